@@ -1,10 +1,11 @@
-import subprocess
 import os
 import shutil
+import subprocess
 import sys
 
 PORT = str(os.environ.get("PORT", "80"))
 
+
 def main() -> None:
     """Main function."""
 
@@ -12,20 +13,28 @@ def main() -> None:
     os.makedirs("/etc/yt-dlp-plugins/", exist_ok=True)
 
     shutil.copy("yt_pot_extractor.py", "/etc/yt-dlp-plugins/")
-    proc = subprocess.Popen(
-        ["uv", "run", "-m", "http.server", PORT],
-        cwd="www",
-        stdout=subprocess.DEVNULL,
-        stderr=subprocess.DEVNULL,
+    # The sync process serves the www files and /metrics itself on PORT.
+    # Run with inherited stdout/stderr for real-time streaming
+    sync_proc = subprocess.Popen(
+        [
+            "uv",
+            "run",
+            "-m",
+            "youtube_sync.cli.sync_multiple",
+            "--config",
+            "config.json",
+            "--port",
+            PORT,
+            "--host",
+            "0.0.0.0",  # published by docker
+            "--www",
+            "www",
+        ],
+        stdout=sys.stdout,
+        stderr=sys.stderr,
     )
-    with proc:
-        # Run with inherited stdout/stderr for real-time streaming
-        sync_proc = subprocess.Popen(
-            ["uv", "run", "-m", "youtube_sync.cli.sync_multiple", "--config", "config.json"],
-            stdout=sys.stdout,
-            stderr=sys.stderr,
-        )
-        sync_proc.wait()
+    sync_proc.wait()
+
 
 if __name__ == "__main__":
     main()
@@ -61,11 +61,15 @@ class YouTubeSync:
         return out
 
     def scan_for_vids(
-        self, limit: int | None, stop_on_duplicate_vids: bool = False
+        self,
+        limit: int | None,
+        stop_on_duplicate_vids: bool = False,
+        force: bool = False,
     ) -> list[VidEntry]:
         out = self.impl.scan_for_vids(
             limit=limit,
             stop_on_duplicate_vids=stop_on_duplicate_vids,
+            force=force,
         )
         return out
 
@@ -76,8 +80,10 @@ class YouTubeSync:
     def download(
         self,
         limit: int | None,
+        vids: list[VidEntry] | None = None,
+        fresh_days: int | None = None,
     ) -> None:
-        self.impl.download(limit)
+        self.impl.download(limit, vids=vids, fresh_days=fresh_days)
 
     def sync(
         self,
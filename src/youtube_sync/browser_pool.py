@@ -0,0 +1,364 @@
+"""
+One long lived headless Chromium shared by the cookie, user agent and scan code.
+
+Playwright's sync API has to be driven from the thread that started it, so the
+pool owns a worker thread that launches the browser on first use and runs the
+callers' functions there, one at a time. Each call gets a browser context: a
+fresh one by default, or a named one that is kept (with its cookies and cache)
+for later calls with the same key. The browser is closed after it has been
+idle for a while and launched again on the next call.
+
+A call waits a bounded time for its result. When a running call overruns it,
+the browser is taken as hung: the worker and its browser are left behind to
+shut down once the call returns, and the queued and later calls get a new
+worker with a new browser.
+
+The user agent is cached on disk with a TTL, so most processes never start a
+browser just to read it.
+
+Environment overrides:
+  YOUTUBE_SYNC_BROWSER_IDLE_SECONDS: close the browser after this long unused (default 600)
+  YOUTUBE_SYNC_BROWSER_TASK_TIMEOUT_SECONDS: how long a call waits for its result (default 300)
+  YOUTUBE_SYNC_USER_AGENT_FILE: user agent cache (default: user_agent.json in the user data dir)
+  YOUTUBE_SYNC_USER_AGENT_TTL_SECONDS: lifetime of the cached user agent (default 7 days)
+"""
+
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, TypeVar
+
+from appdirs import user_data_dir  # type: ignore[reportUnknownVariableType]
+
+from youtube_sync.envutil import env_float
+from youtube_sync.logutil import create_logger
+
+logger = create_logger(__name__, "INFO")
+
+T = TypeVar("T")
+
+ENV_IDLE_SECONDS = "YOUTUBE_SYNC_BROWSER_IDLE_SECONDS"
+ENV_TASK_TIMEOUT_SECONDS = "YOUTUBE_SYNC_BROWSER_TASK_TIMEOUT_SECONDS"
+ENV_USER_AGENT_FILE = "YOUTUBE_SYNC_USER_AGENT_FILE"
+ENV_USER_AGENT_TTL = "YOUTUBE_SYNC_USER_AGENT_TTL_SECONDS"
+
+DEFAULT_IDLE_SECONDS = 600.0
+# The launch timeout of start_browser().
+DEFAULT_TASK_TIMEOUT_SECONDS = 300.0
+DEFAULT_USER_AGENT_TTL_SECONDS = 7 * 24 * 60 * 60.0
+
+# Returns the browser and the function that closes it.
+Launcher = Callable[[], tuple[Any, Callable[[], None]]]
+
+
+def _default_launcher() -> tuple[Any, Callable[[], None]]:
+    from youtube_sync.playwright_launcher import start_browser
+
+    return start_browser()
+
+
+@dataclass
+class _Task:
+    fn: Callable[[Any], Any]
+    context_key: str | None
+    future: "Future[Any]"
+
+
+# Set on the worker threads, to refuse calls from inside a task.
+_IN_WORKER = threading.local()
+
+
+class _Worker:
+    """The browser thread and what it owns, replaced when a call hangs."""
+
+    def __init__(self, pool: "BrowserPool") -> None:
+        self.pool = pool
+        self.tasks: queue.Queue[_Task | None] = queue.Queue()
+        # Only touched from the worker thread.
+        self.browser: Any = None
+        self.stop_browser: Callable[[], None] | None = None
+        self.contexts: dict[str, Any] = {}
+        self.thread = threading.Thread(
+            target=self._loop, name="browser-pool", daemon=True
+        )
+        self.thread.start()
+
+    def _loop(self) -> None:
+        _IN_WORKER.active = True
+        while True:
+            try:
+                task = self.tasks.get(timeout=self.pool.idle_seconds)
+            except queue.Empty:
+                if self.browser is not None:
+                    logger.info("Browser idle, closing it")
+                    self._shutdown_browser()
+                continue
+            if task is None:
+                self._shutdown_browser()
+                return
+            if task.future.set_running_or_notify_cancel():
+                self._run_task(task)
+
+    def _run_task(self, task: _Task) -> None:
+        context: Any = None
+        try:
+            context = self._context(task.context_key)
+            result = task.fn(context)
+        except BaseException as e:  # pylint: disable=broad-exception-caught
+            task.future.set_exception(e)
+            if self.browser is not None and not self.browser.is_connected():
+                logger.warning("Browser disconnected, it will be relaunched")
+                self._shutdown_browser()
+        else:
+            task.future.set_result(result)
+        finally:
+            if task.context_key is None and context is not None:
+                try:
+                    context.close()
+                except Exception as e:  # pylint: disable=broad-exception-caught
+                    logger.warning(f"Error closing browser context: {e}")
+
+    def _context(self, key: str | None) -> Any:
+        if self.browser is None:
+            start = time.perf_counter()
+            launcher = self.pool._launcher  # pylint: disable=protected-access
+            self.browser, self.stop_browser = launcher()
+            self.pool.launches += 1
+            logger.info(f"Browser launched in {time.perf_counter() - start:.1f}s")
+        if key is None:
+            return self.browser.new_context()
+        context = self.contexts.get(key)
+        if context is None:
+            context = self.browser.new_context()
+            self.contexts[key] = context
+        return context
+
+    def _shutdown_browser(self) -> None:
+        stop = self.stop_browser
+        self.browser = None
+        self.stop_browser = None
+        self.contexts.clear()
+        if stop is None:
+            return
+        try:
+            stop()
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logger.warning(f"Error closing browser: {e}")
+
+
+class BrowserPool:
+    """Runs functions against a shared browser on its own thread."""
+
+    def __init__(
+        self,
+        launcher: Launcher | None = None,
+        idle_seconds: float | None = None,
+        task_timeout: float | None = None,
+    ) -> None:
+        self._launcher = launcher or _default_launcher
+        self.idle_seconds = (
+            idle_seconds
+            if idle_seconds is not None
+            else env_float(ENV_IDLE_SECONDS, DEFAULT_IDLE_SECONDS)
+        )
+        self.task_timeout = (
+            task_timeout
+            if task_timeout is not None
+            else env_float(ENV_TASK_TIMEOUT_SECONDS, DEFAULT_TASK_TIMEOUT_SECONDS)
+        )
+        self._lock = threading.Lock()
+        self._worker: _Worker | None = None
+        self.launches = 0
+        self.recycles = 0
+
+    def run(
+        self,
+        fn: Callable[[Any], T],
+        context_key: str | None = None,
+        timeout: float | None = None,
+    ) -> T:
+        """Call fn(context) on the browser thread and return its result.
+
+        Without a context_key the context is new and closed afterwards, with one
+        the same context is handed to every call using that key. Raises
+        TimeoutError after timeout (default task_timeout) seconds, and moves
+        the pool to a new browser if the call was running by then.
+        """
+        if getattr(_IN_WORKER, "active", False):
+            raise RuntimeError("BrowserPool.run() called from inside a pool task")
+        future: Future[Any] = Future()
+        with self._lock:
+            if self._worker is None or not self._worker.thread.is_alive():
+                self._worker = _Worker(self)
+            worker = self._worker
+            worker.tasks.put(_Task(fn=fn, context_key=context_key, future=future))
+        timeout = timeout if timeout is not None else self.task_timeout
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            # still queued behind another call: that caller recycles
+            if not future.cancel():
+                self._recycle(worker, timeout)
+            raise
+
+    def _recycle(self, worker: _Worker, timeout: float) -> None:
+        """Leave a hung worker behind, its queued calls go to a new one."""
+        with self._lock:
+            if self._worker is not worker:
+                return  # another caller did it already
+            logger.warning(
+                f"Browser call still running after {timeout:.0f}s, starting a new browser"
+            )
+            self.recycles += 1
+            self._worker = _Worker(self)
+            while True:
+                try:
+                    task = worker.tasks.get_nowait()
+                except queue.Empty:
+                    break
+                if task is not None:
+                    self._worker.tasks.put(task)
+            # closes the old browser once the hung call returns
+            worker.tasks.put(None)
+
+    def scrape(
+        self,
+        url: str,
+        fn: Callable[[Any], T],
+        context_key: str | None = None,
+    ) -> T:
+        """Open url in a new page and return fn(page)."""
+
+        def task(context: Any) -> T:
+            page = context.new_page()
+            try:
+                page.goto(url)
+                return fn(page)
+            finally:
+                page.close()
+
+        return self.run(task, context_key=context_key)
+
+    def cookies(self, url: str) -> list[dict[str, Any]]:
+        """Cookies a fresh context is given by visiting url."""
+
+        def task(context: Any) -> list[dict[str, Any]]:
+            page = context.new_page()
+            try:
+                page.goto(url)
+                return [dict(c) for c in context.cookies()]
+            finally:
+                page.close()
+
+        return self.run(task)
+
+    def user_agent(self) -> str:
+        """The browser's user agent, see get_user_agent() for the cached one."""
+
+        def task(context: Any) -> str:
+            page = context.new_page()
+            try:
+                return str(page.evaluate("navigator.userAgent"))
+            finally:
+                page.close()
+
+        return self.run(task)
+
+    def close(self, timeout: float = 30) -> None:
+        """Close the browser and stop the thread, the next run() starts over."""
+        with self._lock:
+            worker = self._worker
+            if worker is None or not worker.thread.is_alive():
+                return
+            worker.tasks.put(None)
+            worker.thread.join(timeout)
+            self._worker = None
+
+
+_POOL: BrowserPool | None = None
+_POOL_LOCK = threading.Lock()
+
+
+def browser_pool() -> BrowserPool:
+    """Get the process wide browser pool."""
+    global _POOL  # pylint: disable=global-statement
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = BrowserPool()
+        return _POOL
+
+
+def _close_pool() -> None:
+    with _POOL_LOCK:
+        pool = _POOL
+    if pool is not None:
+        pool.close(timeout=10)
+
+
+atexit.register(_close_pool)
+
+
+def default_user_agent_path() -> Path:
+    override = os.environ.get(ENV_USER_AGENT_FILE)
+    if override:
+        return Path(override)
+    out = os.path.join(user_data_dir("youtube-sync"), "user_agent.json")  # type: ignore[reportUnknownMemberType, reportUnknownArgumentType]
+    return Path(out)
+
+
+def read_cached_user_agent(
+    path: Path | None = None,
+    ttl_seconds: float | None = None,
+    now: float | None = None,
+) -> str | None:
+    """The cached user agent, None if there is none or it is too old."""
+    path = path or default_user_agent_path()
+    ttl_seconds = (
+        ttl_seconds
+        if ttl_seconds is not None
+        else env_float(ENV_USER_AGENT_TTL, DEFAULT_USER_AGENT_TTL_SECONDS)
+    )
+    now = now if now is not None else time.time()
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        user_agent = str(data["user_agent"])
+        saved = float(data["saved"])
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logger.warning(f"Ignoring unreadable user agent cache {path}: {e}")
+        return None
+    if not user_agent or now - saved > ttl_seconds:
+        return None
+    return user_agent
+
+
+def write_cached_user_agent(
+    user_agent: str, path: Path | None = None, now: float | None = None
+) -> None:
+    path = path or default_user_agent_path()
+    data = {"user_agent": user_agent, "saved": now if now is not None else time.time()}
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning(f"Could not cache the user agent in {path}: {e}")
+
+
+def get_user_agent(pool: BrowserPool | None = None, path: Path | None = None) -> str:
+    """The browser user agent from the disk cache, asking the browser when stale."""
+    cached = read_cached_user_agent(path)
+    if cached is not None:
+        return cached
+    user_agent = (pool or browser_pool()).user_agent()
+    write_cached_user_agent(user_agent, path)
+    return user_agent
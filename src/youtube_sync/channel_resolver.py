@@ -0,0 +1,279 @@
+"""
+Persistent cache of resolved channels.
+
+Resolving a channel is slow: a Rumble handle takes one or two page fetches to
+tell a /c/ channel from a /user/ one, a YouTube handle takes a full yt-dlp run
+for its UC... id. The answers (canonical url, channel id, user or channel
+form) are kept in a json file next to the source health state and reused
+until they are YOUTUBE_SYNC_CHANNEL_CACHE_DAYS old. A channel that doesn't
+resolve is remembered as well, for YOUTUBE_SYNC_CHANNEL_RETRY_MINUTES, so it
+costs one lookup per interval instead of one per cycle. Network errors aren't
+cached: the lookup runs again next time and an outdated answer is used
+meanwhile, when there is one.
+
+resolve_channels() resolves the configured channels missing from the cache
+concurrently, at startup.
+
+Environment overrides:
+  YOUTUBE_SYNC_CHANNEL_CACHE_DAYS: how long a resolution is kept (default 30)
+  YOUTUBE_SYNC_CHANNEL_RETRY_MINUTES: how long a failed one is kept (default 60)
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+from appdirs import user_data_dir  # type: ignore[reportUnknownVariableType]
+from filelock import FileLock
+
+from youtube_sync.config import Channel
+from youtube_sync.envutil import env_float
+from youtube_sync.logutil import create_logger
+from youtube_sync.types import Source
+
+logger = create_logger(__name__, "INFO")
+
+ENV_CACHE_DAYS = "YOUTUBE_SYNC_CHANNEL_CACHE_DAYS"
+ENV_RETRY_MINUTES = "YOUTUBE_SYNC_CHANNEL_RETRY_MINUTES"
+
+DEFAULT_CACHE_DAYS = 30.0
+DEFAULT_RETRY_MINUTES = 60.0
+RESOLVE_CONCURRENCY = 8
+
+
+@dataclass
+class ChannelResolution:
+    """What a channel resolved to, error is set when it didn't resolve."""
+
+    url: str | None = None
+    channel_id: str | None = None
+    is_user: bool | None = None
+    error: str | None = None
+    resolved_at: float = 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+    @staticmethod
+    def from_dict(data: dict[str, Any]) -> "ChannelResolution":
+        return ChannelResolution(
+            url=data.get("url"),
+            channel_id=data.get("channel_id"),
+            is_user=data.get("is_user"),
+            error=data.get("error"),
+            resolved_at=float(data.get("resolved_at", 0.0)),
+        )
+
+
+def resolution_key(source: Source, handle: str) -> str:
+    return f"{source.value}:{handle}"
+
+
+def _default_cache_path() -> Path:
+    out = os.path.join(user_data_dir("youtube-sync"), "channels.json")  # type: ignore[reportUnknownMemberType, reportUnknownArgumentType]
+    return Path(out)
+
+
+class ChannelResolver:
+    """The resolution cache, persisted to a json file."""
+
+    def __init__(
+        self,
+        cache_path: Path | None = None,
+        ttl: float | None = None,
+        negative_ttl: float | None = None,
+    ) -> None:
+        self.cache_path = cache_path or _default_cache_path()
+        self.ttl = (
+            ttl
+            if ttl is not None
+            else env_float(ENV_CACHE_DAYS, DEFAULT_CACHE_DAYS) * 24 * 60 * 60
+        )
+        self.negative_ttl = (
+            negative_ttl
+            if negative_ttl is not None
+            else env_float(ENV_RETRY_MINUTES, DEFAULT_RETRY_MINUTES) * 60
+        )
+        self._file_lock = FileLock(f"{self.cache_path}.lock")
+        self._lock = threading.Lock()
+        self._key_locks: dict[str, threading.Lock] = {}
+        self._cache: dict[str, ChannelResolution] = {}
+        self.load()
+
+    def load(self) -> None:
+        with self._lock, self._file_lock:
+            if not self.cache_path.exists():
+                return
+            try:
+                data = json.loads(self.cache_path.read_text(encoding="utf-8"))
+                for key, item in data.get("channels", {}).items():
+                    self._cache[key] = ChannelResolution.from_dict(item)
+            except Exception as e:  # pylint: disable=broad-except
+                logger.error(
+                    f"Error loading the channel cache from {self.cache_path}: {e}"
+                )
+
+    def save(self) -> None:
+        with self._lock:
+            data = {"channels": {key: r.to_dict() for key, r in self._cache.items()}}
+        text = json.dumps(data, indent=4)
+        with self._file_lock:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.cache_path.with_suffix(".tmp")
+            tmp.write_text(text, encoding="utf-8")
+            os.replace(tmp, self.cache_path)
+
+    def get(self, key: str, now: float | None = None) -> ChannelResolution | None:
+        """The cached resolution, None when there is none or it expired."""
+        now = now if now is not None else time.time()
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached is None:
+            return None
+        ttl = self.negative_ttl if cached.error is not None else self.ttl
+        return cached if now - cached.resolved_at < ttl else None
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            if key not in self._key_locks:
+                self._key_locks[key] = threading.Lock()
+            return self._key_locks[key]
+
+    def resolve(
+        self,
+        key: str,
+        lookup: Callable[[], ChannelResolution],
+        now: float | None = None,
+    ) -> ChannelResolution:
+        """The cached resolution of key, or what lookup() finds. The lookup
+        returns a resolution with error set when the channel doesn't exist
+        (that is cached), and raises on errors worth retrying (not cached)."""
+        with self._key_lock(key):
+            cached = self.get(key, now)
+            if cached is not None:
+                return cached
+            try:
+                out = lookup()
+            except Exception as e:  # pylint: disable=broad-except
+                with self._lock:
+                    stale = self._cache.get(key)
+                if stale is None or stale.error is not None:
+                    raise
+                logger.warning(
+                    f"Could not resolve {key} again, using the answer from {time.ctime(stale.resolved_at)}: {e}"
+                )
+                return stale
+            out.resolved_at = now if now is not None else time.time()
+            with self._lock:
+                self._cache[key] = out
+            self.save()
+            return out
+
+
+_RESOLVER: ChannelResolver | None = None
+_RESOLVER_LOCK = threading.Lock()
+
+
+def channel_resolver() -> ChannelResolver:
+    """Get the process wide resolution cache."""
+    global _RESOLVER  # pylint: disable=global-statement
+    with _RESOLVER_LOCK:
+        if _RESOLVER is None:
+            _RESOLVER = ChannelResolver()
+        return _RESOLVER
+
+
+def set_channel_resolver_path(path: Path) -> None:
+    """Use a different cache file, mostly for tests."""
+    global _RESOLVER  # pylint: disable=global-statement
+    with _RESOLVER_LOCK:
+        _RESOLVER = ChannelResolver(cache_path=path)
+
+
+def youtube_channel_id(channel_url: str, fetch: Callable[[str], str]) -> str | None:
+    """The UC... id of the channel, fetch() resolves a handle (yt-dlp)."""
+    from youtube_sync.youtube.rss_scanner import channel_id_from_url
+    from youtube_sync.ytdlp.error import ChannelIdNotFound
+
+    channel_id = channel_id_from_url(channel_url)
+    if channel_id is not None:
+        return channel_id
+
+    def lookup() -> ChannelResolution:
+        try:
+            return ChannelResolution(
+                url=channel_url, channel_id=str(fetch(channel_url))
+            )
+        except (
+            ChannelIdNotFound
+        ) as e:  # yt-dlp ran and found nothing, other failures aren't cached
+            return ChannelResolution(url=channel_url, error=str(e)[-500:])
+
+    resolution = channel_resolver().resolve(
+        resolution_key(Source.YOUTUBE, channel_url), lookup
+    )
+    if resolution.channel_id is None:
+        logger.warning(
+            f"Could not resolve the channel id of {channel_url}: {resolution.error}"
+        )
+    return resolution.channel_id
+
+
+def resolve_channels(
+    channels: list[Channel], concurrency: int = RESOLVE_CONCURRENCY
+) -> None:
+    """Resolve the channels missing from the cache, a few at a time."""
+    from youtube_sync.to_channel_url import to_channel_url
+    from youtube_sync.youtube.rss_scanner import rss_scan_enabled
+
+    resolver = channel_resolver()
+    ytdlp_lock = threading.Lock()
+    ytdlps: list[Any] = []
+
+    def fetch_channel_id(url: str) -> str:
+        from youtube_sync.ytdlp.ytdlp import YtDlp
+
+        with ytdlp_lock:
+            if not ytdlps:
+                ytdlps.append(YtDlp(source=Source.YOUTUBE))
+        return str(ytdlps[0].fetch_channel_id(url))
+
+    def resolve(channel: Channel) -> None:
+        try:
+            url = to_channel_url(source=channel.source, channel_id=channel.channel_id)
+            if channel.source == Source.YOUTUBE and rss_scan_enabled():
+                # only the feed check needs the id
+                youtube_channel_id(url, fetch_channel_id)
+        except Exception as e:  # pylint: disable=broad-except
+            logger.warning(f"Could not resolve {channel.name}: {e}")
+
+    todo = [c for c in channels if _needs_resolving(resolver, c, rss_scan_enabled())]
+    if not todo:
+        return
+    logger.info(f"Resolving {len(todo)} channels")
+    with ThreadPoolExecutor(
+        max_workers=max(1, min(concurrency, len(todo))), thread_name_prefix="resolve"
+    ) as pool:
+        list(pool.map(resolve, todo))
+
+
+def _needs_resolving(
+    resolver: ChannelResolver, channel: Channel, need_ids: bool
+) -> bool:
+    from youtube_sync.to_channel_url import to_channel_url
+    from youtube_sync.youtube.rss_scanner import channel_id_from_url
+
+    if channel.source == Source.RUMBLE:
+        return resolver.get(resolution_key(Source.RUMBLE, channel.channel_id)) is None
+    if channel.source == Source.YOUTUBE and need_ids:
+        url = to_channel_url(source=channel.source, channel_id=channel.channel_id)
+        return (
+            channel_id_from_url(url) is None
+            and resolver.get(resolution_key(Source.YOUTUBE, url)) is None
+        )
+    return False
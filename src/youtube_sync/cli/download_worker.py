@@ -0,0 +1,54 @@
+"""
+Command entry point for a download worker of the coordinator mode.
+"""
+
+import argparse
+import os
+from dataclasses import dataclass
+
+from youtube_sync.download_worker import ENV_COORDINATOR_URL, DownloadWorker
+from youtube_sync.logutil import create_logger
+from youtube_sync.web_server import ENV_WORKER_TOKEN, worker_token
+
+logger = create_logger(__name__, "INFO")
+
+
+@dataclass
+class Args:
+    """Command line arguments."""
+
+    coordinator: str
+    concurrency: int
+
+
+def parse_args() -> Args:
+    parser = argparse.ArgumentParser("youtube-sync-worker")
+    parser.add_argument(
+        "--coordinator",
+        default=os.environ.get(ENV_COORDINATOR_URL),
+        help=f"Base url of the coordinator, e.g. http://sync:8080 (default ${ENV_COORDINATOR_URL}).",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Downloads to run at the same time.",
+    )
+    tmp = parser.parse_args()
+    if not tmp.coordinator:
+        parser.error(f"--coordinator or ${ENV_COORDINATOR_URL} is required")
+    if worker_token() is None:
+        parser.error(
+            f"${ENV_WORKER_TOKEN} is required, the coordinator refuses workers without it"
+        )
+    return Args(coordinator=tmp.coordinator, concurrency=tmp.concurrency)
+
+
+def main() -> None:
+    args = parse_args()
+    logger.info(f"Arguments: {args}")
+    DownloadWorker(args.coordinator, concurrency=args.concurrency).run()
+
+
+if __name__ == "__main__":
+    main()
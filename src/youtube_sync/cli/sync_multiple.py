@@ -5,23 +5,56 @@ Command entry point for syncing multiple YouTube channels.
 # pylint: disable=consider-using-f-string
 
 import argparse
+import contextlib
 import logging
 import os
 import time
 import traceback
 from dataclasses import dataclass
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any
+from typing import Any, Generator
 
 from virtual_fs import FSPath, Vfs
 
-from youtube_sync import Channel, YouTubeSync
+from youtube_sync import Channel, VidEntry, YouTubeSync
+from youtube_sync.channel_resolver import resolve_channels
 from youtube_sync.config import Config
+from youtube_sync.control import (
+    Action,
+    ChannelState,
+    ControlApi,
+    ControlError,
+    TriggerThread,
+    channel_lock,
+    status_board,
+)
+from youtube_sync.cookie_refresher import start_cookie_refresher
+from youtube_sync.coordinator import start_coordinator
+from youtube_sync.download_scheduler import DownloadScheduler
 from youtube_sync.logutil import create_logger
+from youtube_sync.metrics import CYCLE_SECONDS
+from youtube_sync.scan_scheduler import (
+    max_scan_delay,
+    min_scan_delay,
+    scan_schedule_enabled,
+)
 from youtube_sync.settings import ENV_JSON
+from youtube_sync.sharding import ShardManager, channel_key, shard_manager
+from youtube_sync.source_health import source_health
 from youtube_sync.to_channel_url import to_channel_url
+from youtube_sync.tracing import start_run
+from youtube_sync.web_server import (
+    DEFAULT_HOST,
+    ENV_WORKER_TOKEN,
+    start_web_server,
+    worker_token,
+)
 
 logger = create_logger(__name__, logging.DEBUG)
+
+# Shortest sleep between cycles, whatever the scan schedule says.
+MIN_SLEEP_SECONDS = 60
 # set debug logging for all youtube_sync modules
 logging.getLogger("youtube_sync").setLevel(logging.DEBUG)
 
@@ -40,6 +73,15 @@ class Args:
     dry_run: bool
     download_limit: int
     once: bool
+    # serve /metrics (and the www files) on this port, None disables it
+    port: int | None = None
+    www: Path | None = None
+    # interface the port listens on, 0.0.0.0 for a container
+    host: str = DEFAULT_HOST
+    # run from the persistent job queue instead of cycles, see daemon.py
+    daemon: bool = False
+    # hand the downloads to remote workers, see coordinator.py
+    coordinator: bool = False
 
     def __post_init__(self) -> None:
         # check types
@@ -62,6 +104,14 @@ class Args:
         ), f"Expected int, got {type(self.download_limit)}"
 
         assert isinstance(self.once, bool), f"Expected bool, got {type(self.once)}"
+        if self.port is not None:
+            _check_type(self.port, int)
+        if self.coordinator and self.port is None:
+            raise ValueError("--coordinator needs --port, the workers connect to it")
+        if self.coordinator and worker_token() is None:
+            raise ValueError(
+                f"--coordinator needs ${ENV_WORKER_TOKEN}, the workers authenticate with it"
+            )
 
 
 def parse_args() -> Args:
@@ -89,6 +139,33 @@ def parse_args() -> Args:
         action="store_true",
         help="Run once, do not loop.",
     )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Run scans and downloads from a persistent job queue that survives restarts.",
+    )
+    parser.add_argument(
+        "--coordinator",
+        action="store_true",
+        help="Scan here and hand the downloads to youtube-sync-worker processes over --port.",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        help="Serve /metrics and the --www files on this port.",
+        default=None,
+    )
+    parser.add_argument(
+        "--host",
+        help=f"Interface --port listens on (default {DEFAULT_HOST}, 0.0.0.0 for all).",
+        default=DEFAULT_HOST,
+    )
+    parser.add_argument(
+        "--www",
+        type=Path,
+        help="Directory of static files served next to /metrics.",
+        default=None,
+    )
     tmp = parser.parse_args()
     if tmp.dry_run:
         logger.info("Dry run, no downloads will be performed.")
@@ -99,6 +176,11 @@ def parse_args() -> Args:
         download_limit=tmp.download_limit,
         dry_run=tmp.dry_run,
         once=tmp.once,
+        port=tmp.port,
+        www=tmp.www,
+        host=tmp.host,
+        daemon=tmp.daemon,
+        coordinator=tmp.coordinator,
     )
     return args
 
@@ -109,9 +191,22 @@ def _get_config(path: Path | None) -> Config | Exception:
     return Config.from_env()
 
 
-def _process_channel(
-    channel: Channel, cwd: FSPath, download_limit: int, dry_run: bool
-) -> None:
+def _open_channel(channel: Channel, cwd: FSPath) -> YouTubeSync:
+    url = to_channel_url(source=channel.source, channel_id=channel.channel_id)
+    return YouTubeSync(
+        channel_name=channel.name,
+        channel_id=channel.channel_id,
+        media_output=channel.to_fs_path(cwd),
+        source=channel.source,
+        channel_url=url,  # Using channel_id as the URL
+    )
+
+
+def _scan_channel(
+    channel: Channel, cwd: FSPath, dry_run: bool, force: bool = False
+) -> YouTubeSync | None:
+    """Open the channel library and scan it for new videos."""
+    board = status_board()
     try:
         logger.info(f"Processing channel: {channel.name}")
         # Get source from channel
@@ -124,41 +219,156 @@ def _process_channel(
             logger.info(f"Output: {cwd}")
             logger.info(f"Source: {source}")
             logger.info(f"Path: {path}")
-            return
-
-        url = to_channel_url(source=source, channel_id=channel.channel_id)
+            return None
 
         # Create YouTubeSync instance
-        yt = YouTubeSync(
-            channel_name=channel.name,
-            channel_id=channel.channel_id,
-            media_output=path,
-            source=source,
-            channel_url=url,  # Using channel_id as the URL
-        )
+        yt = _open_channel(channel, cwd)
 
         # Default limits
         scan_limit = 1000  # Default value
 
         # Scan for videos
         logger.info(f"Scanning channel {channel.name} with limit {scan_limit}")
-        yt.scan_for_vids(scan_limit)
+        with channel_lock(channel.name), board.activity(channel, ChannelState.SCANNING):
+            yt.scan_for_vids(scan_limit, force=force)
+        state = yt.library.scan_state()
+        board.update(channel, last_scan=state.last_scan, next_scan=state.next_scan)
+        return yt
+    except Exception as e:
+        stacktrace_str = traceback.format_exc()
+        logger.error(stacktrace_str)
+        logger.error(f"Failed to process channel: {channel.name}")
+        logger.error(e)
+        return None
 
-        # Download videos
-        logger.info(
-            f"Downloading videos for {channel.name} with limit {download_limit}"
-        )
-        yt.download(download_limit)
 
+def _download_channel(
+    channel: Channel,
+    yt: YouTubeSync,
+    vids: list[VidEntry] | None,
+    limit: int | None,
+    fresh_days: int | None = None,
+) -> None:
+    board = status_board()
+    try:
+        logger.info(f"Downloading videos for {channel.name} with limit {limit}")
+        in_flight = len(vids) if vids is not None else 0
+        with (
+            channel_lock(channel.name),
+            board.activity(channel, ChannelState.DOWNLOADING, in_flight),
+        ):
+            yt.download(limit, vids=vids, fresh_days=fresh_days)
         logger.info(f"Finished processing channel: {channel.name}")
     except Exception as e:
         stacktrace_str = traceback.format_exc()
         logger.error(stacktrace_str)
-        logger.error(f"Failed to process channel: {channel.name}")
+        logger.error(f"Failed to download channel: {channel.name}")
         logger.error(e)
+    if vids is None or vids:
+        missing = yt.find_vids_missing_downloads(refresh=False)
+        if not isinstance(missing, Exception):
+            board.update(channel, queued=len(missing))
+
+
+@contextlib.contextmanager
+def _working_on(
+    shards: ShardManager | None, channel: Channel
+) -> Generator[bool, None, None]:
+    """Keeps the channel's lease from being handed over while the block runs,
+    yields whether this node holds it."""
+    if shards is None:
+        yield True
+        return
+    with shards.busy(channel_key(channel)) as held:
+        yield held
+
+
+def _run_trigger(
+    args: Args, channel: Channel, action: Action, shards: ShardManager | None
+) -> None:
+    """Scan (whatever the schedule says) and download one channel now."""
+    config = _get_config(args.config)
+    if isinstance(config, Exception):
+        raise config
+    with (
+        Vfs.begin(config.output, rclone_conf=config.rclone) as cwd,  # type: ignore[reportUnknownMemberType]
+        _working_on(shards, channel) as held,
+    ):
+        if not held:
+            logger.warning(f"Lease on {channel.name} was lost, skipping the trigger")
+            return
+        if action == Action.SCAN:
+            yt = _scan_channel(channel, cwd, dry_run=args.dry_run, force=True)
+        else:
+            yt = None if args.dry_run else _open_channel(channel, cwd)
+        if yt is not None:
+            _download_channel(
+                channel,
+                yt,
+                vids=None,
+                limit=args.download_limit,
+                fresh_days=config.cmd_options.fresh_days,
+            )
 
 
-def run(args: Args) -> None:
+def _start_control_api(args: Args, shards: ShardManager | None) -> None:
+    """Serve the /api routes, triggers run on a background thread."""
+    config = _get_config(args.config)
+    if isinstance(config, Exception):
+        raise config
+    runner = TriggerThread(
+        lambda channel, action: _run_trigger(args, channel, action, shards)
+    )
+
+    def trigger(channel: Channel, action: Action) -> None:
+        if shards is not None and not shards.holds(channel_key(channel)):
+            raise ControlError(f"{channel.name} is held by another node")
+        runner(channel, action)
+
+    ControlApi(config.channels, trigger).register_routes()
+
+
+def _make_scheduler(
+    synced: list[tuple[Channel, YouTubeSync]], fresh_days: int
+) -> DownloadScheduler:
+    scheduler = DownloadScheduler(fresh_days=fresh_days)
+    for channel, yt in synced:
+        scheduler.add_library(yt.library, weight=channel.weight)
+    return scheduler
+
+
+def _next_cycle_at(
+    synced: list[tuple[Channel, YouTubeSync]],
+    backlog: bool,
+    now: datetime | None = None,
+) -> datetime:
+    """When the next cycle is due: the earliest next scan of the channels, and
+    no later than the minimum scan delay while downloads are left over."""
+    now = now or datetime.now()
+    if not scan_schedule_enabled():
+        return now + min_scan_delay()
+    wake = now + max_scan_delay()
+    for _, yt in synced:
+        next_scan = yt.library.scan_state().next_scan
+        if next_scan is not None:
+            wake = min(wake, next_scan)
+    if backlog:
+        wake = min(wake, now + min_scan_delay())
+    return max(wake, now + timedelta(seconds=MIN_SLEEP_SECONDS))
+
+
+def _claimed_channels(
+    channels: list[Channel], shards: ShardManager | None
+) -> list[Channel]:
+    """The channels this node works on, all of them without sharding."""
+    if shards is None:
+        return channels
+    held = set(shards.claim([channel_key(c) for c in channels]))
+    return [c for c in channels if channel_key(c) in held]
+
+
+def run(args: Args, shards: ShardManager | None = None) -> datetime | None:
+    """One sync cycle, returns when the next one is due (None if unknown)."""
     # Load the config file
     config = _get_config(args.config)
     if isinstance(config, Exception):
@@ -169,29 +379,140 @@ def run(args: Args) -> None:
 
     output = config.output
     with Vfs.begin(output, rclone_conf=rclone_config) as cwd:  # type: ignore[reportUnknownMemberType]
-        # Process each channel in the config
-        for channel in config.channels:
-            logger.info(f"Processing channel: {channel.name}")
-            _process_channel(
-                channel=channel,
-                cwd=cwd,
-                download_limit=args.download_limit,
-                dry_run=args.dry_run,
-            )
+        # Scan every channel first so the scheduler sees all missing downloads.
+        synced: list[tuple[Channel, YouTubeSync]] = []
+        for channel in _claimed_channels(config.channels, shards):
+            with _working_on(shards, channel) as held:
+                if not held:
+                    logger.warning(f"Lease on {channel.name} was lost, skipping it")
+                    continue
+                yt = _scan_channel(channel=channel, cwd=cwd, dry_run=args.dry_run)
+            if yt is not None:
+                synced.append((channel, yt))
+        if not synced:
+            return None
+
+        # The download limit is the budget for the whole cycle, shared across
+        # channels with fresh uploads first and round-robin fairness.
+        scheduler = _make_scheduler(synced, fresh_days=config.cmd_options.fresh_days)
+        logger.info(f"Download schedule:\n{scheduler}")
+        by_name = {channel.name: channel for channel, _ in synced}
+        for entry in scheduler.summary():
+            if entry["channel"] in by_name:
+                status_board().update(
+                    by_name[entry["channel"]], queued=entry["fresh"] + entry["backfill"]
+                )
+        planned = {
+            id(library): vids
+            for library, vids in scheduler.plan_by_library(args.download_limit)
+        }
+        health = source_health()
+        for channel, yt in synced:
+            if health.is_paused(channel.source):
+                # The rest of the sources keep going while this one cools down.
+                logger.warning(
+                    f"Source {channel.source.value} is paused, skipping downloads for {channel.name}"
+                )
+                continue
+            with _working_on(shards, channel) as held:
+                if not held:
+                    logger.warning(
+                        f"Lease on {channel.name} was lost, skipping its downloads"
+                    )
+                    continue
+                # Channels with nothing planned still get a pass so their missing
+                # upload dates are filled in, the planned vids bound the downloads.
+                vids = planned.get(id(yt.library), [])
+                _download_channel(channel=channel, yt=yt, vids=vids, limit=None)
+        backlog = len(scheduler) > sum(len(vids) for vids in planned.values())
+        return _next_cycle_at(synced, backlog=backlog)
+
+
+def run_daemon(args: Args) -> None:
+    """Run the scans and downloads from the persistent job queue, forever."""
+    from youtube_sync.daemon import SyncDaemon
+    from youtube_sync.job_queue import JobQueue
+
+    config = _get_config(args.config)
+    if isinstance(config, Exception):
+        logger.error(f"Failed to load config: {config}")
+        raise config
+    with Vfs.begin(config.output, rclone_conf=config.rclone) as cwd:  # type: ignore[reportUnknownMemberType]
+        queue = JobQueue()
+        logger.info(f"Daemon mode, job queue at {queue.path}")
+        daemon = SyncDaemon(config, cwd, queue, shards=shard_manager(cwd))
+        if args.port is not None:
+            ControlApi(config.channels, daemon.trigger).register_routes()
+        daemon.run_forever()
+
+
+@contextlib.contextmanager
+def _sharding(args: Args) -> Generator[ShardManager | None, None, None]:
+    """The channel leases of this node, renewed for as long as the process
+    runs so they survive the sleeps between cycles."""
+    config = _get_config(args.config)
+    if isinstance(config, Exception):
+        raise config
+    with Vfs.begin(config.output, rclone_conf=config.rclone) as root:  # type: ignore[reportUnknownMemberType]
+        shards = shard_manager(root)
+        if shards is None:
+            yield None
+            return
+        logger.info(f"Sharding on, node {shards.node}")
+        shards.start_heartbeat()
+        try:
+            yield shards
+        finally:
+            shards.stop_heartbeat()
+            shards.release_all()
+
+
+def _resolve_channels(args: Args) -> None:
+    """Fill the channel cache up front, rather than one lookup at a time
+    in the first cycle."""
+    config = _get_config(args.config)
+    if isinstance(config, Exception):
+        raise config
+    resolve_channels(config.channels)
 
 
 def main() -> None:
     args = parse_args()
     logger.info(f"Arguments: {args}")
-
-    while True:
-        run(args)
-        if args.once:
-            break
-        # Sleep for a while before the next run
-        logger.info("Sleeping for 1 hour...")
-        # Sleep for 1 hour
-        time.sleep(3600)
+    _resolve_channels(args)
+
+    if args.port is not None:
+        start_web_server(args.port, directory=args.www, host=args.host)
+    if args.coordinator:
+        start_coordinator()
+    if not args.once:
+        # the process lives for days, keep the cookies fresh between cycles
+        start_cookie_refresher()
+
+    if args.daemon and not args.once:
+        run_daemon(args)
+        return
+
+    with _sharding(args) as shards:
+        if args.port is not None and not args.once:
+            _start_control_api(args, shards)
+        while True:
+            run_id = start_run()
+            logger.info(f"Starting sync cycle {run_id}")
+            with CYCLE_SECONDS.time():
+                next_cycle = run(args, shards)
+            if args.once:
+                break
+            # Sleep until the next channel is due for a scan
+            if next_cycle is None:
+                next_cycle = datetime.now() + min_scan_delay()
+            sleep_seconds = max(
+                MIN_SLEEP_SECONDS, (next_cycle - datetime.now()).total_seconds()
+            )
+            logger.info(
+                f"Sleeping {sleep_seconds / 60:.0f} minutes, until {next_cycle}"
+            )
+            time.sleep(sleep_seconds)
 
 
 def unit_test() -> None:
@@ -0,0 +1,142 @@
+"""
+Command entry point for summarizing the stage traces of a sync run.
+"""
+
+import argparse
+import json
+import math
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from youtube_sync.tracing import default_trace_path
+
+
+@dataclass
+class Args:
+    """Command line arguments."""
+
+    trace_file: Path
+    run_id: str | None  # None means the last run in the file
+    all_runs: bool
+
+
+@dataclass
+class StageSummary:
+    """Aggregated timings of one stage."""
+
+    stage: str
+    count: int
+    failures: int
+    p50: float
+    p95: float
+    max: float
+    total: float
+
+
+def parse_args() -> Args:
+    parser = argparse.ArgumentParser("youtube-sync-trace-report")
+    parser.add_argument(
+        "--trace-file",
+        type=Path,
+        default=None,
+        help="Path of the JSONL trace log, defaults to the one the sync writes.",
+    )
+    parser.add_argument("--run", help="Run id to report, defaults to the last run.")
+    parser.add_argument(
+        "--all", action="store_true", help="Report over every run in the file."
+    )
+    tmp = parser.parse_args()
+    return Args(
+        trace_file=tmp.trace_file or default_trace_path(),
+        run_id=tmp.run,
+        all_runs=tmp.all,
+    )
+
+
+def load_spans(path: Path) -> list[dict[str, Any]]:
+    """Read the span records, skipping lines that don't parse."""
+    out: list[dict[str, Any]] = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "stage" in record and "duration_seconds" in record:
+                out.append(record)
+    return out
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest rank percentile of a non empty list."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(spans: list[dict[str, Any]]) -> list[StageSummary]:
+    """Per stage summaries, the stage with the most total time first."""
+    by_stage: dict[str, list[dict[str, Any]]] = {}
+    for record in spans:
+        by_stage.setdefault(str(record["stage"]), []).append(record)
+    out: list[StageSummary] = []
+    for stage, records in by_stage.items():
+        durations = [float(r["duration_seconds"]) for r in records]
+        out.append(
+            StageSummary(
+                stage=stage,
+                count=len(records),
+                failures=sum(1 for r in records if not r.get("ok", True)),
+                p50=percentile(durations, 50),
+                p95=percentile(durations, 95),
+                max=max(durations),
+                total=sum(durations),
+            )
+        )
+    out.sort(key=lambda s: s.total, reverse=True)
+    return out
+
+
+def select_run(spans: list[dict[str, Any]], run_id: str | None) -> list[dict[str, Any]]:
+    if run_id is None:
+        if not spans:
+            return []
+        run_id = spans[-1].get("run_id")
+    return [s for s in spans if s.get("run_id") == run_id]
+
+
+def format_report(summaries: list[StageSummary]) -> str:
+    header = f"{'stage':<16}{'count':>7}{'fail':>6}{'p50 s':>10}{'p95 s':>10}{'max s':>10}{'total s':>11}"
+    lines = [header, "-" * len(header)]
+    for s in summaries:
+        lines.append(
+            f"{s.stage:<16}{s.count:>7}{s.failures:>6}{s.p50:>10.2f}{s.p95:>10.2f}"
+            f"{s.max:>10.2f}{s.total:>11.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main() -> int:
+    args = parse_args()
+    if not args.trace_file.exists():
+        print(f"No trace file at {args.trace_file}", file=sys.stderr)
+        return 1
+    spans = load_spans(args.trace_file)
+    if not args.all_runs:
+        spans = select_run(spans, args.run_id)
+    if not spans:
+        print("No spans found", file=sys.stderr)
+        return 1
+    runs = sorted({str(s.get("run_id")) for s in spans})
+    print(f"Trace: {args.trace_file} ({len(spans)} spans, runs: {', '.join(runs)})")
+    print(format_report(summarize(spans)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
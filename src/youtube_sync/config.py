@@ -21,14 +21,18 @@ logger = create_logger(__name__, "WARNING")
 class CmdOptions:
     download: bool
     scan: bool
+    # uploads newer than this many days are downloaded ahead of the backfill
+    fresh_days: int = 7
 
     @staticmethod
     def from_dict(data: dict[str, Any]) -> "CmdOptions":
         download = data.get("download", True)
         scan = data.get("scan", True)
+        fresh_days = int(data.get("fresh_days", 7))
         return CmdOptions(
             download=download,
             scan=scan,
+            fresh_days=fresh_days,
         )
 
 
@@ -51,6 +55,8 @@ class Channel:
     name: str
     source: Source
     channel_id: str
+    # download slots per scheduler round, relative to the other channels
+    weight: int = 1
 
     @staticmethod
     def from_dict(data: dict[str, Any]) -> "Channel":
@@ -58,6 +64,7 @@ class Channel:
             name=data["name"],
             source=Source.from_str(data["source"]),
             channel_id=data["channel_id"],
+            weight=int(data.get("weight", 1)),
         )
 
     def to_fs_path(self, root: FSPath) -> FSPath:
@@ -71,6 +78,7 @@ class Channel:
         assert isinstance(
             self.channel_id, str
         ), f"Expecting channel_id to be a string: {self.channel_id}"
+        assert self.weight >= 1, f"Expecting weight >= 1: {self.weight}"
         self.channel_id = _fix_channel_id_if_necessary(self.source, self.channel_id)
 
     # hash
@@ -0,0 +1,313 @@
+"""
+Control API on the built-in web server.
+
+  GET  /api/status    per channel status (state, queued and in-flight
+                      downloads, last error, last and next scan) and the
+                      health of every source
+  POST /api/scan      {"channel": name} scan the channel now, whatever its
+                      schedule, and download what's new
+  POST /api/download  {"channel": name} download the channel's missing
+                      videos now
+  POST /api/pause     {"source": name, "minutes": n} pause a source, until
+                      resumed when minutes is left out
+  POST /api/resume    {"source": name}
+
+Triggers return 202 right away. How they run depends on the mode: the sync
+loop runs them on a background thread, taking the same per-channel lock as
+the cycle (see channel_lock()), the daemon moves the channel's jobs to the
+front of its queue. The POST routes want the YOUTUBE_SYNC_WORKER_TOKEN secret
+as "Authorization: Bearer <token>" (see web_server.require_token()) and are
+refused while it isn't set, /api/status is open to anyone who reaches the
+port.
+"""
+
+import json
+import queue
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from enum import Enum
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler
+from typing import Any, Callable
+
+from youtube_sync.config import Channel
+from youtube_sync.logutil import create_logger
+from youtube_sync.source_health import SourceHealthController, source_health
+from youtube_sync.types import Source
+from youtube_sync.web_server import (
+    ENV_WORKER_TOKEN,
+    read_body,
+    register_route,
+    require_token,
+    worker_token,
+)
+
+logger = create_logger(__name__, "INFO")
+
+JSON_TYPE = "application/json"
+# The commands are small JSON objects.
+MAX_BODY_BYTES = 64 * 1024
+
+
+class Action(Enum):
+    SCAN = "scan"
+    DOWNLOAD = "download"
+
+
+class ControlError(Exception):
+    """A trigger that can't run, e.g. the channel is held by another node."""
+
+
+class ChannelState(Enum):
+    IDLE = "idle"
+    SCANNING = "scanning"
+    DOWNLOADING = "downloading"
+
+
+@dataclass
+class ChannelStatus:
+    """What a channel is up to, as shown by /api/status."""
+
+    channel: str
+    source: str
+    state: str = ChannelState.IDLE.value
+    queued: int = 0
+    in_flight: int = 0
+    last_error: str | None = None
+    last_error_at: float | None = None
+    last_scan: str | None = None
+    next_scan: str | None = None
+    updated_at: float = field(default_factory=time.time)
+
+
+class StatusBoard:
+    """Live status of every channel, updated by the sync loop or daemon."""
+
+    def __init__(self) -> None:
+        self._status: dict[str, ChannelStatus] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, channel: Channel) -> ChannelStatus:
+        if channel.name not in self._status:
+            self._status[channel.name] = ChannelStatus(
+                channel=channel.name, source=channel.source.value
+            )
+        return self._status[channel.name]
+
+    def update(self, channel: Channel, **fields: Any) -> None:
+        with self._lock:
+            status = self._get(channel)
+            for name, value in fields.items():
+                if isinstance(value, datetime):
+                    value = value.isoformat(timespec="seconds")
+                elif isinstance(value, Enum):
+                    value = value.value
+                setattr(status, name, value)
+            status.updated_at = time.time()
+
+    def error(self, channel: Channel, error: str | Exception) -> None:
+        self.update(channel, last_error=str(error)[-500:], last_error_at=time.time())
+
+    def activity(
+        self, channel: Channel, state: ChannelState, in_flight: int = 0
+    ) -> "_Activity":
+        """Context manager that shows the state while it lasts and records
+        the error it ends with."""
+        return _Activity(self, channel, state, in_flight)
+
+    def snapshot(self) -> list[dict[str, Any]]:
+        with self._lock:
+            return [asdict(status) for status in self._status.values()]
+
+
+class _Activity:
+    def __init__(
+        self, board: StatusBoard, channel: Channel, state: ChannelState, in_flight: int
+    ) -> None:
+        self.board = board
+        self.channel = channel
+        self.state = state
+        self.in_flight = in_flight
+
+    def __enter__(self) -> None:
+        self.board.update(self.channel, state=self.state, in_flight=self.in_flight)
+
+    def __exit__(self, exc_type: object, exc_val: object, exc_tb: object) -> None:
+        if isinstance(exc_val, Exception):
+            self.board.error(self.channel, exc_val)
+        self.board.update(self.channel, state=ChannelState.IDLE, in_flight=0)
+
+
+_BOARD = StatusBoard()
+_CHANNEL_LOCKS: dict[str, threading.Lock] = {}
+_CHANNEL_LOCKS_LOCK = threading.Lock()
+
+
+def status_board() -> StatusBoard:
+    return _BOARD
+
+
+def channel_lock(name: str) -> threading.Lock:
+    """The lock that keeps the cycle and the triggers of a channel apart."""
+    with _CHANNEL_LOCKS_LOCK:
+        if name not in _CHANNEL_LOCKS:
+            _CHANNEL_LOCKS[name] = threading.Lock()
+        return _CHANNEL_LOCKS[name]
+
+
+# Runs (or queues) an action for a channel, raises ControlError to refuse it.
+Trigger = Callable[[Channel, Action], None]
+
+
+class TriggerThread:
+    """Runs triggered actions one at a time on a background thread. An action
+    that is already waiting isn't queued twice."""
+
+    def __init__(self, run: Trigger) -> None:
+        self.run = run
+        self._queue: queue.Queue[tuple[Channel, Action]] = queue.Queue()
+        self._waiting: set[tuple[str, Action]] = set()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._loop, name="control_triggers", daemon=True
+        )
+        self._thread.start()
+
+    def __call__(self, channel: Channel, action: Action) -> None:
+        with self._lock:
+            if (channel.name, action) in self._waiting:
+                return
+            self._waiting.add((channel.name, action))
+        self._queue.put((channel, action))
+
+    def join(self) -> None:
+        """Wait until the queued actions ran."""
+        self._queue.join()
+
+    def _loop(self) -> None:
+        while True:
+            channel, action = self._queue.get()
+            with self._lock:
+                self._waiting.discard((channel.name, action))
+            try:
+                logger.info(f"Running triggered {action.value} of {channel.name}")
+                self.run(channel, action)
+            except Exception as e:  # pylint: disable=broad-except
+                logger.error(f"Triggered {action.value} of {channel.name} failed: {e}")
+                status_board().error(channel, e)
+            finally:
+                self._queue.task_done()
+
+
+class ControlApi:
+    """The /api routes over the configured channels."""
+
+    def __init__(
+        self,
+        channels: list[Channel],
+        trigger: Trigger,
+        health: SourceHealthController | None = None,
+    ) -> None:
+        self.channels = {c.name: c for c in channels}
+        self.trigger = trigger
+        self.health = health or source_health()
+        for channel in channels:
+            status_board().update(channel)
+
+    def _trigger(
+        self, handler: SimpleHTTPRequestHandler, action: Action
+    ) -> tuple[int, str, bytes]:
+        params = _read_json(handler)
+        channel = self.channels.get(str(params.get("channel")))
+        if channel is None:
+            return _json(
+                HTTPStatus.NOT_FOUND,
+                {"error": f"unknown channel {params.get('channel')!r}"},
+            )
+        try:
+            self.trigger(channel, action)
+        except ControlError as e:
+            return _json(HTTPStatus.CONFLICT, {"error": str(e)})
+        logger.info(f"Triggered {action.value} of {channel.name}")
+        return _json(
+            HTTPStatus.ACCEPTED, {"channel": channel.name, "action": action.value}
+        )
+
+    def _scan_route(self, handler: SimpleHTTPRequestHandler) -> tuple[int, str, bytes]:
+        return self._trigger(handler, Action.SCAN)
+
+    def _download_route(
+        self, handler: SimpleHTTPRequestHandler
+    ) -> tuple[int, str, bytes]:
+        return self._trigger(handler, Action.DOWNLOAD)
+
+    def _pause_route(self, handler: SimpleHTTPRequestHandler) -> tuple[int, str, bytes]:
+        params = _read_json(handler)
+        source = Source.from_str(str(params.get("source")))
+        minutes = params.get("minutes")
+        if minutes is not None and (
+            not isinstance(minutes, (int, float))
+            or isinstance(minutes, bool)
+            or minutes <= 0
+        ):
+            raise ValueError(f"minutes must be a positive number, got {minutes!r}")
+        paused_until = self.health.pause(
+            source, float(minutes) * 60 if minutes is not None else None
+        )
+        return _json(
+            HTTPStatus.OK, {"source": source.value, "paused_until": paused_until}
+        )
+
+    def _resume_route(
+        self, handler: SimpleHTTPRequestHandler
+    ) -> tuple[int, str, bytes]:
+        source = Source.from_str(str(_read_json(handler).get("source")))
+        self.health.resume(source)
+        return _json(HTTPStatus.OK, {"source": source.value})
+
+    def _status_route(self, _: SimpleHTTPRequestHandler) -> tuple[int, str, bytes]:
+        return _json(
+            HTTPStatus.OK,
+            {"channels": status_board().snapshot(), "sources": self.health.snapshot()},
+        )
+
+    def register_routes(self) -> None:
+        if worker_token() is None:
+            logger.warning(
+                f"${ENV_WORKER_TOKEN} isn't set, the control commands are refused"
+            )
+        register_route("GET", "/api/status", self._status_route)
+        for path, route in (
+            ("/api/scan", self._scan_route),
+            ("/api/download", self._download_route),
+            ("/api/pause", self._pause_route),
+            ("/api/resume", self._resume_route),
+        ):
+            register_route(
+                "POST", path, require_token(_bad_request_on_value_error(route))
+            )
+
+
+def _read_json(handler: SimpleHTTPRequestHandler) -> dict[str, Any]:
+    data = json.loads(read_body(handler, MAX_BODY_BYTES) or b"{}")
+    if not isinstance(data, dict):
+        raise ValueError("Expecting a JSON object")
+    return data  # type: ignore[return-value]
+
+
+def _json(status: int, data: Any) -> tuple[int, str, bytes]:
+    return status, JSON_TYPE, json.dumps(data).encode("utf-8")
+
+
+def _bad_request_on_value_error(
+    route: Callable[[SimpleHTTPRequestHandler], tuple[int, str, bytes]],
+) -> Callable[[SimpleHTTPRequestHandler], tuple[int, str, bytes]]:
+    def wrapped(handler: SimpleHTTPRequestHandler) -> tuple[int, str, bytes]:
+        try:
+            return route(handler)
+        except ValueError as e:  # includes bad JSON and unknown sources
+            return _json(HTTPStatus.BAD_REQUEST, {"error": str(e)})
+
+    return wrapped
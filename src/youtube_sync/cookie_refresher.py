@@ -0,0 +1,162 @@
+"""
+Background refresh of the cookies before they go stale.
+
+Every source whose cookies are loaded in this process is checked periodically.
+Its cookies are refreshed when they are close to Cookies.refresh_due_at() (the
+expiry in the cookies.txt or the COOKIE_REFRESH_SECONDS age, whichever comes
+first), or when the circuit breaker recorded a bot check failure after the
+cookies were made. The new cookies are fetched without holding COOKIES_LOCK
+and written with os.replace, so yt-dlp runs that already have the path keep
+going and Cookies.refresh() callers pick the new ones up.
+
+Environment overrides:
+  YOUTUBE_SYNC_COOKIE_CHECK_SECONDS: how often the cookies are checked (default 60)
+  YOUTUBE_SYNC_COOKIE_REFRESH_LEAD_SECONDS: refresh this long before due (default 3600)
+  YOUTUBE_SYNC_COOKIE_MIN_REFRESH_SECONDS: least time between refreshes of a source (default 600)
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable
+
+from filelock import FileLock
+
+from youtube_sync import cookies as cookies_module
+from youtube_sync.cookies import Cookies, get_cookie_paths
+from youtube_sync.envutil import env_float
+from youtube_sync.logutil import create_logger
+from youtube_sync.source_health import (
+    FailureKind,
+    SourceHealthController,
+    source_health,
+)
+from youtube_sync.types import Source
+
+logger = create_logger(__name__, "INFO")
+
+ENV_CHECK_SECONDS = "YOUTUBE_SYNC_COOKIE_CHECK_SECONDS"
+ENV_LEAD_SECONDS = "YOUTUBE_SYNC_COOKIE_REFRESH_LEAD_SECONDS"
+ENV_MIN_REFRESH_SECONDS = "YOUTUBE_SYNC_COOKIE_MIN_REFRESH_SECONDS"
+
+# Failures that mean the platform no longer accepts the cookies.
+_AUTH_FAILURES = (FailureKind.BOT_CHECK,)
+
+
+def fetch_cookies(source: Source) -> Cookies:
+    """Get fresh cookies from the browser and save them atomically."""
+    paths = get_cookie_paths(source)
+    with FileLock(paths.lck):
+        return Cookies.from_browser(source, save=True)
+
+
+class CookieRefresher:
+    """Refreshes the loaded cookies ahead of expiry or after auth failures."""
+
+    def __init__(
+        self,
+        check_seconds: float | None = None,
+        lead_seconds: float | None = None,
+        min_refresh_seconds: float | None = None,
+        fetch: Callable[[Source], Cookies] = fetch_cookies,
+        health: SourceHealthController | None = None,
+    ) -> None:
+        self.check_seconds = (
+            check_seconds
+            if check_seconds is not None
+            else env_float(ENV_CHECK_SECONDS, 60.0)
+        )
+        self.lead_seconds = (
+            lead_seconds
+            if lead_seconds is not None
+            else env_float(ENV_LEAD_SECONDS, 3600.0)
+        )
+        self.min_refresh_seconds = (
+            min_refresh_seconds
+            if min_refresh_seconds is not None
+            else env_float(ENV_MIN_REFRESH_SECONDS, 600.0)
+        )
+        self._fetch = fetch
+        self._health = health
+        self._last_refresh: dict[Source, float] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def refresh_reason(self, cookies: Cookies, now: datetime) -> str | None:
+        """Why the cookies should be refreshed now, None if they are fine."""
+        health = (self._health or source_health()).get(cookies.source)
+        if (
+            health.last_failure_kind in _AUTH_FAILURES
+            and health.last_failure_at > cookies.creation_time.timestamp()
+        ):
+            return (
+                f"{health.last_failure_kind.value} failure since the cookies were made"
+            )
+        if cookies_module._no_expire_cookies():  # pylint: disable=protected-access
+            return None
+        due = cookies.refresh_due_at() - timedelta(seconds=self.lead_seconds)
+        if now >= due:
+            return f"due at {cookies.refresh_due_at().isoformat(timespec='seconds')}"
+        return None
+
+    def check_once(self, now: float | None = None) -> list[Source]:
+        """Refresh what needs it, returns the refreshed sources."""
+        now = time.time() if now is None else now
+        with cookies_module.COOKIES_LOCK:
+            loaded = dict(cookies_module.COOKIES)
+        refreshed: list[Source] = []
+        for source, current in loaded.items():
+            if now - self._last_refresh.get(source, 0.0) < self.min_refresh_seconds:
+                continue
+            reason = self.refresh_reason(current, datetime.fromtimestamp(now))
+            if reason is None:
+                continue
+            logger.info(f"Refreshing cookies for {source.value}: {reason}")
+            self._last_refresh[source] = now
+            try:
+                fresh = self._fetch(source)
+            except Exception as e:  # pylint: disable=broad-except
+                logger.error(
+                    f"Background cookie refresh for {source.value} failed: {e}"
+                )
+                continue
+            with cookies_module.COOKIES_LOCK:
+                cookies_module.COOKIES[source] = fresh
+            refreshed.append(source)
+        return refreshed
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.check_seconds):
+            try:
+                self.check_once()
+            except Exception as e:  # pylint: disable=broad-except
+                logger.error(f"Cookie refresher check failed: {e}")
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="cookie-refresher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 10) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+_REFRESHER: CookieRefresher | None = None
+_REFRESHER_LOCK = threading.Lock()
+
+
+def start_cookie_refresher() -> CookieRefresher:
+    """Start the process wide cookie refresher, for long running processes."""
+    global _REFRESHER  # pylint: disable=global-statement
+    with _REFRESHER_LOCK:
+        if _REFRESHER is None:
+            _REFRESHER = CookieRefresher()
+        _REFRESHER.start()
+        return _REFRESHER
@@ -12,12 +12,40 @@ from filelock import FileLock
 from youtube_sync.open_webdriver import open_webdriver  # type: ignore
 
 from .logutil import create_logger
+from .tracing import span
 from .types import Source
 
 # Set up module logger
 logger = create_logger(__name__, logging.getLogger().level)
 
 COOKIE_REFRESH_SECONDS = 2 * 24 * 60 * 60  # 2 days
+# Cookies that live shorter than this are rotated by the site on every visit,
+# their expiry is not a reason to refresh.
+MIN_COOKIE_LIFETIME_SECONDS = 60 * 60
+
+
+def parse_cookie_expiries(text: str) -> list[float]:
+    """Expiry timestamps of the non session cookies in a Netscape cookies.txt."""
+    out: list[float] = []
+    for line in text.splitlines():
+        if line.startswith("#HttpOnly_"):
+            line = line[len("#HttpOnly_") :]
+        elif not line.strip() or line.startswith("#"):
+            continue
+        fields = line.split("\t")
+        if len(fields) != 7:
+            continue
+        try:
+            expiry = float(fields[4])
+        except ValueError:
+            continue
+        if expiry > 0:
+            out.append(expiry)
+    return out
+
+
+def _no_expire_cookies() -> bool:
+    return os.environ.get("NO_EXPIRE_COOKIES", "0").lower() == "1"
 
 
 def _convert_cookies_to_txt(cookies: list[dict[str, Any]]) -> str:
@@ -52,7 +80,9 @@ def _convert_cookies_to_txt(cookies: list[dict[str, Any]]) -> str:
         # Secure field: 'TRUE' if cookie is secure, otherwise 'FALSE'
         secure: str = "TRUE" if cookie.get("secure", False) else "FALSE"
         # Use expiry if provided; otherwise, set to 0 for a session cookie.
-        expiry: str = str(cookie.get("expiry", 0))
+        # WebDriver calls it "expiry", Playwright "expires" with -1 for session.
+        expiry_value = cookie.get("expiry", cookie.get("expires", 0)) or 0
+        expiry: str = str(max(0, int(expiry_value)))
         name: str = cookie.get("name", "")
         value: str = cookie.get("value", "")
 
@@ -81,22 +111,13 @@ def _get_cookies_from_browser_using_webdriver(url: str) -> list[dict[str, Any]]:
 
 
 def _get_cookies_from_browser_using_playwright(url: str) -> list[dict[str, Any]]:
-    from .playwright_launcher import Page, launch_playwright, set_headless
+    from .browser_pool import browser_pool
 
     logger.info("Getting cookies using Playwright from %s", url)
-    set_headless(True)
-    out: list[dict[str, Any]] = []
-
     try:
-        page: Page
-        with launch_playwright() as (page, _):
-            logger.debug("Navigating to %s", url)
-            page.goto(url)
-            cookies = page.context.cookies()
-            # convert to list of dicts
-            out = [dict(c) for c in cookies]
-            logger.info("Retrieved %d cookies from Playwright", len(out))
-            return out
+        out = browser_pool().cookies(url)
+        logger.info("Retrieved %d cookies from Playwright", len(out))
+        return out
     except Exception as e:
         logger.error("Error getting cookies with Playwright: %s", str(e))
         raise
@@ -167,7 +188,7 @@ def _get_or_refresh_cookies(
     logger.debug(
         "Cookie paths: pkl=%s, txt=%s, lock=%s", paths.pkl, paths.txt, paths.lck
     )
-    no_expire_cookies = os.environ.get("NO_EXPIRE_COOKIES", "0").lower() == "1"
+    no_expire_cookies = _no_expire_cookies()
 
     with FileLock(paths.lck):
         logger.debug("Acquired lock for cookie refresh: %s", paths.lck)
@@ -178,19 +199,16 @@ def _get_or_refresh_cookies(
         # case 1: we have cookies in memory
         if cookies is not None:
             # and they are not expired
-            expire_time = cookies.creation_time + timedelta(
-                seconds=COOKIE_REFRESH_SECONDS
-            )
-            if now < expire_time or no_expire_cookies:
+            if not cookies.needs_refresh(now) or no_expire_cookies:
                 logger.info(
                     "Using existing cookies (not expired, age: %d seconds)",
-                    (now - cookies.creation_time).seconds,
+                    cookies.age_seconds(now),
                 )
                 return cookies
             else:
                 logger.info(
                     "#################################\n# EXPIRED COOKIES!! expired (age: %d seconds)\n#################################",
-                    (now - cookies.creation_time).seconds,
+                    cookies.age_seconds(now),
                 )
         else:
             logger.info("No cookies provided in memory")
@@ -212,12 +230,12 @@ def _get_or_refresh_cookies(
                 logger.error("Loaded cookies from txt file: %s", cookies_txt)
             try:
                 if isinstance(yt_cookies, Cookies):
-                    seconds_old = (now - yt_cookies.creation_time).seconds
+                    seconds_old = yt_cookies.age_seconds(now)
                     logger.info(
                         "Loaded cookies from disk, age: %d seconds", seconds_old
                     )
 
-                    if seconds_old < COOKIE_REFRESH_SECONDS:
+                    if not yt_cookies.needs_refresh(now):
                         logger.info(
                             "Using cookies from disk (not expired, age: %d seconds)",
                             seconds_old,
@@ -242,6 +260,18 @@ def _get_or_refresh_cookies(
         return yt_cookies
 
 
+def _atomic_write(file_path: Path, data: bytes) -> None:
+    tmp = file_path.with_name(
+        f"{file_path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+    )
+    try:
+        tmp.write_bytes(data)
+        os.replace(tmp, file_path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
 COOKIES: dict[Source, "Cookies"] = {}
 COOKIES_LOCK = threading.Lock()
 
@@ -253,9 +283,14 @@ def get_or_refresh_cookies(
     global COOKIES
 
     with COOKIES_LOCK:
-        if source not in COOKIES:
+        current = COOKIES.get(source)
+        if current is None:
             logger.info("Creating new Cookies object for %s", source.value)
             COOKIES[source] = _get_or_refresh_cookies(source=source, cookies=cookies)
+        elif current.needs_refresh() and not _no_expire_cookies():
+            # Normally the CookieRefresher got here first, this is the fallback.
+            logger.info("Cookies for %s are due for a refresh", source.value)
+            COOKIES[source] = _get_or_refresh_cookies(source=source, cookies=current)
         return COOKIES[source]
 
 
@@ -267,21 +302,12 @@ def set_cookie_refresh_seconds(seconds: int) -> None:
 _USER_AGENT: str | None = None
 
 
-def _get_user_agent_no_cache() -> str:
-    from playwright.sync_api import sync_playwright
-
-    with sync_playwright() as p:
-        browser = p.chromium.launch()
-        page = browser.new_page()
-        user_agent = page.evaluate("navigator.userAgent")
-        browser.close()
-        return user_agent
-
-
 def get_user_agent() -> str:
     global _USER_AGENT
     if _USER_AGENT is None:
-        _USER_AGENT = _get_user_agent_no_cache()
+        from .browser_pool import get_user_agent as get_cached_user_agent
+
+        _USER_AGENT = get_cached_user_agent()
     return _USER_AGENT
 
 
@@ -289,8 +315,8 @@ class Cookies:
 
     @staticmethod
     def get_or_refresh(source: Source, cookies: "Cookies | None") -> "Cookies":
-
-        return get_or_refresh_cookies(source=source, cookies=cookies)
+        with span("cookies", source=source.value):
+            return get_or_refresh_cookies(source=source, cookies=cookies)
 
     @staticmethod
     def from_txt(source: Source, txt: str) -> "Cookies":
@@ -345,8 +371,37 @@ class Cookies:
     def cookies_txt(self) -> str:
         return self._cookies_txt
 
+    def age_seconds(self, now: datetime | None = None) -> float:
+        now = now or datetime.now()
+        return (now - self.creation_time).total_seconds()
+
+    def expires_at(self) -> datetime | None:
+        """When the first cookie that is meant to last expires, None if none are."""
+        created = self.creation_time.timestamp()
+        lasting = [
+            e
+            for e in parse_cookie_expiries(self.cookies_txt)
+            if e - created >= MIN_COOKIE_LIFETIME_SECONDS
+        ]
+        if not lasting:
+            return None
+        return datetime.fromtimestamp(min(lasting))
+
+    def refresh_due_at(self) -> datetime:
+        """The earlier of the cookie expiry and the COOKIE_REFRESH_SECONDS age limit."""
+        due = self.creation_time + timedelta(seconds=COOKIE_REFRESH_SECONDS)
+        expires = self.expires_at()
+        if expires is not None and expires < due:
+            return expires
+        return due
+
+    def needs_refresh(self, now: datetime | None = None) -> bool:
+        now = now or datetime.now()
+        return now >= self.refresh_due_at()
+
     def write_cookies_txt(self, file_path: Path):
-        file_path.write_text(self.cookies_txt, encoding="utf-8")
+        # yt-dlp runs may be reading the file, they see the old or the new one
+        _atomic_write(file_path, self.cookies_txt.encode("utf-8"))
 
     @staticmethod
     def load(source: Source) -> "Cookies":
@@ -408,8 +463,7 @@ class Cookies:
         Args:
             file_path: Path where the pickle file will be saved
         """
-        with open(file_path, "wb") as f:
-            pickle.dump(self, f)
+        _atomic_write(file_path, pickle.dumps(self))
 
     @staticmethod
     def from_pickle(file_path: Path | str) -> "Cookies":
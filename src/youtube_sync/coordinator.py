@@ -0,0 +1,335 @@
+"""
+Coordinator side of the distributed download mode.
+
+The coordinator owns scanning and the libraries. Instead of running yt-dlp
+itself it queues each DownloadRequest as a task, and stateless download
+workers (see download_worker.py), on this host or others, pull tasks over
+HTTP from the built-in web server:
+
+  POST /worker/lease   {"worker": id, "wait": seconds}
+       -> 200 {"id", "url", "source", "download_vid", "download_date"}
+       -> 204 when nothing is queued within `wait`
+  POST /worker/result  one JSON line {"id", "worker", "date", "error",
+       "error_type"}, a newline, then the mp3 bytes (empty without a video)
+
+The coordinator writes the mp3 to the request's output and resolves the
+download future with the FinalResult, so the library code is the same as for
+local downloads and only the coordinator touches library.json and the
+output. A task whose worker goes quiet is handed out again after the lease
+runs out, and fails after a few tries. A task that no worker takes fails once
+it has been queued for YOUTUBE_SYNC_REMOTE_PENDING_SECONDS. A background
+thread checks both while there are tasks, so the downloads end even if every
+worker is gone.
+
+Both routes want the shared secret of YOUTUBE_SYNC_WORKER_TOKEN as
+"Authorization: Bearer <token>" (see web_server.require_token()), and a
+result is refused when it's bigger than YOUTUBE_SYNC_REMOTE_MAX_RESULT_MB.
+
+Environment overrides:
+  YOUTUBE_SYNC_REMOTE_LEASE_SECONDS: how long a worker has for one task (default 3600)
+  YOUTUBE_SYNC_REMOTE_MAX_ATTEMPTS: leases of a task before it fails (default 3)
+  YOUTUBE_SYNC_REMOTE_PENDING_SECONDS: how long a task waits for a worker (default 3600)
+  YOUTUBE_SYNC_REMOTE_MAX_RESULT_MB: largest result a worker may post (default 1024)
+"""
+
+import collections
+import itertools
+import json
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from datetime import datetime
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler
+from typing import Any
+
+from youtube_sync.envutil import env_float
+from youtube_sync.final_result import FinalResult
+from youtube_sync.logutil import create_logger
+from youtube_sync.metrics import BYTES_UPLOADED, QUEUE_DEPTH
+from youtube_sync.types import Source
+from youtube_sync.web_server import read_body, register_route, require_token
+from youtube_sync.ytdlp.download_request import DownloadRequest
+from youtube_sync.ytdlp.error import SourcePausedException
+
+logger = create_logger(__name__, "INFO")
+
+ENV_REMOTE_LEASE_SECONDS = "YOUTUBE_SYNC_REMOTE_LEASE_SECONDS"
+ENV_REMOTE_MAX_ATTEMPTS = "YOUTUBE_SYNC_REMOTE_MAX_ATTEMPTS"
+ENV_REMOTE_MAX_RESULT_MB = "YOUTUBE_SYNC_REMOTE_MAX_RESULT_MB"
+ENV_REMOTE_PENDING_SECONDS = "YOUTUBE_SYNC_REMOTE_PENDING_SECONDS"
+
+DEFAULT_REMOTE_LEASE_SECONDS = 3600.0
+DEFAULT_REMOTE_MAX_ATTEMPTS = 3
+DEFAULT_REMOTE_MAX_RESULT_MB = 1024.0
+DEFAULT_REMOTE_PENDING_SECONDS = 3600.0
+# How often the expiry thread looks at the tasks.
+REAP_SECONDS = 30.0
+# A lease request is a small JSON object.
+MAX_LEASE_BYTES = 64 * 1024
+# Longest a lease request waits for a task.
+MAX_LEASE_WAIT_SECONDS = 30.0
+
+JSON_TYPE = "application/json"
+
+
+class RemoteDownloadError(Exception):
+    """A download that failed on a worker, with the worker's error text."""
+
+
+@dataclass
+class _Task:
+    id: str
+    request: DownloadRequest
+    source: Source
+    future: Future[FinalResult]
+    attempts: int = 0
+    worker: str | None = None
+    lease_expires: float = 0.0
+    queued_at: float = 0.0
+
+
+class Coordinator:
+    """Queues download requests for the workers and collects their results."""
+
+    def __init__(
+        self,
+        lease_seconds: float | None = None,
+        max_attempts: int | None = None,
+        max_result_bytes: int | None = None,
+        pending_seconds: float | None = None,
+        reap_seconds: float = REAP_SECONDS,
+    ) -> None:
+        self.lease_seconds = (
+            lease_seconds
+            if lease_seconds is not None
+            else env_float(ENV_REMOTE_LEASE_SECONDS, DEFAULT_REMOTE_LEASE_SECONDS)
+        )
+        self.max_attempts = (
+            max_attempts
+            if max_attempts is not None
+            else int(env_float(ENV_REMOTE_MAX_ATTEMPTS, DEFAULT_REMOTE_MAX_ATTEMPTS))
+        )
+        self.max_result_bytes = (
+            max_result_bytes
+            if max_result_bytes is not None
+            else int(
+                env_float(ENV_REMOTE_MAX_RESULT_MB, DEFAULT_REMOTE_MAX_RESULT_MB)
+                * 1024
+                * 1024
+            )
+        )
+        self.pending_seconds = (
+            pending_seconds
+            if pending_seconds is not None
+            else env_float(ENV_REMOTE_PENDING_SECONDS, DEFAULT_REMOTE_PENDING_SECONDS)
+        )
+        self.reap_seconds = reap_seconds
+        self._reaper: threading.Thread | None = None
+        self._pending: collections.deque[_Task] = collections.deque()
+        self._leased: dict[str, _Task] = {}
+        self._ids = itertools.count(1)
+        self._cond = threading.Condition()
+
+    # ----- coordinator side -----
+
+    def submit(self, request: DownloadRequest, source: Source) -> Future[FinalResult]:
+        future: Future[FinalResult] = Future()
+        with self._cond:
+            task = _Task(
+                id=str(next(self._ids)),
+                request=request,
+                source=source,
+                future=future,
+                queued_at=time.time(),
+            )
+            self._pending.append(task)
+            QUEUE_DEPTH.inc(queue="remote")
+            self._cond.notify()
+            if self._reaper is None:
+                self._reaper = threading.Thread(
+                    target=self._reap, name="coordinator-reaper", daemon=True
+                )
+                self._reaper.start()
+        return future
+
+    def download_mp3s(
+        self, downloads: list[DownloadRequest], source: Source
+    ) -> list[Future[FinalResult]]:
+        return [self.submit(di, source) for di in downloads]
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def leased(self) -> dict[str, str | None]:
+        with self._cond:
+            return {task.request.url: task.worker for task in self._leased.values()}
+
+    def _finish(self, task: _Task, result: FinalResult) -> None:
+        QUEUE_DEPTH.dec(queue="remote")
+        task.future.set_result(result)
+
+    def _fail(self, task: _Task, error: RemoteDownloadError) -> None:
+        logger.error(str(error))
+        self._finish(
+            task, FinalResult(request=task.request, date=None, exception=error)
+        )
+
+    def _expire(self, now: float) -> None:
+        """Fail the tasks nobody took in time, requeue or fail the ones whose
+        lease ran out. Called with the condition held."""
+        for task in [
+            t for t in self._pending if now - t.queued_at >= self.pending_seconds
+        ]:
+            self._pending.remove(task)
+            self._fail(
+                task,
+                RemoteDownloadError(
+                    f"No worker took {task.request.url} in {self.pending_seconds:.0f}s"
+                ),
+            )
+        for task in [t for t in self._leased.values() if t.lease_expires <= now]:
+            del self._leased[task.id]
+            if task.attempts >= self.max_attempts:
+                self._fail(
+                    task,
+                    RemoteDownloadError(
+                        f"No worker finished {task.request.url} in {task.attempts} tries"
+                    ),
+                )
+                continue
+            logger.warning(
+                f"Lease of {task.request.url} by {task.worker} ran out, queueing it again"
+            )
+            task.worker = None
+            task.queued_at = now
+            self._pending.appendleft(task)
+            self._cond.notify()
+
+    def _reap(self) -> None:
+        """Expire the tasks in the background, lease() only sees them while
+        workers ask for work. Stops once no task is left."""
+        while True:
+            time.sleep(self.reap_seconds)
+            with self._cond:
+                self._expire(time.time())
+                if not self._pending and not self._leased:
+                    self._reaper = None
+                    return
+
+    def lease(
+        self, worker: str, wait: float = 0.0, now: float | None = None
+    ) -> _Task | None:
+        """The next queued task for `worker`, waiting up to `wait` seconds."""
+        deadline = time.time() + min(wait, MAX_LEASE_WAIT_SECONDS)
+        with self._cond:
+            while True:
+                self._expire(now if now is not None else time.time())
+                if self._pending:
+                    break
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            task = self._pending.popleft()
+            task.attempts += 1
+            task.worker = worker
+            task.lease_expires = (
+                now if now is not None else time.time()
+            ) + self.lease_seconds
+            self._leased[task.id] = task
+        logger.info(f"Worker {worker} took {task.request.url}")
+        return task
+
+    def complete(
+        self,
+        task_id: str,
+        date: datetime | None,
+        error: Exception | None,
+        mp3: bytes | None,
+    ) -> bool:
+        """Store the worker's result, False for unknown (e.g. expired) tasks."""
+        with self._cond:
+            task = self._leased.pop(task_id, None)
+        if task is None:
+            return False
+        if error is None and mp3:
+            try:
+                task.request.outmp3.parent.mkdir(parents=True, exist_ok=True)
+                task.request.outmp3.write_bytes(mp3)
+                BYTES_UPLOADED.inc(len(mp3), source=task.source.value)
+            except Exception as e:  # pylint: disable=broad-except
+                error = e
+        elif error is None and task.request.download_vid:
+            error = RemoteDownloadError(
+                f"Worker {task.worker} sent no audio for {task.request.url}"
+            )
+        self._finish(
+            task, FinalResult(request=task.request, date=date, exception=error)
+        )
+        return True
+
+    # ----- http routes -----
+
+    def _lease_route(self, handler: SimpleHTTPRequestHandler) -> tuple[int, str, bytes]:
+        body = read_body(handler, MAX_LEASE_BYTES)
+        params: dict[str, Any] = json.loads(body or b"{}")
+        task = self.lease(
+            str(params.get("worker", "?")), wait=float(params.get("wait", 0))
+        )
+        if task is None:
+            return HTTPStatus.NO_CONTENT, JSON_TYPE, b""
+        out = {
+            "id": task.id,
+            "url": task.request.url,
+            "source": task.source.value,
+            "download_vid": task.request.download_vid,
+            "download_date": task.request.download_date,
+        }
+        return HTTPStatus.OK, JSON_TYPE, json.dumps(out).encode("utf-8")
+
+    def _result_route(
+        self, handler: SimpleHTTPRequestHandler
+    ) -> tuple[int, str, bytes]:
+        header, _, mp3 = read_body(handler, self.max_result_bytes).partition(b"\n")
+        meta: dict[str, Any] = json.loads(header)
+        date = datetime.fromisoformat(meta["date"]) if meta.get("date") else None
+        error = _to_exception(meta.get("error"), meta.get("error_type"))
+        if not self.complete(str(meta["id"]), date, error, mp3):
+            return HTTPStatus.CONFLICT, JSON_TYPE, b'{"ok": false}'
+        return HTTPStatus.OK, JSON_TYPE, b'{"ok": true}'
+
+    def register_routes(self) -> None:
+        register_route("POST", "/worker/lease", require_token(self._lease_route))
+        register_route("POST", "/worker/result", require_token(self._result_route))
+
+
+def _to_exception(error: str | None, error_type: str | None) -> Exception | None:
+    if not error:
+        return None
+    if error_type == SourcePausedException.__name__:
+        return SourcePausedException(error)
+    return RemoteDownloadError(error)
+
+
+_COORDINATOR: Coordinator | None = None
+_COORDINATOR_LOCK = threading.Lock()
+
+
+def start_coordinator() -> Coordinator:
+    """Route the downloads of this process to remote workers, served from the
+    web server (which must be started with a port)."""
+    global _COORDINATOR
+    with _COORDINATOR_LOCK:
+        if _COORDINATOR is None:
+            _COORDINATOR = Coordinator()
+            _COORDINATOR.register_routes()
+            logger.info("Coordinator mode, downloads go to the workers")
+        return _COORDINATOR
+
+
+def active_coordinator() -> Coordinator | None:
+    with _COORDINATOR_LOCK:
+        return _COORDINATOR
@@ -0,0 +1,297 @@
+"""
+Daemon mode of sync_multiple, driven by the persistent job queue.
+
+Every channel has a recurring scan job, due at the next scan time of its
+library (see scan_scheduler.py). A scan queues one download job per missing
+video, fresh uploads at a higher priority than the backfill. A scan worker and
+a download worker lease jobs from the queue, so after a restart the daemon
+carries on with the queued downloads and scans when they are due, instead of
+rescanning and re-checking every channel.
+
+Triggers of the control API (see control.py) move the channel's jobs to the
+front of the queue and wake the workers.
+
+With sharding on (see sharding.py) the jobs of channels another node holds
+are deferred, and picked up if that node's lease runs out.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Generator
+
+from virtual_fs import FSPath
+
+from youtube_sync import Channel, VidEntry, YouTubeSync
+from youtube_sync.config import Config
+from youtube_sync.control import Action, ChannelState, ControlError, status_board
+from youtube_sync.download_scheduler import split_lanes
+from youtube_sync.job_queue import (
+    Job,
+    JobKind,
+    JobQueue,
+    JobWorker,
+    Retry,
+    worker_id,
+)
+from youtube_sync.logutil import create_logger
+from youtube_sync.sharding import ShardManager, channel_key
+from youtube_sync.source_health import source_health
+from youtube_sync.to_channel_url import to_channel_url
+
+logger = create_logger(__name__, "INFO")
+
+SCAN_LIMIT = 1000
+SCAN_PRIORITY = 0
+# Scans are recurring, they back off on errors but never give up.
+SCAN_MAX_ATTEMPTS = 1_000_000
+FRESH_PRIORITY = 1
+BACKFILL_PRIORITY = 2
+# Downloads pushed through by hand go before everything else.
+URGENT_PRIORITY = 0
+# A download that ended without the file (e.g. only its upload date was
+# fetched) is looked at again this soon.
+DOWNLOAD_RECHECK_SECONDS = 60.0
+# Done jobs are kept this long, so the queue shows what happened recently.
+KEEP_DONE_SECONDS = 7 * 24 * 60 * 60
+
+
+def scan_key(channel: Channel) -> str:
+    return f"scan:{channel.source.value}:{channel.name}"
+
+
+def download_prefix(channel: Channel) -> str:
+    return f"download:{channel.source.value}:{channel.name}:"
+
+
+def download_key(channel: Channel, vid: VidEntry) -> str:
+    return f"{download_prefix(channel)}{vid.url}"
+
+
+class SyncDaemon:
+    """Runs the scan and download jobs of the configured channels."""
+
+    def __init__(
+        self,
+        config: Config,
+        cwd: FSPath,
+        queue: JobQueue,
+        shards: ShardManager | None = None,
+    ) -> None:
+        self.config = config
+        self.cwd = cwd
+        self.queue = queue
+        self.shards = shards
+        self.channels: dict[str, Channel] = {c.name: c for c in config.channels}
+        self._syncs: dict[str, YouTubeSync] = {}
+        self._locks: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        # channels whose next scan runs whatever their schedule says
+        self._forced: set[str] = set()
+        self.owner = worker_id("daemon")
+        self.workers: list[JobWorker] = []
+
+    def _channel(self, job: Job) -> Channel | None:
+        channel = self.channels.get(str(job.payload.get("channel")))
+        if channel is None:
+            logger.warning(f"Dropping {job.key}, the channel is no longer configured")
+        return channel
+
+    def _sync(self, channel: Channel) -> tuple[YouTubeSync, threading.Lock]:
+        """The channel's YouTubeSync and the lock that keeps its scans and
+        downloads from overlapping."""
+        with self._lock:
+            if channel.name not in self._syncs:
+                self._syncs[channel.name] = YouTubeSync(
+                    channel_name=channel.name,
+                    channel_id=channel.channel_id,
+                    media_output=channel.to_fs_path(self.cwd),
+                    source=channel.source,
+                    channel_url=to_channel_url(
+                        source=channel.source, channel_id=channel.channel_id
+                    ),
+                )
+                self._locks[channel.name] = threading.Lock()
+            return self._syncs[channel.name], self._locks[channel.name]
+
+    @staticmethod
+    def _check_paused(channel: Channel) -> None:
+        health = source_health()
+        if health.is_paused(channel.source):
+            resume = health.get(channel.source).seconds_until_resume()
+            raise Retry(resume, f"source {channel.source.value} is paused")
+
+    @contextmanager
+    def _leased(self, channel: Channel) -> Generator[None, None, None]:
+        """Hold the channel's lease, and keep it from being handed over,
+        while the block runs."""
+        if self.shards is None:
+            yield
+            return
+        key = channel_key(channel)
+        retry = Retry(self.shards.ttl / 2, f"{channel.name} is held by another node")
+        if not self.shards.acquire(key):
+            raise retry
+        with self.shards.busy(key) as held:
+            if not held:
+                raise retry  # handed over in the meantime
+            yield
+
+    def seed(self) -> None:
+        """Queue the scan job of every channel, existing jobs are kept as is."""
+        released = self.queue.release_stale(self.owner)
+        if released:
+            logger.info(f"Requeued {released} jobs of the previous run")
+        for channel in self.config.channels:
+            self.queue.enqueue(
+                JobKind.SCAN,
+                scan_key(channel),
+                {"channel": channel.name},
+                priority=SCAN_PRIORITY,
+                max_attempts=SCAN_MAX_ATTEMPTS,
+                retry_failed=True,
+            )
+        self.queue.prune(KEEP_DONE_SECONDS)
+        self.queue.update_metrics()
+
+    def handle_scan(self, job: Job) -> float | None:
+        channel = self._channel(job)
+        if channel is None:
+            return None
+        self._check_paused(channel)
+        with self._lock:
+            force = channel.name in self._forced
+            self._forced.discard(channel.name)
+        yt, lock = self._sync(channel)
+        board = status_board()
+        with (
+            self._leased(channel),
+            lock,
+            board.activity(channel, ChannelState.SCANNING),
+        ):
+            yt.scan_for_vids(SCAN_LIMIT, force=force)
+            missing = yt.find_vids_missing_downloads(refresh=False)
+            if isinstance(missing, Exception):
+                raise missing
+            self._queue_downloads(channel, missing)
+            state = yt.library.scan_state()
+        board.update(
+            channel,
+            queued=self.queue.count(download_prefix(channel)),
+            last_scan=state.last_scan,
+            next_scan=state.next_scan,
+        )
+        return (state.next_scan or datetime.now()).timestamp()
+
+    def _queue_downloads(self, channel: Channel, missing: list[VidEntry]) -> None:
+        fresh, backfill = split_lanes(
+            missing, fresh_days=self.config.cmd_options.fresh_days
+        )
+        queued = 0
+        now = time.time()
+        for priority, vids in ((FRESH_PRIORITY, fresh), (BACKFILL_PRIORITY, backfill)):
+            for i, vid in enumerate(vids):
+                # due times keep the lane order within the channel
+                queued += self.queue.enqueue(
+                    JobKind.DOWNLOAD,
+                    download_key(channel, vid),
+                    {"channel": channel.name, "url": vid.url},
+                    due_at=now + i * 1e-3,
+                    priority=priority,
+                )
+        if queued:
+            logger.info(f"Queued {queued} downloads for {channel.name}")
+
+    def handle_download(self, job: Job) -> float | None:
+        channel = self._channel(job)
+        if channel is None:
+            return None
+        self._check_paused(channel)
+        url = str(job.payload["url"])
+        yt, lock = self._sync(channel)
+        board = status_board()
+        board.update(channel, queued=self.queue.count(download_prefix(channel)))
+        with (
+            self._leased(channel),
+            lock,
+            board.activity(channel, ChannelState.DOWNLOADING, in_flight=1),
+        ):
+            vid = _find_vid(yt.library.known_vids(load=True), url)
+            if vid is None:
+                logger.info(f"{url} is no longer in the library of {channel.name}")
+                return None
+            yt.download(None, vids=[vid])
+            # the library was reloaded and the file may have been renamed
+            vid = _find_vid(yt.library.known_vids(load=False), url) or vid
+            if (yt.library.out_dir / vid.file_path).exists():
+                return None
+            if vid.error:
+                raise RuntimeError(f"Download of {url} failed")
+        self._check_paused(channel)
+        return time.time() + DOWNLOAD_RECHECK_SECONDS
+
+    def trigger(self, channel: Channel, action: Action) -> None:
+        """Push a channel through now, for the control API."""
+        if self.shards is not None and not self.shards.acquire(channel_key(channel)):
+            raise ControlError(f"{channel.name} is held by another node")
+        expedited = 0
+        if action == Action.DOWNLOAD:
+            expedited = self.queue.expedite(
+                download_prefix(channel), priority=URGENT_PRIORITY
+            )
+            logger.info(f"Expedited {expedited} downloads of {channel.name}")
+        if action == Action.SCAN:
+            with self._lock:
+                self._forced.add(channel.name)
+        if action == Action.SCAN or not expedited:
+            # without queued downloads, a scan finds and queues the missing ones
+            self.queue.enqueue(
+                JobKind.SCAN,
+                scan_key(channel),
+                {"channel": channel.name},
+                due_at=time.time(),
+                priority=SCAN_PRIORITY,
+                max_attempts=SCAN_MAX_ATTEMPTS,
+                retry_failed=True,
+            )
+        for worker in self.workers:
+            worker.wake()
+
+    def start(self) -> None:
+        self.seed()
+        if self.shards is not None:
+            self.shards.claim([channel_key(c) for c in self.config.channels])
+            self.shards.start_heartbeat()
+        handlers: list[dict[JobKind, Any]] = [
+            {JobKind.SCAN: self.handle_scan},
+            {JobKind.DOWNLOAD: self.handle_download},
+        ]
+        for handler in handlers:
+            name = next(iter(handler)).value
+            worker = JobWorker(self.queue, handler, owner=worker_id(name))
+            worker.start()
+            self.workers.append(worker)
+
+    def stop(self) -> None:
+        for worker in self.workers:
+            worker.stop()
+        if self.shards is not None:
+            self.shards.stop_heartbeat()
+            self.shards.release_all()
+
+    def run_forever(self) -> None:
+        self.start()
+        try:
+            while True:
+                time.sleep(60 * 60)
+                self.queue.prune(KEEP_DONE_SECONDS)
+        finally:
+            self.stop()
+
+
+def _find_vid(vids: list[VidEntry], url: str) -> VidEntry | None:
+    for vid in vids:
+        if vid.url == url:
+            return vid
+    return None
@@ -0,0 +1,216 @@
+"""
+Priority scheduler for downloads.
+
+Takes the missing downloads of one or more libraries and orders them so that
+fresh uploads (uploaded within the last N days) go first, followed by the
+backfill. Inside each lane the channels are served round-robin, each channel
+getting `weight` slots per round, so a single large channel cannot consume a
+whole cycle's download budget.
+"""
+
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from enum import Enum
+from typing import Any
+
+from youtube_sync.library import Library
+from youtube_sync.logutil import create_logger
+from youtube_sync.vid_entry import VidEntry
+
+logger = create_logger(__name__, "INFO")
+
+DEFAULT_FRESH_DAYS = 7
+
+
+class Lane(Enum):
+    """Download lane, in priority order."""
+
+    FRESH = "fresh"
+    BACKFILL = "backfill"
+
+
+@dataclass
+class ScheduledItem:
+    """A single video scheduled for download."""
+
+    library: Library
+    vid: VidEntry
+    lane: Lane
+
+    @property
+    def channel_name(self) -> str:
+        return self.library.channel_name
+
+    def to_dict(self) -> dict[str, Any]:
+        upload_date = self.vid.date_upload
+        return {
+            "channel": self.channel_name,
+            "source": self.library.source.value,
+            "lane": self.lane.value,
+            "url": self.vid.url,
+            "title": self.vid.title,
+            "date_upload": upload_date.isoformat() if upload_date else None,
+            "error": self.vid.error,
+        }
+
+
+@dataclass
+class _ChannelQueue:
+    library: Library
+    weight: int
+    fresh: list[VidEntry]
+    backfill: list[VidEntry]
+
+
+def _upload_day(vid: VidEntry) -> date | None:
+    upload = vid.date_upload
+    if isinstance(upload, datetime):
+        return upload.date()
+    return upload
+
+
+def is_fresh(vid: VidEntry, fresh_days: int, today: date | None = None) -> bool:
+    """True if the video was uploaded within the last `fresh_days` days."""
+    upload = _upload_day(vid)
+    if upload is None:
+        return False
+    today = today or date.today()
+    return upload >= today - timedelta(days=fresh_days)
+
+
+def split_lanes(
+    vids: list[VidEntry], fresh_days: int, today: date | None = None
+) -> tuple[list[VidEntry], list[VidEntry]]:
+    """Split vids into (fresh, backfill).
+
+    Fresh is newest first so the latest upload lands first. Backfill keeps the
+    oldest first order of the library, with previously failed videos last so
+    they don't block new work.
+    """
+    fresh: list[VidEntry] = []
+    backfill: list[VidEntry] = []
+    for vid in vids:
+        if is_fresh(vid, fresh_days=fresh_days, today=today):
+            fresh.append(vid)
+        else:
+            backfill.append(vid)
+    fresh.sort(key=lambda vid: _upload_day(vid) or date.min, reverse=True)
+    # stable sort, keeps the library order within each group
+    backfill.sort(key=lambda vid: vid.error)
+    return fresh, backfill
+
+
+def order_for_download(
+    vids: list[VidEntry], fresh_days: int = DEFAULT_FRESH_DAYS
+) -> list[VidEntry]:
+    """Order the missing downloads of a single library, fresh lane first."""
+    fresh, backfill = split_lanes(vids, fresh_days=fresh_days)
+    return fresh + backfill
+
+
+class DownloadScheduler:
+    """Schedules missing downloads across libraries."""
+
+    def __init__(self, fresh_days: int = DEFAULT_FRESH_DAYS) -> None:
+        self.fresh_days = fresh_days
+        self._channels: list[_ChannelQueue] = []
+
+    def add(self, library: Library, vids: list[VidEntry], weight: int = 1) -> None:
+        """Add the missing vids of a library with the given weight."""
+        if weight < 1:
+            raise ValueError(f"Weight must be >= 1, got {weight}")
+        fresh, backfill = split_lanes(vids, fresh_days=self.fresh_days)
+        self._channels.append(
+            _ChannelQueue(
+                library=library, weight=weight, fresh=fresh, backfill=backfill
+            )
+        )
+
+    def add_library(self, library: Library, weight: int = 1) -> Exception | None:
+        """Add all the missing downloads of a library."""
+        missing_or_err = library.find_missing_downloads()
+        if isinstance(missing_or_err, Exception):
+            logger.error(
+                f"Error finding missing downloads for {library.channel_name}: {missing_or_err}"
+            )
+            return missing_or_err
+        self.add(library, missing_or_err, weight=weight)
+        return None
+
+    def _round_robin(self, lane: Lane, limit: int | None) -> list[ScheduledItem]:
+        out: list[ScheduledItem] = []
+        cursors: list[int] = [0] * len(self._channels)
+
+        def lane_vids(queue: _ChannelQueue) -> list[VidEntry]:
+            return queue.fresh if lane == Lane.FRESH else queue.backfill
+
+        while limit is None or len(out) < limit:
+            progressed = False
+            for i, queue in enumerate(self._channels):
+                vids = lane_vids(queue)
+                for _ in range(queue.weight):
+                    if cursors[i] >= len(vids):
+                        break
+                    if limit is not None and len(out) >= limit:
+                        return out
+                    out.append(
+                        ScheduledItem(
+                            library=queue.library, vid=vids[cursors[i]], lane=lane
+                        )
+                    )
+                    cursors[i] += 1
+                    progressed = True
+            if not progressed:
+                break
+        return out
+
+    def plan(self, limit: int | None = None) -> list[ScheduledItem]:
+        """Return up to `limit` items, fresh lane first, then the backfill."""
+        if limit is not None and limit < 0:
+            limit = None
+        out = self._round_robin(Lane.FRESH, limit)
+        remaining = None if limit is None else limit - len(out)
+        if remaining is None or remaining > 0:
+            out += self._round_robin(Lane.BACKFILL, remaining)
+        return out
+
+    def plan_by_library(
+        self, limit: int | None = None
+    ) -> list[tuple[Library, list[VidEntry]]]:
+        """Same as plan() but grouped per library, preserving the planned order."""
+        grouped: dict[int, tuple[Library, list[VidEntry]]] = {}
+        for item in self.plan(limit):
+            key = id(item.library)
+            if key not in grouped:
+                grouped[key] = (item.library, [])
+            grouped[key][1].append(item.vid)
+        return list(grouped.values())
+
+    def queue(self) -> list[dict[str, Any]]:
+        """Inspect the full queue, in the order it would be downloaded."""
+        return [item.to_dict() for item in self.plan(None)]
+
+    def summary(self) -> list[dict[str, Any]]:
+        """Per channel queue depths."""
+        return [
+            {
+                "channel": queue.library.channel_name,
+                "source": queue.library.source.value,
+                "weight": queue.weight,
+                "fresh": len(queue.fresh),
+                "backfill": len(queue.backfill),
+            }
+            for queue in self._channels
+        ]
+
+    def __len__(self) -> int:
+        return sum(len(q.fresh) + len(q.backfill) for q in self._channels)
+
+    def __str__(self) -> str:
+        lines = [f"DownloadScheduler(fresh_days={self.fresh_days}, queued={len(self)})"]
+        for entry in self.summary():
+            lines.append(
+                f"  {entry['channel']} ({entry['source']}): weight={entry['weight']}"
+                f" fresh={entry['fresh']} backfill={entry['backfill']}"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,201 @@
+"""
+Stateless download worker for the coordinator mode (see coordinator.py).
+
+A worker leases one DownloadRequest at a time from the coordinator, runs the
+regular download pipeline (YtDlpDownloader, ffmpeg) into a temp dir and posts
+the FinalResult back with the mp3. It keeps no state and needs no access to
+the output or library.json, so any number of them can run, on any host that
+reaches the coordinator.
+
+Environment overrides:
+  YOUTUBE_SYNC_COORDINATOR_URL: base url of the coordinator, e.g. http://sync:8080
+  YOUTUBE_SYNC_WORKER_TOKEN: shared secret sent to the coordinator (required)
+"""
+
+import json
+import os
+import socket
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+from youtube_sync import RealFS
+from youtube_sync.final_result import FinalResult
+from youtube_sync.http_session import http_session
+from youtube_sync.logutil import create_logger
+from youtube_sync.types import Source
+from youtube_sync.web_server import worker_token
+from youtube_sync.ytdlp.download_request import DownloadRequest
+
+logger = create_logger(__name__, "INFO")
+
+ENV_COORDINATOR_URL = "YOUTUBE_SYNC_COORDINATOR_URL"
+
+# Seconds a lease request waits at the coordinator for a task.
+LEASE_WAIT_SECONDS = 20.0
+# Pause after a failed request to the coordinator.
+ERROR_SLEEP_SECONDS = 10.0
+
+
+@dataclass
+class RemoteTask:
+    """A task as handed out by the coordinator."""
+
+    id: str
+    url: str
+    source: Source
+    download_vid: bool
+    download_date: bool
+
+    @staticmethod
+    def from_dict(data: dict[str, Any]) -> "RemoteTask":
+        return RemoteTask(
+            id=str(data["id"]),
+            url=str(data["url"]),
+            source=Source(data["source"]),
+            download_vid=bool(data["download_vid"]),
+            download_date=bool(data["download_date"]),
+        )
+
+
+def encode_result(
+    task_id: str, worker: str, result: FinalResult, mp3: bytes | None
+) -> bytes:
+    """The body of a result post: a JSON line, then the mp3 bytes."""
+    meta = {
+        "id": task_id,
+        "worker": worker,
+        "date": result.date.isoformat() if result.date is not None else None,
+        "error": str(result.exception) if result.exception is not None else None,
+        "error_type": (
+            type(result.exception).__name__ if result.exception is not None else None
+        ),
+    }
+    return json.dumps(meta).encode("utf-8") + b"\n" + (mp3 or b"")
+
+
+def run_task(
+    task: RemoteTask, pool: ThreadPoolExecutor
+) -> tuple[FinalResult, bytes | None]:
+    """Download and convert one task into a temp dir, returns the result and
+    the mp3 bytes (None without a video)."""
+    from youtube_sync.cookies import Cookies
+    from youtube_sync.staging import staging_root
+    from youtube_sync.ytdlp.bulk_download_mp3s import download_mp3s
+
+    cookies = Cookies.load(task.source) if task.source == Source.YOUTUBE else None
+    with tempfile.TemporaryDirectory(dir=staging_root()) as temp_dir:
+        out = Path(temp_dir) / "out.mp3"
+        di = DownloadRequest(
+            url=task.url,
+            outmp3=RealFS.from_path(out),
+            download_vid=task.download_vid,
+            download_date=task.download_date,
+        )
+        result = download_mp3s([di], pool, source=task.source, cookies=cookies)[
+            0
+        ].result()
+        mp3 = out.read_bytes() if result.exception is None and out.exists() else None
+    return result, mp3
+
+
+TaskRunner = Callable[
+    [RemoteTask, ThreadPoolExecutor], tuple[FinalResult, bytes | None]
+]
+
+
+class DownloadWorker:
+    """Leases tasks from the coordinator and runs them, `concurrency` at a time."""
+
+    def __init__(
+        self,
+        coordinator_url: str,
+        concurrency: int = 1,
+        name: str | None = None,
+        runner: TaskRunner = run_task,
+        token: str | None = None,
+    ) -> None:
+        self.url = coordinator_url.rstrip("/")
+        self.token = token or worker_token()
+        self.concurrency = max(1, concurrency)
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}"
+        self.runner = runner
+        self._stop = threading.Event()
+
+    def _auth(self) -> dict[str, str]:
+        return {"Authorization": f"Bearer {self.token}"} if self.token else {}
+
+    def _lease(self, slot: int) -> RemoteTask | None:
+        resp = http_session().post(
+            f"{self.url}/worker/lease",
+            json={"worker": f"{self.name}/{slot}", "wait": LEASE_WAIT_SECONDS},
+            headers=self._auth(),
+            timeout=LEASE_WAIT_SECONDS + 30,
+        )
+        resp.raise_for_status()
+        if resp.status_code == 204:
+            return None
+        return RemoteTask.from_dict(resp.json())
+
+    def _post_result(
+        self, task: RemoteTask, slot: int, result: FinalResult, mp3: bytes | None
+    ) -> None:
+        resp = http_session().post(
+            f"{self.url}/worker/result",
+            data=encode_result(task.id, f"{self.name}/{slot}", result, mp3),
+            headers={"Content-Type": "application/octet-stream", **self._auth()},
+            timeout=600,
+        )
+        if resp.status_code == 409:
+            logger.warning(f"Coordinator dropped {task.url}, the lease ran out")
+            return
+        resp.raise_for_status()
+
+    def run_once(self, slot: int, pool: ThreadPoolExecutor) -> bool:
+        """Run one task, False when there was none."""
+        task = self._lease(slot)
+        if task is None:
+            return False
+        logger.info(f"Downloading {task.url}")
+        result, mp3 = self.runner(task, pool)
+        if result.exception is not None:
+            logger.warning(f"Download of {task.url} failed: {result.exception}")
+        self._post_result(task, slot, result, mp3)
+        return True
+
+    def _loop(self, slot: int) -> None:
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            while not self._stop.is_set():
+                try:
+                    self.run_once(slot, pool)
+                except Exception as e:  # pylint: disable=broad-except
+                    logger.error(f"Worker {self.name}/{slot}: {e}")
+                    self._stop.wait(ERROR_SLEEP_SECONDS)
+
+    def run(self) -> None:
+        threads = [
+            threading.Thread(
+                target=self._loop,
+                args=(slot,),
+                name=f"download-worker-{slot}",
+                daemon=True,
+            )
+            for slot in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        logger.info(
+            f"Worker {self.name} serving {self.url} with {self.concurrency} slots"
+        )
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=1.0)
+        finally:
+            self.stop()
+
+    def stop(self) -> None:
+        self._stop.set()
@@ -0,0 +1,32 @@
+"""
+Numeric environment overrides.
+
+Unset or empty means the default, and so does a value that doesn't parse,
+with a warning instead of a crash in the middle of a sync.
+"""
+
+import os
+
+from youtube_sync.logutil import create_logger
+
+logger = create_logger(__name__, "INFO")
+
+
+def env_float(name: str, default: float) -> float:
+    """The float in the environment variable name, or default."""
+    value = os.environ.get(name)
+    try:
+        return float(value) if value else default
+    except ValueError:
+        logger.warning(f"Ignoring {name}={value!r}, not a number")
+        return default
+
+
+def env_int(name: str, default: int) -> int:
+    """The integer in the environment variable name, or default."""
+    value = os.environ.get(name)
+    try:
+        return int(value) if value else default
+    except ValueError:
+        logger.warning(f"Ignoring {name}={value!r}, not an integer")
+        return default
@@ -1,12 +1,21 @@
 import _thread
+import asyncio
 import logging
 import signal
 import subprocess
+import threading
 import time
 from pathlib import Path
+from typing import IO
 
 from static_ffmpeg import add_paths  # type: ignore[reportUnknownVariableType]
 
+from youtube_sync.transcode import (
+    FFMPEG_THREADS,
+    EncodeStats,
+    lower_ffmpeg_priority,
+    transcode_scheduler,
+)
 from youtube_sync.ytdlp.error import (
     KeyboardInterruptException,
     check_keyboard_interrupt,
@@ -19,6 +28,28 @@ logging.basicConfig(level=logging.WARNING)
 _FFMPEG_PATH_ADDED = False
 
 
+class _FfmpegProgress:
+    """Parses the key=value stream of `ffmpeg -progress`."""
+
+    def __init__(self) -> None:
+        self.media_seconds: float | None = None
+        self.speed: float | None = None
+
+    def feed(self, line: str) -> None:
+        key, _, value = line.strip().partition("=")
+        if key == "out_time_us" and value.isdigit():
+            self.media_seconds = int(value) / 1_000_000
+        elif key == "speed" and value.endswith("x"):
+            try:
+                self.speed = float(value[:-1])
+            except ValueError:
+                pass
+
+    def consume(self, stream: IO[bytes]) -> None:
+        for raw in stream:
+            self.feed(raw.decode("utf-8", errors="replace"))
+
+
 def init_once() -> None:
     global _FFMPEG_PATH_ADDED  # pylint: disable=global-statement
     if not _FFMPEG_PATH_ADDED:
@@ -26,6 +57,26 @@ def init_once() -> None:
         _FFMPEG_PATH_ADDED = True
 
 
+def _mp3_cmd(input_file: Path, output_file: Path) -> list[str]:
+    return [
+        "ffmpeg",
+        "-nostdin",
+        "-i",
+        str(input_file),
+        "-threads",
+        str(FFMPEG_THREADS),  # libmp3lame is single threaded
+        "-codec:a",
+        "libmp3lame",
+        "-qscale:a",
+        "2",  # High quality setting
+        "-progress",
+        "pipe:1",  # machine readable progress on stdout
+        "-nostats",
+        "-y",  # Overwrite output file if it exists
+        str(output_file),
+    ]
+
+
 def convert_audio_to_mp3(input_file: Path, output_file: Path) -> Path | Exception:
     """Convert audio file to MP3 format using ffmpeg.
 
@@ -46,17 +97,7 @@ def convert_audio_to_mp3(input_file: Path, output_file: Path) -> Path | Exceptio
     # Ensure the output directory exists
     output_file.parent.mkdir(parents=True, exist_ok=True)
 
-    cmd_list = [
-        "ffmpeg",
-        "-i",
-        str(input_file),
-        "-codec:a",
-        "libmp3lame",
-        "-qscale:a",
-        "2",  # High quality setting
-        "-y",  # Overwrite output file if it exists
-        str(output_file),
-    ]
+    cmd_list = _mp3_cmd(input_file, output_file)
 
     try:
         logger.info("Converting %s -> %s", input_file, output_file)
@@ -67,9 +108,19 @@ def convert_audio_to_mp3(input_file: Path, output_file: Path) -> Path | Exceptio
             "\n\n###################\n# Running command: %s\n###################\n\n",
             cmd_str,
         )
+        start = time.time()
         proc = subprocess.Popen(
-            cmd_list, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            cmd_list,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
         )
+        lower_ffmpeg_priority(proc.pid)
+        progress = _FfmpegProgress()
+        assert proc.stdout is not None
+        reader = threading.Thread(
+            target=progress.consume, args=(proc.stdout,), daemon=True
+        )
+        reader.start()
 
         # Monitor the process and check for interrupts
         while proc.poll() is None:
@@ -79,6 +130,16 @@ def convert_audio_to_mp3(input_file: Path, output_file: Path) -> Path | Exceptio
                     "Conversion aborted due to previous keyboard interrupt"
                 )
             time.sleep(0.1)
+        reader.join(timeout=1)
+
+        transcode_scheduler().record(
+            EncodeStats(
+                input_file=str(input_file),
+                media_seconds=progress.media_seconds,
+                wall_seconds=time.time() - start,
+                ok=proc.returncode == 0,
+            )
+        )
 
         if proc.returncode != 0:
             rtn = proc.returncode
@@ -95,3 +156,53 @@ def convert_audio_to_mp3(input_file: Path, output_file: Path) -> Path | Exceptio
         raise
     except subprocess.CalledProcessError as e:
         return e
+
+
+async def convert_audio_to_mp3_async(
+    input_file: Path, output_file: Path
+) -> Path | Exception:
+    """convert_audio_to_mp3() as an asyncio subprocess, for the download
+    pipeline: waiting on ffmpeg takes no thread."""
+    if check_keyboard_interrupt():
+        return KeyboardInterruptException(
+            "Conversion aborted due to previous keyboard interrupt"
+        )
+
+    init_once()
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    cmd_list = _mp3_cmd(input_file, output_file)
+    logger.info("Converting %s -> %s", input_file, output_file)
+    start = time.time()
+    proc = await asyncio.create_subprocess_exec(
+        *cmd_list,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    lower_ffmpeg_priority(proc.pid)
+    progress = _FfmpegProgress()
+    assert proc.stdout is not None
+    async for raw in proc.stdout:
+        progress.feed(raw.decode("utf-8", errors="replace"))
+        if check_keyboard_interrupt():
+            proc.terminate()
+            await proc.wait()
+            return KeyboardInterruptException(
+                "Conversion aborted due to previous keyboard interrupt"
+            )
+    await proc.wait()
+
+    transcode_scheduler().record(
+        EncodeStats(
+            input_file=str(input_file),
+            media_seconds=progress.media_seconds,
+            wall_seconds=time.time() - start,
+            ok=proc.returncode == 0,
+        )
+    )
+    if proc.returncode != 0:
+        if proc.returncode == -signal.SIGINT:
+            set_keyboard_interrupt()
+            return KeyboardInterruptException("ffmpeg interrupted")
+        return subprocess.CalledProcessError(proc.returncode or 0, cmd_list)
+    logger.info(f"Conversion successful: {input_file} -> {output_file}")
+    return output_file
@@ -0,0 +1,205 @@
+"""
+Pooled keep-alive HTTP client for pages, feeds and listings.
+
+One process wide client: a requests session with a connection pool per host
+(kept alive between requests, no `Connection: close`), retries with backoff
+on connection errors and 5xx, and a cap on the requests in flight per host so
+concurrent scanners don't hammer one site. A 429 isn't retried, it goes back
+to the caller (and the source health) as is.
+fetch_many() fetches a batch of urls concurrently over the same pool.
+
+The cap is the size of the host pools, which block when all their
+connections are busy, so it holds for everything that uses the session
+(http_session()) and not only for fetch(). Sessions of their own, like the
+curl_cffi one of the Rumble scanner, take a host_slot() per request.
+
+With httpx and h2 installed, YOUTUBE_SYNC_HTTP2=1 sends fetch() and
+fetch_many() over HTTP/2, one multiplexed connection per host. The requests
+session stays HTTP/1.1 and is what http_session() hands out.
+
+Environment overrides:
+  YOUTUBE_SYNC_HTTP_PER_HOST: requests in flight per host (default 6)
+  YOUTUBE_SYNC_HTTP_RETRIES: retries of a failed request (default 3)
+  YOUTUBE_SYNC_HTTP2: set to 1 to use HTTP/2 when httpx[http2] is installed
+"""
+
+import importlib.util
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from youtube_sync.envutil import env_int
+from youtube_sync.logutil import create_logger
+
+try:
+    import httpx  # type: ignore[import-not-found]
+
+    HAS_HTTP2 = importlib.util.find_spec("h2") is not None
+except ImportError:
+    httpx = None
+    HAS_HTTP2 = False
+
+logger = create_logger(__name__, "INFO")
+
+ENV_HTTP_PER_HOST = "YOUTUBE_SYNC_HTTP_PER_HOST"
+ENV_HTTP_RETRIES = "YOUTUBE_SYNC_HTTP_RETRIES"
+ENV_HTTP2 = "YOUTUBE_SYNC_HTTP2"
+
+DEFAULT_PER_HOST = 6
+DEFAULT_RETRIES = 3
+DEFAULT_TIMEOUT = 10.0
+# Host pools kept around, one per site the sync talks to.
+MAX_HOSTS = 16
+RETRY_STATUSES = (500, 502, 503, 504)
+BACKOFF_FACTOR = 0.5
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+    " (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"
+)
+
+
+@dataclass
+class FetchResult:
+    html: str
+    status_code: int
+    ok = property(lambda self: 200 <= self.status_code < 300)
+
+
+class HttpClient:
+    """Keep-alive client with per-host limits, see the module docstring."""
+
+    def __init__(
+        self,
+        per_host: int | None = None,
+        retries: int | None = None,
+        http2: bool | None = None,
+    ) -> None:
+        self.per_host = max(
+            1,
+            (
+                per_host
+                if per_host is not None
+                else env_int(ENV_HTTP_PER_HOST, DEFAULT_PER_HOST)
+            ),
+        )
+        self.retries = max(
+            0,
+            (
+                retries
+                if retries is not None
+                else env_int(ENV_HTTP_RETRIES, DEFAULT_RETRIES)
+            ),
+        )
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=MAX_HOSTS,
+            pool_maxsize=self.per_host,
+            # wait for a free connection rather than opening one more
+            pool_block=True,
+            max_retries=Retry(
+                total=self.retries,
+                backoff_factor=BACKOFF_FACTOR,
+                status_forcelist=RETRY_STATUSES,
+                raise_on_status=False,
+            ),
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if http2 is None:
+            http2 = os.environ.get(ENV_HTTP2, "0") == "1"
+        if http2 and not HAS_HTTP2:
+            logger.warning(
+                f"{ENV_HTTP2}=1 but httpx[http2] isn't installed, using HTTP/1.1"
+            )
+        self._h2: Any = None
+        if http2 and httpx is not None and HAS_HTTP2:
+            self._h2 = httpx.Client(
+                http2=True,
+                follow_redirects=True,
+                transport=httpx.HTTPTransport(http2=True, retries=self.retries),
+            )
+        self._slots: dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def host_slot(self, url: str) -> threading.BoundedSemaphore:
+        """One of the per_host slots of the url's host, to hold while a
+        request made outside this client is in flight."""
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._slots:
+                self._slots[host] = threading.BoundedSemaphore(self.per_host)
+            return self._slots[host]
+
+    def _get_h2(self, url: str, timeout: float, headers: dict[str, str]) -> FetchResult:
+        # httpx only retries connects, the statuses are retried here
+        attempt = 0
+        while True:
+            resp = self._h2.get(url, timeout=timeout, headers=headers)
+            if resp.status_code not in RETRY_STATUSES or attempt == self.retries:
+                return FetchResult(html=resp.text, status_code=resp.status_code)
+            time.sleep(BACKOFF_FACTOR * (2**attempt))
+            attempt += 1
+
+    def fetch(
+        self,
+        url: str,
+        timeout: float | None = None,
+        headers: dict[str, str] | None = None,
+    ) -> FetchResult:
+        """GET the url, the status is in the result (raises on network errors)."""
+        timeout = timeout or DEFAULT_TIMEOUT
+        headers = {"User-Agent": USER_AGENT, **(headers or {})}
+        if self._h2 is not None:
+            # one multiplexed connection, the pool doesn't limit the streams
+            with self.host_slot(url):
+                return self._get_h2(url, timeout, headers)
+        resp = self.session.get(url, timeout=timeout, headers=headers)
+        return FetchResult(html=resp.text, status_code=resp.status_code)
+
+    def fetch_many(
+        self,
+        urls: list[str],
+        concurrency: int = 8,
+        timeout: float | None = None,
+    ) -> list[FetchResult | Exception]:
+        """Fetch the urls concurrently, the results are in the order of the urls."""
+
+        def fetch_one(url: str) -> FetchResult | Exception:
+            try:
+                return self.fetch(url, timeout=timeout)
+            except Exception as e:  # pylint: disable=broad-except
+                return e
+
+        if not urls:
+            return []
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(concurrency, len(urls))),
+            thread_name_prefix="http_fetch",
+        ) as pool:
+            return list(pool.map(fetch_one, urls))
+
+    def close(self) -> None:
+        self.session.close()
+        if self._h2 is not None:
+            self._h2.close()
+
+
+_CLIENT: HttpClient | None = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def http_client() -> HttpClient:
+    """The process wide client."""
+    global _CLIENT  # pylint: disable=global-statement
+    with _CLIENT_LOCK:
+        if _CLIENT is None:
+            _CLIENT = HttpClient()
+        return _CLIENT
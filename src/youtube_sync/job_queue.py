@@ -0,0 +1,619 @@
+"""
+Persistent job queue on a local SQLite file.
+
+Scan and download jobs are rows with a due time, a priority, an attempt count
+and a lease. A worker leases the next due job, runs it and completes it (or
+fails it, which retries it with backoff until max_attempts). Because the queue
+lives on disk, a restarted daemon picks up exactly where the old one stopped:
+queued jobs keep their due times, and jobs that were running are leased again
+once their lease expires, immediately when the same host restarts. A worker
+renews the lease of its job while the job runs.
+
+Jobs are keyed, enqueueing a key that is already queued or running is a no-op
+(the earlier due time wins), so seeding the queue on every start is safe. A
+job that used up its attempts stays failed until it is queued with
+retry_failed.
+
+Environment overrides:
+  YOUTUBE_SYNC_JOB_DB: path of the queue database (default: user data dir)
+"""
+
+import contextlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from enum import Enum
+from pathlib import Path
+from typing import Any, Callable, Generator
+
+from appdirs import user_data_dir  # type: ignore[reportUnknownVariableType]
+
+from youtube_sync.logutil import create_logger
+from youtube_sync.metrics import QUEUE_DEPTH
+from youtube_sync.source_health import backoff_seconds
+
+logger = create_logger(__name__, "INFO")
+
+ENV_JOB_DB = "YOUTUBE_SYNC_JOB_DB"
+
+DEFAULT_LEASE_SECONDS = 30 * 60
+DEFAULT_MAX_ATTEMPTS = 5
+# Longest a worker waits for the next due job before looking again.
+MAX_IDLE_SECONDS = 30.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL UNIQUE,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    due_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    lease_owner TEXT,
+    lease_until REAL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_due ON jobs (state, priority, due_at);
+"""
+
+
+class JobState(Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class JobKind(Enum):
+    SCAN = "scan"
+    DOWNLOAD = "download"
+
+
+@dataclass
+class Job:
+    """A leased job."""
+
+    id: int
+    kind: JobKind
+    key: str
+    payload: dict[str, Any]
+    attempts: int
+    max_attempts: int
+    lease_owner: str | None = None
+    lease_until: float | None = None
+    last_error: str | None = None
+    priority: int = 0
+    due_at: float = 0.0
+    state: JobState = JobState.QUEUED
+
+    @staticmethod
+    def from_row(row: sqlite3.Row) -> "Job":
+        return Job(
+            id=int(row["id"]),
+            kind=JobKind(row["kind"]),
+            key=str(row["key"]),
+            payload=json.loads(row["payload"]),
+            attempts=int(row["attempts"]),
+            max_attempts=int(row["max_attempts"]),
+            lease_owner=row["lease_owner"],
+            lease_until=row["lease_until"],
+            last_error=row["last_error"],
+            priority=int(row["priority"]),
+            due_at=float(row["due_at"]),
+            state=JobState(row["state"]),
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind.value,
+            "key": self.key,
+            "payload": self.payload,
+            "state": self.state.value,
+            "priority": self.priority,
+            "due_at": self.due_at,
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "lease_owner": self.lease_owner,
+            "lease_until": self.lease_until,
+            "last_error": self.last_error,
+        }
+
+
+def default_job_db_path() -> Path:
+    override = os.environ.get(ENV_JOB_DB)
+    if override:
+        return Path(override)
+    out = os.path.join(user_data_dir("youtube-sync"), "jobs.sqlite3")  # type: ignore[reportUnknownMemberType, reportUnknownArgumentType]
+    return Path(out)
+
+
+# Tells this process apart from an earlier one with the same pid, which is
+# the rule in a restarted container.
+_INSTANCE = uuid.uuid4().hex[:12]
+
+
+def worker_id(name: str = "worker") -> str:
+    """host:pid:instance:name, the host prefix is how a restart finds its old
+    leases."""
+    return f"{socket.gethostname()}:{os.getpid()}:{_INSTANCE}:{name}"
+
+
+def _parse_owner(owner: str) -> tuple[str, str, str]:
+    """host, pid and instance of a worker id, the instance is empty for the
+    host:pid:name ids of older versions."""
+    parts = owner.split(":")
+    return parts[0], parts[1], parts[2] if len(parts) >= 4 else ""
+
+
+def _pid_alive(pid: str) -> bool:
+    """False only when no process has the pid, anything unclear counts as alive."""
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (OSError, ValueError):  # e.g. PermissionError, the pid is someone else's
+        return True
+    return True
+
+
+class JobQueue:
+    """SQLite backed job queue, safe to share between threads and processes."""
+
+    def __init__(self, path: Path | None = None) -> None:
+        self.path = path or default_job_db_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn: sqlite3.Connection | None = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _tx(self) -> "_Transaction":
+        return _Transaction(self._conn())
+
+    def close(self) -> None:
+        conn: sqlite3.Connection | None = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def enqueue(
+        self,
+        kind: JobKind,
+        key: str,
+        payload: dict[str, Any],
+        due_at: float | None = None,
+        priority: int = 0,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        retry_failed: bool = False,
+    ) -> bool:
+        """Queue a job, True if it was added or requeued.
+
+        A queued job with the same key keeps the earlier due time, a running
+        one is left alone. Done jobs are queued again, failed ones only with
+        retry_failed.
+        """
+        now = time.time()
+        due_at = now if due_at is None else due_at
+        with self._tx() as conn:
+            row = conn.execute(
+                "SELECT state, due_at FROM jobs WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                conn.execute(
+                    "INSERT INTO jobs (kind, key, payload, state, priority, due_at, max_attempts, created_at, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        kind.value,
+                        key,
+                        json.dumps(payload),
+                        JobState.QUEUED.value,
+                        priority,
+                        due_at,
+                        max_attempts,
+                        now,
+                        now,
+                    ),
+                )
+                return True
+            state = JobState(row["state"])
+            if state == JobState.RUNNING or (
+                state == JobState.FAILED and not retry_failed
+            ):
+                return False
+            if state == JobState.QUEUED:
+                if due_at < row["due_at"]:
+                    conn.execute(
+                        "UPDATE jobs SET due_at = ?, priority = ?, updated_at = ? WHERE key = ?",
+                        (due_at, priority, now, key),
+                    )
+                return False
+            conn.execute(
+                "UPDATE jobs SET payload = ?, state = ?, priority = ?, due_at = ?, attempts = 0,"
+                " max_attempts = ?, lease_owner = NULL, lease_until = NULL, last_error = NULL, updated_at = ?"
+                " WHERE key = ?",
+                (
+                    json.dumps(payload),
+                    JobState.QUEUED.value,
+                    priority,
+                    due_at,
+                    max_attempts,
+                    now,
+                    key,
+                ),
+            )
+            return True
+
+    def lease(
+        self,
+        owner: str,
+        kinds: list[JobKind] | None = None,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        now: float | None = None,
+    ) -> Job | None:
+        """Lease the next due job: highest priority (lowest number), then oldest due."""
+        now = time.time() if now is None else now
+        kinds = kinds or list(JobKind)
+        marks = ",".join("?" for _ in kinds)
+        with self._tx() as conn:
+            row = conn.execute(
+                f"SELECT * FROM jobs WHERE kind IN ({marks}) AND ("
+                "  (state = ? AND due_at <= ?) OR (state = ? AND lease_until <= ?)"
+                ") ORDER BY priority, due_at LIMIT 1",
+                (
+                    *[k.value for k in kinds],
+                    JobState.QUEUED.value,
+                    now,
+                    JobState.RUNNING.value,
+                    now,
+                ),
+            ).fetchone()
+            if row is None:
+                return None
+            lease_until = now + lease_seconds
+            conn.execute(
+                "UPDATE jobs SET state = ?, lease_owner = ?, lease_until = ?, attempts = attempts + 1,"
+                " updated_at = ? WHERE id = ?",
+                (JobState.RUNNING.value, owner, lease_until, now, row["id"]),
+            )
+        job = Job.from_row(row)
+        job.attempts += 1
+        job.lease_owner = owner
+        job.lease_until = lease_until
+        job.state = JobState.RUNNING
+        return job
+
+    def extend(self, job: Job, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+        """Extend the lease of a long running job, False if it was lost."""
+        now = time.time()
+        with self._tx() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET lease_until = ?, updated_at = ? WHERE id = ? AND state = ? AND lease_owner = ?",
+                (
+                    now + lease_seconds,
+                    now,
+                    job.id,
+                    JobState.RUNNING.value,
+                    job.lease_owner,
+                ),
+            )
+            return cur.rowcount == 1
+
+    def expedite(
+        self, key_prefix: str, priority: int | None = None, now: float | None = None
+    ) -> int:
+        """Make the queued jobs whose key starts with key_prefix due now (and
+        of the given priority), returns how many there are."""
+        now = time.time() if now is None else now
+        with self._tx() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET due_at = MIN(due_at, ?), priority = COALESCE(?, priority), updated_at = ?"
+                " WHERE state = ? AND substr(key, 1, ?) = ?",
+                (
+                    now,
+                    priority,
+                    now,
+                    JobState.QUEUED.value,
+                    len(key_prefix),
+                    key_prefix,
+                ),
+            )
+            return cur.rowcount
+
+    def count(self, key_prefix: str, state: JobState = JobState.QUEUED) -> int:
+        """Jobs in `state` whose key starts with key_prefix."""
+        row = (
+            self._conn()
+            .execute(
+                "SELECT COUNT(*) FROM jobs WHERE state = ? AND substr(key, 1, ?) = ?",
+                (state.value, len(key_prefix), key_prefix),
+            )
+            .fetchone()
+        )
+        return int(row[0])
+
+    def complete(self, job: Job, requeue_at: float | None = None) -> None:
+        """Finish the job, or put it back for requeue_at (recurring jobs)."""
+        now = time.time()
+        with self._tx() as conn:
+            if requeue_at is None:
+                conn.execute(
+                    "UPDATE jobs SET state = ?, lease_owner = NULL, lease_until = NULL, last_error = NULL,"
+                    " updated_at = ? WHERE id = ? AND lease_owner = ?",
+                    (JobState.DONE.value, now, job.id, job.lease_owner),
+                )
+            else:
+                conn.execute(
+                    "UPDATE jobs SET state = ?, due_at = ?, attempts = 0, lease_owner = NULL, lease_until = NULL,"
+                    " last_error = NULL, updated_at = ? WHERE id = ? AND lease_owner = ?",
+                    (JobState.QUEUED.value, requeue_at, now, job.id, job.lease_owner),
+                )
+
+    def fail(
+        self, job: Job, error: str | Exception, retry_in: float | None = None
+    ) -> JobState:
+        """Record a failed attempt. The job is retried with backoff (or after
+        retry_in) until it runs out of attempts."""
+        now = time.time()
+        if job.attempts >= job.max_attempts:
+            state, due_at = JobState.FAILED, now
+        else:
+            state = JobState.QUEUED
+            due_at = now + (
+                retry_in if retry_in is not None else backoff_seconds(job.attempts)
+            )
+        with self._tx() as conn:
+            conn.execute(
+                "UPDATE jobs SET state = ?, due_at = ?, lease_owner = NULL, lease_until = NULL, last_error = ?,"
+                " updated_at = ? WHERE id = ? AND lease_owner = ?",
+                (state.value, due_at, str(error), now, job.id, job.lease_owner),
+            )
+        return state
+
+    def defer(self, job: Job, until: float) -> None:
+        """Put the job back without counting the attempt (e.g. source paused)."""
+        with self._tx() as conn:
+            conn.execute(
+                "UPDATE jobs SET state = ?, due_at = ?, attempts = MAX(0, attempts - 1), lease_owner = NULL,"
+                " lease_until = NULL, updated_at = ? WHERE id = ? AND lease_owner = ?",
+                (JobState.QUEUED.value, until, time.time(), job.id, job.lease_owner),
+            )
+
+    def release_stale(self, owner: str) -> int:
+        """Requeue the running jobs of dead processes on the owner's host.
+
+        Workers are named host:pid:instance:name, a restarted daemon on the
+        same host doesn't have to wait for the old leases to expire. A lease
+        of another instance is stale when its pid is dead or is this
+        process's own pid (an earlier process that had the same pid). Leases
+        of other processes that are still running (e.g. a second daemon on
+        the same job file) are left alone.
+        """
+        host, pid, instance = _parse_owner(owner)
+
+        def stale_owner(lease_owner: str) -> bool:
+            _, lease_pid, lease_instance = _parse_owner(lease_owner)
+            if lease_instance == instance:
+                return False  # this process
+            return lease_pid == pid or not _pid_alive(lease_pid)
+
+        with self._tx() as conn:
+            rows = conn.execute(
+                "SELECT id, lease_owner FROM jobs WHERE state = ? AND lease_owner LIKE ?",
+                (JobState.RUNNING.value, f"{host}:%"),
+            ).fetchall()
+            stale = [
+                (row["id"], row["lease_owner"])
+                for row in rows
+                if stale_owner(str(row["lease_owner"]))
+            ]
+            now = time.time()
+            for job_id, lease_owner in stale:
+                conn.execute(
+                    "UPDATE jobs SET state = ?, lease_owner = NULL, lease_until = NULL, updated_at = ?"
+                    " WHERE id = ? AND lease_owner = ?",
+                    (JobState.QUEUED.value, now, job_id, lease_owner),
+                )
+            return len(stale)
+
+    def next_due(self, kinds: list[JobKind] | None = None) -> float | None:
+        """When the next queued job (or running lease) is due, None if there is none."""
+        kinds = kinds or list(JobKind)
+        marks = ",".join("?" for _ in kinds)
+        row = (
+            self._conn()
+            .execute(
+                f"SELECT MIN(CASE WHEN state = ? THEN due_at ELSE lease_until END) AS due FROM jobs"
+                f" WHERE kind IN ({marks}) AND state IN (?, ?)",
+                (
+                    JobState.QUEUED.value,
+                    *[k.value for k in kinds],
+                    JobState.QUEUED.value,
+                    JobState.RUNNING.value,
+                ),
+            )
+            .fetchone()
+        )
+        return None if row is None or row["due"] is None else float(row["due"])
+
+    def counts(self) -> dict[str, dict[str, int]]:
+        """{kind: {state: count}}"""
+        out: dict[str, dict[str, int]] = {}
+        rows = (
+            self._conn()
+            .execute("SELECT kind, state, COUNT(*) AS n FROM jobs GROUP BY kind, state")
+            .fetchall()
+        )
+        for row in rows:
+            out.setdefault(row["kind"], {})[row["state"]] = int(row["n"])
+        return out
+
+    def jobs(self, state: JobState | None = None, limit: int = 100) -> list[Job]:
+        if state is None:
+            rows = (
+                self._conn()
+                .execute(
+                    "SELECT * FROM jobs ORDER BY priority, due_at LIMIT ?", (limit,)
+                )
+                .fetchall()
+            )
+        else:
+            rows = (
+                self._conn()
+                .execute(
+                    "SELECT * FROM jobs WHERE state = ? ORDER BY priority, due_at LIMIT ?",
+                    (state.value, limit),
+                )
+                .fetchall()
+            )
+        return [Job.from_row(row) for row in rows]
+
+    def prune(self, older_than_seconds: float) -> int:
+        """Drop done jobs last touched more than older_than_seconds ago."""
+        cutoff = time.time() - older_than_seconds
+        with self._tx() as conn:
+            cur = conn.execute(
+                "DELETE FROM jobs WHERE state = ? AND updated_at < ?",
+                (JobState.DONE.value, cutoff),
+            )
+            return cur.rowcount
+
+    def update_metrics(self) -> None:
+        for kind, states in self.counts().items():
+            depth = states.get(JobState.QUEUED.value, 0) + states.get(
+                JobState.RUNNING.value, 0
+            )
+            QUEUE_DEPTH.set(depth, queue=f"jobs_{kind}")
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT, so a lease can't be taken twice."""
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        if exc_type is None:
+            self.conn.execute("COMMIT")
+        else:
+            self.conn.execute("ROLLBACK")
+
+
+class Retry(Exception):
+    """Raised by a handler to put its job back for later without failing it."""
+
+    def __init__(self, delay_seconds: float, reason: str = "") -> None:
+        super().__init__(reason or f"retry in {delay_seconds:.0f}s")
+        self.delay_seconds = delay_seconds
+
+
+# A handler returns None when the job is done, or when to run it again.
+JobHandler = Callable[[Job], float | None]
+
+
+@dataclass
+class JobWorker:
+    """Leases jobs of the given kinds and runs their handlers."""
+
+    queue: JobQueue
+    handlers: dict[JobKind, JobHandler]
+    owner: str
+    lease_seconds: float = DEFAULT_LEASE_SECONDS
+    stop_event: threading.Event = field(default_factory=threading.Event)
+    wake_event: threading.Event = field(default_factory=threading.Event)
+
+    @property
+    def kinds(self) -> list[JobKind]:
+        return list(self.handlers)
+
+    def run_once(self, now: float | None = None) -> Job | None:
+        """Run the next due job, returns it (None if nothing was due)."""
+        job = self.queue.lease(self.owner, self.kinds, self.lease_seconds, now=now)
+        if job is None:
+            return None
+        logger.info(f"{self.owner} running {job.key} (attempt {job.attempts})")
+        try:
+            with self._lease_heartbeat(job):
+                requeue_at = self.handlers[job.kind](job)
+        except Retry as e:
+            logger.info(f"{job.key}: {e}")
+            self.queue.defer(job, time.time() + e.delay_seconds)
+        except Exception as e:  # pylint: disable=broad-except
+            state = self.queue.fail(job, e)
+            logger.error(f"{job.key} failed ({state.value}): {e}")
+        else:
+            self.queue.complete(job, requeue_at=requeue_at)
+        self.queue.update_metrics()
+        return job
+
+    @contextlib.contextmanager
+    def _lease_heartbeat(self, job: Job) -> Generator[None, None, None]:
+        """Renew the lease every third of lease_seconds while the handler
+        runs, downloads can take longer than one lease."""
+        done = threading.Event()
+
+        def beat() -> None:
+            while not done.wait(self.lease_seconds / 3):
+                try:
+                    if not self.queue.extend(job, self.lease_seconds):
+                        logger.warning(f"{self.owner} lost the lease of {job.key}")
+                        return
+                except Exception as e:  # pylint: disable=broad-except
+                    logger.error(f"Renewing the lease of {job.key} failed: {e}")
+
+        thread = threading.Thread(target=beat, name=f"lease_{self.owner}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            done.set()
+            thread.join()
+
+    def run(self) -> None:
+        """Run jobs until stopped, sleeping until the next one is due."""
+        while not self.stop_event.is_set():
+            if self.run_once() is not None:
+                continue
+            next_due = self.queue.next_due(self.kinds)
+            wait = MAX_IDLE_SECONDS
+            if next_due is not None:
+                wait = min(wait, max(0.0, next_due - time.time()))
+            self.wake_event.wait(max(wait, 0.5))
+            self.wake_event.clear()
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(
+            target=self.run, name=f"job_worker_{self.owner}", daemon=True
+        )
+        thread.start()
+        return thread
+
+    def wake(self) -> None:
+        """Look for due jobs now, e.g. after some were expedited."""
+        self.wake_event.set()
+
+    def stop(self) -> None:
+        self.stop_event.set()
+        self.wake_event.set()
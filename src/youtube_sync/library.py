@@ -16,9 +16,17 @@ from appdirs import user_data_dir  # type: ignore[reportUnknownVariableType]
 from filelock import FileLock
 
 from youtube_sync import FSPath, RealFS
-from youtube_sync.library_data import LibraryData, Source
+from youtube_sync.library_data import LibraryData, ScanState, Source
 from youtube_sync.logutil import create_logger
+from youtube_sync.metrics import (
+    LIBRARY_LOAD_SECONDS,
+    LIBRARY_SAVE_SECONDS,
+    VIDEOS_DOWNLOADED,
+    VIDEOS_FAILED,
+)
+from youtube_sync.source_health import CircuitState, FailureKind, source_health
 from youtube_sync.to_channel_url import to_channel_url
+from youtube_sync.tracing import span, trace_context
 from youtube_sync.vid_entry import VidEntry
 from youtube_sync.ytdlp.download_request import DownloadRequest
 from youtube_sync.ytdlp.ytdlp import YtDlp
@@ -34,6 +42,9 @@ def _get_library_json_lock_path() -> str:
 
 _FILE_LOCK = FileLock(_get_library_json_lock_path())
 
+# Failures that are about the platform rather than the video itself.
+_SOURCE_FAILURES = (FailureKind.RATE_LIMIT, FailureKind.BOT_CHECK, FailureKind.NETWORK)
+
 
 def _find_missing_downloads(
     vids: list[VidEntry],
@@ -59,6 +70,26 @@ def _find_missing_downloads(
         return e
 
 
+def _plan_video_renames(vids: list[VidEntry]) -> list[tuple[VidEntry, str]]:
+    """Find the vids whose file name lacks the upload date and their new names."""
+    task_data: list[tuple[VidEntry, str]] = []
+    for vid in vids:
+        if vid.date_upload is None:
+            print(f"Vid {vid.url} has no upload date, skipping.")
+            continue
+
+        is_valid_date_path = _is_valid_date_path(vid.file_path)
+        if is_valid_date_path:
+            # print(f"Vid {vid.url} already has a valid file path, skipping.")
+            continue
+
+        date_str = vid.date_upload.strftime("%Y-%m-%d")
+        # Assumes file_path is actually just a file_name.
+        new_name = f"{date_str} {vid.file_path}"
+        task_data.append((vid, new_name))
+    return task_data
+
+
 def _make_library(
     channel_name: str,
     channel_id: str,
@@ -292,28 +323,7 @@ class Library:
         if self.libdata is None:
             return
 
-        task_data: list[tuple[VidEntry, str]] = []
-        for vid in self.libdata.vids:
-            if vid.date_upload is None:
-                print(f"Vid {vid.url} has no upload date, skipping.")
-                continue
-
-            is_valid_date_path = _is_valid_date_path(vid.file_path)
-            if is_valid_date_path:
-                # print(f"Vid {vid.url} already has a valid file path, skipping.")
-                continue
-
-            date_str = vid.date_upload.strftime("%Y-%m-%d")
-            # Assumes file_path is actually just a file_name.
-            new_name = f"{date_str} {vid.file_path}"
-
-            # def task_change_name(vid=vid, new_name=new_name) -> None:
-            #     # print(f"Renaming {vid.file_path} to {new_name}")
-            #     return _task_change_name(vid=vid, new_name=new_name)
-            item = (vid, new_name)
-
-            # vid.task_change_name = new_name
-            task_data.append(item)
+        task_data: list[tuple[VidEntry, str]] = _plan_video_renames(self.libdata.vids)
         # print(f"Fixed up {len(self.libdata.vids)} video names.")
         print(f"Fixed up {len(task_data)} video names.")
 
@@ -343,7 +353,7 @@ class Library:
         """Load json from file."""
         # self.libdata = _load_json(self.library_json_path)
         # return self.libdata.vids
-        with _FILE_LOCK:
+        with _FILE_LOCK, LIBRARY_LOAD_SECONDS.time():
             lib_or_err = LibraryData.from_json(self.json_path)
         if isinstance(lib_or_err, FileNotFoundError):
             lib_or_err = self._empty_data()
@@ -391,14 +401,30 @@ class Library:
     def save(self, overwrite: bool = False) -> Exception | None:
         """Save json to file."""
         data = self.libdata or self._empty_data()
-        text = data.to_json_str()
-        with _FILE_LOCK:
-            self.json_path.parent.mkdir(parents=True, exist_ok=True)
-            if self.json_path.exists() and not overwrite:
-                return FileExistsError(f"{self.json_path} exists.")
-            self.json_path.write_text(text, encoding="utf-8")
+        with (
+            LIBRARY_SAVE_SECONDS.time(),
+            span("library_save", channel=self.channel_name),
+        ):
+            text = data.to_json_str()
+            with _FILE_LOCK:
+                self.json_path.parent.mkdir(parents=True, exist_ok=True)
+                if self.json_path.exists() and not overwrite:
+                    return FileExistsError(f"{self.json_path} exists.")
+                self.json_path.write_text(text, encoding="utf-8")
         return None
 
+    def scan_state(self) -> ScanState:
+        """Bookkeeping of the scans, see scan_cursor.py and scan_scheduler.py."""
+        data = self.libdata or self._empty_data()
+        return data.scan
+
+    def save_scan_state(self, state: ScanState) -> None:
+        """Store the scan state, re-reading the library first like merge()."""
+        self.load()
+        assert self.libdata is not None
+        self.libdata.scan = state
+        self.save(overwrite=True)
+
     def merge(self, vids: list[VidEntry], save: bool) -> None:
         """Merge the vids into the library."""
         logger.info(f"Merging {len(vids)} vids into library for {self.channel_name}")
@@ -412,17 +438,27 @@ class Library:
         self,
         limit: int | None,
         max_concurrent_downloads: int = 1,
+        vids: list[VidEntry] | None = None,
+        fresh_days: int | None = None,
     ) -> None:
         """Download the missing files using thread pools.
 
         Args:
             limit: Maximum number of files to download or None for unlimited
             max_concurrent_downloads: Maximum number of concurrent downloads
-            max_concurrent_conversions: Maximum number of concurrent conversions
+            vids: Optional ordered selection of vids (from the DownloadScheduler)
+                to download, None means all missing vids, fresh uploads first.
+            fresh_days: Uploads newer than this many days count as fresh when
+                vids is None, None for the scheduler's default.
         """
         logger.info(f"Downloading missing files for {self.channel_name}")
+        from youtube_sync.download_scheduler import (
+            DEFAULT_FRESH_DAYS,
+            order_for_download,
+        )
         from youtube_sync.final_result import FinalResult
         from youtube_sync.ytdlp.error import (
+            SourcePausedException,
             check_keyboard_interrupt,
             set_keyboard_interrupt,
         )
@@ -432,15 +468,29 @@ class Library:
             max_workers=max_concurrent_downloads, thread_name_prefix="download"
         )
 
+        health = source_health()
+
         try:
             download_count = 0
-            max_errors = 100
 
             # Check for keyboard interrupt
             if check_keyboard_interrupt():
                 print("Detected previous keyboard interrupt. Aborting downloads.")
                 return
 
+            admitted = health.admit(self.source)
+            if admitted == CircuitState.OPEN:
+                resume = health.get(self.source).seconds_until_resume()
+                print(
+                    f"Source {self.source.value} is paused for another {resume:.0f} seconds,"
+                    f" skipping downloads for {self.channel_name}."
+                )
+                return
+            probe = admitted == CircuitState.HALF_OPEN
+            if probe:
+                # the single probe after a pause, one download tells whether the source is back
+                limit = 1 if limit is None else min(limit, 1)
+
             if (limit is not None) and (download_count >= limit):
                 return
 
@@ -455,6 +505,8 @@ class Library:
                 missing_upload_dates_or_error = {}
             assert isinstance(missing_upload_dates_or_error, list)
             missing_dates: list[VidEntry] = missing_upload_dates_or_error
+            if probe:
+                missing_dates = missing_dates[:1]
             if missing_dates:
                 # always prioritize missing upload dates and filling them in before proceeding.
                 # this is because the upload date is used to determine the file name.
@@ -473,14 +525,21 @@ class Library:
                     di.download_vid = download_vid
                     di.download_date = download_upload_date
                     downloads_to_process.append(di)
-                futures: list[Future[FinalResult]] = self.ytdlp.download_mp3s(
-                    downloads=downloads_to_process,
-                    download_pool=download_pool,
-                )
+                with trace_context(channel=self.channel_name):
+                    futures: list[Future[FinalResult]] = self.ytdlp.download_mp3s(
+                        downloads=downloads_to_process,
+                        download_pool=download_pool,
+                    )
                 for i, f in enumerate(futures):
                     rslt: FinalResult = f.result()
                     upload_date = rslt.date
                     missing_dates[i].date_upload = upload_date
+                    if isinstance(rslt.exception, SourcePausedException):
+                        continue
+                    if rslt.exception is not None:
+                        health.record_failure(self.source, rslt.exception)
+                    else:
+                        health.record_success(self.source)
                 # save result
                 # self.save(overwrite=True)
                 self.merge(missing_dates, save=False)
@@ -531,13 +590,29 @@ class Library:
                 return
 
             assert isinstance(missing_downloads_or_error, list)
-            missing_downloads: list[VidEntry] = missing_downloads_or_error.copy()
+            missing_downloads: list[VidEntry] = order_for_download(
+                missing_downloads_or_error,
+                fresh_days=DEFAULT_FRESH_DAYS if fresh_days is None else fresh_days,
+            )
 
             # now add the vids that need upload dates
             for vid in missing_upload_dates_or_error:  # type: ignore[reportUnknownVariableType]
                 if vid not in missing_downloads:  # type: ignore[reportUnknownArgumentType]
                     missing_downloads.append(vid)  # type: ignore[reportUnknownArgumentType]
 
+            if vids is not None:
+                # The scheduler already picked and ordered the vids, keep only
+                # the ones that are still missing, as the entries just loaded
+                # (the scheduler's copies can be older, e.g. lack the upload date).
+                still_missing_by_url: dict[str, VidEntry] = {
+                    vid.url: vid for vid in missing_downloads
+                }
+                missing_downloads = [
+                    still_missing_by_url[vid.url]
+                    for vid in vids
+                    if vid.url in still_missing_by_url
+                ]
+
             # Determine how many to download in this batch
             remaining_limit = None if limit is None else limit - download_count
             batch_size = (
@@ -572,10 +647,11 @@ class Library:
 
             try:
                 # Submit downloads to thread pools
-                futures: list[Future[FinalResult]] = self.ytdlp.download_mp3s(
-                    downloads=downloads_to_process,
-                    download_pool=download_pool,
-                )
+                with trace_context(channel=self.channel_name):
+                    futures: list[Future[FinalResult]] = self.ytdlp.download_mp3s(
+                        downloads=downloads_to_process,
+                        download_pool=download_pool,
+                    )
                 if not futures:
                     print("No downloads to process. Exiting.")
                     return
@@ -596,15 +672,34 @@ class Library:
                         if final_result.date is not None:
                             vid.date_upload = final_result.date
                         self.merge([vid], save=True)
+                        if isinstance(error, SourcePausedException):
+                            print(f"Source paused, stopping downloads: {error}")
+                            download_pool.shutdown(wait=False, cancel_futures=True)
+                            break
                         if error is not None:
                             print(f"Error downloading {vid.url}: {error}")
-                            self.mark_error(vid)
-                            max_errors -= 1
-                            if max_errors <= 0:
-                                print("Too many errors, aborting downloads.")
+                            kind = health.record_failure(self.source, error)
+                            VIDEOS_FAILED.inc(
+                                source=self.source.value,
+                                channel=self.channel_name,
+                                kind=kind.value,
+                            )
+                            if kind not in _SOURCE_FAILURES:
+                                # only blame the video for per video failures
+                                self.mark_error(vid)
+                            if health.is_paused(self.source):
+                                print(
+                                    f"Source {self.source.value} is paused ({kind.value}), aborting downloads."
+                                )
                                 download_pool.shutdown(wait=False, cancel_futures=True)
                                 break
                         else:
+                            health.record_success(self.source)
+                            if final_result.request.download_vid:
+                                VIDEOS_DOWNLOADED.inc(
+                                    source=self.source.value,
+                                    channel=self.channel_name,
+                                )
                             print(f"Successfully downloaded {vid.url}")
                     except KeyboardInterrupt:
                         print(
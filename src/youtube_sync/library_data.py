@@ -3,7 +3,8 @@
 """Library json module."""
 
 import json
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from datetime import datetime
 from typing import Any
 
 from youtube_sync import FSPath
@@ -11,6 +12,47 @@ from youtube_sync.types import Source
 from youtube_sync.vid_entry import VidEntry
 
 
+def _datetime_or_none(value: str | None) -> datetime | None:
+    return datetime.fromisoformat(value) if value else None
+
+
+@dataclass
+class ScanState:
+    """Bookkeeping of the incremental scans of a channel."""
+
+    channel_id: str | None = None  # platform channel id, e.g. UC... on YouTube
+    last_full_scan: datetime | None = None  # last deep scan, see scan_cursor.py
+    last_feed_scan: datetime | None = None
+    last_scan: datetime | None = None
+    newest_known: str | None = None  # url of the newest video, the high-water mark
+    next_scan: datetime | None = None  # see scan_scheduler.py
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "channel_id": self.channel_id,
+            "last_full_scan": (
+                self.last_full_scan.isoformat() if self.last_full_scan else None
+            ),
+            "last_feed_scan": (
+                self.last_feed_scan.isoformat() if self.last_feed_scan else None
+            ),
+            "last_scan": self.last_scan.isoformat() if self.last_scan else None,
+            "newest_known": self.newest_known,
+            "next_scan": self.next_scan.isoformat() if self.next_scan else None,
+        }
+
+    @staticmethod
+    def from_dict(data: dict[str, Any]) -> "ScanState":
+        return ScanState(
+            channel_id=data.get("channel_id"),
+            last_full_scan=_datetime_or_none(data.get("last_full_scan")),
+            last_feed_scan=_datetime_or_none(data.get("last_feed_scan")),
+            last_scan=_datetime_or_none(data.get("last_scan")),
+            newest_known=data.get("newest_known"),
+            next_scan=_datetime_or_none(data.get("next_scan")),
+        )
+
+
 @dataclass
 class LibraryData:
     """Library data."""
@@ -19,6 +61,7 @@ class LibraryData:
     channel_url: str
     source: Source
     vids: list[VidEntry]
+    scan: ScanState = field(default_factory=ScanState)
 
     def to_json(self) -> dict[str, Any]:
         """Convert to dictionary."""
@@ -26,6 +69,7 @@ class LibraryData:
             "channel_name": self.channel_name,
             "channel_url": self.channel_url,
             "source": self.source.value,
+            "scan": self.scan.to_dict(),
             "vids": [vid.to_dict() for vid in self.vids],
         }
 
@@ -73,11 +117,14 @@ class LibraryData:
             channel_url = data["channel_url"]
             source = Source.from_str(data["source"])
             vids = [VidEntry.from_dict(vid) for vid in data["vids"]]
+            # libraries written before the incremental scans have no "scan"
+            scan = ScanState.from_dict(data.get("scan") or {})
             return LibraryData(
                 channel_name=channel_name,
                 channel_url=channel_url,
                 source=source,
                 vids=vids,
+                scan=scan,
             )
         except FileNotFoundError as fe:
             return fe
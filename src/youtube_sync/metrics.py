@@ -0,0 +1,323 @@
+"""
+In-process metrics in the Prometheus text format.
+
+The sync loop updates the counters, gauges and histograms below as it goes,
+web_server.py serves REGISTRY.render() on /metrics. No client library is
+needed, the exposition format is plain text.
+"""
+
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Generator
+
+LabelValues = tuple[str, ...]
+
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.5,
+    1.0,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    300.0,
+    900.0,
+    3600.0,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...]) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def _samples(self) -> list[str]:
+        """The sample lines of the metric, in the text exposition format."""
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonically increasing value."""
+
+    kind = "counter"
+
+    def __init__(
+        self, name: str, help_text: str, labelnames: tuple[str, ...] = ()
+    ) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Gauge(_Metric):
+    """Value that goes up and down."""
+
+    kind = "gauge"
+
+    def __init__(
+        self, name: str, help_text: str, labelnames: tuple[str, ...] = ()
+    ) -> None:
+        super().__init__(name, help_text, labelnames)
+        self._values: dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class _HistogramValues:
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+
+class Histogram(_Metric):
+    """Distribution of observations in cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: dict[LabelValues, _HistogramValues] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            values = self._values.setdefault(key, _HistogramValues(self.buckets))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    values.counts[i] += 1
+            values.total += value
+            values.count += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Generator[None, None, None]:
+        """Observe the duration of the with block in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            values = self._values.get(self._key(labels))
+            return values.count if values else 0
+
+    def _samples(self) -> list[str]:
+        lines: list[str] = []
+        with self._lock:
+            items = sorted(self._values.items())
+            for key, values in items:
+                for bound, count in zip(self.buckets, values.counts):
+                    labels = _format_labels(
+                        self.labelnames, key, f'le="{_format_value(bound)}"'
+                    )
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{labels} {values.count}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(values.total)}")
+                lines.append(f"{self.name}_count{labels} {values.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics, rendered together."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._metrics: dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(
+        self, name: str, help_text: str, labelnames: tuple[str, ...] = ()
+    ) -> Counter:
+        out = Counter(name, help_text, labelnames)
+        self._register(out)
+        return out
+
+    def gauge(
+        self, name: str, help_text: str, labelnames: tuple[str, ...] = ()
+    ) -> Gauge:
+        out = Gauge(name, help_text, labelnames)
+        self._register(out)
+        return out
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        out = Histogram(name, help_text, labelnames, buckets)
+        self._register(out)
+        return out
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: list[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+VIDEOS_SCANNED = REGISTRY.counter(
+    "youtube_sync_videos_scanned_total",
+    "New videos found by channel scans.",
+    ("source", "channel"),
+)
+SCAN_ENTRIES = REGISTRY.counter(
+    "youtube_sync_scan_entries_total",
+    "Entries enumerated by channel scans, known or new.",
+    ("source", "channel"),
+)
+VIDEOS_DOWNLOADED = REGISTRY.counter(
+    "youtube_sync_videos_downloaded_total",
+    "Videos downloaded and stored.",
+    ("source", "channel"),
+)
+VIDEOS_FAILED = REGISTRY.counter(
+    "youtube_sync_videos_failed_total",
+    "Failed video downloads by failure kind.",
+    ("source", "channel", "kind"),
+)
+BYTES_DOWNLOADED = REGISTRY.counter(
+    "youtube_sync_bytes_downloaded_total",
+    "Bytes of media downloaded by yt-dlp.",
+    ("source",),
+)
+BYTES_UPLOADED = REGISTRY.counter(
+    "youtube_sync_bytes_uploaded_total",
+    "Bytes of mp3 written to the output file system.",
+    ("source",),
+)
+TRANSCODE_SECONDS = REGISTRY.histogram(
+    "youtube_sync_transcode_seconds",
+    "Wall clock seconds per ffmpeg transcode.",
+    ("result",),
+)
+QUEUE_DEPTH = REGISTRY.gauge(
+    "youtube_sync_queue_depth",
+    "Jobs queued or running in a work queue.",
+    ("queue",),
+)
+STAGING_RESERVED_BYTES = REGISTRY.gauge(
+    "youtube_sync_staging_reserved_bytes",
+    "Staging bytes reserved by the downloads in flight.",
+    ("area",),
+)
+LIBRARY_LOAD_SECONDS = REGISTRY.histogram(
+    "youtube_sync_library_load_seconds",
+    "Seconds to load a library json.",
+)
+LIBRARY_SAVE_SECONDS = REGISTRY.histogram(
+    "youtube_sync_library_save_seconds",
+    "Seconds to save a library json.",
+)
+CYCLE_SECONDS = REGISTRY.histogram(
+    "youtube_sync_cycle_seconds",
+    "Seconds per full sync cycle over all channels.",
+)
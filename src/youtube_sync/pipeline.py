@@ -0,0 +1,347 @@
+"""
+asyncio download pipeline.
+
+Every download goes through four bounded stages connected by queues:
+
+  download   yt-dlp (and the upload date) on the caller's download pool:
+             the size of the media first, then the download once the
+             staging budget has room for that size (see staging.py)
+  transcode  ffmpeg as an asyncio subprocess, as many at once as the
+             transcode scheduler allows for the cpu quota
+  upload     the copy of the mp3 to the output, local or rclone
+  record     resolves the caller's future and cleans up the temp dir
+
+The stages run as coroutines on one event loop in a background thread, so a
+queued download is a queue entry rather than a thread parked on a future:
+thousands of them cost no threads. The threads left are the yt-dlp runs in
+flight (the download pool, yt-dlp stays behind the synchronous executor with
+its proxy fallback and stall watchdog) and the uploads in flight. The
+transcode and upload queues are short, a download that finishes while they
+are full holds its slot until there's room, so the temp dirs don't pile up
+ahead of ffmpeg.
+
+Environment overrides:
+  YOUTUBE_SYNC_PIPELINE_DOWNLOADS: downloads in flight over all channels (default 16)
+  YOUTUBE_SYNC_PIPELINE_UPLOADS: uploads in flight (default 4)
+"""
+
+import _thread
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, TypeVar
+
+from youtube_sync.envutil import env_int
+from youtube_sync.final_result import FinalResult
+from youtube_sync.logutil import create_logger
+from youtube_sync.metrics import QUEUE_DEPTH
+from youtube_sync.source_health import source_health
+from youtube_sync.staging import Reservation, StagingBudget, staging_budget
+from youtube_sync.tracing import trace_context
+from youtube_sync.transcode import transcode_scheduler
+from youtube_sync.types import Source
+from youtube_sync.ytdlp.download_request import DownloadRequest
+from youtube_sync.ytdlp.downloader import YtDlpDownloader
+from youtube_sync.ytdlp.error import (
+    KeyboardInterruptException,
+    SourcePausedException,
+    check_keyboard_interrupt,
+    set_keyboard_interrupt,
+)
+
+logger = create_logger(__name__, "INFO")
+
+ENV_PIPELINE_DOWNLOADS = "YOUTUBE_SYNC_PIPELINE_DOWNLOADS"
+ENV_PIPELINE_UPLOADS = "YOUTUBE_SYNC_PIPELINE_UPLOADS"
+
+DEFAULT_DOWNLOADS = 16
+DEFAULT_UPLOADS = 4
+
+T = TypeVar("T")
+
+# Builds the downloader of a request (request, source, cookies),
+# YtDlpDownloader but for the tests.
+DownloaderFactory = Callable[[DownloadRequest, Source, "Path | None"], Any]
+
+
+def _ytdlp_downloader(
+    di: DownloadRequest, source: Source, cookies_txt: Path | None
+) -> YtDlpDownloader:
+    return YtDlpDownloader(di=di, cookies_txt=cookies_txt, source=source)
+
+
+@dataclass
+class _Item:
+    """A download on its way through the stages."""
+
+    di: DownloadRequest
+    source: Source
+    cookies_txt: Path | None
+    download_pool: ThreadPoolExecutor
+    future: "Future[FinalResult]"
+    # carries the trace attributes into the stages
+    ctx: contextvars.Context
+    downloader: Any = None
+    reservation: Reservation | None = None
+    result: FinalResult | None = None
+
+    def date(self) -> datetime | None:
+        date = getattr(self.downloader, "date", None)
+        return date if isinstance(date, datetime) else None
+
+    def fail(self, error: Exception) -> None:
+        self.result = FinalResult(request=self.di, date=self.date(), exception=error)
+
+    def finish(self) -> None:
+        date = self.date()
+        if date is None and self.di.download_date:
+            logger.warning(f"Failed to get upload date for {self.di.url}")
+        self.result = FinalResult(request=self.di, date=date, exception=None)
+
+
+Step = Callable[[_Item], Awaitable["asyncio.Queue[_Item] | None"]]
+
+
+class DownloadPipeline:
+    """The stages and their event loop, see the module docstring."""
+
+    def __init__(
+        self,
+        downloads: int | None = None,
+        uploads: int | None = None,
+        transcodes: int | None = None,
+        downloader_factory: DownloaderFactory = _ytdlp_downloader,
+        staging: StagingBudget | None = None,
+    ) -> None:
+        self.downloads = max(
+            1, downloads or env_int(ENV_PIPELINE_DOWNLOADS, DEFAULT_DOWNLOADS)
+        )
+        self.uploads = max(1, uploads or env_int(ENV_PIPELINE_UPLOADS, DEFAULT_UPLOADS))
+        self.transcodes = max(1, transcodes or transcode_scheduler().max_workers)
+        self.downloader_factory = downloader_factory
+        self.staging = staging or staging_budget()
+        self._upload_pool = ThreadPoolExecutor(
+            max_workers=self.uploads, thread_name_prefix="upload"
+        )
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._tasks: list["asyncio.Future[None]"] = []
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="download_pipeline", daemon=True
+        )
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+
+    async def _start(self) -> None:
+        self._download_q: asyncio.Queue[_Item] = asyncio.Queue()
+        self._transcode_q: asyncio.Queue[_Item] = asyncio.Queue(maxsize=self.transcodes)
+        self._upload_q: asyncio.Queue[_Item] = asyncio.Queue(maxsize=self.uploads)
+        self._record_q: asyncio.Queue[_Item] = asyncio.Queue()
+        stages: list[tuple[asyncio.Queue[_Item], Step, int]] = [
+            (self._download_q, self._download, self.downloads),
+            (self._transcode_q, self._transcode, self.transcodes),
+            (self._upload_q, self._upload, self.uploads),
+            (self._record_q, self._record, 1),
+        ]
+        for queue, step, workers in stages:
+            for _ in range(workers):
+                self._tasks.append(asyncio.ensure_future(self._worker(queue, step)))
+
+    def submit(
+        self,
+        di: DownloadRequest,
+        source: Source,
+        download_pool: ThreadPoolExecutor,
+        cookies_txt: Path | None = None,
+    ) -> "Future[FinalResult]":
+        """Queue the download, the future resolves once it's recorded."""
+        future: Future[FinalResult] = Future()
+        with trace_context(url=di.url, source=source.value):
+            ctx = contextvars.copy_context()
+        item = _Item(
+            di=di,
+            source=source,
+            cookies_txt=cookies_txt,
+            download_pool=download_pool,
+            future=future,
+            ctx=ctx,
+        )
+        with self._lock:
+            self._in_flight += 1
+        QUEUE_DEPTH.inc(queue="download")
+        self._loop.call_soon_threadsafe(self._download_q.put_nowait, item)
+        return future
+
+    def pending(self) -> int:
+        """Downloads submitted and not recorded yet."""
+        with self._lock:
+            return self._in_flight
+
+    async def _worker(self, queue: "asyncio.Queue[_Item]", step: Step) -> None:
+        while True:
+            item = await queue.get()
+            try:
+                next_queue = await step(item)
+            except Exception as e:  # pylint: disable=broad-except
+                logger.error(f"Download pipeline failed on {item.di.url}: {e}")
+                item.fail(e)
+                next_queue = self._record_q if step != self._record else None
+            finally:
+                queue.task_done()
+            if next_queue is not None:
+                await next_queue.put(item)
+
+    def _run_probe(self, item: _Item) -> int | None | Exception:
+        try:
+            item.downloader = self.downloader_factory(
+                item.di, item.source, item.cookies_txt
+            )
+            if not item.di.download_vid:
+                return None  # a date lookup stages nothing
+            return item.downloader.probe()
+        except KeyboardInterrupt as e:
+            # must not reach the event loop
+            set_keyboard_interrupt()
+            _thread.interrupt_main()
+            return KeyboardInterruptException(str(e))
+
+    def _run_download(self, item: _Item) -> object:
+        try:
+            assert item.reservation is not None
+            return item.downloader.download(item.reservation.area.root)
+        except KeyboardInterrupt as e:
+            # must not reach the event loop
+            set_keyboard_interrupt()
+            _thread.interrupt_main()
+            return KeyboardInterruptException(str(e))
+
+    @staticmethod
+    def _run_upload(item: _Item) -> Exception | None:
+        try:
+            item.downloader.copy_to_destination()
+        except KeyboardInterrupt as e:  # raised after an earlier interrupt
+            return KeyboardInterruptException(str(e))
+        return None
+
+    async def _in_download_pool(
+        self, item: _Item, run: Callable[[_Item], T]
+    ) -> T | CancelledError:
+        future = item.download_pool.submit(item.ctx.run, run, item)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                raise
+            # the caller shut its pool down, e.g. its source got paused
+            return CancelledError(f"Download of {item.di.url} cancelled")
+
+    async def _download(self, item: _Item) -> "asyncio.Queue[_Item]":
+        if check_keyboard_interrupt():
+            item.fail(
+                KeyboardInterruptException(
+                    "Download aborted due to previous keyboard interrupt"
+                )
+            )
+            return self._record_q
+        # the source got paused while this waited, a probe of a half open
+        # circuit has the whole batch of its caller
+        if source_health().get(item.source).is_paused():
+            item.fail(
+                SourcePausedException(
+                    f"Download skipped, {item.source.value} is paused"
+                )
+            )
+            return self._record_q
+        filesize = await self._in_download_pool(item, self._run_probe)
+        if isinstance(filesize, Exception):
+            item.fail(filesize)
+            return self._record_q
+        # holds this download slot until there's staging space
+        item.reservation = await self.staging.reserve(item.di, filesize)
+        result = await self._in_download_pool(item, self._run_download)
+        if isinstance(result, CancelledError):
+            item.fail(result)
+            return self._record_q
+        if isinstance(result, Exception):
+            logger.warning(f"Failed to download {item.di.url}: {result}")
+            item.fail(result)
+            return self._record_q
+        if not item.di.download_vid:
+            item.finish()
+            return self._record_q
+        if check_keyboard_interrupt():
+            item.fail(
+                KeyboardInterruptException(
+                    "Download aborted due to previous keyboard interrupt"
+                )
+            )
+            return self._record_q
+        transcode_scheduler().job_queued()
+        return self._transcode_q
+
+    async def _transcode(self, item: _Item) -> "asyncio.Queue[_Item]":
+        with transcode_scheduler().job_running():
+            # a task made under the item's context carries its trace attributes
+            converted = await item.ctx.run(
+                asyncio.ensure_future, item.downloader.convert_to_mp3_async()
+            )
+        if isinstance(converted, Exception):
+            item.fail(converted)
+            return self._record_q
+        return self._upload_q
+
+    async def _upload(self, item: _Item) -> "asyncio.Queue[_Item]":
+        def upload() -> Exception | None:
+            return item.ctx.run(self._run_upload, item)
+
+        error = await self._loop.run_in_executor(self._upload_pool, upload)
+        if error is not None:
+            item.fail(error)
+        else:
+            item.finish()
+        return self._record_q
+
+    async def _record(self, item: _Item) -> None:
+        try:
+            if item.downloader is not None:
+                item.downloader.dispose()
+        finally:
+            if item.reservation is not None:
+                await self.staging.release(item.reservation)
+            with self._lock:
+                self._in_flight -= 1
+            QUEUE_DEPTH.dec(queue="download")
+            assert item.result is not None
+            item.future.set_result(item.result)
+
+    def close(self) -> None:
+        """Stop the stages, for the tests. Queued downloads never resolve."""
+
+        async def cancel() -> None:
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        asyncio.run_coroutine_threadsafe(cancel(), self._loop).result(timeout=10)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=10)
+        self._loop.close()
+        self._upload_pool.shutdown(wait=False)
+
+
+_PIPELINE: DownloadPipeline | None = None
+_PIPELINE_LOCK = threading.Lock()
+
+
+def download_pipeline() -> DownloadPipeline:
+    """Get the process wide download pipeline."""
+    global _PIPELINE  # pylint: disable=global-statement
+    with _PIPELINE_LOCK:
+        if _PIPELINE is None:
+            _PIPELINE = DownloadPipeline()
+        return _PIPELINE
@@ -4,7 +4,7 @@ Launches playwright and sets up all the defaults.
 
 import os
 from contextlib import contextmanager
-from typing import Generator
+from typing import Callable, Generator
 
 from filelock import FileLock
 from playwright.sync_api import Browser, Page, sync_playwright
@@ -19,11 +19,16 @@ def set_headless(headless: bool) -> None:
     HEADLESS = headless
 
 
-def install_playwright() -> None:
-    """Install Playwright."""
+def install_playwright(executable_path: str | None = None) -> None:
+    """Install Playwright, skipped when the browser at executable_path exists."""
+    global INSTALLED  # pylint: disable=global-statement
+    if INSTALLED:
+        return
+    if executable_path and os.path.exists(executable_path):
+        INSTALLED = True
+        return
     install_lock = os.path.join(os.getcwd(), "playwright.lock")
     with FileLock(install_lock):
-        global INSTALLED  # pylint: disable=global-statement
         if INSTALLED:
             return
         print("\n############################")
@@ -60,3 +65,29 @@ def launch_playwright(
         finally:
             page.close()
             browser.close()
+
+
+def start_browser(
+    timeout_seconds: float = 300,
+) -> tuple[Browser, Callable[[], None]]:
+    """
+    Starts playwright and a browser that outlives the call, for the browser pool.
+    Returns the browser and a function that closes it and stops playwright. Both
+    must be called from the thread that started them.
+    """
+    pw = sync_playwright().start()
+    try:
+        install_playwright(pw.chromium.executable_path)
+        headless = HEADLESS or os.environ.get("GITHUB_ACTIONS") == "true"
+        browser = pw.chromium.launch(headless=headless, timeout=timeout_seconds * 1000)
+    except Exception:
+        pw.stop()
+        raise
+
+    def stop() -> None:
+        try:
+            browser.close()
+        finally:
+            pw.stop()
+
+    return browser, stop
@@ -1,13 +1,4 @@
-import os
-from concurrent.futures import ThreadPoolExecutor
+from youtube_sync.transcode import TranscodeScheduler, transcode_scheduler
 
-_MAX_CPU_WORKERS = max(2, os.cpu_count() or 0)
-
-# Thread pool for resolving futures
-FUTURE_RESOLVER_POOL = ThreadPoolExecutor(
-    max_workers=_MAX_CPU_WORKERS, thread_name_prefix="future_resolver"
-)
-
-FFMPEG_EXECUTORS = ThreadPoolExecutor(
-    max_workers=_MAX_CPU_WORKERS, thread_name_prefix="ffmpeg_executor"
-)
+# Sized from the effective cpu quota of the container, see transcode.py
+FFMPEG_EXECUTORS: TranscodeScheduler = transcode_scheduler()
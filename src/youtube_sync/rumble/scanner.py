@@ -0,0 +1,246 @@
+"""
+Parallel HTTP scanner for Rumble channel listings.
+
+A Rumble channel lists its uploads newest first, 25 or so per page, at
+/c/<channel>?page=N (or /user/<name>?page=N). Pages past the end answer 404.
+Instead of one sequential yt-dlp --flat-playlist run, the listing pages are
+fetched a batch at a time over a pooled session and parsed for the url, title
+and upload time of each video. The scan stops where its ScanCursor says, at
+the first page whose videos are all in the library, at the limit, or at the
+end of the listing. A first page without videos is a RumbleScanError, so the
+caller falls back to yt-dlp.
+
+The session impersonates Chrome through curl_cffi (installed with
+yt-dlp[curl-cffi]) when it is available; Rumble's bot protection turns plain
+requests away more often. Either way a page fetch holds a slot of the HTTP
+client's per-host cap (see http_client.py).
+
+Environment overrides:
+  YOUTUBE_SYNC_RUMBLE_SCAN_CONCURRENCY: listing pages fetched at once (default 4)
+"""
+
+import functools
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+from urllib.parse import parse_qs, urlencode, urljoin, urlparse, urlunparse
+
+from bs4 import BeautifulSoup
+
+from youtube_sync.clean_filename import clean_filename
+from youtube_sync.envutil import env_int
+from youtube_sync.http_client import http_client
+from youtube_sync.http_session import http_session
+from youtube_sync.logutil import create_logger
+from youtube_sync.scan_cursor import ScanCursor
+from youtube_sync.vid_entry import VidEntry
+
+try:
+    from curl_cffi import requests as curl_requests  # type: ignore
+
+    USE_CURL_CFFI = True
+except ImportError:
+    curl_requests = None
+    USE_CURL_CFFI = False
+
+logger = create_logger(__name__, "INFO")
+
+ENV_SCAN_CONCURRENCY = "YOUTUBE_SYNC_RUMBLE_SCAN_CONCURRENCY"
+DEFAULT_SCAN_CONCURRENCY = 4
+
+URL_BASE = "https://rumble.com"
+IMPERSONATE = "chrome"
+
+# Safety stop for a listing that never ends.
+MAX_PAGES = 2000
+
+_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"
+    ),
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+_VIDEO_HREF = re.compile(r"^/v[0-9a-z]+-[^/?#]*\.html")
+
+
+class RumbleScanError(Exception):
+    """A listing page could not be fetched."""
+
+
+def scan_concurrency() -> int:
+    return max(1, env_int(ENV_SCAN_CONCURRENCY, DEFAULT_SCAN_CONCURRENCY))
+
+
+def page_url(channel_url: str, page_num: int) -> str:
+    """The listing url of a page, the same ?page=N scheme as to_channel_url."""
+    parts = urlparse(channel_url)
+    query = parse_qs(parts.query)
+    query.pop("page", None)
+    if page_num > 1:
+        query["page"] = [str(page_num)]
+    return urlunparse(parts._replace(query=urlencode(query, doseq=True)))
+
+
+def create_session() -> Any:
+    """A pooled session, impersonating Chrome when curl_cffi is installed."""
+    if USE_CURL_CFFI:
+        return curl_requests.Session(impersonate=IMPERSONATE)
+    return http_session()
+
+
+def fetch_status(url: str, session: Any = None, timeout: float = 20) -> int:
+    """Status of a GET of url the way the scanner fetches its pages."""
+    with http_client().host_slot(url):
+        resp = (session or create_session()).get(url, headers=_HEADERS, timeout=timeout)
+    return int(resp.status_code)
+
+
+def _vid_from_item(item: Any) -> VidEntry | None:
+    link = item.find("a", href=_VIDEO_HREF)
+    if link is None:
+        return None
+    url = urljoin(URL_BASE, link["href"].split("?")[0])
+    heading = item.find("h3")
+    title = ""
+    if heading is not None:
+        title = str(heading.get("title") or heading.get_text(" ", strip=True))
+    if not title:
+        title = str(link.get("title") or link.get_text(" ", strip=True))
+    if not title:
+        return None
+    time_tag = item.find("time", attrs={"datetime": True})
+    if time_tag is None:
+        return VidEntry(url=url, title=title)
+    try:
+        uploaded = datetime.fromisoformat(str(time_tag["datetime"]))
+    except ValueError:
+        return VidEntry(url=url, title=title)
+    # the dated name the upload date fetch + fixup_video_names would give it
+    file_path = f"{uploaded.date().isoformat()} {clean_filename(f'{title}.mp3')}"
+    return VidEntry(
+        url=url, title=title, file_path=file_path, upload_date=uploaded.date()
+    )
+
+
+def parse_listing(html: str) -> list[VidEntry]:
+    """Vids of a channel listing page, in page order (newest first)."""
+    soup = BeautifulSoup(html, "html.parser")
+    # current layout: div.videostream, older layout: article.video-item
+    items = soup.select("div.videostream, article.video-item")
+    out: list[VidEntry] = []
+    seen: set[str] = set()
+    for item in items:
+        vid = _vid_from_item(item)
+        if vid is None or vid.url in seen:
+            continue
+        seen.add(vid.url)
+        out.append(vid)
+    return out
+
+
+@dataclass
+class ListingPage:
+    """A fetched listing page, vids is None past the end of the listing."""
+
+    page_num: int
+    vids: list[VidEntry] | None
+
+
+class RumbleScanner:
+    """Scans a Rumble channel's listing pages concurrently."""
+
+    def __init__(
+        self, session: Any = None, concurrency: int | None = None, timeout: float = 20
+    ) -> None:
+        self.session = session or create_session()
+        self.concurrency = concurrency or scan_concurrency()
+        self.timeout = timeout
+
+    def fetch_page(self, channel_url: str, page_num: int) -> ListingPage:
+        url = page_url(channel_url, page_num)
+        try:
+            with http_client().host_slot(url):
+                resp = self.session.get(url, headers=_HEADERS, timeout=self.timeout)
+        except Exception as e:
+            raise RumbleScanError(f"Fetching {url} failed: {e}") from e
+        if resp.status_code == 404 and page_num > 1:
+            return ListingPage(page_num, None)
+        if resp.status_code >= 400:
+            raise RumbleScanError(
+                f"Fetching {url} failed: HTTP Error {resp.status_code}"
+            )
+        vids = parse_listing(resp.text)
+        if not vids and page_num == 1:
+            # a bot check or a new page layout, not an empty channel
+            raise RumbleScanError(f"No videos found on {url}")
+        return ListingPage(page_num, vids if vids else None)
+
+    def scan(
+        self,
+        channel_url: str,
+        stored_vids: list[VidEntry],
+        limit: int | None,
+        cursor: ScanCursor | None = None,
+    ) -> list[VidEntry]:
+        """New vids, newest first, until a fully known page or the limit."""
+        if limit is not None and limit < 0:
+            limit = None
+        if cursor is None:
+            # no streak, a fully known page is what ends the scan
+            cursor = ScanCursor(stored_vids, streak=sys.maxsize)
+        out: list[VidEntry] = []
+        seen: set[VidEntry] = set()
+        next_page = 1
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            while next_page <= MAX_PAGES:
+                batch = range(
+                    next_page, min(next_page + self.concurrency, MAX_PAGES + 1)
+                )
+                next_page = batch[-1] + 1
+                # pages are consumed in order, later pages of the batch only
+                # cost a request if an earlier one ends the scan
+                pages = pool.map(functools.partial(self.fetch_page, channel_url), batch)
+                for page in pages:
+                    if page.vids is None:
+                        logger.debug(f"End of the listing at page {page.page_num}")
+                        return out
+                    for vid in page.vids:
+                        if vid in seen:
+                            continue
+                        seen.add(vid)
+                        stop = cursor.observe(vid)
+                        if not cursor.is_known(vid):
+                            out.append(vid)
+                        if limit is not None and len(out) >= limit:
+                            return out
+                        if stop:
+                            logger.debug(f"Stopping at {vid.url}: {cursor.stop_reason}")
+                            return out
+                    if cursor.deep or not cursor.stored:
+                        continue
+                    if all(cursor.is_known(v) for v in page.vids):
+                        cursor.stop_reason = (
+                            f"page {page.page_num} is all in the library"
+                        )
+                        logger.debug(
+                            f"Page {page.page_num} is all in the library, stopping"
+                        )
+                        return out
+        return out
+
+
+def scan_for_vids(
+    channel_url: str,
+    stored_vids: list[VidEntry],
+    limit: int | None,
+    cursor: ScanCursor | None = None,
+) -> list[VidEntry]:
+    """Same contract as ytdlp.scan_for_vids.scan_for_vids, without yt-dlp."""
+    return RumbleScanner().scan(
+        channel_url, stored_vids=stored_vids, limit=limit, cursor=cursor
+    )
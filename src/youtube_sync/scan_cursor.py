@@ -0,0 +1,115 @@
+"""
+Incremental channel scans: where to stop, and when to scan deep.
+
+Channel listings come newest first. A scan stops once it reaches the newest
+video the previous scan saw (the high-water mark kept in the library's scan
+state) or after YOUTUBE_SYNC_SCAN_KNOWN_STREAK entries in a row that are
+already in the library. A streak rather than the first known entry keeps a
+pinned or re-listed video from cutting the scan short.
+
+Every YOUTUBE_SYNC_DEEP_SCAN_HOURS a deep scan runs without the early stop, so
+whatever an early stop skipped is picked up.
+
+Environment overrides:
+  YOUTUBE_SYNC_INCREMENTAL_SCAN: set to 0 to enumerate up to the limit every scan
+  YOUTUBE_SYNC_SCAN_KNOWN_STREAK: known entries in a row that end a scan (default 5)
+  YOUTUBE_SYNC_DEEP_SCAN_HOURS: hours between deep scans of a channel (default 24)
+"""
+
+import os
+from datetime import datetime, timedelta
+
+from youtube_sync.envutil import env_float, env_int
+from youtube_sync.logutil import create_logger
+from youtube_sync.vid_entry import VidEntry
+
+logger = create_logger(__name__, "INFO")
+
+ENV_INCREMENTAL_SCAN = "YOUTUBE_SYNC_INCREMENTAL_SCAN"
+ENV_KNOWN_STREAK = "YOUTUBE_SYNC_SCAN_KNOWN_STREAK"
+ENV_DEEP_SCAN_HOURS = "YOUTUBE_SYNC_DEEP_SCAN_HOURS"
+
+DEFAULT_KNOWN_STREAK = 5
+DEFAULT_DEEP_SCAN_HOURS = 24.0
+
+
+def incremental_scan_enabled() -> bool:
+    return os.environ.get(ENV_INCREMENTAL_SCAN, "1") != "0"
+
+
+def known_streak() -> int:
+    return max(1, env_int(ENV_KNOWN_STREAK, DEFAULT_KNOWN_STREAK))
+
+
+def deep_scan_interval() -> timedelta:
+    return timedelta(hours=env_float(ENV_DEEP_SCAN_HOURS, DEFAULT_DEEP_SCAN_HOURS))
+
+
+def deep_scan_due(last_full_scan: datetime | None, now: datetime | None = None) -> bool:
+    if last_full_scan is None:
+        return True
+    now = now or datetime.now()
+    return now - last_full_scan >= deep_scan_interval()
+
+
+class ScanCursor:
+    """Counts the entries of a scan and decides when it can stop.
+
+    A deep cursor never stops early but still counts what is new.
+    """
+
+    def __init__(
+        self,
+        stored_vids: list[VidEntry],
+        newest_known: str | None = None,
+        streak: int = DEFAULT_KNOWN_STREAK,
+        deep: bool = False,
+    ) -> None:
+        self.stored = set(stored_vids)
+        self.newest_known = newest_known
+        self.streak = max(1, streak)
+        self.deep = deep
+        self.enumerated = 0
+        self.new = 0
+        self.newest: str | None = None  # first url of this scan, the next mark
+        self.stop_reason = ""
+        self._known_in_row = 0
+
+    def reset(self) -> None:
+        """Start the count over, for a fallback scanner after a failed one."""
+        self.enumerated = 0
+        self.new = 0
+        self.newest = None
+        self.stop_reason = ""
+        self._known_in_row = 0
+
+    def complete(self, limit: int | None) -> bool:
+        """The scan got down to what was known: it stopped here, or the
+        listing ended before the limit. A scan cut off by the limit leaves a
+        gap below it, so its newest video must not become the next mark."""
+        if self.stop_reason:
+            return True
+        return limit is None or limit < 0 or self.enumerated < limit
+
+    def is_known(self, vid: VidEntry) -> bool:
+        return vid in self.stored
+
+    def observe(self, vid: VidEntry) -> bool:
+        """Count the entry, True when the scan should stop after it."""
+        self.enumerated += 1
+        if self.newest is None:
+            self.newest = vid.url
+        if not self.is_known(vid):
+            self.new += 1
+            self._known_in_row = 0
+            return False
+        self._known_in_row += 1
+        if self.deep:
+            return False
+        if self.newest_known is not None and vid.url == self.newest_known:
+            self.stop_reason = "reached the newest video of the last scan"
+            return True
+        if self._known_in_row >= self.streak:
+            self.stop_reason = f"{self._known_in_row} known videos in a row"
+            return True
+        return False
@@ -0,0 +1,104 @@
+"""
+Scheduler for channel scans.
+
+Each channel's upload interval is estimated from the upload dates in its
+library: the mean gap between its recent uploads, stretched to the time since
+the latest one so a channel that went quiet is polled less and less. The next
+scan is half that interval away, within the min/max bounds. A scan that found
+new uploads brings the next one down to the minimum, uploads come in bursts.
+
+The next scan time is kept in the library's scan state. The sync loop sleeps
+until the earliest one across the channels.
+
+Environment overrides:
+  YOUTUBE_SYNC_SCAN_SCHEDULE: set to 0 to scan every channel every cycle
+  YOUTUBE_SYNC_SCAN_MIN_MINUTES: shortest time between scans of a channel (default 60)
+  YOUTUBE_SYNC_SCAN_MAX_HOURS: longest time between scans of a channel (default 24)
+"""
+
+import os
+from datetime import date, datetime, timedelta
+
+from youtube_sync.envutil import env_float
+from youtube_sync.library_data import ScanState
+from youtube_sync.logutil import create_logger
+from youtube_sync.vid_entry import VidEntry
+
+logger = create_logger(__name__, "INFO")
+
+ENV_SCAN_SCHEDULE = "YOUTUBE_SYNC_SCAN_SCHEDULE"
+ENV_SCAN_MIN_MINUTES = "YOUTUBE_SYNC_SCAN_MIN_MINUTES"
+ENV_SCAN_MAX_HOURS = "YOUTUBE_SYNC_SCAN_MAX_HOURS"
+
+DEFAULT_SCAN_MIN_MINUTES = 60.0
+DEFAULT_SCAN_MAX_HOURS = 24.0
+
+# Uploads the rate is estimated from.
+RECENT_UPLOADS = 20
+# Scans per expected upload interval.
+SCANS_PER_INTERVAL = 2
+
+
+def scan_schedule_enabled() -> bool:
+    return os.environ.get(ENV_SCAN_SCHEDULE, "1") != "0"
+
+
+def min_scan_delay() -> timedelta:
+    return timedelta(minutes=env_float(ENV_SCAN_MIN_MINUTES, DEFAULT_SCAN_MIN_MINUTES))
+
+
+def max_scan_delay() -> timedelta:
+    return max(
+        min_scan_delay(),
+        timedelta(hours=env_float(ENV_SCAN_MAX_HOURS, DEFAULT_SCAN_MAX_HOURS)),
+    )
+
+
+def _upload_day(vid: VidEntry) -> date | None:
+    upload = vid.date_upload
+    if isinstance(upload, datetime):
+        return upload.date()
+    return upload
+
+
+def upload_interval(
+    vids: list[VidEntry], today: date | None = None
+) -> timedelta | None:
+    """Expected time between uploads, None without enough upload dates."""
+    days = sorted((d for d in map(_upload_day, vids) if d is not None), reverse=True)
+    days = days[:RECENT_UPLOADS]
+    if len(days) < 2:
+        return None
+    mean_gap = (days[0] - days[-1]) / (len(days) - 1)
+    since_last = (today or date.today()) - days[0]
+    return max(mean_gap, since_last)
+
+
+def next_scan_delay(
+    vids: list[VidEntry], found_new: bool, today: date | None = None
+) -> timedelta:
+    low, high = min_scan_delay(), max_scan_delay()
+    if found_new:
+        return low
+    interval = upload_interval(vids, today)
+    if interval is None:
+        return low
+    return min(high, max(low, interval / SCANS_PER_INTERVAL))
+
+
+def plan_next_scan(
+    state: ScanState,
+    vids: list[VidEntry],
+    found_new: bool,
+    now: datetime | None = None,
+) -> datetime:
+    """Set and return the next scan time of the channel."""
+    now = now or datetime.now()
+    state.next_scan = now + next_scan_delay(vids, found_new, now.date())
+    return state.next_scan
+
+
+def scan_due(state: ScanState, now: datetime | None = None) -> bool:
+    if not scan_schedule_enabled() or state.next_scan is None:
+        return True
+    return (now or datetime.now()) >= state.next_scan
@@ -0,0 +1,389 @@
+"""
+Channel sharding across nodes that share the same output.
+
+Each node claims the channels it works on by writing a lease next to the
+libraries, under `.youtube_sync/leases/<channel>/<node>.json`, and only scans
+and downloads the channels it holds. Remotes have no compare-and-swap, so a
+node never overwrites another node's lease file: it writes its own claim,
+waits a moment for concurrent writers to land, then lists the claims of the
+channel. Among the unexpired claims the earliest one wins, and a held lease
+keeps its claim time when it's renewed, so a newcomer always loses to the
+holder. A heartbeat thread renews the held leases every third of the TTL; a
+node that dies stops renewing and its channels are free once the TTL runs out.
+
+Nodes also write a heartbeat file under `.youtube_sync/leases/_nodes/`, and a node
+holds at most its fair share of the channels (channels / live nodes, rounded
+up), so a node that joins gets channels handed over at the next claim or
+heartbeat, whichever comes first. A channel that is being scanned or
+downloaded (see busy()) is only handed over once that work is done.
+
+Node clocks are compared, keep them in sync (NTP) and the TTL well above the
+skew.
+
+Environment overrides:
+  YOUTUBE_SYNC_SHARDING: set to 1 to claim channels through leases
+  YOUTUBE_SYNC_NODE_ID: name of this node (default: host-pid)
+  YOUTUBE_SYNC_LEASE_TTL_SECONDS: how long a lease lasts without renewal (default 600)
+  YOUTUBE_SYNC_LEASE_SETTLE_SECONDS: wait between writing a claim and reading the claims back (default 2)
+"""
+
+import json
+import math
+import os
+import re
+import socket
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Any, Generator, Protocol
+
+from virtual_fs import FSPath
+
+from youtube_sync.config import Channel
+from youtube_sync.envutil import env_float
+from youtube_sync.logutil import create_logger
+
+logger = create_logger(__name__, "INFO")
+
+ENV_SHARDING = "YOUTUBE_SYNC_SHARDING"
+ENV_NODE_ID = "YOUTUBE_SYNC_NODE_ID"
+ENV_LEASE_TTL_SECONDS = "YOUTUBE_SYNC_LEASE_TTL_SECONDS"
+ENV_LEASE_SETTLE_SECONDS = "YOUTUBE_SYNC_LEASE_SETTLE_SECONDS"
+
+DEFAULT_LEASE_TTL_SECONDS = 600.0
+DEFAULT_LEASE_SETTLE_SECONDS = 2.0
+
+LEASE_DIR = ".youtube_sync"
+# Channel key for the nodes' own heartbeat files.
+NODES_KEY = "_nodes"
+
+
+def sharding_enabled() -> bool:
+    return os.environ.get(ENV_SHARDING, "0") == "1"
+
+
+def node_id() -> str:
+    return os.environ.get(ENV_NODE_ID) or f"{socket.gethostname()}-{os.getpid()}"
+
+
+def lease_ttl() -> float:
+    return env_float(ENV_LEASE_TTL_SECONDS, DEFAULT_LEASE_TTL_SECONDS)
+
+
+def lease_settle() -> float:
+    return env_float(ENV_LEASE_SETTLE_SECONDS, DEFAULT_LEASE_SETTLE_SECONDS)
+
+
+def channel_key(channel: Channel) -> str:
+    return f"{channel.name}/{channel.source.value}"
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r"[^\w.-]", "_", name)
+
+
+@dataclass
+class Lease:
+    """One node's claim on a channel."""
+
+    channel: str
+    node: str
+    claimed_at: float
+    expires_at: float
+
+    def expired(self, now: float | None = None) -> bool:
+        return (now or time.time()) >= self.expires_at
+
+    def sort_key(self) -> tuple[float, str]:
+        return (self.claimed_at, self.node)
+
+    @staticmethod
+    def from_dict(data: dict[str, Any]) -> "Lease":
+        return Lease(
+            channel=str(data["channel"]),
+            node=str(data["node"]),
+            claimed_at=float(data["claimed_at"]),
+            expires_at=float(data["expires_at"]),
+        )
+
+
+class LeaseStore(Protocol):
+    """Where the lease files live, one file per channel and node."""
+
+    def write(self, lease: Lease) -> None: ...
+
+    def read_all(self, channel: str) -> list[Lease]: ...
+
+    def delete(self, channel: str, node: str) -> None: ...
+
+
+class FSLeaseStore:
+    """Leases as JSON files under the shared output (local or rclone remote)."""
+
+    def __init__(self, root: FSPath) -> None:
+        self.root = root / LEASE_DIR / "leases"
+
+    def _dir(self, channel: str) -> FSPath:
+        return self.root / _safe_name(channel)
+
+    def write(self, lease: Lease) -> None:
+        path = self._dir(lease.channel)
+        path.mkdir(parents=True, exist_ok=True)
+        (path / f"{_safe_name(lease.node)}.json").write_text(
+            json.dumps(asdict(lease)), encoding="utf-8"
+        )
+
+    def read_all(self, channel: str) -> list[Lease]:
+        path = self._dir(channel)
+        if not path.exists():
+            return []
+        files, _ = path.ls()
+        out: list[Lease] = []
+        for file in files:
+            name = os.path.basename(str(file))
+            if not name.endswith(".json"):
+                continue
+            try:
+                out.append(
+                    Lease.from_dict(
+                        json.loads((path / name).read_text(encoding="utf-8"))
+                    )
+                )
+            except (ValueError, KeyError, TypeError, OSError) as e:
+                # half written or gone in the meantime, the next read settles it
+                logger.debug(f"Skipping lease file {name} of {channel}: {e}")
+        return out
+
+    def delete(self, channel: str, node: str) -> None:
+        (self._dir(channel) / f"{_safe_name(node)}.json").unlink(missing_ok=True)
+
+
+class ShardManager:
+    """Claims, renews and releases this node's channel leases."""
+
+    def __init__(
+        self,
+        store: LeaseStore,
+        node: str | None = None,
+        ttl: float | None = None,
+        settle: float | None = None,
+    ) -> None:
+        self.store = store
+        self.node = node or node_id()
+        self.ttl = ttl if ttl is not None else lease_ttl()
+        self.settle = settle if settle is not None else lease_settle()
+        self.channels: list[str] = []
+        self._held: dict[str, Lease] = {}
+        # scans and downloads running per channel, these aren't handed over
+        self._busy: Counter[str] = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    # ----- leases -----
+
+    def _winner(self, channel: str, now: float) -> Lease | None:
+        live: list[Lease] = []
+        for lease in self.store.read_all(channel):
+            if not lease.expired(now):
+                live.append(lease)
+            elif now - lease.expires_at > self.ttl and lease.node != self.node:
+                # long dead node, tidy up after it
+                self.store.delete(channel, lease.node)
+        return min(live, key=Lease.sort_key) if live else None
+
+    def _try_acquire(self, channel: str) -> bool:
+        now = time.time()
+        winner = self._winner(channel, now)
+        if winner is not None and winner.node != self.node:
+            return False
+        if winner is not None:
+            mine = winner
+            mine.expires_at = now + self.ttl
+        else:
+            mine = Lease(
+                channel=channel,
+                node=self.node,
+                claimed_at=now,
+                expires_at=now + self.ttl,
+            )
+        self.store.write(mine)
+        if winner is None and self.settle > 0:
+            # let concurrent claims land before deciding
+            time.sleep(self.settle)
+        winner = self._winner(channel, time.time())
+        if winner is None or winner.node != self.node:
+            self.store.delete(channel, self.node)
+            return False
+        self._held[channel] = winner
+        return True
+
+    def _renew(self, channel: str) -> bool:
+        lease = self._held[channel]
+        now = time.time()
+        if lease.expired(now):
+            # someone may have claimed it in the meantime, start over
+            logger.warning(f"Lease on {channel} ran out before it was renewed")
+            self._drop(channel)
+            return self._try_acquire(channel)
+        winner = self._winner(channel, now)
+        if winner is None or winner.node != self.node:
+            logger.warning(
+                f"Lost the lease on {channel} to {winner.node if winner else 'nobody'}"
+            )
+            self._drop(channel)
+            return False
+        lease.expires_at = now + self.ttl
+        self.store.write(lease)
+        return True
+
+    def _drop(self, channel: str) -> None:
+        self._held.pop(channel, None)
+        self.store.delete(channel, self.node)
+
+    def _beat(self) -> None:
+        now = time.time()
+        self.store.write(
+            Lease(
+                channel=NODES_KEY,
+                node=self.node,
+                claimed_at=now,
+                expires_at=now + self.ttl,
+            )
+        )
+
+    def live_nodes(self) -> int:
+        now = time.time()
+        nodes = {
+            lease.node
+            for lease in self.store.read_all(NODES_KEY)
+            if not lease.expired(now)
+        }
+        nodes.add(self.node)
+        return len(nodes)
+
+    def fair_share(self) -> int:
+        if not self.channels:
+            return 0
+        return math.ceil(len(self.channels) / self.live_nodes())
+
+    def _rebalance(self) -> None:
+        """Hand over what's above the share to the nodes that joined, idle
+        channels only: a busy one is released at a later heartbeat."""
+        share = self.fair_share()
+        idle = [
+            c for c in reversed(self.channels) if c in self._held and not self._busy[c]
+        ]
+        above = idle[: max(0, len(self._held) - share)]
+        for channel in above:
+            logger.info(f"Releasing {channel}, above the fair share of {share}")
+            self._drop(channel)
+
+    # ----- public -----
+
+    def claim(self, channels: list[str]) -> list[str]:
+        """Renew the held leases and claim free channels up to the fair share,
+        returns the channels this node holds, in the given order."""
+        with self._lock:
+            self.channels = list(channels)
+            self._beat()
+            for channel in list(self._held):
+                if channel not in channels:
+                    self._drop(channel)
+                else:
+                    self._renew(channel)
+            self._rebalance()
+            share = self.fair_share()
+            for channel in channels:
+                if len(self._held) >= share:
+                    break
+                if channel not in self._held:
+                    self._try_acquire(channel)
+            held = [c for c in channels if c in self._held]
+        logger.info(
+            f"Node {self.node} holds {len(held)}/{len(channels)} channels: {held}"
+        )
+        return held
+
+    def acquire(self, channel: str) -> bool:
+        """Hold the lease of one channel, claiming it if it's free and this
+        node is below its fair share."""
+        with self._lock:
+            if channel in self._held:
+                return not self._held[channel].expired() or self._renew(channel)
+            if len(self._held) >= max(1, self.fair_share()):
+                return False
+            return self._try_acquire(channel)
+
+    @contextmanager
+    def busy(self, channel: str) -> Generator[bool, None, None]:
+        """Keep the channel from being handed over while the block runs,
+        yields whether this node holds it (work only if it does)."""
+        with self._lock:
+            held = channel in self._held
+            if held:
+                self._busy[channel] += 1
+        try:
+            yield held
+        finally:
+            if held:
+                with self._lock:
+                    self._busy[channel] -= 1
+
+    def holds(self, channel: str) -> bool:
+        with self._lock:
+            lease = self._held.get(channel)
+            return lease is not None and not lease.expired()
+
+    def held(self) -> list[str]:
+        with self._lock:
+            return list(self._held)
+
+    def renew_all(self) -> None:
+        with self._lock:
+            self._beat()
+            for channel in list(self._held):
+                try:
+                    self._renew(channel)
+                except Exception as e:  # pylint: disable=broad-except
+                    logger.error(f"Failed to renew the lease on {channel}: {e}")
+            # the daemon only claims at the start, nodes that join later get
+            # their share from here
+            self._rebalance()
+
+    def release_all(self) -> None:
+        with self._lock:
+            for channel in list(self._held):
+                self._drop(channel)
+            self.store.delete(NODES_KEY, self.node)
+
+    def _heartbeat(self) -> None:
+        while not self._stop.wait(self.ttl / 3):
+            try:
+                self.renew_all()
+            except Exception as e:  # pylint: disable=broad-except
+                logger.error(f"Lease heartbeat failed: {e}")
+
+    def start_heartbeat(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._heartbeat, name="lease-heartbeat", daemon=True
+        )
+        self._thread.start()
+
+    def stop_heartbeat(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def shard_manager(root: FSPath) -> ShardManager | None:
+    """The lease manager over the shared output, None when sharding is off."""
+    if not sharding_enabled():
+        return None
+    return ShardManager(FSLeaseStore(root))
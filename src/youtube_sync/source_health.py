@@ -0,0 +1,403 @@
+"""
+Per-source health tracking with exponential backoff and a circuit breaker.
+
+yt-dlp failures are classified (rate limit, bot check, geo block, removed or
+private video, network). Failures that say something about the platform
+rather than a single video pause the whole source once enough of them of the
+same kind came in a row: the pause grows exponentially with the number of
+times the circuit opened, with jitter, and while it lasts the circuit is open
+and the
+source's queue is skipped, other sources keep going. The state is persisted
+so it survives the hourly loop and process restarts.
+
+Once a pause has passed the circuit is half open: admit() lets a single
+caller through as the probe and keeps the others out until the probe's result
+is recorded (or PROBE_SECONDS passed without one).
+"""
+
+import json
+import os
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from enum import Enum
+from pathlib import Path
+from typing import Any
+
+from appdirs import user_data_dir  # type: ignore[reportUnknownVariableType]
+from filelock import FileLock
+
+from youtube_sync.logutil import create_logger
+from youtube_sync.types import Source
+
+logger = create_logger(__name__, "INFO")
+
+BASE_BACKOFF_SECONDS = 60.0
+MAX_BACKOFF_SECONDS = 6 * 60 * 60.0
+# A pause by hand without a duration lasts until it's resumed, or this long.
+MANUAL_PAUSE_SECONDS = 7 * 24 * 60 * 60.0
+# How long a half open circuit waits for its probe before it lets another one through.
+PROBE_SECONDS = 15 * 60.0
+
+
+class FailureKind(Enum):
+    """Classification of a yt-dlp failure."""
+
+    RATE_LIMIT = "rate_limit"
+    BOT_CHECK = "bot_check"
+    FORBIDDEN = "forbidden"  # HTTP 403, an expired url or an ip block
+    GEO = "geo"
+    UNAVAILABLE = "unavailable"  # removed, private, members only, ...
+    NETWORK = "network"
+    UNKNOWN = "unknown"
+
+
+class CircuitState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+# Order matters, the first match wins.
+_PATTERNS: list[tuple[FailureKind, re.Pattern[str]]] = [
+    (
+        FailureKind.RATE_LIMIT,
+        re.compile(
+            r"HTTP Error 429|Too Many Requests|rate.?limit|try again later",
+            re.IGNORECASE,
+        ),
+    ),
+    (
+        FailureKind.BOT_CHECK,
+        re.compile(
+            r"confirm you.?re not a bot|Sign in to confirm|captcha",
+            re.IGNORECASE,
+        ),
+    ),
+    (FailureKind.FORBIDDEN, re.compile(r"HTTP Error 403", re.IGNORECASE)),
+    (
+        FailureKind.GEO,
+        re.compile(
+            r"available in your country|geo.?restrict|blocked it in your country",
+            re.IGNORECASE,
+        ),
+    ),
+    (
+        FailureKind.UNAVAILABLE,
+        re.compile(
+            r"Private video|Video unavailable|has been removed|"
+            r"members.?only|This video is not available|account .* terminated|"
+            r"HTTP Error 404|HTTP Error 410",
+            re.IGNORECASE,
+        ),
+    ),
+    (
+        FailureKind.NETWORK,
+        re.compile(
+            r"timed out|stalled:|Connection (?:reset|refused|aborted)|"
+            r"Temporary failure in name resolution|Network is unreachable|"
+            r"Remote end closed connection|HTTP Error 5\d\d|Unable to download webpage",
+            re.IGNORECASE,
+        ),
+    ),
+]
+
+# Consecutive failures of a kind before the source is paused, a failure of
+# another kind starts the count over. Kinds that are not listed are about a
+# single video and never pause the source.
+_OPEN_THRESHOLDS: dict[FailureKind, int] = {
+    FailureKind.RATE_LIMIT: 1,
+    FailureKind.BOT_CHECK: 1,
+    # a single 403 is usually an expired url of one video, a run of them a block
+    FailureKind.FORBIDDEN: 5,
+    FailureKind.NETWORK: 3,
+    FailureKind.UNKNOWN: 10,
+}
+
+
+def classify_failure(error: str | Exception | None) -> FailureKind:
+    """Classify the output or exception of a failed yt-dlp run."""
+    if error is None:
+        return FailureKind.UNKNOWN
+    text = str(error)
+    for kind, pattern in _PATTERNS:
+        if pattern.search(text):
+            return kind
+    return FailureKind.UNKNOWN
+
+
+def backoff_seconds(
+    attempts: int,
+    base: float = BASE_BACKOFF_SECONDS,
+    cap: float = MAX_BACKOFF_SECONDS,
+) -> float:
+    """Exponential backoff with "equal jitter": half fixed, half random. The
+    first attempt waits around base."""
+    if attempts <= 0:
+        return 0.0
+    delay = min(cap, base * (2 ** (attempts - 1)))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+@dataclass
+class SourceHealth:
+    """Health of a single source."""
+
+    source: Source
+    # the current run of failures of one kind
+    consecutive_failures: int = 0
+    streak_kind: FailureKind | None = None
+    # times the circuit opened since the last success, the backoff exponent
+    opens: int = 0
+    paused_until: float = 0.0
+    half_open: bool = False
+    last_failure_kind: FailureKind | None = None
+    last_error: str | None = None
+    last_failure_at: float = 0.0
+    total_failures: int = 0
+    total_successes: int = 0
+    # a probe of the half open circuit is running until then, not persisted
+    probe_until: float = 0.0
+
+    def state(self, now: float | None = None) -> CircuitState:
+        now = time.time() if now is None else now
+        if now < self.paused_until:
+            return CircuitState.OPEN
+        if self.half_open:
+            return CircuitState.HALF_OPEN
+        return CircuitState.CLOSED
+
+    def is_paused(self, now: float | None = None) -> bool:
+        return self.state(now) == CircuitState.OPEN
+
+    def probing(self, now: float | None = None) -> bool:
+        """A probe of the half open circuit is running."""
+        now = time.time() if now is None else now
+        return self.state(now) == CircuitState.HALF_OPEN and now < self.probe_until
+
+    def admit(self, now: float | None = None) -> CircuitState:
+        """OPEN when the caller has to keep out, HALF_OPEN when it's the
+        probe, CLOSED when everything goes."""
+        now = time.time() if now is None else now
+        state = self.state(now)
+        if state == CircuitState.HALF_OPEN:
+            if now < self.probe_until:
+                return CircuitState.OPEN
+            self.probe_until = now + PROBE_SECONDS
+        return state
+
+    def seconds_until_resume(self, now: float | None = None) -> float:
+        now = time.time() if now is None else now
+        return max(0.0, self.paused_until - now)
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self.streak_kind = None
+        self.opens = 0
+        self.half_open = False
+        self.paused_until = 0.0
+        self.probe_until = 0.0
+        self.total_successes += 1
+
+    def record_failure(
+        self, kind: FailureKind, error: str | None, now: float | None = None
+    ) -> None:
+        now = time.time() if now is None else now
+        self.total_failures += 1
+        self.last_failure_kind = kind
+        self.last_error = error[-500:] if error else None
+        self.last_failure_at = now
+        # whatever the probe ran into, it's over
+        self.probe_until = 0.0
+        threshold = _OPEN_THRESHOLDS.get(kind)
+        if threshold is None:
+            # Per video problem, says nothing about the platform.
+            return
+        if kind != self.streak_kind:
+            self.streak_kind = kind
+            self.consecutive_failures = 0
+        self.consecutive_failures += 1
+        if self.half_open or self.consecutive_failures >= threshold:
+            # the probe after a pause failed or we crossed the threshold
+            self.opens += 1
+            delay = backoff_seconds(self.opens)
+            self.paused_until = now + delay
+            self.half_open = True
+            logger.warning(
+                f"Pausing {self.source.value} for {delay:.0f} seconds after "
+                f"{self.consecutive_failures} consecutive failures ({kind.value})"
+            )
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "source": self.source.value,
+            "consecutive_failures": self.consecutive_failures,
+            "streak_kind": self.streak_kind.value if self.streak_kind else None,
+            "opens": self.opens,
+            "paused_until": self.paused_until,
+            "half_open": self.half_open,
+            "last_failure_kind": (
+                self.last_failure_kind.value if self.last_failure_kind else None
+            ),
+            "last_error": self.last_error,
+            "last_failure_at": self.last_failure_at,
+            "total_failures": self.total_failures,
+            "total_successes": self.total_successes,
+        }
+
+    @staticmethod
+    def from_dict(data: dict[str, Any]) -> "SourceHealth":
+        kind = data.get("last_failure_kind")
+        streak_kind = data.get("streak_kind")
+        return SourceHealth(
+            source=Source.from_str(data["source"]),
+            consecutive_failures=int(data.get("consecutive_failures", 0)),
+            streak_kind=FailureKind(streak_kind) if streak_kind else None,
+            opens=int(data.get("opens", 0)),
+            paused_until=float(data.get("paused_until", 0.0)),
+            half_open=bool(data.get("half_open", False)),
+            last_failure_kind=FailureKind(kind) if kind else None,
+            last_error=data.get("last_error"),
+            last_failure_at=float(data.get("last_failure_at", 0.0)),
+            total_failures=int(data.get("total_failures", 0)),
+            total_successes=int(data.get("total_successes", 0)),
+        )
+
+
+def _default_state_path() -> Path:
+    out = os.path.join(user_data_dir("youtube-sync"), "source_health.json")  # type: ignore[reportUnknownMemberType, reportUnknownArgumentType]
+    return Path(out)
+
+
+class SourceHealthController:
+    """Tracks the health of every source, persisted to a json file."""
+
+    def __init__(self, state_path: Path | None = None) -> None:
+        self.state_path = state_path or _default_state_path()
+        self._file_lock = FileLock(f"{self.state_path}.lock")
+        self._lock = threading.Lock()
+        self._health: dict[Source, SourceHealth] = {}
+        self.load()
+
+    def load(self) -> None:
+        with self._lock, self._file_lock:
+            if not self.state_path.exists():
+                return
+            try:
+                data = json.loads(self.state_path.read_text(encoding="utf-8"))
+                for item in data.get("sources", []):
+                    health = SourceHealth.from_dict(item)
+                    self._health[health.source] = health
+            except Exception as e:  # pylint: disable=broad-except
+                logger.error(f"Error loading source health from {self.state_path}: {e}")
+
+    def save(self) -> None:
+        with self._lock:
+            data = {"sources": [h.to_dict() for h in self._health.values()]}
+        text = json.dumps(data, indent=4)
+        with self._file_lock:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.state_path.with_suffix(".tmp")
+            tmp.write_text(text, encoding="utf-8")
+            os.replace(tmp, self.state_path)
+
+    def get(self, source: Source) -> SourceHealth:
+        with self._lock:
+            if source not in self._health:
+                self._health[source] = SourceHealth(source=source)
+            return self._health[source]
+
+    def is_paused(self, source: Source) -> bool:
+        """The source is paused, or its probe is running."""
+        health = self.get(source)
+        with self._lock:
+            return health.is_paused() or health.probing()
+
+    def admit(self, source: Source) -> CircuitState:
+        """Gate of a batch of work on the source, see SourceHealth.admit().
+        A HALF_OPEN caller is the probe and should do a single download or
+        scan and record its result."""
+        health = self.get(source)
+        with self._lock:
+            state = health.admit()
+        if state == CircuitState.HALF_OPEN:
+            logger.info(f"Probing {source.value} after its pause")
+        return state
+
+    def record_success(self, source: Source) -> None:
+        health = self.get(source)
+        changed = health.consecutive_failures > 0 or health.half_open
+        with self._lock:
+            health.record_success()
+        if changed:
+            logger.info(f"Source {source.value} recovered, circuit closed")
+            self.save()
+
+    def record_failure(
+        self, source: Source, error: str | Exception | None
+    ) -> FailureKind:
+        """Classify and record the failure, returns the classification."""
+        kind = classify_failure(error)
+        health = self.get(source)
+        with self._lock:
+            health.record_failure(kind, str(error) if error is not None else None)
+        self.save()
+        return kind
+
+    def pause(self, source: Source, seconds: float | None = None) -> float:
+        """Pause the source by hand, returns when it resumes by itself."""
+        health = self.get(source)
+        with self._lock:
+            health.paused_until = time.time() + (
+                seconds if seconds is not None else MANUAL_PAUSE_SECONDS
+            )
+            paused_until = health.paused_until
+        logger.warning(
+            f"Source {source.value} paused by hand until {time.ctime(paused_until)}"
+        )
+        self.save()
+        return paused_until
+
+    def resume(self, source: Source) -> None:
+        """Close the circuit of the source, whatever paused it."""
+        health = self.get(source)
+        with self._lock:
+            health.paused_until = 0.0
+            health.half_open = False
+            health.probe_until = 0.0
+            health.consecutive_failures = 0
+            health.streak_kind = None
+            health.opens = 0
+        logger.info(f"Source {source.value} resumed by hand")
+        self.save()
+
+    def snapshot(self) -> list[dict[str, Any]]:
+        with self._lock:
+            out: list[dict[str, Any]] = []
+            for health in self._health.values():
+                item = health.to_dict()
+                item["state"] = health.state().value
+                out.append(item)
+            return out
+
+
+_CONTROLLER: SourceHealthController | None = None
+_CONTROLLER_LOCK = threading.Lock()
+
+
+def source_health() -> SourceHealthController:
+    """Get the process wide source health controller."""
+    global _CONTROLLER  # pylint: disable=global-statement
+    with _CONTROLLER_LOCK:
+        if _CONTROLLER is None:
+            _CONTROLLER = SourceHealthController()
+        return _CONTROLLER
+
+
+def set_source_health_path(path: Path) -> None:
+    """Use a different state file, mostly for tests."""
+    global _CONTROLLER  # pylint: disable=global-statement
+    with _CONTROLLER_LOCK:
+        _CONTROLLER = SourceHealthController(state_path=path)
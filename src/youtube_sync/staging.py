@@ -0,0 +1,201 @@
+"""
+Staging space budget for the download temp dirs.
+
+Every download stages the source audio and its mp3 in a temp dir before the
+copy to the output. By default that's the system temp dir, in a container a
+small overlay that a few long downloads fill up, failing everything that
+runs next to them. The download pipeline reserves the estimated size of a
+download here before starting it and waits while the budget is used up.
+
+The estimate is the size yt-dlp gives for the format it picked
+(filesize or filesize_approx, asked for before anything is fetched) times
+ESTIMATE_FACTOR, for the source audio plus the mp3, or
+YOUTUBE_SYNC_STAGING_ESTIMATE_MB when yt-dlp doesn't know. A date lookup
+counts as nothing. A download bigger than the whole budget still runs,
+alone. Small downloads can be staged on a tmpfs
+(YOUTUBE_SYNC_STAGING_FAST_DIR, e.g. /dev/shm), with a budget of its own.
+
+Environment overrides:
+  YOUTUBE_SYNC_STAGING_DIR: where the temp dirs go (default the system temp dir)
+  YOUTUBE_SYNC_STAGING_BUDGET_MB: staging budget (default 80% of the free space there)
+  YOUTUBE_SYNC_STAGING_ESTIMATE_MB: estimate of a download of unknown size (default 200)
+  YOUTUBE_SYNC_STAGING_FAST_DIR: tmpfs for small downloads (default none)
+  YOUTUBE_SYNC_STAGING_FAST_MAX_MB: estimates up to this go to the tmpfs (default 64)
+  YOUTUBE_SYNC_STAGING_FAST_BUDGET_MB: tmpfs budget (default half its free space)
+"""
+
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from youtube_sync.envutil import env_float
+from youtube_sync.logutil import create_logger
+from youtube_sync.metrics import STAGING_RESERVED_BYTES
+from youtube_sync.ytdlp.download_request import DownloadRequest
+
+logger = create_logger(__name__, "INFO")
+
+ENV_STAGING_DIR = "YOUTUBE_SYNC_STAGING_DIR"
+ENV_STAGING_BUDGET_MB = "YOUTUBE_SYNC_STAGING_BUDGET_MB"
+ENV_STAGING_ESTIMATE_MB = "YOUTUBE_SYNC_STAGING_ESTIMATE_MB"
+ENV_STAGING_FAST_DIR = "YOUTUBE_SYNC_STAGING_FAST_DIR"
+ENV_STAGING_FAST_MAX_MB = "YOUTUBE_SYNC_STAGING_FAST_MAX_MB"
+ENV_STAGING_FAST_BUDGET_MB = "YOUTUBE_SYNC_STAGING_FAST_BUDGET_MB"
+
+MB = 1024 * 1024
+DEFAULT_ESTIMATE_MB = 200.0
+DEFAULT_FAST_MAX_MB = 64.0
+# Share of the free space used when no budget is set.
+DISK_SHARE = 0.8
+TMPFS_SHARE = 0.5
+# The source audio plus the mp3, which is about 1.5 times its size.
+ESTIMATE_FACTOR = 2.5
+
+
+def staging_root() -> Path:
+    """Where the download temp dirs go, created when missing."""
+    root = os.environ.get(ENV_STAGING_DIR)
+    out = Path(root) if root else Path(tempfile.gettempdir())
+    out.mkdir(parents=True, exist_ok=True)
+    return out
+
+
+def _budget(root: Path, env: str, share: float) -> int:
+    budget_mb = env_float(env, 0.0)
+    if budget_mb > 0:
+        return int(budget_mb * MB)
+    return int(shutil.disk_usage(root).free * share)
+
+
+@dataclass
+class StagingArea:
+    """A staging dir and its budget."""
+
+    root: Path
+    budget: int
+    reserved: int = 0
+
+
+@dataclass
+class Reservation:
+    area: StagingArea
+    nbytes: int
+
+
+class StagingBudget:
+    """Reservations of staging space. reserve() and release() run on the
+    event loop of the download pipeline."""
+
+    def __init__(
+        self,
+        root: Path | None = None,
+        budget: int | None = None,
+        fast_root: Path | None = None,
+        fast_budget: int | None = None,
+        fast_max: int | None = None,
+        estimate: int | None = None,
+    ) -> None:
+        root = root or staging_root()
+        root.mkdir(parents=True, exist_ok=True)
+        self.area = StagingArea(
+            root=root,
+            budget=(
+                budget
+                if budget is not None
+                else _budget(root, ENV_STAGING_BUDGET_MB, DISK_SHARE)
+            ),
+        )
+        if fast_root is None and os.environ.get(ENV_STAGING_FAST_DIR):
+            fast_root = Path(os.environ[ENV_STAGING_FAST_DIR])
+        self.fast_area: StagingArea | None = None
+        if fast_root is not None:
+            fast_root.mkdir(parents=True, exist_ok=True)
+            self.fast_area = StagingArea(
+                root=fast_root,
+                budget=(
+                    fast_budget
+                    if fast_budget is not None
+                    else _budget(fast_root, ENV_STAGING_FAST_BUDGET_MB, TMPFS_SHARE)
+                ),
+            )
+        self.fast_max = (
+            fast_max
+            if fast_max is not None
+            else int(env_float(ENV_STAGING_FAST_MAX_MB, DEFAULT_FAST_MAX_MB) * MB)
+        )
+        self.default_estimate = (
+            estimate
+            if estimate is not None
+            else int(env_float(ENV_STAGING_ESTIMATE_MB, DEFAULT_ESTIMATE_MB) * MB)
+        )
+        self._cond: asyncio.Condition | None = None
+        logger.info(
+            f"Staging downloads in {root}, budget {self.area.budget / MB:.0f} MB"
+        )
+        if self.fast_area is not None:
+            logger.info(
+                f"Staging downloads up to {self.fast_max / MB:.0f} MB in"
+                f" {fast_root}, budget {self.fast_area.budget / MB:.0f} MB"
+            )
+
+    def estimate(self, di: DownloadRequest, filesize: int | None = None) -> int:
+        """Staging bytes the download is expected to need, filesize is
+        yt-dlp's size of the media when it knows it."""
+        if not di.download_vid:
+            return 0  # only the upload date
+        if filesize:
+            return int(filesize * ESTIMATE_FACTOR)
+        return self.default_estimate
+
+    def _pick(self, nbytes: int) -> StagingArea:
+        fast = self.fast_area
+        if fast is not None and 0 < nbytes <= self.fast_max and nbytes <= fast.budget:
+            return fast
+        return self.area
+
+    async def reserve(
+        self, di: DownloadRequest, filesize: int | None = None
+    ) -> Reservation:
+        """Wait until the estimated size of the download fits the budget."""
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        nbytes = self.estimate(di, filesize)
+        area = self._pick(nbytes)
+        async with self._cond:
+            if nbytes and area.reserved and area.reserved + nbytes > area.budget:
+                logger.info(
+                    f"Staging {area.root} full ({area.reserved / MB:.0f} of"
+                    f" {area.budget / MB:.0f} MB), {di.url} waits"
+                )
+                # an empty area takes anything, too big or not
+                await self._cond.wait_for(
+                    lambda: not area.reserved or area.reserved + nbytes <= area.budget
+                )
+            area.reserved += nbytes
+        STAGING_RESERVED_BYTES.set(area.reserved, area=str(area.root))
+        return Reservation(area=area, nbytes=nbytes)
+
+    async def release(self, reservation: Reservation) -> None:
+        assert self._cond is not None
+        area = reservation.area
+        async with self._cond:
+            area.reserved -= reservation.nbytes
+            self._cond.notify_all()
+        STAGING_RESERVED_BYTES.set(area.reserved, area=str(area.root))
+
+
+_BUDGET: StagingBudget | None = None
+_BUDGET_LOCK = threading.Lock()
+
+
+def staging_budget() -> StagingBudget:
+    """Get the process wide staging budget."""
+    global _BUDGET  # pylint: disable=global-statement
+    with _BUDGET_LOCK:
+        if _BUDGET is None:
+            _BUDGET = StagingBudget()
+        return _BUDGET
@@ -4,6 +4,8 @@ from virtual_fs import FSPath
 
 from .create import create
 from .library import Library
+from .metrics import VIDEOS_SCANNED
+from .scan_scheduler import plan_next_scan, scan_due
 from .sync_impl import BaseSync
 from .types import Source
 from .vid_entry import VidEntry
@@ -63,32 +65,40 @@ class YouTubeSyncImpl:
         return out
 
     def scan_for_vids(
-        self, limit: int | None, stop_on_duplicate_vids: bool = False
+        self,
+        limit: int | None,
+        stop_on_duplicate_vids: bool = False,
+        force: bool = False,
     ) -> list[VidEntry]:
-        remaining_to_download: list[VidEntry] | Exception = (
-            self.find_vids_missing_downloads()
-        )
-        do_scan: bool
-        if isinstance(remaining_to_download, Exception):
-            logger.warning(
-                f"Failed to find vids missing downloads: {remaining_to_download}"
+        self.library.load()
+        state = self.library.scan_state()
+        if not force and not scan_due(state):
+            logger.info(
+                f"Skipping scan of {self.library.channel_name}, next scan at {state.next_scan}"
             )
-            do_scan = True
-        else:
-            do_scan = len(remaining_to_download) < 5
-
-        if do_scan:
-            out: list[VidEntry] = self.api.scan_for_vids(
-                limit=limit,
-                stop_on_duplicate_vids=stop_on_duplicate_vids,
-            )
-            logger.info(f"Found {len(out)} new videos")
-            self.library.merge(out, save=True)
-            return out
-        else:
-            logger.info("Skipping scan for vids, enough videos already downloaded")
             return []
 
+        out: list[VidEntry] = self.api.scan_for_vids(
+            limit=limit,
+            stop_on_duplicate_vids=stop_on_duplicate_vids,
+        )
+        logger.info(f"Found {len(out)} new videos")
+        VIDEOS_SCANNED.inc(
+            len(out),
+            source=self.library.source.value,
+            channel=self.library.channel_name,
+        )
+        self.library.merge(out, save=False)
+        # merge() re-read the library, with the scan state the scan left
+        next_scan = plan_next_scan(
+            self.library.scan_state(),
+            self.library.known_vids(load=False),
+            found_new=bool(out),
+        )
+        logger.info(f"Next scan of {self.library.channel_name} at {next_scan}")
+        self.library.save(overwrite=True)
+        return out
+
     def find_vids_already_downloaded(self, refresh: bool = True) -> list[VidEntry]:
         known_vids = self.known_vids(refresh=refresh)
         find_vids_missing_downloads = self.find_vids_missing_downloads()
@@ -105,8 +115,10 @@ class YouTubeSyncImpl:
     def download(
         self,
         limit: int | None,
+        vids: list[VidEntry] | None = None,
+        fresh_days: int | None = None,
     ) -> None:
-        self.api.download(limit=limit)
+        self.api.download(limit=limit, vids=vids, fresh_days=fresh_days)
 
     def sync(
         self,
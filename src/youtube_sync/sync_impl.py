@@ -4,16 +4,47 @@ Command entry point.
 
 # pylint: disable=consider-using-f-string
 
+import os
 from abc import ABC, abstractmethod
+from datetime import datetime
 from pathlib import Path
 
 from youtube_sync.cookies import Cookies
 from youtube_sync.library import Library
+from youtube_sync.library_data import ScanState
+from youtube_sync.logutil import create_logger
+from youtube_sync.metrics import SCAN_ENTRIES
+from youtube_sync.scan_cursor import (
+    ScanCursor,
+    deep_scan_due,
+    incremental_scan_enabled,
+    known_streak,
+)
+from youtube_sync.tracing import span
 from youtube_sync.types import Source
 from youtube_sync.vid_entry import VidEntry
 
+logger = create_logger(__name__, "INFO")
+
 _YOUTUBE_USE_BOT_SCANNER = False
 
+# How YouTube channels are scanned: "ytdlp" (flat playlist), "innertube"
+# (plain HTTP, falls back to yt-dlp on errors) or "browser" (bot_scanner).
+ENV_YOUTUBE_SCANNER = "YOUTUBE_SYNC_YOUTUBE_SCANNER"
+# How Rumble channels are scanned: "http" (listing pages, falls back to yt-dlp
+# on errors) or "ytdlp".
+ENV_RUMBLE_SCANNER = "YOUTUBE_SYNC_RUMBLE_SCANNER"
+
+
+def _youtube_scanner() -> str:
+    if _YOUTUBE_USE_BOT_SCANNER:
+        return "browser"
+    return os.environ.get(ENV_YOUTUBE_SCANNER, "ytdlp").strip().lower()
+
+
+def _rumble_scanner() -> str:
+    return os.environ.get(ENV_RUMBLE_SCANNER, "http").strip().lower()
+
 
 class BaseSync(ABC):
     """Abstract base class defining the interface for YouTube synchronization."""
@@ -25,10 +56,17 @@ class BaseSync(ABC):
         """Return the library object."""
         return self.lib
 
-    def download(self, limit: int | None) -> None:
-        """Download videos with optional limit."""
+    def download(
+        self,
+        limit: int | None,
+        vids: list[VidEntry] | None = None,
+        fresh_days: int | None = None,
+    ) -> None:
+        """Download videos with optional limit and optional scheduled selection."""
         self.lib.download_missing(
             limit=limit,
+            vids=vids,
+            fresh_days=fresh_days,
         )
 
     def source(self) -> Source:
@@ -58,10 +96,70 @@ class YtDlpSync(BaseSync):
         limit: int | None,
         stop_on_duplicate_vids: bool,
     ) -> list[VidEntry]:
-        # get_cookies
+        from youtube_sync.source_health import CircuitState, source_health
 
+        source = self.channel_source()
+        if source_health().admit(source) == CircuitState.OPEN:
+            logger.warning(f"Source {source.value} is paused, skipping scan")
+            return []
+        state = self.lib.scan_state()
+        cursor = self._scan_cursor(state, limit, stop_on_duplicate_vids)
+        out = self._scan(limit, state, cursor)
+        self._record_scan(state, cursor, limit)
+        return out
+
+    def _scan_cursor(
+        self, state: ScanState, limit: int | None, stop_on_duplicate_vids: bool
+    ) -> ScanCursor:
+        """Incremental unless a deep scan is due, see scan_cursor.py."""
+        if not incremental_scan_enabled():
+            # stop at the first known vid, and only when asked to
+            stored_vids = self.lib.load() if stop_on_duplicate_vids else []
+            return ScanCursor(stored_vids, streak=1, deep=not stop_on_duplicate_vids)
+        deep = not stop_on_duplicate_vids and (
+            limit is None or deep_scan_due(state.last_full_scan)
+        )
+        if deep:
+            logger.info(f"Deep scan of {self.lib.channel_name}")
+        return ScanCursor(
+            self.lib.load(),
+            newest_known=state.newest_known,
+            streak=known_streak(),
+            deep=deep,
+        )
+
+    def _record_scan(
+        self, state: ScanState, cursor: ScanCursor, limit: int | None
+    ) -> None:
+        """Move the scan cursor forward and count the entries."""
+        from youtube_sync.source_health import source_health
+
+        source = self.channel_source()
+        SCAN_ENTRIES.inc(
+            cursor.enumerated, source=source.value, channel=self.lib.channel_name
+        )
+        stopped = f", stopped: {cursor.stop_reason}" if cursor.stop_reason else ""
+        logger.info(
+            f"Scan of {self.lib.channel_name} enumerated {cursor.enumerated} entries, {cursor.new} new{stopped}"
+        )
+        if source_health().get(source).is_paused():
+            # the scan was cut short, the next one starts from the old cursor
+            return
+        now = datetime.now()
+        state.last_scan = now
+        if cursor.newest is not None and cursor.complete(limit):
+            state.newest_known = cursor.newest
+        if cursor.deep:
+            state.last_full_scan = now
+        self.lib.save_scan_state(state)
+
+    def _scan(
+        self, limit: int | None, state: ScanState, cursor: ScanCursor
+    ) -> list[VidEntry]:
+        """Scan the channel with yt-dlp --flat-playlist."""
         from youtube_sync.ytdlp.scan_for_vids import scan_for_vids
 
+        source = self.channel_source()
         self.cookies = Cookies.get_or_refresh(
             source=self.channel_source(), cookies=self.cookies
         )
@@ -69,19 +167,21 @@ class YtDlpSync(BaseSync):
         channel_url = self.lib.channel_url
         if "http" not in channel_url:
             raise ValueError(f"Invalid channel URL: {channel_url}")
-        if stop_on_duplicate_vids:
-            stored_vids = self.lib.load()
-        else:
-            stored_vids = []
         full_scan = limit is None
         limit = limit if limit is not None else -1
-        out: list[VidEntry] = scan_for_vids(
-            channel_url=channel_url,
-            limit=limit,
-            stored_vids=stored_vids,
-            full_scan=full_scan,
-            cookies_txt=Path(self.cookies.path_txt),
-        )
+        with span("scan", channel=self.lib.channel_name, source=source.value) as rec:
+            out: list[VidEntry] = scan_for_vids(
+                channel_url=channel_url,
+                limit=limit,
+                stored_vids=list(cursor.stored),
+                full_scan=full_scan,
+                cookies_txt=Path(self.cookies.path_txt),
+                source=source,
+                cursor=cursor,
+            )
+            rec["vids"] = len(out)
+            rec["enumerated"] = cursor.enumerated
+            rec["deep"] = cursor.deep
 
         return out
 
@@ -93,6 +193,57 @@ class RumbleSyncImpl(YtDlpSync):
     def channel_source(self) -> Source:
         return Source.RUMBLE
 
+    def _http_scan(
+        self, limit: int | None, cursor: ScanCursor
+    ) -> list[VidEntry] | Exception:
+        from youtube_sync.rumble.scanner import RumbleScanError, scan_for_vids
+        from youtube_sync.source_health import (
+            FailureKind,
+            classify_failure,
+            source_health,
+        )
+
+        source = self.channel_source()
+        with span("scan", channel=self.lib.channel_name, source=source.value) as rec:
+            rec["scanner"] = "http"
+            try:
+                out = scan_for_vids(
+                    self.lib.channel_url,
+                    stored_vids=list(cursor.stored),
+                    limit=limit,
+                    cursor=cursor,
+                )
+            except RumbleScanError as e:
+                rec["ok"] = False
+                if classify_failure(e) in (
+                    FailureKind.RATE_LIMIT,
+                    FailureKind.BOT_CHECK,
+                    FailureKind.FORBIDDEN,
+                ):
+                    source_health().record_failure(source, str(e))
+                return e
+            rec["vids"] = len(out)
+            rec["enumerated"] = cursor.enumerated
+            rec["deep"] = cursor.deep
+        source_health().record_success(source)
+        return out
+
+    # override
+    def _scan(
+        self, limit: int | None, state: ScanState, cursor: ScanCursor
+    ) -> list[VidEntry]:
+        from youtube_sync.source_health import source_health
+
+        if _rumble_scanner() == "http":
+            out = self._http_scan(limit, cursor)
+            if not isinstance(out, Exception):
+                return out
+            if source_health().get(self.channel_source()).is_paused():
+                return []
+            logger.warning(f"Rumble page scan failed, falling back to yt-dlp: {out}")
+            cursor.reset()
+        return super()._scan(limit, state, cursor)
+
 
 class YouTubeSyncImpl(YtDlpSync):
     def __init__(self, library: Library):
@@ -101,26 +252,122 @@ class YouTubeSyncImpl(YtDlpSync):
     def channel_source(self) -> Source:
         return Source.YOUTUBE
 
-    def _bot_scan(self, limit: int | None) -> list[VidEntry]:
+    def _bot_scan(self, limit: int | None, cursor: ScanCursor) -> list[VidEntry]:
         from youtube_sync.youtube.scan import youtube_scan
 
         channel_url = self.lib.channel_url
         limit_scroll_pages = max(1, limit // 10) if limit is not None else None
-        return youtube_scan(
+        out = youtube_scan(
             channel_url=channel_url,
             limit_scroll_pages=limit_scroll_pages,
         )
+        for vid in out:
+            cursor.observe(vid)
+        return out
+
+    def _innertube_scan(
+        self, limit: int | None, cursor: ScanCursor
+    ) -> list[VidEntry] | Exception:
+        from youtube_sync.youtube.innertube_scanner import InnerTubeError, scan_for_vids
+
+        source = self.channel_source()
+        with span("scan", channel=self.lib.channel_name, source=source.value) as rec:
+            rec["scanner"] = "innertube"
+            try:
+                out = scan_for_vids(
+                    self.lib.channel_url,
+                    stored_vids=list(cursor.stored),
+                    limit=limit,
+                    cursor=cursor,
+                )
+            except InnerTubeError as e:
+                rec["ok"] = False
+                return e
+            rec["vids"] = len(out)
+            rec["enumerated"] = cursor.enumerated
+            rec["deep"] = cursor.deep
+        return out
+
+    def _channel_id(self, state: ScanState) -> str | None:
+        """The UC... channel id, resolved through yt-dlp once and then cached."""
+        from youtube_sync.channel_resolver import youtube_channel_id
+
+        if state.channel_id:
+            return state.channel_id
+        try:
+            channel_id = youtube_channel_id(
+                self.lib.channel_url, self.lib.ytdlp.fetch_channel_id
+            )
+        except Exception as e:  # pylint: disable=broad-except
+            logger.warning(
+                f"Could not resolve the channel id of {self.lib.channel_url}: {e}"
+            )
+            return None
+        if channel_id is None:
+            return None
+        state.channel_id = channel_id
+        self.lib.save_scan_state(state)
+        return state.channel_id
+
+    def _feed_scan(
+        self, limit: int | None, state: ScanState, cursor: ScanCursor
+    ) -> list[VidEntry] | None:
+        """New vids from the channel feed, None when a full scan is needed."""
+        from youtube_sync.youtube.rss_scanner import (
+            FeedError,
+            diff_feed,
+            fetch_feed,
+            rss_scan_enabled,
+        )
+
+        if not rss_scan_enabled():
+            return None
+        channel_id = self._channel_id(state)
+        if channel_id is None:
+            return None
+        source = self.channel_source()
+        with span("scan", channel=self.lib.channel_name, source=source.value) as rec:
+            rec["scanner"] = "rss"
+            try:
+                feed = fetch_feed(channel_id)
+            except FeedError as e:
+                rec["ok"] = False
+                logger.warning(f"Feed scan failed, doing a full scan: {e}")
+                return None
+            result = diff_feed(feed, list(cursor.stored))
+            for vid in feed:
+                cursor.observe(vid)
+            rec["vids"] = len(result.new_vids)
+            rec["enumerated"] = cursor.enumerated
+        if result.needs_full_scan:
+            logger.info(
+                f"Feed of {self.lib.channel_name} is not enough: {result.reason}"
+            )
+            return None
+        state.last_feed_scan = datetime.now()
+        if limit is not None and limit > 0:
+            return result.new_vids[:limit]
+        return result.new_vids
 
     # override
-    def scan_for_vids(
-        self,
-        limit: int | None,
-        stop_on_duplicate_vids: bool,
+    def _scan(
+        self, limit: int | None, state: ScanState, cursor: ScanCursor
     ) -> list[VidEntry]:
-        if _YOUTUBE_USE_BOT_SCANNER:
-            return self._bot_scan(limit)
-        else:
-            return super().scan_for_vids(limit, stop_on_duplicate_vids)
+        if not cursor.deep:
+            out = self._feed_scan(limit, state, cursor)
+            if out is not None:
+                return out
+            cursor.reset()
+        scanner = _youtube_scanner()
+        if scanner == "browser":
+            return self._bot_scan(limit, cursor)
+        if scanner == "innertube":
+            out = self._innertube_scan(limit, cursor)
+            if not isinstance(out, Exception):
+                return out
+            logger.warning(f"InnerTube scan failed, falling back to yt-dlp: {out}")
+            cursor.reset()
+        return super()._scan(limit, state, cursor)
 
 
 class BrighteonSyncImpl(YtDlpSync):
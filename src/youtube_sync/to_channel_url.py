@@ -2,9 +2,13 @@
 
 """Library json module."""
 
-
-from youtube_sync.fetch_html import fetch_html_using_curl as fetch_html
+from youtube_sync.channel_resolver import (
+    ChannelResolution,
+    channel_resolver,
+    resolution_key,
+)
 from youtube_sync.library_data import Source
+from youtube_sync.rumble.scanner import create_session, fetch_status
 
 
 def to_channel_url(source: Source, channel_id: str) -> str:
@@ -35,17 +39,29 @@ def _get_channel_url_for_page(
     return base_url
 
 
+def _probe_rumble(channel: str) -> ChannelResolution:
+    """Find out whether the channel is a /c/ or a /user/ page."""
+    # the scanner's session, plain requests get turned away by the bot check
+    session = create_session()
+    statuses: list[int] = []
+    for is_user_channel in (False, True):
+        test_url = _get_channel_url_for_page(
+            channel=channel, page_num=1, is_user_channel=is_user_channel
+        )
+        status = fetch_status(test_url, session)
+        if 200 <= status < 300:
+            return ChannelResolution(url=test_url, is_user=is_user_channel)
+        statuses.append(status)
+    if any(status != 404 for status in statuses):
+        # down or rate limited, not an answer worth keeping
+        raise ValueError(f"Could not find channel or user {channel} (HTTP {statuses})")
+    return ChannelResolution(error=f"Could not find channel or user {channel}")
+
+
 def _to_channel_url_rumble(channel: str) -> str:
-    test_url = _get_channel_url_for_page(
-        channel=channel, page_num=1, is_user_channel=False
-    )
-    fetch_response = fetch_html(test_url)
-    if fetch_response.ok:
-        return test_url
-    test_url = _get_channel_url_for_page(
-        channel=channel, page_num=1, is_user_channel=True
+    resolution = channel_resolver().resolve(
+        resolution_key(Source.RUMBLE, channel), lambda: _probe_rumble(channel)
     )
-    fetch_response = fetch_html(test_url)
-    if fetch_response.ok:
-        return test_url
-    raise ValueError(f"Could not find channel or user {channel}")
+    if resolution.url is None:
+        raise ValueError(resolution.error)
+    return resolution.url
@@ -0,0 +1,145 @@
+"""
+Per-video stage tracing written as JSONL.
+
+Each span records one stage (cookies, scan, date fetch, download, convert,
+copy, library save) with its duration, the video url and channel. The url and
+channel come from trace_context(), which is carried into the worker pools, so
+the stages only name themselves. `youtube-sync-trace-report` aggregates a run
+into per-stage percentiles.
+
+Environment overrides:
+  YOUTUBE_SYNC_TRACE_FILE: trace log path (default: traces.jsonl in the user data dir)
+  YOUTUBE_SYNC_TRACE: set to 0 to turn tracing off
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Generator
+
+from appdirs import user_data_dir  # type: ignore[reportUnknownVariableType]
+
+from youtube_sync.logutil import create_logger
+
+logger = create_logger(__name__, "INFO")
+
+ENV_TRACE_FILE = "YOUTUBE_SYNC_TRACE_FILE"
+ENV_TRACE = "YOUTUBE_SYNC_TRACE"
+
+# The log is rotated to <name>.1 when it grows past this.
+MAX_TRACE_BYTES = 50 * 1024 * 1024
+
+_CONTEXT: ContextVar[dict[str, str]] = ContextVar("youtube_sync_trace", default={})
+
+_RUN_ID = uuid.uuid4().hex[:12]
+_RUN_LOCK = threading.Lock()
+
+
+def default_trace_path() -> Path:
+    override = os.environ.get(ENV_TRACE_FILE)
+    if override:
+        return Path(override)
+    out = os.path.join(user_data_dir("youtube-sync"), "traces.jsonl")  # type: ignore[reportUnknownMemberType, reportUnknownArgumentType]
+    return Path(out)
+
+
+def tracing_enabled() -> bool:
+    return os.environ.get(ENV_TRACE, "1") != "0"
+
+
+def start_run() -> str:
+    """Start a new run, spans written after this are grouped under its id."""
+    global _RUN_ID  # pylint: disable=global-statement
+    with _RUN_LOCK:
+        _RUN_ID = uuid.uuid4().hex[:12]
+        return _RUN_ID
+
+
+def current_run() -> str:
+    with _RUN_LOCK:
+        return _RUN_ID
+
+
+@contextmanager
+def trace_context(**attrs: str) -> Generator[None, None, None]:
+    """Attach attributes (url, channel, source) to every span in the block."""
+    token = _CONTEXT.set({**_CONTEXT.get(), **attrs})
+    try:
+        yield
+    finally:
+        _CONTEXT.reset(token)
+
+
+class TraceWriter:
+    """Appends span records to a JSONL file."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, record: dict[str, Any]) -> None:
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                if self.path.exists() and self.path.stat().st_size > MAX_TRACE_BYTES:
+                    os.replace(self.path, self.path.with_name(self.path.name + ".1"))
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line)
+            except OSError as e:
+                # tracing must never break a sync
+                logger.warning(f"Could not write trace to {self.path}: {e}")
+
+
+_WRITER: TraceWriter | None = None
+_WRITER_LOCK = threading.Lock()
+
+
+def trace_writer() -> TraceWriter:
+    """Get the process wide trace writer."""
+    global _WRITER  # pylint: disable=global-statement
+    with _WRITER_LOCK:
+        if _WRITER is None:
+            _WRITER = TraceWriter(default_trace_path())
+        return _WRITER
+
+
+def set_trace_path(path: Path) -> None:
+    """Write traces to a different file, mostly for tests."""
+    global _WRITER  # pylint: disable=global-statement
+    with _WRITER_LOCK:
+        _WRITER = TraceWriter(path)
+
+
+@contextmanager
+def span(stage: str, **attrs: Any) -> Generator[dict[str, Any], None, None]:
+    """Time the block as `stage`.
+
+    Yields the record, so the caller can add fields or set "ok" to False for
+    functions that return their errors instead of raising them.
+    """
+    record: dict[str, Any] = {"stage": stage, "ok": True}
+    if not tracing_enabled():
+        yield record
+        return
+    record.update(_CONTEXT.get())
+    record.update(attrs)
+    start_ts = time.time()
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record["ok"] = False
+        record["error"] = type(e).__name__
+        raise
+    finally:
+        record["duration_seconds"] = round(time.perf_counter() - start, 6)
+        record["ts"] = round(start_ts, 3)
+        record["run_id"] = current_run()
+        record["thread"] = threading.current_thread().name
+        trace_writer().write(record)
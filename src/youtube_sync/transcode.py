@@ -0,0 +1,246 @@
+"""
+CPU aware scheduler for ffmpeg transcodes.
+
+os.cpu_count() reports the cores of the host, not the CPU quota of the
+container, so the ffmpeg pool used to be oversized. libmp3lame encodes on a
+single thread, so one job per available core is the ceiling, minus what yt-dlp
+and curl-cffi need for the downloads running next to it.
+
+Environment overrides:
+  YOUTUBE_SYNC_TRANSCODE_JOBS: fixed number of concurrent ffmpeg jobs
+  YOUTUBE_SYNC_TRANSCODE_RESERVED_CPUS: cpus kept free for the downloads
+  YOUTUBE_SYNC_TRANSCODE_NICE: nice increment for ffmpeg (posix only)
+"""
+
+import math
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Generator, TypeVar
+
+from youtube_sync.envutil import env_float, env_int
+from youtube_sync.logutil import create_logger
+from youtube_sync.metrics import QUEUE_DEPTH, TRANSCODE_SECONDS
+
+logger = create_logger(__name__, "INFO")
+
+T = TypeVar("T")
+
+ENV_TRANSCODE_JOBS = "YOUTUBE_SYNC_TRANSCODE_JOBS"
+ENV_TRANSCODE_RESERVED_CPUS = "YOUTUBE_SYNC_TRANSCODE_RESERVED_CPUS"
+ENV_TRANSCODE_NICE = "YOUTUBE_SYNC_TRANSCODE_NICE"
+
+DEFAULT_NICE = 10
+# libmp3lame is single threaded, more threads only add contention.
+FFMPEG_THREADS = 1
+
+_CGROUP_ROOT = Path("/sys/fs/cgroup")
+
+
+def _cgroup_v2_quota(root: Path) -> float | None:
+    cpu_max = root / "cpu.max"
+    if not cpu_max.exists():
+        return None
+    parts = cpu_max.read_text(encoding="utf-8").split()
+    if len(parts) != 2 or parts[0] == "max":
+        return None
+    return int(parts[0]) / int(parts[1])
+
+
+def _cgroup_v1_quota(root: Path) -> float | None:
+    quota_file = root / "cpu" / "cpu.cfs_quota_us"
+    period_file = root / "cpu" / "cpu.cfs_period_us"
+    if not quota_file.exists() or not period_file.exists():
+        return None
+    quota = int(quota_file.read_text(encoding="utf-8").strip())
+    period = int(period_file.read_text(encoding="utf-8").strip())
+    if quota <= 0 or period <= 0:
+        return None
+    return quota / period
+
+
+def cgroup_cpu_quota(root: Path = _CGROUP_ROOT) -> float | None:
+    """CPU quota of the container in cores, None if unlimited or unknown."""
+    try:
+        quota = _cgroup_v2_quota(root)
+        if quota is None:
+            quota = _cgroup_v1_quota(root)
+        return quota
+    except (OSError, ValueError) as e:
+        logger.debug(f"Could not read cgroup cpu quota: {e}")
+        return None
+
+
+def effective_cpu_count(cgroup_root: Path = _CGROUP_ROOT) -> float:
+    """Number of cpus this process can actually use, may be fractional."""
+    counts: list[float] = [float(os.cpu_count() or 1)]
+    if hasattr(os, "sched_getaffinity"):
+        counts.append(float(len(os.sched_getaffinity(0))))  # type: ignore[attr-defined]
+    quota = cgroup_cpu_quota(cgroup_root)
+    if quota is not None:
+        counts.append(quota)
+    return max(min(counts), 0.1)
+
+
+def transcode_concurrency(cpus: float | None = None) -> int:
+    """Number of concurrent ffmpeg jobs for the cpu budget."""
+    jobs = env_int(ENV_TRANSCODE_JOBS, 0)
+    if jobs > 0:
+        return jobs
+    cpus = effective_cpu_count() if cpus is None else cpus
+    # downloads are mostly io bound, a quarter of the cpus is plenty
+    reserved = env_float(ENV_TRANSCODE_RESERVED_CPUS, max(0.5, cpus * 0.25))
+    return max(1, math.floor(cpus - reserved))
+
+
+def transcode_nice() -> int:
+    return env_int(ENV_TRANSCODE_NICE, DEFAULT_NICE)
+
+
+def lower_ffmpeg_priority(pid: int) -> None:
+    """Renice a freshly started ffmpeg by the configured increment.
+
+    Done from the parent after the spawn rather than in a preexec_fn, which
+    runs between fork and exec of a threaded process and can deadlock.
+    """
+    increment = transcode_nice()
+    if increment <= 0 or not hasattr(os, "setpriority"):
+        return
+    try:
+        os.setpriority(
+            os.PRIO_PROCESS, pid, os.getpriority(os.PRIO_PROCESS, 0) + increment
+        )
+    except OSError as e:  # e.g. it already exited
+        logger.debug(f"Could not lower the priority of ffmpeg {pid}: {e}")
+
+
+@dataclass
+class EncodeStats:
+    """Stats of a single finished encode."""
+
+    input_file: str
+    media_seconds: float | None
+    wall_seconds: float
+    ok: bool
+
+    @property
+    def realtime_factor(self) -> float | None:
+        """Seconds of audio encoded per wall clock second."""
+        if not self.media_seconds or self.wall_seconds <= 0:
+            return None
+        return self.media_seconds / self.wall_seconds
+
+    def to_dict(self) -> dict[str, Any]:
+        factor = self.realtime_factor
+        return {
+            "input_file": self.input_file,
+            "media_seconds": self.media_seconds,
+            "wall_seconds": round(self.wall_seconds, 3),
+            "realtime_factor": round(factor, 2) if factor is not None else None,
+            "ok": self.ok,
+        }
+
+
+class TranscodeScheduler:
+    """Bounded pool for ffmpeg jobs that tracks queue depth and encode speed."""
+
+    def __init__(self, max_workers: int | None = None) -> None:
+        cpus = effective_cpu_count()
+        self.max_workers = max_workers or transcode_concurrency(cpus)
+        self.cpus = cpus
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="ffmpeg_executor"
+        )
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._recent: deque[EncodeStats] = deque(maxlen=50)
+        logger.info(
+            f"Transcode scheduler: {cpus:.2f} effective cpus, {self.max_workers} concurrent ffmpeg jobs"
+        )
+
+    def submit(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> Future[T]:
+        self.job_queued()
+
+        def run() -> T:
+            with self.job_running():
+                return fn(*args, **kwargs)
+
+        return self._executor.submit(run)
+
+    def job_queued(self) -> None:
+        """Count a job waiting for a slot, for jobs run outside the pool
+        (the asyncio pipeline runs ffmpeg itself)."""
+        with self._lock:
+            self._queued += 1
+        QUEUE_DEPTH.inc(queue="transcode")
+
+    @contextmanager
+    def job_running(self) -> Generator[None, None, None]:
+        """A queued job got its slot and runs while this lasts."""
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+            QUEUE_DEPTH.dec(queue="transcode")
+
+    @property
+    def queue_depth(self) -> int:
+        with self._lock:
+            return self._queued
+
+    def record(self, stats: EncodeStats) -> None:
+        with self._lock:
+            self._recent.append(stats)
+            queued, running = self._queued, self._running
+        TRANSCODE_SECONDS.observe(
+            stats.wall_seconds, result="ok" if stats.ok else "failed"
+        )
+        factor = stats.realtime_factor
+        speed = f"{factor:.1f}x realtime" if factor is not None else "unknown speed"
+        logger.info(
+            f"Encoded {Path(stats.input_file).name} in {stats.wall_seconds:.1f}s ({speed}),"
+            f" running={running} queued={queued}"
+        )
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            recent = list(self._recent)
+            factors = [s.realtime_factor for s in recent if s.realtime_factor]
+            return {
+                "effective_cpus": self.cpus,
+                "max_workers": self.max_workers,
+                "queued": self._queued,
+                "running": self._running,
+                "completed": self._completed,
+                "avg_realtime_factor": (
+                    (sum(factors) / len(factors)) if factors else None
+                ),
+                "recent": [s.to_dict() for s in recent[-10:]],
+            }
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+
+_SCHEDULER: TranscodeScheduler | None = None
+_SCHEDULER_LOCK = threading.Lock()
+
+
+def transcode_scheduler() -> TranscodeScheduler:
+    """Get the process wide transcode scheduler."""
+    global _SCHEDULER  # pylint: disable=global-statement
+    with _SCHEDULER_LOCK:
+        if _SCHEDULER is None:
+            _SCHEDULER = TranscodeScheduler()
+        return _SCHEDULER
@@ -0,0 +1,191 @@
+"""
+Built-in web server: /metrics, plus static files from an explicit directory.
+
+Runs on a daemon thread inside the sync process so the metrics come straight
+from the in-process registry. Other modules can add JSON or text endpoints
+with register_route(). Without a directory only the routes are served, never
+the working directory (it holds config.json and the cookies). It listens on
+127.0.0.1 unless told otherwise.
+
+Routes that change something (the worker and control POST routes) are
+wrapped in require_token(): they want "Authorization: Bearer <token>" with
+the shared secret in YOUTUBE_SYNC_WORKER_TOKEN and are refused while it
+isn't set.
+
+Environment overrides:
+  YOUTUBE_SYNC_WORKER_TOKEN: shared secret of the workers and the control API (default none)
+"""
+
+import hmac
+import json
+import os
+import threading
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable
+from urllib.parse import urlsplit
+
+from youtube_sync.logutil import create_logger
+from youtube_sync.metrics import REGISTRY
+
+logger = create_logger(__name__, "INFO")
+
+# A route gets the request handler and returns (status, content type, body).
+RouteHandler = Callable[[SimpleHTTPRequestHandler], tuple[int, str, bytes]]
+
+ENV_WORKER_TOKEN = "YOUTUBE_SYNC_WORKER_TOKEN"
+
+TEXT_TYPE = "text/plain; charset=utf-8"
+
+_ROUTES: dict[tuple[str, str], RouteHandler] = {}
+_ROUTES_LOCK = threading.Lock()
+
+
+def register_route(method: str, path: str, handler: RouteHandler) -> None:
+    """Serve `path` with `handler` instead of the static files."""
+    with _ROUTES_LOCK:
+        _ROUTES[(method.upper(), path)] = handler
+
+
+class RequestTooLarge(Exception):
+    """A request body over the route's limit, answered with a 413."""
+
+
+def worker_token() -> str | None:
+    """The shared secret of the protected routes, None when not set."""
+    return os.environ.get(ENV_WORKER_TOKEN) or None
+
+
+def _error(status: int, message: str) -> tuple[int, str, bytes]:
+    return status, "application/json", json.dumps({"error": message}).encode("utf-8")
+
+
+def require_token(route: RouteHandler) -> RouteHandler:
+    """Refuse requests without the shared secret in the Authorization header."""
+
+    def wrapped(handler: SimpleHTTPRequestHandler) -> tuple[int, str, bytes]:
+        token = worker_token()
+        if token is None:
+            return _error(
+                HTTPStatus.FORBIDDEN, f"Set {ENV_WORKER_TOKEN} to use this endpoint"
+            )
+        given = handler.headers.get("Authorization") or ""
+        if not hmac.compare_digest(
+            given.encode("utf-8"), f"Bearer {token}".encode("utf-8")
+        ):
+            return _error(HTTPStatus.UNAUTHORIZED, "Bad or missing token")
+        return route(handler)
+
+    return wrapped
+
+
+def read_body(handler: SimpleHTTPRequestHandler, max_bytes: int) -> bytes:
+    """The request body, RequestTooLarge when it's over max_bytes."""
+    length = int(handler.headers.get("Content-Length") or 0)
+    if length > max_bytes:
+        raise RequestTooLarge(
+            f"Request body of {length} bytes, the limit is {max_bytes}"
+        )
+    return handler.rfile.read(length) if length else b""
+
+
+def _metrics_route(_: SimpleHTTPRequestHandler) -> tuple[int, str, bytes]:
+    body = REGISTRY.render().encode("utf-8")
+    return HTTPStatus.OK, "text/plain; version=0.0.4; charset=utf-8", body
+
+
+register_route("GET", "/metrics", _metrics_route)
+
+
+class _Handler(SimpleHTTPRequestHandler):
+    # anything but the routes is a 404, _StaticHandler serves files as well
+    serve_static = False
+
+    def _route(self, method: str) -> bool:
+        path = urlsplit(self.path).path
+        with _ROUTES_LOCK:
+            handler = _ROUTES.get((method, path))
+            if handler is None and method == "HEAD":
+                handler = _ROUTES.get(("GET", path))
+        if handler is None:
+            return False
+        try:
+            status, content_type, body = handler(self)
+        except RequestTooLarge as e:
+            # the body is still unread, the connection can't be reused
+            self.close_connection = True
+            status, content_type, body = (
+                HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                TEXT_TYPE,
+                str(e).encode("utf-8"),
+            )
+        except Exception as e:  # pylint: disable=broad-except
+            logger.error(f"Error handling {method} {path}: {e}")
+            status, content_type, body = (
+                HTTPStatus.INTERNAL_SERVER_ERROR,
+                TEXT_TYPE,
+                str(e).encode("utf-8"),
+            )
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        if method != "HEAD":
+            self.wfile.write(body)
+        return True
+
+    def do_GET(self) -> None:  # noqa: N802
+        if self._route("GET"):
+            return
+        if self.serve_static:
+            super().do_GET()
+        else:
+            self.send_error(HTTPStatus.NOT_FOUND)
+
+    def do_HEAD(self) -> None:  # noqa: N802
+        if self._route("HEAD"):
+            return
+        if self.serve_static:
+            super().do_HEAD()
+        else:
+            self.send_error(HTTPStatus.NOT_FOUND)
+
+    def do_POST(self) -> None:  # noqa: N802
+        if not self._route("POST"):
+            self.send_error(HTTPStatus.NOT_FOUND)
+
+    def log_message(
+        self, format: str, *args: Any
+    ) -> None:  # pylint: disable=redefined-builtin
+        logger.debug(format % args)
+
+
+class _StaticHandler(_Handler):
+    serve_static = True
+
+
+DEFAULT_HOST = "127.0.0.1"
+
+
+def start_web_server(
+    port: int, directory: Path | None = None, host: str = DEFAULT_HOST
+) -> ThreadingHTTPServer:
+    """Start serving on a daemon thread, returns the server for shutdown().
+    Static files come from `directory` only, None serves just the routes."""
+    static_dir = str(directory) if directory is not None else None
+    handler_class = _StaticHandler if static_dir is not None else _Handler
+
+    def handler(*args: Any, **kwargs: Any) -> _Handler:
+        return handler_class(*args, directory=static_dir, **kwargs)
+
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(
+        target=server.serve_forever, name="web_server", daemon=True
+    )
+    thread.start()
+    logger.info(f"Web server listening on {host}:{server.server_address[1]}")
+    return server
@@ -2,11 +2,12 @@ import time
 import traceback
 import unicodedata
 import warnings
+from typing import Any
 
-import requests
 from bs4 import BeautifulSoup
-from playwright.sync_api import sync_playwright
 
+from youtube_sync.browser_pool import browser_pool
+from youtube_sync.http_client import http_client
 from youtube_sync.library import VidEntry  # Adjust if needed
 
 URL = "https://www.youtube.com/@silverguru/videos"
@@ -62,14 +63,11 @@ def fetch_all_sources(yt_channel_url: str, limit: int = -1) -> list[VidEntry]:
     _ERRORS = False
     max_scrolls = limit if limit > 0 else 1000
     scroll_pause = 1
-    index = 0
 
     print("starting browser")
 
-    with sync_playwright() as pw:
-        browser = pw.chromium.launch(headless=True)
-        page = browser.new_page()
-        page.goto(yt_channel_url)
+    def collect(page: Any) -> set[str]:
+        index = 0
         time.sleep(scroll_pause)
 
         last_height = page.evaluate("document.documentElement.scrollHeight")
@@ -94,9 +92,11 @@ def fetch_all_sources(yt_channel_url: str, limit: int = -1) -> list[VidEntry]:
             last_height = new_height
             print(f"#### {index}: scrolling for new content ####")
             index += 1
+        return collected_html
 
-        browser.close()
-        return list_vids_from_html(collected_html)
+    # The shared browser stays up between scans, only the page is new.
+    collected_html = browser_pool().scrape(yt_channel_url, collect)
+    return list_vids_from_html(collected_html)
 
 
 def list_vids_from_html(html_blocks: set[str]) -> list[VidEntry]:
@@ -116,8 +116,7 @@ def list_vids_from_html(html_blocks: set[str]) -> list[VidEntry]:
 
 def test_channel_url(channel_url: str) -> bool:
     try:
-        response = requests.get(channel_url, timeout=10)
-        return response.status_code == 200
+        return http_client().fetch(channel_url, timeout=10).status_code == 200
     except Exception:
         return False
 
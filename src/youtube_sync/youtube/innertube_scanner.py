@@ -0,0 +1,275 @@
+"""
+Browserless YouTube channel scanner using the InnerTube continuations.
+
+The channel's /videos page embeds the first grid of uploads as ytInitialData
+together with the InnerTube api key and client context (ytcfg). The rest of
+the grid is paged through the youtubei/v1/browse endpoint with the
+continuation token at the end of each batch. All of it is plain HTTP over
+http_session(), no browser and no yt-dlp process.
+
+Uploads come newest first. The scan stops where its ScanCursor says (by
+default at the first video already in the library), at the limit, or when
+there is no continuation left.
+"""
+
+import json
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Iterator
+
+from youtube_sync.http_session import http_session
+from youtube_sync.logutil import create_logger
+from youtube_sync.scan_cursor import ScanCursor
+from youtube_sync.vid_entry import VidEntry
+
+logger = create_logger(__name__, "INFO")
+
+URL_BASE = "https://www.youtube.com"
+BROWSE_URL = URL_BASE + "/youtubei/v1/browse"
+
+# Desktop browser headers; English so the relative publish times parse.
+# The consent cookies skip the EU consent interstitial.
+_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"
+    ),
+    "Accept-Language": "en-US,en;q=0.9",
+    "Cookie": "CONSENT=YES+cb; SOCS=CAI",
+}
+
+_DEFAULT_CONTEXT: dict[str, Any] = {
+    "client": {"clientName": "WEB", "clientVersion": "2.20240101.00.00", "hl": "en"}
+}
+
+# Safety stop, a channel page is 30 videos per continuation.
+MAX_CONTINUATIONS = 1000
+
+_INITIAL_DATA = re.compile(
+    r"(?:var\s+ytInitialData|window\[\"ytInitialData\"\])\s*=\s*"
+)
+_YTCFG = re.compile(r"ytcfg\.set\(\s*(?=\{)")
+_RELATIVE_TIME = re.compile(
+    r"(\d+)\s+(second|minute|hour|day|week|month|year)s?\s+ago", re.IGNORECASE
+)
+_UNIT_SECONDS = {
+    "second": 1,
+    "minute": 60,
+    "hour": 60 * 60,
+    "day": 24 * 60 * 60,
+    "week": 7 * 24 * 60 * 60,
+    "month": 30 * 24 * 60 * 60,
+    "year": 365 * 24 * 60 * 60,
+}
+
+
+class InnerTubeError(Exception):
+    """The channel page or a continuation could not be fetched or parsed."""
+
+
+@dataclass
+class InnerTubeVideo:
+    """A video of the channel grid."""
+
+    video_id: str
+    title: str
+    published_text: str | None = None  # e.g. "3 days ago", "Streamed 2 weeks ago"
+
+    @property
+    def url(self) -> str:
+        return f"{URL_BASE}/watch?v={self.video_id}"
+
+    def published_estimate(self, now: datetime | None = None) -> datetime | None:
+        """Publish time estimated from the relative text, None if there is none."""
+        if not self.published_text:
+            return None
+        match = _RELATIVE_TIME.search(self.published_text)
+        if match is None:
+            return None
+        count = int(match.group(1))
+        seconds = count * _UNIT_SECONDS[match.group(2).lower()]
+        return (now or datetime.now()) - timedelta(seconds=seconds)
+
+    def to_vid_entry(self, now: datetime | None = None) -> VidEntry:
+        """VidEntry with the estimated publish time as its date, so new
+        downloads are ordered oldest first. The exact upload date is still
+        fetched later for the file name."""
+        return VidEntry(
+            url=self.url,
+            title=self.title,
+            creation_date=self.published_estimate(now),
+        )
+
+
+def _json_after(pattern: re.Pattern[str], html: str) -> dict[str, Any] | None:
+    match = pattern.search(html)
+    if match is None:
+        return None
+    try:
+        data, _ = json.JSONDecoder().raw_decode(html, match.end())
+    except json.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _text(node: Any) -> str | None:
+    if not isinstance(node, dict):
+        return None
+    if "simpleText" in node:
+        return str(node["simpleText"])
+    if "content" in node:
+        return str(node["content"])
+    runs = node.get("runs")
+    if isinstance(runs, list):
+        return "".join(str(r.get("text", "")) for r in runs if isinstance(r, dict))
+    return None
+
+
+def _walk(node: Any) -> Iterator[tuple[str, dict[str, Any]]]:
+    """Every (key, dict) pair in the tree, depth first in document order."""
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if isinstance(value, dict):
+                yield key, value
+            yield from _walk(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _walk(value)
+
+
+def parse_videos(data: dict[str, Any]) -> tuple[list[InnerTubeVideo], str | None]:
+    """Videos of an initial page or continuation response and the next token."""
+    videos: list[InnerTubeVideo] = []
+    token: str | None = None
+    for key, node in _walk(data):
+        if key == "videoRenderer" and "videoId" in node:
+            videos.append(
+                InnerTubeVideo(
+                    video_id=str(node["videoId"]),
+                    title=_text(node.get("title")) or "",
+                    published_text=_text(node.get("publishedTimeText")),
+                )
+            )
+        elif (
+            key == "lockupViewModel"
+            and node.get("contentType") == "LOCKUP_CONTENT_TYPE_VIDEO"
+        ):
+            metadata = node.get("metadata", {}).get("lockupMetadataViewModel", {})
+            videos.append(
+                InnerTubeVideo(
+                    video_id=str(node.get("contentId")),
+                    title=_text(metadata.get("title")) or "",
+                )
+            )
+        elif key == "continuationItemRenderer":
+            # only the grid's own continuation, the sort chips have tokens too
+            for inner_key, inner in _walk(node):
+                if inner_key == "continuationCommand" and "token" in inner:
+                    token = str(inner["token"])
+    return videos, token
+
+
+def parse_channel_page(html: str) -> tuple[dict[str, Any], str | None, dict[str, Any]]:
+    """ytInitialData, the InnerTube api key and client context of a channel page."""
+    data = _json_after(_INITIAL_DATA, html)
+    if data is None:
+        raise InnerTubeError("No ytInitialData in the channel page")
+    ytcfg = _json_after(_YTCFG, html) or {}
+    api_key = ytcfg.get("INNERTUBE_API_KEY")
+    context = ytcfg.get("INNERTUBE_CONTEXT") or _DEFAULT_CONTEXT
+    return data, api_key, context
+
+
+def _videos_url(channel_url: str) -> str:
+    url = channel_url.rstrip("/")
+    if not url.endswith("/videos"):
+        url += "/videos"
+    return url
+
+
+class InnerTubeScanner:
+    """Scans a channel's uploads over InnerTube."""
+
+    def __init__(self, session: Any = None, timeout: float = 20) -> None:
+        self.session = session or http_session()
+        self.timeout = timeout
+
+    def _get_text(self, url: str) -> str:
+        try:
+            resp = self.session.get(url, headers=_HEADERS, timeout=self.timeout)
+            resp.raise_for_status()
+        except Exception as e:
+            raise InnerTubeError(f"Fetching {url} failed: {e}") from e
+        return resp.text
+
+    def _post_json(self, url: str, payload: dict[str, Any]) -> dict[str, Any]:
+        try:
+            resp = self.session.post(
+                url, json=payload, headers=_HEADERS, timeout=self.timeout
+            )
+            resp.raise_for_status()
+            return resp.json()
+        except Exception as e:
+            raise InnerTubeError(f"Continuation request failed: {e}") from e
+
+    def iter_videos(self, channel_url: str) -> Iterator[InnerTubeVideo]:
+        """All uploads, newest first, fetching continuations as needed."""
+        html = self._get_text(_videos_url(channel_url))
+        data, api_key, context = parse_channel_page(html)
+        videos, token = parse_videos(data)
+        yield from videos
+        url = f"{BROWSE_URL}?key={api_key}&prettyPrint=false" if api_key else BROWSE_URL
+        for _ in range(MAX_CONTINUATIONS):
+            if token is None:
+                return
+            data = self._post_json(url, {"context": context, "continuation": token})
+            videos, next_token = parse_videos(data)
+            if next_token == token:
+                return
+            token = next_token
+            yield from videos
+
+    def scan(
+        self,
+        channel_url: str,
+        stored_vids: list[VidEntry],
+        limit: int | None,
+        now: datetime | None = None,
+        cursor: ScanCursor | None = None,
+    ) -> list[VidEntry]:
+        """New vids until the cursor stops (default: the first one in
+        stored_vids) or the limit."""
+        if limit is not None and limit < 0:
+            limit = None
+        if cursor is None:
+            cursor = ScanCursor(stored_vids, streak=1)
+        now = now or datetime.now()
+        out: list[VidEntry] = []
+        seen: set[str] = set()
+        for video in self.iter_videos(channel_url):
+            if video.video_id in seen:
+                continue
+            seen.add(video.video_id)
+            vid = video.to_vid_entry(now)
+            stop = cursor.observe(vid)
+            if not cursor.is_known(vid):
+                out.append(vid)
+            if stop:
+                logger.debug(f"Stopping at {vid.url}: {cursor.stop_reason}")
+                break
+            if limit is not None and len(out) >= limit:
+                break
+        return out
+
+
+def scan_for_vids(
+    channel_url: str,
+    stored_vids: list[VidEntry],
+    limit: int | None,
+    cursor: ScanCursor | None = None,
+) -> list[VidEntry]:
+    """Same contract as ytdlp.scan_for_vids.scan_for_vids, without yt-dlp."""
+    return InnerTubeScanner().scan(
+        channel_url, stored_vids=stored_vids, limit=limit, cursor=cursor
+    )
@@ -0,0 +1,128 @@
+"""
+RSS-first incremental scanning of YouTube channels.
+
+The feed of a channel's long-form uploads playlist
+(feeds/videos.xml?playlist_id=UULF..., the UC... channel id with UULF in place
+of UC) lists the latest 15 videos with their publish times in one small GET.
+Unlike the channel feed it leaves out Shorts and live streams, the same videos
+as the /videos tab the full scan reads, so a burst of Shorts neither hides the
+uploads behind it nor forces a full scan. Entries linking to /shorts/ are
+skipped all the same. When the oldest feed entry
+is already in the library, the new entries of the feed are all there is and
+the yt-dlp scan is skipped. The scan falls back to a full scan when every
+entry of a full feed is new (there may be more behind it) and on the deep scan
+schedule of scan_cursor.py, so nothing the feed missed stays missing.
+
+Environment overrides:
+  YOUTUBE_SYNC_RSS_SCAN: set to 0 to always use the full scan
+"""
+
+import os
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+import feedparser  # type: ignore
+
+from youtube_sync.clean_filename import clean_filename
+from youtube_sync.http_session import http_session
+from youtube_sync.logutil import create_logger
+from youtube_sync.vid_entry import VidEntry
+
+logger = create_logger(__name__, "INFO")
+
+ENV_RSS_SCAN = "YOUTUBE_SYNC_RSS_SCAN"
+
+FEED_URL = "https://www.youtube.com/feeds/videos.xml?playlist_id={playlist_id}"
+# YouTube's feeds hold the latest 15 uploads.
+FEED_CAPACITY = 15
+
+_CHANNEL_ID = re.compile(r"/channel/(UC[\w-]{22})")
+
+
+def rss_scan_enabled() -> bool:
+    return os.environ.get(ENV_RSS_SCAN, "1") != "0"
+
+
+def feed_url(channel_id: str) -> str:
+    """The feed of the long-form uploads of the channel UC..."""
+    return FEED_URL.format(playlist_id=f"UULF{channel_id[2:]}")
+
+
+def channel_id_from_url(channel_url: str) -> str | None:
+    """The UC... id when the url has it, handles (@name) need resolving."""
+    match = _CHANNEL_ID.search(channel_url)
+    return match.group(1) if match else None
+
+
+class FeedError(Exception):
+    """The feed could not be fetched or parsed."""
+
+
+def _vid_from_entry(entry: Any) -> VidEntry | None:
+    video_id = entry.get("yt_videoid")
+    title = entry.get("title")
+    if not video_id or not title:
+        return None
+    if "/shorts/" in (entry.get("link") or ""):
+        return None
+    url = f"https://www.youtube.com/watch?v={video_id}"
+    published = entry.get("published_parsed")
+    if published is None:
+        return VidEntry(url=url, title=title)
+    upload = datetime(*published[:6])
+    # the same name the upload date fetch + fixup_video_names would give it
+    file_path = f"{upload.date().isoformat()} {clean_filename(f'{title}.mp3')}"
+    return VidEntry(
+        url=url,
+        title=title,
+        file_path=file_path,
+        upload_date=upload.date(),
+    )
+
+
+def parse_feed(text: str) -> list[VidEntry]:
+    """Vids of a channel feed, newest first, with their upload dates."""
+    parsed = feedparser.parse(text)
+    if parsed.get("bozo") and not parsed.get("entries"):
+        raise FeedError(f"Unparsable feed: {parsed.get('bozo_exception')}")
+    out: list[VidEntry] = []
+    for entry in parsed.get("entries", []):
+        vid = _vid_from_entry(entry)
+        if vid is not None:
+            out.append(vid)
+    return out
+
+
+def fetch_feed(
+    channel_id: str, session: Any = None, timeout: float = 10
+) -> list[VidEntry]:
+    url = feed_url(channel_id)
+    try:
+        resp = (session or http_session()).get(url, timeout=timeout)
+        resp.raise_for_status()
+    except Exception as e:
+        raise FeedError(f"Fetching {url} failed: {e}") from e
+    return parse_feed(resp.text)
+
+
+@dataclass
+class FeedScan:
+    """Outcome of checking the feed against the library."""
+
+    new_vids: list[VidEntry]
+    needs_full_scan: bool
+    reason: str = ""
+
+
+def diff_feed(feed: list[VidEntry], known: list[VidEntry]) -> FeedScan:
+    """New vids of the feed, or a full scan when the feed can't be trusted to
+    hold all of them."""
+    known_set = set(known)
+    new_vids = [vid for vid in feed if vid not in known_set]
+    if not known:
+        return FeedScan(new_vids, True, "empty library")
+    if len(feed) >= FEED_CAPACITY and feed[-1] not in known_set:
+        return FeedScan(new_vids, True, f"all {len(feed)} feed entries are new")
+    return FeedScan(new_vids, False)
@@ -1,23 +1,45 @@
 import _thread
+import codecs
 import logging
 import os
+import queue
+import re
 import subprocess
+import threading
 import time
 from abc import ABC, abstractmethod
+from collections import deque
 from dataclasses import dataclass
 from pathlib import Path
+from typing import IO, Any
 
 from filelock import FileLock
 from yt_dlp_proxy import YtDLPProxy
 
 from youtube_sync.cookies import Cookies, Source
+from youtube_sync.metrics import BYTES_DOWNLOADED
+from youtube_sync.source_health import FailureKind, classify_failure
 
 from .error import (
     KeyboardInterruptException,
+    YtDlpFailure,
     check_keyboard_interrupt,
     set_keyboard_interrupt,
 )
 from .exe import YtDlpCmdRunner
+from .progress import (
+    ProgressThrottle,
+    format_progress,
+    parse_progress_line,
+    progress_args,
+)
+from .proxy_pool import ProxyPool
+from .watchdog import StallPolicy, StallWatchdog
+
+_LINE_ENDINGS = re.compile(r"\r\n|\r|\n")
+
+# Raw output lines kept for error reports, progress lines are not kept.
+OUTPUT_TAIL_LINES = 200
 
 # cookies
 
@@ -30,6 +52,16 @@ _UPDATE_PROXIES_LOCK = FileLock("proxies.lock")
 _PROXIES_UPDATED = False
 
 _DOWNLOADER_COUNTER = 0
+_RETRYABLE_FAILURES = (FailureKind.NETWORK, FailureKind.UNKNOWN)
+# Failures that a different exit ip could fix.
+_PROXY_WORTHY_FAILURES = (
+    FailureKind.RATE_LIMIT,
+    FailureKind.BOT_CHECK,
+    FailureKind.FORBIDDEN,
+    FailureKind.NETWORK,
+)
+_REAL_FAILURES_BEFORE_PROXY = 3
+_REAL_PROBE_INTERVAL_SECONDS = 15 * 60
 _STARTUP_TIME = time.time()
 
 
@@ -41,6 +73,8 @@ class ExeResult:
     stdout: str | None
     stderr: str | None
     error: str | None = None
+    # set when the stall watchdog killed the run
+    stall_reason: str | None = None
 
 
 def _update_proxies_once() -> None:
@@ -85,11 +119,37 @@ class YtDlpExecutor(ABC):
         pass
 
 
+def _read_lines(stream: IO[bytes], lines: "queue.Queue[str | None]") -> None:
+    """Read yt-dlp output, treating both newlines and carriage returns as line endings.
+
+    Runs on its own thread so the caller can keep checking the watchdog while
+    yt-dlp is silent. A None is put on the queue at end of stream.
+    """
+    # The incremental decoder keeps partial UTF-8 sequences between chunks.
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    text_buffer = ""
+    try:
+        while True:
+            chunk = stream.read(1024)
+            text_buffer += decoder.decode(chunk, final=not chunk)
+            parts = _LINE_ENDINGS.split(text_buffer)
+            # the last part is an unfinished line, unless the stream ended
+            text_buffer = parts.pop() if chunk else ""
+            for line in parts:
+                if line.strip():
+                    lines.put(line)
+            if not chunk:
+                break
+    finally:
+        lines.put(None)
+
+
 class RealYtdlp(YtDlpExecutor):
     """Execute yt-dlp directly as a subprocess."""
 
-    def __init__(self, yt_exe: YtDlpCmdRunner):
+    def __init__(self, yt_exe: YtDlpCmdRunner, stall_policy: StallPolicy | None = None):
         self.yt_exe = yt_exe
+        self.stall_policy = stall_policy
 
     def execute(
         self,
@@ -105,65 +165,40 @@ class RealYtdlp(YtDlpExecutor):
             stderr=subprocess.STDOUT,
             bufsize=0,  # Unbuffered
         )
-        stdout_lines: list[str] = []
+        # Only the tail of the raw output is kept, for error reports.
+        tail: deque[str] = deque(maxlen=OUTPUT_TAIL_LINES)
         last_output_time = time.time()
-        text_buffer = ""  # For complete text lines
-        byte_buffer = b""  # For incomplete UTF-8 sequences
+        watchdog = StallWatchdog(self.stall_policy)
+        throttle = ProgressThrottle()
+        lines: "queue.Queue[str | None]" = queue.Queue()
+
+        def output() -> str:
+            return "\n".join(tail) + "\n"
 
         with proc:
             assert proc.stdout is not None
-            # Read in small chunks and treat both \n and \r as line endings
+            reader = threading.Thread(
+                target=_read_lines, args=(proc.stdout, lines), daemon=True
+            )
+            reader.start()
             while True:
-                chunk = proc.stdout.read(1024)
-                if not chunk:
-                    # End of stream - decode any remaining bytes and save content
-                    if byte_buffer:
-                        text_buffer += byte_buffer.decode("utf-8", errors="replace")
-                    if text_buffer.strip():
-                        print(text_buffer, flush=True)
-                        stdout_lines.append(text_buffer)
+                try:
+                    line = lines.get(timeout=1.0)
+                except queue.Empty:
+                    line = ""
+                if line is None:
                     break
-
-                # Accumulate bytes
-                byte_buffer += chunk
-                last_output_time = time.time()
-
-                # Try to decode as much as possible
-                # Find the last valid UTF-8 boundary
-                decoded_text = ""
-                for i in range(len(byte_buffer), max(0, len(byte_buffer) - 3), -1):
-                    # Try to decode up to position i
-                    try:
-                        decoded_text = byte_buffer[:i].decode("utf-8")
-                        # Success - keep any remaining bytes for next iteration
-                        byte_buffer = byte_buffer[i:]
-                        break
-                    except UnicodeDecodeError:
-                        # Continue trying with fewer bytes
-                        continue
-
-                text_buffer += decoded_text
-
-                # Process complete lines (split on both \n and \r)
-                while "\n" in text_buffer or "\r" in text_buffer:
-                    # Find the earliest line ending
-                    newline_pos = text_buffer.find("\n")
-                    cr_pos = text_buffer.find("\r")
-
-                    if newline_pos == -1:
-                        line_end_pos = cr_pos
-                    elif cr_pos == -1:
-                        line_end_pos = newline_pos
+                if line:
+                    last_output_time = time.time()
+                    event = parse_progress_line(line)
+                    if event is not None:
+                        watchdog.on_progress(event)
+                        if throttle.should_emit(event):
+                            print(format_progress(event), flush=True)
                     else:
-                        line_end_pos = min(newline_pos, cr_pos)
-
-                    line = text_buffer[:line_end_pos]
-                    text_buffer = text_buffer[line_end_pos + 1 :]
-
-                    # Print and save all non-empty lines
-                    if line:
+                        watchdog.on_output()
                         print(line, flush=True)
-                        stdout_lines.append(line)
+                        tail.append(line)
 
                 # Check timeout
                 if time.time() - last_output_time > timeout_seconds:
@@ -171,12 +206,24 @@ class RealYtdlp(YtDlpExecutor):
                     logging.error(f"yt-dlp timed out after {timeout_seconds} seconds")
                     return ExeResult(
                         ok=False,
-                        stdout="\n".join(stdout_lines) + "\n",
+                        stdout=output(),
                         stderr=None,
                         error=f"yt-dlp timed out after {timeout_seconds} seconds",
                     )
 
-            stdout = "\n".join(stdout_lines) + "\n"
+                stall_reason = watchdog.check()
+                if stall_reason is not None:
+                    proc.kill()
+                    logger.error(f"yt-dlp {stall_reason}, killed")
+                    return ExeResult(
+                        ok=False,
+                        stdout=output(),
+                        stderr=None,
+                        error=f"yt-dlp {stall_reason}",
+                        stall_reason=stall_reason,
+                    )
+
+            stdout = output()
             proc.wait()
             if proc.returncode != 0:
                 logging.error(f"yt-dlp failed with return code {proc.returncode}")
@@ -194,16 +241,28 @@ class RealYtdlp(YtDlpExecutor):
 
 
 class RealOrProxyExecutor(YtDlpExecutor):
-    """Executor that tries real execution first, then falls back to proxy if needed."""
+    """Executor that tries real execution first, then falls back to proxy if needed.
+
+    A single instance is shared per source (see get_executor()) so that the
+    failure history carries over from one download to the next.
+    """
 
-    def __init__(self, yt_exe: YtDlpCmdRunner, source: Source):
+    def __init__(
+        self,
+        yt_exe: YtDlpCmdRunner,
+        source: Source,
+        proxy_pool: ProxyPool | None = None,
+    ):
         self.proxy = YtDLPProxy()
         self.real = RealYtdlp(yt_exe)
+        self.proxy_pool = proxy_pool if proxy_pool is not None else ProxyPool()
         self.real_failures = 0
+        self.real_successes = 0
+        # When the proxy mode started, used to probe the real path again.
+        self.proxy_since: float | None = None
         self.yt_exe = yt_exe
         self.source = source
-        # Update proxies once during initialization
-        # self._update_proxies()
+        self._lock = threading.Lock()
 
     def _update_proxies(self) -> None:
         """Update proxies once."""
@@ -227,45 +286,134 @@ class RealOrProxyExecutor(YtDlpExecutor):
             logger.info(f"Cookies ({cookies_txt}):\n{cookies_txt_str}\n")
         return cookies_txt
 
-    def execute(
-        self,
-        cmd_list: list[str],
-        yt_dlp_path: Path | None = None,
-        timeout_seconds: int = 1800,
-    ) -> ExeResult:
-        # Always ensure proxies are updated
-
-        if self.real_failures > 3:
-            self._update_proxies()
-            ok: bool = self.proxy.execute(cmd_list, yt_dlp_path=self.yt_exe.exe)
-            out: ExeResult = ExeResult(
-                ok=ok,
-                stdout="NO OUTPUT FOR PROXY",
-                stderr="NO STDERR FOR PROXY",
-                error="ERROR HAPPENED" if not ok else None,
+    def _use_proxy(self) -> bool:
+        with self._lock:
+            if self.real_failures <= _REAL_FAILURES_BEFORE_PROXY:
+                return False
+            now = time.time()
+            if (
+                self.proxy_since is not None
+                and now - self.proxy_since > _REAL_PROBE_INTERVAL_SECONDS
+            ):
+                # Give the real path another chance, a success switches back.
+                self.proxy_since = now
+                return False
+            return True
+
+    def _record_real(self, rslt: ExeResult) -> bool:
+        """Record the outcome of a real run, True if we just switched to proxy mode."""
+        if rslt.ok:
+            with self._lock:
+                if self.real_failures > _REAL_FAILURES_BEFORE_PROXY:
+                    logger.info(f"Real yt-dlp works again for {self.source.value}")
+                self.real_failures = 0
+                self.real_successes += 1
+                self.proxy_since = None
+            return False
+        kind = classify_failure(rslt.stdout or rslt.error)
+        if kind not in _PROXY_WORTHY_FAILURES:
+            # geo blocks, removed videos... a proxy won't help the next video
+            return False
+        with self._lock:
+            self.real_failures += 1
+            switched = (
+                self.real_failures > _REAL_FAILURES_BEFORE_PROXY
+                and self.proxy_since is None
             )
-            return out
-        try:
-            return self.real.execute(
-                cmd_list, yt_dlp_path=self.yt_exe.exe, timeout_seconds=timeout_seconds
+            if switched:
+                self.proxy_since = time.time()
+        if switched:
+            logger.warning(
+                f"{self.real_failures} consecutive {kind.value} failures for"
+                f" {self.source.value}, switching to proxy mode"
             )
-        except subprocess.CalledProcessError:
-            self.real_failures += 1
             # If we're switching to proxy mode, refresh cookies and proxies
-            if self.real_failures > 3 and self.source is not None:
+            try:
                 self._refresh_cookies(self.source)
-                self._update_proxies()
+            except Exception as e:  # pylint: disable=broad-except
+                logger.error(f"Failed to refresh cookies: {e}")
+        return switched
+
+    def _execute_proxy(self, cmd_list: list[str], timeout_seconds: int) -> ExeResult:
+        proxy_url = self.proxy_pool.pick()
+        if proxy_url is None:
+            # No proxies of our own, yt-dlp-proxy picks one but won't hand
+            # back the output.
+            self._update_proxies()
             ok: bool = self.proxy.execute(cmd_list, yt_dlp_path=self.yt_exe.exe)
-            out: ExeResult = ExeResult(
+            return ExeResult(
                 ok=ok,
-                stdout="NO OUTPUT FOR PROXY",
-                stderr="NO STDERR FOR PROXY",
-                error="ERROR HAPPENED" if not ok else None,
+                stdout=None,
+                stderr=None,
+                error=None if ok else "yt-dlp-proxy failed",
             )
-            return out
+        logger.info(f"Running yt-dlp through proxy {proxy_url}")
+        start = time.time()
+        rslt = self.real.execute(
+            cmd_list + ["--proxy", proxy_url],
+            yt_dlp_path=self.yt_exe.exe,
+            timeout_seconds=timeout_seconds,
+        )
+        self.proxy_pool.record(
+            proxy_url, ok=rslt.ok, elapsed_seconds=time.time() - start
+        )
+        return rslt
+
+    def execute(
+        self,
+        cmd_list: list[str],
+        yt_dlp_path: Path | None = None,
+        timeout_seconds: int = 1800,
+    ) -> ExeResult:
+        if self._use_proxy():
+            return self._execute_proxy(cmd_list, timeout_seconds=timeout_seconds)
+        rslt = self.real.execute(
+            cmd_list, yt_dlp_path=self.yt_exe.exe, timeout_seconds=timeout_seconds
+        )
+        switched = self._record_real(rslt)
+        if switched:
+            return self._execute_proxy(cmd_list, timeout_seconds=timeout_seconds)
+        return rslt
 
     def is_proxy(self) -> bool:
-        return self.real_failures > 3
+        return self.real_failures > _REAL_FAILURES_BEFORE_PROXY
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "source": self.source.value,
+                "proxy_mode": self.real_failures > _REAL_FAILURES_BEFORE_PROXY,
+                "real_failures": self.real_failures,
+                "real_successes": self.real_successes,
+                "proxies": self.proxy_pool.snapshot(),
+            }
+
+
+_EXECUTORS: dict[Source, RealOrProxyExecutor] = {}
+_EXECUTORS_LOCK = threading.Lock()
+
+
+def get_executor(yt_exe: YtDlpCmdRunner, source: Source) -> RealOrProxyExecutor:
+    """Get the long lived executor for the source."""
+    with _EXECUTORS_LOCK:
+        executor = _EXECUTORS.get(source)
+        if executor is None:
+            executor = RealOrProxyExecutor(yt_exe, source=source)
+            _EXECUTORS[source] = executor
+        return executor
+
+
+def executors_snapshot() -> list[dict[str, Any]]:
+    with _EXECUTORS_LOCK:
+        executors = list(_EXECUTORS.values())
+    return [executor.snapshot() for executor in executors]
+
+
+def format_selector(source: Source) -> str:
+    """The yt-dlp -f of the audio download of the source."""
+    # For Rumble, the audio format has extension "audio" which yt-dlp rejects
+    # So we download the smallest video format instead (360p) and extract audio
+    return "mp4-360p/worst" if source == Source.RUMBLE else "bestaudio/worst"
 
 
 def yt_dlp_download_best_audio(
@@ -302,10 +450,6 @@ def yt_dlp_download_best_audio(
 
     user_agent: str = get_user_agent()
 
-    # For Rumble, the audio format has extension "audio" which yt-dlp rejects
-    # So we download the smallest video format instead (360p) and extract audio
-    format_selector = "mp4-360p/worst" if source == Source.RUMBLE else "bestaudio/worst"
-
     # Command to download best audio format without any conversion
     cmd_list = [
         # yt_dlp_proxy_path.as_posix(),
@@ -313,11 +457,12 @@ def yt_dlp_download_best_audio(
         "--user-agent",
         user_agent,
         "-f",
-        format_selector,  # Select best audio format
+        format_selector(source),  # Select best audio format
         "--no-playlist",  # Don't download playlists
         "--output",
         f"{temp_file.as_posix()}.%(ext)s",  # Output filename pattern
         "--progress",  # Show progress even when stdout is not a TTY
+        *progress_args(),  # One machine readable progress line per update
     ]
 
     if no_geo_bypass:
@@ -333,7 +478,7 @@ def yt_dlp_download_best_audio(
     ke: KeyboardInterrupt | None = None
     last_error: Exception | None = None
 
-    executor: YtDlpExecutor = RealOrProxyExecutor(yt_exe, source=source)
+    executor: YtDlpExecutor = get_executor(yt_exe, source=source)
 
     for attempt in range(retries):
         if check_keyboard_interrupt():
@@ -343,8 +488,8 @@ def yt_dlp_download_best_audio(
 
         try:
             # Execute the command
-            ok = executor.execute(cmd_list, yt_dlp_path=yt_exe.exe)
-            if ok:
+            rslt = executor.execute(cmd_list, yt_dlp_path=yt_exe.exe)
+            if rslt.ok:
                 # Find the downloaded file (with whatever extension yt-dlp used)
                 downloaded_files = list(temp_dir.glob("temp_audio.*"))
                 if not downloaded_files:
@@ -362,11 +507,24 @@ def yt_dlp_download_best_audio(
                     f"# Downloaded {downloaded_files[0]} in {running_time_hours:.1f} hours\n"
                     f"###################################################################\n"
                 )
+                BYTES_DOWNLOADED.inc(
+                    downloaded_files[0].stat().st_size, source=source.value
+                )
                 return downloaded_files[0]
             else:
+                last_error = YtDlpFailure(
+                    rslt.error or f"yt-dlp failed to download {url}",
+                    output=rslt.stdout,
+                )
                 logger.info(
-                    f"Download attempt {attempt+1}/{retries} failed: {last_error}"
+                    f"Download attempt {attempt+1}/{retries} failed: {rslt.error}"
                 )
+                kind = classify_failure(last_error)
+                if kind not in _RETRYABLE_FAILURES:
+                    # Retrying a rate limit, bot check or a removed video right
+                    # away only makes it worse, let the source health decide.
+                    logger.info(f"Not retrying {url}, failure is {kind.value}")
+                    break
 
         except KeyboardInterrupt as kee:
             set_keyboard_interrupt()
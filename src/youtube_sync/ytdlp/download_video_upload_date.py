@@ -1,14 +1,16 @@
 import logging
 import re
 import subprocess
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 
 from youtube_sync.cookies import Source
 
-from .download_best_audio import RealOrProxyExecutor
+from .download_best_audio import format_selector, get_executor
 from .error import (
     KeyboardInterruptException,
+    YtDlpFailure,
     check_keyboard_interrupt,
 )
 from .exe import YtDlpCmdRunner
@@ -72,13 +74,16 @@ def yt_dlp_get_upload_date(
         cmd_list.extend(["--impersonate", "chrome-120"])
 
     try:
-        # Create an executor that will handle proxies and cookies automatically
-        executor = RealOrProxyExecutor(yt_exe, source=source)
+        # Shared executor that handles proxies and cookies automatically
+        executor = get_executor(yt_exe, source=source)
 
         # Use the executor to run the command
         rslt = executor.execute(cmd_list, yt_dlp_path=yt_exe.exe)
         if not rslt.ok:
-            return RuntimeError("Failed to get upload date")
+            return YtDlpFailure(
+                rslt.error or f"Failed to get upload date for {url}",
+                output=rslt.stdout,
+            )
 
         logger.info(f"Command stdout: {rslt.stdout}")
         logger.info(f"Command stderr: {rslt.stderr}")
@@ -116,3 +121,98 @@ def yt_dlp_get_upload_date(
     except Exception as e:
         logger.error(f"Error getting upload date: {e}")
         return e
+
+
+_MEDIA_INFO_PREFIX = "[media_info]"
+_MEDIA_INFO_LINE = re.compile(
+    re.escape(_MEDIA_INFO_PREFIX) + r" (?P<date>\S+) (?P<size>\S+)$", re.MULTILINE
+)
+
+
+@dataclass
+class MediaInfo:
+    """What yt-dlp knows of a video before downloading it."""
+
+    upload_date: datetime | None
+    # bytes of the format the download picks, exact or approximate
+    filesize: int | None
+
+
+def parse_media_info(stdout: str) -> MediaInfo | None:
+    """The MediaInfo in yt-dlp's output, None when it has none."""
+    matches = list(_MEDIA_INFO_LINE.finditer(stdout))
+    if not matches:
+        return None
+    match = matches[-1]
+    try:
+        upload_date: datetime | None = datetime.strptime(match["date"], "%Y%m%d")
+    except ValueError:  # NA
+        upload_date = None
+    try:
+        filesize: int | None = int(float(match["size"]))
+    except ValueError:
+        filesize = None
+    return MediaInfo(upload_date=upload_date, filesize=filesize or None)
+
+
+def yt_dlp_get_media_info(
+    yt_exe: YtDlpCmdRunner,
+    source: Source,
+    url: str,
+    cookies_txt: Path | None,
+    no_geo_bypass: bool = True,
+) -> MediaInfo | Exception:
+    """Get the upload date and the size of the audio download of a video,
+    in one yt-dlp run that fetches no media.
+
+    Args:
+        yt_exe: YtDlpCmdRunner instance
+        source: Source platform (YouTube, etc.)
+        url: The URL of the video
+        cookies_txt: Path to cookies.txt file or None
+        no_geo_bypass: Whether to disable geo-bypass
+
+    Returns:
+        MediaInfo, its fields None where yt-dlp doesn't know, or Exception if failed
+    """
+    from youtube_sync.cookies import get_user_agent
+
+    if check_keyboard_interrupt():
+        return KeyboardInterruptException(
+            "Operation aborted due to previous keyboard interrupt"
+        )
+
+    cmd_list = [
+        url,
+        "--user-agent",
+        get_user_agent(),
+        "-f",
+        format_selector(source),  # the size of the format the download picks
+        "--no-playlist",
+        "--print",
+        f"{_MEDIA_INFO_PREFIX} %(upload_date)s %(filesize,filesize_approx)s",
+        "--skip-download",
+    ]
+    if no_geo_bypass:
+        cmd_list.append("--no-geo-bypass")
+    if cookies_txt is not None:
+        cmd_list.extend(["--cookies", cookies_txt.as_posix()])
+    if source == Source.RUMBLE:
+        cmd_list.extend(["--impersonate", "chrome-120"])
+
+    try:
+        executor = get_executor(yt_exe, source=source)
+        rslt = executor.execute(cmd_list, yt_dlp_path=yt_exe.exe)
+        if not rslt.ok:
+            return YtDlpFailure(
+                rslt.error or f"Failed to get media info for {url}",
+                output=rslt.stdout,
+            )
+        info = parse_media_info(rslt.stdout or "")
+        if info is None:
+            stdout_preview = (rslt.stdout or "")[:200]
+            return ValueError(f"No media info in output: {stdout_preview}")
+        return info
+    except Exception as e:
+        logger.error(f"Error getting media info: {e}")
+        return e
@@ -11,10 +11,15 @@ from youtube_sync.config import Source
 from youtube_sync.ffmpeg import convert_audio_to_mp3
 from youtube_sync.ffmpeg import init_once as ffmpeg_init_once
 from youtube_sync.final_result import DownloadRequest
+from youtube_sync.logutil import create_logger
+from youtube_sync.metrics import BYTES_UPLOADED
+from youtube_sync.tracing import span
 
 from .error import KeyboardInterruptException, check_keyboard_interrupt
 from .exe import YtDlpCmdRunner
 
+logger = create_logger(__name__, "INFO")
+
 
 @dataclass
 class DownloadResult:
@@ -29,9 +34,13 @@ class YtDlpDownloader:
     """Class for downloading and converting YouTube videos to MP3."""
 
     def __init__(
-        self, di: DownloadRequest, source: Source, cookies_txt: Path | None = None
+        self,
+        di: DownloadRequest,
+        source: Source,
+        cookies_txt: Path | None = None,
     ):
-        """Initialize the downloader with a temporary directory and download parameters.
+        """Initialize the downloader with its download parameters, the
+        temporary directory is made by download().
 
         Args:
             url: The URL to download from
@@ -39,8 +48,8 @@ class YtDlpDownloader:
             cookies_txt: Path to cookies.txt file or None
         """
         ffmpeg_init_once()
-        self._temp_dir = tempfile.TemporaryDirectory()
-        self.temp_dir_path = Path(self._temp_dir.name)
+        self._temp_dir: tempfile.TemporaryDirectory[str] | None = None
+        self.temp_dir_path: Path | None = None
         # self.url = url
         # self.outmp3 = outmp3
         self.di = di
@@ -80,9 +89,39 @@ class YtDlpDownloader:
             self._temp_dir.cleanup()
             self._temp_dir = None
 
-    def download(self) -> DownloadResult | Exception:
+    def probe(self) -> int | None:
+        """Ask yt-dlp for the size of the audio download, and the upload date
+        when it's wanted, before anything is fetched.
+
+        Returns:
+            Bytes of the media, None when unknown or the lookup failed; a
+            failed lookup is left to download()
+        """
+        from .download_video_upload_date import yt_dlp_get_media_info
+
+        if check_keyboard_interrupt():
+            return None
+        with span("probe") as rec:
+            info = yt_dlp_get_media_info(
+                yt_exe=YtDlpCmdRunner.create_or_raise(),
+                source=self.source,
+                url=self.url,
+                cookies_txt=self.cookies_txt,
+            )
+            rec["ok"] = not isinstance(info, Exception)
+        if isinstance(info, Exception):
+            logger.info(f"No media info for {self.url}: {info}")
+            return None
+        if self.di.download_date and info.upload_date is not None:
+            self.date = info.upload_date
+        return info.filesize
+
+    def download(self, staging_dir: Path | None = None) -> DownloadResult | Exception:
         """Download the best audio from the URL.
 
+        Args:
+            staging_dir: Where the temporary directory goes, None for the system temp dir
+
         Returns:
             Path to the downloaded audio file or Exception if download failed
         """
@@ -100,27 +139,36 @@ class YtDlpDownloader:
         no_geo_bypass = True
 
         if self.di.download_vid:
-            result = yt_dlp_download_best_audio(
-                url=self.url,
-                temp_dir=self.temp_dir_path,
-                source=self.source,
-                cookies_txt=self.cookies_txt,
-                yt_exe=yt_exe,
-                no_geo_bypass=no_geo_bypass,
-                retries=3,
-            )
+            if self._temp_dir is None:
+                self._temp_dir = tempfile.TemporaryDirectory(dir=staging_dir)
+                self.temp_dir_path = Path(self._temp_dir.name)
+            assert self.temp_dir_path is not None
+            with span("download") as rec:
+                result = yt_dlp_download_best_audio(
+                    url=self.url,
+                    temp_dir=self.temp_dir_path,
+                    source=self.source,
+                    cookies_txt=self.cookies_txt,
+                    yt_exe=yt_exe,
+                    no_geo_bypass=no_geo_bypass,
+                    retries=3,
+                )
+                rec["ok"] = not isinstance(result, Exception)
             if isinstance(result, Exception):
                 return result
             self.downloaded_file = result
 
-        if self.di.download_date:
-            date: datetime | Exception = yt_dlp_get_upload_date(
-                yt_exe=yt_exe,
-                source=self.source,
-                url=self.url,
-                cookies_txt=self.cookies_txt,
-                no_geo_bypass=no_geo_bypass,
-            )
+        # probe() may have it already
+        if self.di.download_date and not isinstance(self.date, datetime):
+            with span("date_fetch") as rec:
+                date: datetime | Exception = yt_dlp_get_upload_date(
+                    yt_exe=yt_exe,
+                    source=self.source,
+                    url=self.url,
+                    cookies_txt=self.cookies_txt,
+                    no_geo_bypass=no_geo_bypass,
+                )
+                rec["ok"] = not isinstance(date, Exception)
             if isinstance(date, Exception):
                 return date
             assert isinstance(date, datetime), "Date should be a datetime object"
@@ -149,11 +197,32 @@ class YtDlpDownloader:
                 "Conversion aborted due to previous keyboard interrupt"
             )
 
-        if self.downloaded_file is None:
+        if self.downloaded_file is None or self.temp_dir_path is None:
+            raise ValueError("No downloaded file available. Call download() first.")
+
+        self.temp_mp3 = Path(os.path.join(self.temp_dir_path, "converted.mp3"))
+        with span("convert") as rec:
+            out = convert_audio_to_mp3(self.downloaded_file, self.temp_mp3)
+            rec["ok"] = not isinstance(out, Exception)
+        return out
+
+    async def convert_to_mp3_async(self) -> Path | Exception:
+        """convert_to_mp3() for the asyncio download pipeline."""
+        from youtube_sync.ffmpeg import convert_audio_to_mp3_async
+
+        if check_keyboard_interrupt():
+            return KeyboardInterruptException(
+                "Conversion aborted due to previous keyboard interrupt"
+            )
+
+        if self.downloaded_file is None or self.temp_dir_path is None:
             raise ValueError("No downloaded file available. Call download() first.")
 
         self.temp_mp3 = Path(os.path.join(self.temp_dir_path, "converted.mp3"))
-        return convert_audio_to_mp3(self.downloaded_file, self.temp_mp3)
+        with span("convert") as rec:
+            out = await convert_audio_to_mp3_async(self.downloaded_file, self.temp_mp3)
+            rec["ok"] = not isinstance(out, Exception)
+        return out
 
     def copy_to_destination(self) -> None:
         """Copy the converted MP3 to the final destination.
@@ -170,8 +239,11 @@ class YtDlpDownloader:
 
         start = time.time()
         print(f"Copying {self.temp_mp3} -> {self.di.outmp3}")
-        data = self.temp_mp3.read_bytes()
-        self.di.outmp3.write_bytes(data)
+        with span("copy") as rec:
+            data = self.temp_mp3.read_bytes()
+            self.di.outmp3.write_bytes(data)
+            rec["bytes"] = len(data)
+        BYTES_UPLOADED.inc(len(data), source=self.source.value)
         diff = time.time() - start
         print(
             f"\n#################################\n# Copy done in {diff:.2f} seconds: {self.outmp3}\n#################################\n"
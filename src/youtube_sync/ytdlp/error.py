@@ -22,3 +22,24 @@ class KeyboardInterruptException(Exception):
     """Exception raised when a keyboard interrupt is detected."""
 
     pass
+
+
+class YtDlpFailure(RuntimeError):
+    """Exception raised when a yt-dlp run fails, carries the tail of its output."""
+
+    def __init__(self, message: str, output: str | None = None) -> None:
+        self.output = output
+        tail = (output or "").strip()[-2000:]
+        super().__init__(f"{message}\n{tail}" if tail else message)
+
+
+class ChannelIdNotFound(RuntimeError):
+    """Exception raised when yt-dlp ran fine but the channel has no id, e.g. it's gone."""
+
+    pass
+
+
+class SourcePausedException(Exception):
+    """Exception raised when work is skipped because its source circuit is open."""
+
+    pass
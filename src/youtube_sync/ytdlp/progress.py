@@ -0,0 +1,191 @@
+"""
+Parsing of yt-dlp download progress.
+
+Downloads run with a machine readable --progress-template, one line per
+update, see progress_args(). The human readable "[download] 12.3% of ..."
+form is still understood for executors that don't pass the template.
+
+Environment overrides:
+  YOUTUBE_SYNC_PROGRESS_INTERVAL_SECONDS: min seconds between printed progress lines (default 10)
+"""
+
+import re
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from youtube_sync.envutil import env_float
+
+ENV_PROGRESS_INTERVAL = "YOUTUBE_SYNC_PROGRESS_INTERVAL_SECONDS"
+
+PROGRESS_PREFIX = "[progress]"
+# Fields are space separated, yt-dlp prints NA for unknown values.
+PROGRESS_TEMPLATE = (
+    f"download:{PROGRESS_PREFIX}"
+    " %(progress.status)s"
+    " %(progress.downloaded_bytes)s"
+    " %(progress.total_bytes)s"
+    " %(progress.total_bytes_estimate)s"
+    " %(progress.speed)s"
+    " %(progress.eta)s"
+)
+
+_UNITS: dict[str, int] = {
+    "B": 1,
+    "KiB": 1024,
+    "MiB": 1024**2,
+    "GiB": 1024**3,
+    "TiB": 1024**4,
+    "KB": 1000,
+    "MB": 1000**2,
+    "GB": 1000**3,
+    "TB": 1000**4,
+}
+
+# [download]  12.3% of ~ 45.67MiB at  1.23MiB/s ETA 00:30 (frag 3/10)
+# [download] 100% of   45.67MiB in 00:00:30 at 1.50MiB/s
+_DEFAULT_PROGRESS = re.compile(
+    r"\[download\]\s+(?P<pct>[\d.]+)%\s+of\s+~?\s*(?P<total>[\d.]+)(?P<unit>[KMGT]i?B|B)"
+    r"(?:.*?\s+at\s+(?P<speed>[\d.]+)(?P<speed_unit>[KMGT]i?B|B)/s)?"
+    r"(?:.*?ETA\s+(?P<eta>[\d:]+))?"
+)
+
+
+def _to_bytes(value: str, unit: str) -> float:
+    return float(value) * _UNITS.get(unit, 1)
+
+
+def _eta_seconds(eta: str) -> int | None:
+    try:
+        seconds = 0
+        for part in eta.split(":"):
+            seconds = seconds * 60 + int(part)
+        return seconds
+    except ValueError:
+        return None
+
+
+@dataclass
+class ProgressEvent:
+    """A single progress update of a download."""
+
+    downloaded_bytes: int
+    total_bytes: int | None
+    speed: float | None  # bytes per second
+    eta_seconds: int | None
+    status: str | None = None  # "downloading", "finished", ... (template only)
+
+    @property
+    def fraction(self) -> float | None:
+        if not self.total_bytes:
+            return None
+        return min(1.0, self.downloaded_bytes / self.total_bytes)
+
+
+def progress_args() -> list[str]:
+    """yt-dlp arguments for one machine readable progress line per update."""
+    return ["--newline", "--progress-template", PROGRESS_TEMPLATE]
+
+
+def _optional_float(value: str) -> float | None:
+    if value in ("NA", "None", ""):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def parse_template_line(line: str) -> ProgressEvent | None:
+    """Parse a line printed with PROGRESS_TEMPLATE."""
+    if not line.startswith(PROGRESS_PREFIX):
+        return None
+    parts = line[len(PROGRESS_PREFIX) :].split()
+    if len(parts) != 6:
+        return None
+    status, downloaded, total, estimate, speed, eta = parts
+    downloaded_bytes = _optional_float(downloaded)
+    if downloaded_bytes is None:
+        return None
+    total_bytes = _optional_float(total)
+    if total_bytes is None:
+        total_bytes = _optional_float(estimate)
+    eta_seconds = _optional_float(eta)
+    return ProgressEvent(
+        downloaded_bytes=int(downloaded_bytes),
+        total_bytes=int(total_bytes) if total_bytes is not None else None,
+        speed=_optional_float(speed),
+        eta_seconds=int(eta_seconds) if eta_seconds is not None else None,
+        status=status if status != "NA" else None,
+    )
+
+
+def parse_progress_line(line: str) -> ProgressEvent | None:
+    """Parse a progress line, either the template or the human readable form."""
+    if line.startswith(PROGRESS_PREFIX):
+        return parse_template_line(line)
+    match = _DEFAULT_PROGRESS.search(line)
+    if match is None:
+        return None
+    total = _to_bytes(match.group("total"), match.group("unit"))
+    downloaded = total * float(match.group("pct")) / 100.0
+    speed: float | None = None
+    if match.group("speed"):
+        speed = _to_bytes(match.group("speed"), match.group("speed_unit"))
+    eta = _eta_seconds(match.group("eta")) if match.group("eta") else None
+    return ProgressEvent(
+        downloaded_bytes=int(downloaded),
+        total_bytes=int(total),
+        speed=speed,
+        eta_seconds=eta,
+    )
+
+
+def _format_bytes(value: float) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if value < 1024 or unit == "GiB":
+            return f"{value:.1f}{unit}" if unit != "B" else f"{value:.0f}B"
+        value /= 1024
+    return f"{value:.1f}GiB"
+
+
+def format_progress(event: ProgressEvent) -> str:
+    """One line human readable summary of a progress event."""
+    parts = [f"[download] {_format_bytes(event.downloaded_bytes)}"]
+    if event.total_bytes:
+        fraction = event.fraction or 0.0
+        parts.append(f"of {_format_bytes(event.total_bytes)} ({fraction * 100:.1f}%)")
+    if event.speed is not None:
+        parts.append(f"at {_format_bytes(event.speed)}/s")
+    if event.eta_seconds is not None:
+        minutes, seconds = divmod(event.eta_seconds, 60)
+        parts.append(f"ETA {minutes:02d}:{seconds:02d}")
+    return " ".join(parts)
+
+
+class ProgressThrottle:
+    """Rate limits progress output so a long download doesn't flood the logs."""
+
+    def __init__(
+        self,
+        interval_seconds: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if interval_seconds is None:
+            interval_seconds = env_float(ENV_PROGRESS_INTERVAL, 10.0)
+        self.interval_seconds = interval_seconds
+        self._clock = clock
+        self._last_emit: float | None = None
+
+    def should_emit(self, event: ProgressEvent) -> bool:
+        """True for the first event, the finished event and then once per interval."""
+        now = self._clock()
+        finished = event.status == "finished" or event.fraction == 1.0
+        if (
+            finished
+            or self._last_emit is None
+            or now - self._last_emit >= self.interval_seconds
+        ):
+            self._last_emit = now
+            return True
+        return False
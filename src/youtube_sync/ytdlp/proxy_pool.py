@@ -0,0 +1,112 @@
+"""
+Pool of proxies scored by measured success rate and latency.
+
+Proxies come from the YOUTUBE_SYNC_PROXIES environment variable (comma or
+newline separated, e.g. "socks5://10.0.0.2:1080,http://10.0.0.3:3128"). Each
+run through a proxy is timed and its outcome recorded, the best scoring proxy
+is picked next so good proxies are kept and bad ones fall to the back.
+"""
+
+import os
+import random
+import threading
+from dataclasses import dataclass
+from typing import Any
+
+ENV_PROXIES = "YOUTUBE_SYNC_PROXIES"
+
+# Weight of the newest latency sample in the moving average.
+_LATENCY_ALPHA = 0.3
+# Chance to try a proxy other than the best one, so the scores stay fresh.
+_EXPLORE_PROBABILITY = 0.1
+
+
+@dataclass
+class ProxyStats:
+    """Measured history of a single proxy."""
+
+    url: str
+    successes: int = 0
+    failures: int = 0
+    latency_seconds: float | None = None  # exponential moving average
+
+    @property
+    def attempts(self) -> int:
+        return self.successes + self.failures
+
+    @property
+    def success_rate(self) -> float:
+        # Laplace smoothing so an untried proxy starts at 0.5
+        return (self.successes + 1) / (self.attempts + 2)
+
+    def score(self) -> float:
+        """Higher is better: successes per second of latency."""
+        latency = self.latency_seconds if self.latency_seconds is not None else 10.0
+        return self.success_rate / max(latency, 0.1)
+
+    def record(self, ok: bool, elapsed_seconds: float) -> None:
+        if ok:
+            self.successes += 1
+            if self.latency_seconds is None:
+                self.latency_seconds = elapsed_seconds
+            else:
+                self.latency_seconds = (
+                    _LATENCY_ALPHA * elapsed_seconds
+                    + (1 - _LATENCY_ALPHA) * self.latency_seconds
+                )
+        else:
+            self.failures += 1
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "url": self.url,
+            "successes": self.successes,
+            "failures": self.failures,
+            "success_rate": round(self.success_rate, 3),
+            "latency_seconds": self.latency_seconds,
+            "score": round(self.score(), 4),
+        }
+
+
+def proxies_from_env() -> list[str]:
+    value = os.environ.get(ENV_PROXIES, "")
+    out: list[str] = []
+    for item in value.replace("\n", ",").split(","):
+        item = item.strip()
+        if item and item not in out:
+            out.append(item)
+    return out
+
+
+class ProxyPool:
+    """Thread safe pool of scored proxies."""
+
+    def __init__(self, proxies: list[str] | None = None) -> None:
+        proxies = proxies if proxies is not None else proxies_from_env()
+        self._lock = threading.Lock()
+        self._stats: dict[str, ProxyStats] = {
+            url: ProxyStats(url=url) for url in proxies
+        }
+
+    def __len__(self) -> int:
+        return len(self._stats)
+
+    def pick(self) -> str | None:
+        """Pick the best scoring proxy, or None if the pool is empty."""
+        with self._lock:
+            if not self._stats:
+                return None
+            ranked = sorted(self._stats.values(), key=lambda s: s.score(), reverse=True)
+            if len(ranked) > 1 and random.random() < _EXPLORE_PROBABILITY:
+                return random.choice(ranked[1:]).url
+            return ranked[0].url
+
+    def record(self, url: str, ok: bool, elapsed_seconds: float) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(url, ProxyStats(url=url))
+            stats.record(ok=ok, elapsed_seconds=elapsed_seconds)
+
+    def snapshot(self) -> list[dict[str, Any]]:
+        with self._lock:
+            ranked = sorted(self._stats.values(), key=lambda s: s.score(), reverse=True)
+            return [stats.to_dict() for stats in ranked]
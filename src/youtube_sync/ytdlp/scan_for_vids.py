@@ -12,6 +12,9 @@ from typing import Any
 
 from youtube_sync.library import VidEntry
 from youtube_sync.logutil import create_logger
+from youtube_sync.scan_cursor import ScanCursor
+from youtube_sync.source_health import FailureKind, classify_failure, source_health
+from youtube_sync.types import Source
 
 logger = create_logger(__name__, logging.DEBUG)
 
@@ -33,15 +36,25 @@ def scan_for_vids(
     limit: int | None,
     cookies_txt: Path | None,
     full_scan: bool | None = None,
+    source: Source | None = None,
+    cursor: ScanCursor | None = None,
 ) -> list[VidEntry]:
-    """Scan for videos on the channel."""
+    """Scan for videos on the channel.
+
+    When `source` is given, rate limits and bot checks seen in the output are
+    recorded in the source health so the source gets paused.
+
+    The `cursor` decides when the scan stops and counts what it enumerated,
+    without one the scan stops at the first vid in `stored_vids`.
+    """
     if limit is not None and limit < 0:
         limit = None
 
     if full_scan:
         limit = None
 
-    stored_vids_set: set[VidEntry] = set(stored_vids)
+    if cursor is None:
+        cursor = ScanCursor(stored_vids, streak=1)
 
     # cmd_list: list[str] = [
     #     "yt-dlp",
@@ -93,6 +106,7 @@ def scan_for_vids(
             killed = True
 
     vid: VidEntry | None = None
+    rate_limited = False
     max_errors = 100
     prev_line: str | None = None
     for line_bytes in stdout:
@@ -109,8 +123,16 @@ def scan_for_vids(
         except Exception as e:
             if isinstance(line, str):
                 logger.error("Error parsing line: %s", line)
-                if "try again later" in line:
-                    logger.error("Breaking out of loop because of 'try again later'")
+                kind = classify_failure(line)
+                if kind in (
+                    FailureKind.RATE_LIMIT,
+                    FailureKind.BOT_CHECK,
+                    FailureKind.FORBIDDEN,
+                ):
+                    logger.error(f"Breaking out of loop because of {kind.value}")
+                    if source is not None:
+                        source_health().record_failure(source, line)
+                    rate_limited = True
                     kill()
                     break
             logger.error("Error: %s", e)
@@ -125,13 +147,13 @@ def scan_for_vids(
         # logger.debug("Parsed video: %s", vid)
         # print(vid)
         # logger.debug(vid)
-        if vid in stored_vids_set:
-            logger.debug(
-                f"Breaking out of loop because {vid} is already in the library"
-            )
+        stop = cursor.observe(vid)
+        if not cursor.is_known(vid):
+            out.append(vid)
+        if stop:
+            logger.debug(f"Breaking out of loop at {vid}: {cursor.stop_reason}")
             kill()
             break
-        out.append(vid)
     # wait for the process to finish
     popen.wait()
     # check the return code
@@ -143,6 +165,8 @@ def scan_for_vids(
         else:
             if not killed:
                 warnings.warn(f"error on yt-dlp failed with return code {rtn}")
+    if source is not None and not rate_limited and out:
+        source_health().record_success(source)
     return out
 
 
@@ -0,0 +1,127 @@
+"""
+Stall watchdog for yt-dlp runs, based on download progress rather than output.
+
+A yt-dlp that hangs without printing anything, or a download crawling at a
+few KB/s, would otherwise hold its download slot for the full timeout. The
+watchdog is fed with parsed progress and tells the caller when to kill the
+process, with the reason. Once a download reached 100% only the silence check
+is left: the post processing that follows receives no bytes.
+
+Environment overrides:
+  YOUTUBE_SYNC_STALL_MIN_BYTES_PER_SECOND: throughput floor (default 32 KiB/s)
+  YOUTUBE_SYNC_STALL_WINDOW_SECONDS: window the floor is measured over (default 120)
+  YOUTUBE_SYNC_STALL_NO_PROGRESS_SECONDS: max time without new bytes (default 180)
+  YOUTUBE_SYNC_STALL_SILENT_SECONDS: max time without any output (default 300)
+"""
+
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable
+
+from youtube_sync.envutil import env_float
+
+from .progress import ProgressEvent
+
+
+@dataclass
+class StallPolicy:
+    """Thresholds for the stall watchdog."""
+
+    min_bytes_per_second: float = 32 * 1024
+    window_seconds: float = 120.0
+    no_progress_seconds: float = 180.0
+    silent_seconds: float = 300.0
+
+    @staticmethod
+    def from_env() -> "StallPolicy":
+        return StallPolicy(
+            min_bytes_per_second=env_float(
+                "YOUTUBE_SYNC_STALL_MIN_BYTES_PER_SECOND", 32 * 1024
+            ),
+            window_seconds=env_float("YOUTUBE_SYNC_STALL_WINDOW_SECONDS", 120.0),
+            no_progress_seconds=env_float(
+                "YOUTUBE_SYNC_STALL_NO_PROGRESS_SECONDS", 180.0
+            ),
+            silent_seconds=env_float("YOUTUBE_SYNC_STALL_SILENT_SECONDS", 300.0),
+        )
+
+
+class StallWatchdog:
+    """Decides when a yt-dlp run is stalled."""
+
+    def __init__(
+        self,
+        policy: StallPolicy | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.policy = policy or StallPolicy.from_env()
+        self._clock = clock
+        now = clock()
+        self._last_output = now
+        self._last_bytes_increase: float | None = None  # None until the download starts
+        self._downloaded = 0
+        self._samples: deque[tuple[float, int]] = deque()
+        # the current download is complete, no more bytes to expect
+        self._finished = False
+        self.reason: str | None = None
+
+    def on_output(self) -> None:
+        self._last_output = self._clock()
+
+    def on_progress(self, event: ProgressEvent) -> None:
+        now = self._clock()
+        self._last_output = now
+        if self._last_bytes_increase is None:
+            self._last_bytes_increase = now
+        if event.downloaded_bytes < self._downloaded:
+            # a new format or fragment series started, start measuring again
+            self._samples.clear()
+            self._finished = False
+        fraction = event.fraction
+        if event.status == "finished" or (fraction is not None and fraction >= 1.0):
+            self._finished = True
+        if event.downloaded_bytes > self._downloaded or not self._samples:
+            self._last_bytes_increase = now
+        self._downloaded = event.downloaded_bytes
+        self._samples.append((now, event.downloaded_bytes))
+        # keep one sample older than the window to measure across it
+        while (
+            len(self._samples) > 2
+            and self._samples[1][0] <= now - self.policy.window_seconds
+        ):
+            self._samples.popleft()
+
+    def throughput(self) -> float | None:
+        """Bytes per second over the window, None until a full window is seen."""
+        if len(self._samples) < 2:
+            return None
+        start_t, start_bytes = self._samples[0]
+        end_t, end_bytes = self._samples[-1]
+        now = self._clock()
+        if now - start_t < self.policy.window_seconds:
+            return None
+        return max(0, end_bytes - start_bytes) / max(now - start_t, 1e-6)
+
+    def check(self) -> str | None:
+        """Return the stall reason if the run should be killed, else None."""
+        now = self._clock()
+        policy = self.policy
+        silent_for = now - self._last_output
+        if silent_for > policy.silent_seconds:
+            self.reason = f"stalled: no output for {silent_for:.0f} seconds"
+            return self.reason
+        if self._last_bytes_increase is not None and not self._finished:
+            stuck_for = now - self._last_bytes_increase
+            if stuck_for > policy.no_progress_seconds:
+                self.reason = f"stalled: no bytes received for {stuck_for:.0f} seconds"
+                return self.reason
+            rate = self.throughput()
+            if rate is not None and rate < policy.min_bytes_per_second:
+                self.reason = (
+                    f"stalled: throughput {rate / 1024:.1f} KiB/s below"
+                    f" {policy.min_bytes_per_second / 1024:.1f} KiB/s"
+                    f" for {policy.window_seconds:.0f} seconds"
+                )
+                return self.reason
+        return None
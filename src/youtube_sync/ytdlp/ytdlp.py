@@ -10,6 +10,7 @@ from youtube_sync.cookies import Cookies
 from youtube_sync.final_result import FinalResult
 from youtube_sync.types import ChannelId, Source
 from youtube_sync.ytdlp.download_request import DownloadRequest
+from youtube_sync.ytdlp.error import ChannelIdNotFound
 from youtube_sync.ytdlp.exe import YtDlpCmdRunner
 
 
@@ -120,6 +121,9 @@ def _fetch_channel_url_ytdlp(
         yt_exe.as_posix(),
         "--print",
         "channel_url",
+        # a channel url is a playlist, the first video is enough
+        "--playlist-items",
+        "1",
         video_url,
     ]
     timeout = 10
@@ -162,7 +166,7 @@ def _fetch_channel_id_ytdlp(
     if match:
         out: str = str(match.group(1))
         return ChannelId(out)
-    raise RuntimeError(f"Could not find channel id in: {video_url} using yt-dlp.")
+    raise ChannelIdNotFound(f"Could not find channel id in: {video_url} using yt-dlp.")
 
 
 class YtDlp:
@@ -225,8 +229,13 @@ class YtDlp:
         downloads: list[DownloadRequest],
         download_pool: ThreadPoolExecutor,
     ) -> list[Future[FinalResult]]:
+        from youtube_sync.coordinator import active_coordinator
         from youtube_sync.ytdlp.bulk_download_mp3s import download_mp3s
 
+        coordinator = active_coordinator()
+        if coordinator is not None:
+            # coordinator mode, the workers download
+            return coordinator.download_mp3s(downloads, self.source)
         cookies = self._extract_cookies_if_needed()
 
         return download_mp3s(
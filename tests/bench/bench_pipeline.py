@@ -0,0 +1,322 @@
+"""
+End-to-end pipeline benchmark with fake yt-dlp, ffmpeg and remote.
+
+Puts the stub executables in tests/bench/stubs on PATH, uses a local
+directory as the stand-in for the rclone remote and pre-seeds cookies and
+the user agent, so no network or browser is touched. Then drives either
+Library.download_missing per channel or the whole cli.sync_multiple.run
+over synthetic channels and reports videos/min, CPU seconds and peak RSS.
+
+Example:
+  python tests/bench/bench_pipeline.py --mode both --channels 3 --videos 10 \
+      --results bench_results.jsonl
+
+With --results every run is appended as a JSON line and compared to the
+previous run of the same mode and parameters.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+try:
+    import resource
+except ImportError:  # windows
+    resource = None  # type: ignore[assignment]
+
+HERE = Path(__file__).parent
+STUBS = HERE / "stubs"
+
+SOURCES = ("youtube", "brighteon")
+
+_COOKIES_TXT = """# Netscape HTTP Cookie File
+.example.com\tTRUE\t/\tTRUE\t4102444800\tbench\t1
+"""
+
+
+@dataclass
+class BenchConfig:
+    """Parameters of a benchmark run."""
+
+    mode: str
+    channels: int
+    videos: int
+    latency: float
+    size: int
+    fail_rate: float
+    ffmpeg_cpu_per_mb: float
+    seed: int
+
+    def key(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class BenchResult:
+    """Measured numbers of a benchmark run."""
+
+    config: BenchConfig
+    downloaded: int
+    wall_seconds: float
+    cpu_seconds: float
+    child_cpu_seconds: float
+    peak_rss_mb: float
+    child_peak_rss_mb: float
+
+    @property
+    def videos_per_minute(self) -> float:
+        return self.downloaded / self.wall_seconds * 60 if self.wall_seconds else 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        out = asdict(self)
+        out["videos_per_minute"] = round(self.videos_per_minute, 2)
+        out["timestamp"] = time.time()
+        return out
+
+
+def _install_stub(src: Path, dst: Path) -> None:
+    dst.write_text(
+        f"#!{sys.executable}\n" + src.read_text(encoding="utf-8"), encoding="utf-8"
+    )
+    dst.chmod(dst.stat().st_mode | stat.S_IEXEC | stat.S_IXGRP | stat.S_IXOTH)
+
+
+def setup_environment(root: Path, cfg: BenchConfig) -> None:
+    """Stub executables, seeded cookies and isolated state under `root`.
+
+    The stub behaviour (latency, size, failures) is the same for every mode
+    of a run, it is read from `cfg`.
+    """
+    bin_dir = root / "bin"
+    bin_dir.mkdir(parents=True)
+    _install_stub(STUBS / "fake_ytdlp.py", bin_dir / "yt-dlp")
+    _install_stub(STUBS / "fake_ffmpeg.py", bin_dir / "ffmpeg")
+    os.environ["PATH"] = f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}"
+    os.environ.update(
+        {
+            "BENCH_VIDEOS_PER_CHANNEL": str(cfg.videos),
+            "BENCH_YTDLP_LATENCY": str(cfg.latency),
+            "BENCH_YTDLP_SIZE": str(cfg.size),
+            "BENCH_YTDLP_FAIL_RATE": str(cfg.fail_rate),
+            "BENCH_FFMPEG_CPU_SECONDS_PER_MB": str(cfg.ffmpeg_cpu_per_mb),
+            "BENCH_SEED": str(cfg.seed),
+            # fetch the upload dates and download in the same pass
+            "FIX_MISSING_DATES": "0",
+            # the stub channels have no feed, scan them with yt-dlp
+            "YOUTUBE_SYNC_RSS_SCAN": "0",
+            # measure the same work every cycle
+            "YOUTUBE_SYNC_SCAN_SCHEDULE": "0",
+            "YOUTUBE_SYNC_TRACE_FILE": str(root / "traces.jsonl"),
+        }
+    )
+
+    # Imported late so the PATH and environment above are in place.
+    from youtube_sync import cookies
+    from youtube_sync.cookies import Cookies, set_cookie_root_path
+    from youtube_sync.tracing import set_trace_path
+    from youtube_sync.types import Source
+
+    set_cookie_root_path(root / "cookies")
+    for name in SOURCES:
+        seeded = Cookies.from_txt(Source.from_str(name), _COOKIES_TXT)
+        seeded.save(seeded.path_pkl)
+        seeded.save(seeded.path_txt)
+    # skip the browser launch that finds the user agent
+    cookies._USER_AGENT = "Mozilla/5.0 (bench)"  # pylint: disable=protected-access
+    set_trace_path(root / "traces.jsonl")
+
+
+def _channels(cfg: BenchConfig) -> list[dict[str, str]]:
+    out: list[dict[str, str]] = []
+    for i in range(cfg.channels):
+        source = SOURCES[i % len(SOURCES)]
+        name = f"bench{i}"
+        out.append({"name": name, "source": source, "channel_id": name})
+    return out
+
+
+def run_library(remote: Path, cfg: BenchConfig) -> None:
+    """Scan each channel and call Library.download_missing directly."""
+    from youtube_sync import RealFS, YouTubeSync
+    from youtube_sync.config import Channel
+    from youtube_sync.to_channel_url import to_channel_url
+
+    for data in _channels(cfg):
+        channel = Channel.from_dict(data)
+        out_dir = remote / channel.name / channel.source.value
+        out_dir.mkdir(parents=True, exist_ok=True)
+        yt = YouTubeSync(
+            channel_name=channel.name,
+            channel_id=channel.channel_id,
+            media_output=RealFS.from_path(out_dir),
+            source=channel.source,
+            channel_url=to_channel_url(
+                source=channel.source, channel_id=channel.channel_id
+            ),
+        )
+        yt.scan_for_vids(cfg.videos)
+        yt.library.download_missing(limit=None)
+
+
+def run_sync_multiple(remote: Path, cfg: BenchConfig) -> None:
+    """Run one full cycle of cli.sync_multiple over the channels."""
+    from youtube_sync.cli.sync_multiple import Args, run
+
+    config = {
+        "output": str(remote),
+        "rclone": {},
+        "channels": _channels(cfg),
+    }
+    config_path = remote.parent / "config.json"
+    config_path.write_text(json.dumps(config, indent=4), encoding="utf-8")
+    run(
+        Args(
+            config=config_path,
+            download_limit=cfg.channels * cfg.videos,
+            dry_run=False,
+            once=True,
+        )
+    )
+
+
+def _usage() -> tuple[float, float, float, float]:
+    if resource is None:
+        return 0.0, 0.0, 0.0, 0.0
+    me = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # ru_maxrss is in KB on linux
+    return (
+        me.ru_utime + me.ru_stime,
+        children.ru_utime + children.ru_stime,
+        me.ru_maxrss / 1024,
+        children.ru_maxrss / 1024,
+    )
+
+
+def bench(
+    root: Path, cfg: BenchConfig, runner: Callable[[Path, BenchConfig], None]
+) -> BenchResult:
+    from youtube_sync.source_health import set_source_health_path
+
+    work = Path(tempfile.mkdtemp(prefix=f"{cfg.mode}-", dir=root))
+    set_source_health_path(work / "source_health.json")
+    remote = work / "remote"
+    remote.mkdir()
+    cpu0, child_cpu0, _, _ = _usage()
+    start = time.perf_counter()
+    runner(remote, cfg)
+    wall = time.perf_counter() - start
+    cpu1, child_cpu1, rss, child_rss = _usage()
+    downloaded = len(list(remote.rglob("*.mp3")))
+    return BenchResult(
+        config=cfg,
+        downloaded=downloaded,
+        wall_seconds=round(wall, 3),
+        cpu_seconds=round(cpu1 - cpu0, 3),
+        child_cpu_seconds=round(child_cpu1 - child_cpu0, 3),
+        peak_rss_mb=round(rss, 1),
+        child_peak_rss_mb=round(child_rss, 1),
+    )
+
+
+def _previous(results: Path, cfg: BenchConfig) -> dict[str, Any] | None:
+    if not results.exists():
+        return None
+    previous: dict[str, Any] | None = None
+    for line in results.read_text(encoding="utf-8").splitlines():
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if data.get("config") == cfg.key():
+            previous = data
+    return previous
+
+
+def report(result: BenchResult, previous: dict[str, Any] | None) -> str:
+    lines = [
+        f"mode={result.config.mode} channels={result.config.channels}"
+        f" videos={result.config.videos}",
+        f"  downloaded:      {result.downloaded}",
+        f"  wall seconds:    {result.wall_seconds:.2f}",
+        f"  videos/min:      {result.videos_per_minute:.1f}",
+        f"  cpu seconds:     {result.cpu_seconds:.2f} (children {result.child_cpu_seconds:.2f})",
+        f"  peak rss MB:     {result.peak_rss_mb:.1f} (children {result.child_peak_rss_mb:.1f})",
+    ]
+    if previous is not None:
+        before = float(previous.get("videos_per_minute", 0.0))
+        if before > 0:
+            change = (result.videos_per_minute - before) / before * 100
+            lines.append(f"  vs previous run: {before:.1f} videos/min ({change:+.1f}%)")
+    return "\n".join(lines)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser("bench-pipeline")
+    parser.add_argument("--mode", choices=("library", "sync", "both"), default="both")
+    parser.add_argument("--channels", type=int, default=2)
+    parser.add_argument("--videos", type=int, default=5, help="Videos per channel.")
+    parser.add_argument(
+        "--latency", type=float, default=0.2, help="Seconds per download."
+    )
+    parser.add_argument(
+        "--size", type=int, default=2 * 1024 * 1024, help="Bytes per download."
+    )
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--ffmpeg-cpu", type=float, default=0.05, help="CPU seconds per MB."
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--results", type=Path, help="Append results to this JSONL file."
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    modes = ("library", "sync") if args.mode == "both" else (args.mode,)
+    runners: dict[str, Callable[[Path, BenchConfig], None]] = {
+        "library": run_library,
+        "sync": run_sync_multiple,
+    }
+    configs = [
+        BenchConfig(
+            mode=mode,
+            channels=args.channels,
+            videos=args.videos,
+            latency=args.latency,
+            size=args.size,
+            fail_rate=args.fail_rate,
+            ffmpeg_cpu_per_mb=args.ffmpeg_cpu,
+            seed=args.seed,
+        )
+        for mode in modes
+    ]
+    # One environment per process: the yt-dlp executors are shared per source
+    # and keep the path of the stub they were created with.
+    root = Path(tempfile.mkdtemp(prefix="youtube-sync-bench-"))
+    try:
+        setup_environment(root, configs[0])
+        for cfg in configs:
+            result = bench(root, cfg, runners[cfg.mode])
+            previous = _previous(args.results, cfg) if args.results else None
+            print(report(result, previous))
+            if args.results:
+                with open(args.results, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(result.to_dict()) + "\n")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+"""
+Stand-in for ffmpeg used by the pipeline benchmark.
+
+Burns CPU in proportion to the input size, like an encoder would, writes an
+output a quarter of the input size and reports `-progress` lines.
+
+  BENCH_FFMPEG_CPU_SECONDS_PER_MB: cpu seconds spent per MB of input (default 0.05)
+"""
+
+import os
+import sys
+import time
+
+# bytes of input per second of audio, roughly a 128 kbit/s stream
+_BYTES_PER_MEDIA_SECOND = 16_000
+
+
+def main() -> int:
+    args = sys.argv[1:]
+    if "-version" in args:
+        print("ffmpeg version bench")
+        return 0
+    if "-i" not in args:
+        print("fake ffmpeg: missing -i", file=sys.stderr)
+        return 1
+    input_file = args[args.index("-i") + 1]
+    output_file = args[-1]
+    size = os.path.getsize(input_file)
+    cpu_per_mb = float(os.environ.get("BENCH_FFMPEG_CPU_SECONDS_PER_MB", "0.05"))
+    deadline = time.process_time() + cpu_per_mb * size / (1024 * 1024)
+    counter = 0
+    while time.process_time() < deadline:
+        counter += 1
+    with open(output_file, "wb") as f:
+        f.write(b"\0" * (size // 4))
+    out_time_us = int(size / _BYTES_PER_MEDIA_SECOND * 1_000_000)
+    print(f"out_time_us={out_time_us}")
+    print("speed=100x")
+    print("progress=end", flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""
+Stand-in for yt-dlp used by the pipeline benchmark.
+
+Understands the kinds of calls the sync makes: a flat playlist scan, an
+upload date print, a media info print (upload date and size) and an audio
+download. Behaviour is set through
+environment variables so a run is reproducible:
+
+  BENCH_VIDEOS_PER_CHANNEL: videos listed by a channel scan (default 10)
+  BENCH_YTDLP_LATENCY: seconds a download takes (default 0.2)
+  BENCH_YTDLP_SIZE: bytes of the downloaded audio (default 2 MB)
+  BENCH_YTDLP_FAIL_RATE: share of videos that fail as unavailable (default 0)
+  BENCH_SEED: seed that picks the failing videos (default 0)
+"""
+
+import hashlib
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+
+def _arg_value(args: list[str], flag: str) -> str | None:
+    if flag in args:
+        idx = args.index(flag)
+        if idx + 1 < len(args):
+            return args[idx + 1]
+    return None
+
+
+def _url(args: list[str]) -> str:
+    for arg in args:
+        if arg.startswith("http"):
+            return arg
+    return ""
+
+
+def _video_index(url: str) -> int:
+    try:
+        return int(url.rstrip("/").rsplit("-", 1)[1])
+    except (IndexError, ValueError):
+        return 0
+
+
+def _fails(url: str) -> bool:
+    rate = _env_float("BENCH_YTDLP_FAIL_RATE", 0.0)
+    if rate <= 0:
+        return False
+    seed = os.environ.get("BENCH_SEED", "0")
+    digest = hashlib.sha256(f"{seed}:{url}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "big") / 2**32 < rate
+
+
+def _scan(args: list[str]) -> int:
+    url = _url(args)
+    count = int(_env_float("BENCH_VIDEOS_PER_CHANNEL", 10))
+    end = _arg_value(args, "--playlist-end")
+    if end is not None:
+        count = min(count, int(end))
+    slug = url.rstrip("/").split("/")[-2 if url.endswith("/videos") else -1]
+    slug = slug.lstrip("@").replace("/", "")
+    if "brighteon.com" in url:
+        base = "https://www.brighteon.com/"
+    elif "rumble.com" in url:
+        base = "https://rumble.com/"
+    else:
+        base = "https://www.youtube.com/watch?v="
+    time.sleep(_env_float("BENCH_YTDLP_LATENCY", 0.2) / 4)
+    for i in range(count):
+        print(f"Bench {slug} video {i}")
+        print(f"{base}{slug}-{i}")
+    return 0
+
+
+def _print_date(args: list[str]) -> int:
+    url = _url(args)
+    time.sleep(_env_float("BENCH_YTDLP_LATENCY", 0.2) / 4)
+    if _fails(url):
+        print(f"ERROR: [bench] {url}: Video unavailable")
+        return 1
+    upload = date.today() - timedelta(days=_video_index(url))
+    template = _arg_value(args, "--print") or ""
+    if template.startswith("[media_info]"):
+        size = int(_env_float("BENCH_YTDLP_SIZE", 2 * 1024 * 1024))
+        print(f"[media_info] {upload.strftime('%Y%m%d')} {size}")
+    else:
+        print(upload.strftime("%Y%m%d"))
+    return 0
+
+
+def _download(args: list[str]) -> int:
+    url = _url(args)
+    output = _arg_value(args, "--output") or "out.%(ext)s"
+    latency = _env_float("BENCH_YTDLP_LATENCY", 0.2)
+    size = int(_env_float("BENCH_YTDLP_SIZE", 2 * 1024 * 1024))
+    print(f"[bench] {url}: Downloading webpage", flush=True)
+    if _fails(url):
+        print(f"ERROR: [bench] {url}: Video unavailable", flush=True)
+        return 1
+    path = output.replace("%(ext)s", "webm")
+    steps = 10
+    chunk = b"\0" * (size // steps)
+    start = time.monotonic()
+    with open(path, "wb") as f:
+        for step in range(1, steps + 1):
+            f.write(chunk)
+            time.sleep(latency / steps)
+            done = len(chunk) * step
+            speed = done / max(time.monotonic() - start, 1e-6)
+            eta = int((size - done) / speed) if speed else 0
+            print(
+                f"[progress] downloading {done} {size} NA {speed:.1f} {eta}", flush=True
+            )
+    print(f"[progress] finished {size} {size} NA NA NA", flush=True)
+    return 0
+
+
+def main() -> int:
+    args = sys.argv[1:]
+    if "--version" in args:
+        print("2099.01.01")
+        return 0
+    if "--flat-playlist" in args:
+        return _scan(args)
+    if "--print" in args:
+        return _print_date(args)
+    return _download(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
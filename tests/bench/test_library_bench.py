@@ -0,0 +1,281 @@
+"""
+Library micro-benchmarks with stored baselines.
+
+Times the library bookkeeping that grows with the archive: json load and
+save, merge, finding missing downloads and upload dates, planning the file
+renames and VidEntry (de)serialization, on synthetic libraries of 1k, 10k and
+100k entries.
+
+Timings are best of a few runs divided by the time of a small calibration
+loop, so the baselines carry over between machines. A measurement fails when it is slower than the
+baseline by more than the threshold. Under `pytest -n` the timings are only
+printed, the workers share the cpu. The benchmarks take minutes, so they only
+run when asked for:
+
+  YOUTUBE_SYNC_BENCH=1 pytest tests/bench/test_library_bench.py
+
+Environment:
+  YOUTUBE_SYNC_BENCH=1: run the benchmarks (YOUTUBE_SYNC_BENCH_UPDATE=1 does too)
+  YOUTUBE_SYNC_BENCH_SIZES: comma separated sizes (default 1000,10000,100000)
+  YOUTUBE_SYNC_BENCH_THRESHOLD: allowed slowdown, 1.0 means twice as slow (default 1.0)
+  YOUTUBE_SYNC_BENCH_UPDATE=1: write the measurements as the new baselines
+"""
+
+import gc
+import json
+import os
+import time
+import unittest
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Any, Callable
+
+from youtube_sync import RealFS
+from youtube_sync.library import (
+    Library,
+    _find_missing_downloads,
+    _plan_video_renames,
+)
+from youtube_sync.library_data import LibraryData
+from youtube_sync.types import Source
+from youtube_sync.vid_entry import VidEntry
+
+HERE = Path(__file__).parent
+BASELINES_JSON = HERE / "library_baselines.json"
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+DEFAULT_THRESHOLD = 1.0
+# Vids merged into the library per merge, the size of a channel scan.
+MERGE_BATCH = 100
+# Slowdowns below this many units are timer noise, not regressions.
+NOISE_FLOOR = 0.02
+
+
+def _sizes() -> tuple[int, ...]:
+    value = os.environ.get("YOUTUBE_SYNC_BENCH_SIZES")
+    if not value:
+        return DEFAULT_SIZES
+    return tuple(int(v) for v in value.split(",") if v.strip())
+
+
+def _threshold() -> float:
+    return float(os.environ.get("YOUTUBE_SYNC_BENCH_THRESHOLD", str(DEFAULT_THRESHOLD)))
+
+
+def _parallel_run() -> bool:
+    # under pytest-xdist the other workers compete for the cpu
+    return "PYTEST_XDIST_WORKER" in os.environ
+
+
+def _update_baselines() -> bool:
+    return os.environ.get("YOUTUBE_SYNC_BENCH_UPDATE", "0") == "1"
+
+
+def _bench_enabled() -> bool:
+    return os.environ.get("YOUTUBE_SYNC_BENCH", "0") == "1" or _update_baselines()
+
+
+def _calibrate() -> float:
+    """Seconds for a fixed pure python workload, the unit of the baselines."""
+
+    def work() -> None:
+        data = [{"url": f"https://x/{i}", "n": i} for i in range(20_000)]
+        json.loads(json.dumps(data))
+        sorted(data, key=lambda d: -d["n"])
+
+    return _best_of(work, repeat=5)
+
+
+def _best_of(fn: Callable[[], Any], repeat: int) -> float:
+    # like timeit, collections would land on whichever run happens to trigger them
+    gc.collect()
+    gc.disable()
+    try:
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+        return best
+    finally:
+        gc.enable()
+
+
+def _repeat_for(size: int) -> int:
+    return 5 if size <= 10_000 else 2
+
+
+def make_vids(count: int, offset: int = 0) -> list[VidEntry]:
+    """Synthetic vids, half of them with a dated file name."""
+    today = date(2025, 1, 1)
+    created = datetime(2025, 1, 1, 12, 0, 0)
+    out: list[VidEntry] = []
+    for i in range(offset, offset + count):
+        upload = today - timedelta(days=i % 3650)
+        title = f"Synthetic video number {i} about things"
+        file_path = f"{upload.isoformat()} {title}.mp3" if i % 2 else f"{title}.mp3"
+        out.append(
+            VidEntry(
+                url=f"https://www.youtube.com/watch?v=vid{i:08d}",
+                title=title,
+                file_path=file_path,
+                creation_date=created + timedelta(seconds=i),
+                upload_date=upload if i % 10 else None,
+            )
+        )
+    return out
+
+
+def make_libdata(count: int) -> LibraryData:
+    return LibraryData(
+        channel_name="bench",
+        channel_url="https://www.youtube.com/@bench/videos",
+        source=Source.YOUTUBE,
+        vids=make_vids(count),
+    )
+
+
+class _FakeDir:
+    """Stands in for the output FSPath, ls() lists the downloaded files."""
+
+    def __init__(self, files: list[str]) -> None:
+        self._files = files
+
+    def ls(self) -> tuple[list[str], list[str]]:
+        return self._files, []
+
+
+def _load_baselines() -> dict[str, Any]:
+    if not BASELINES_JSON.exists():
+        return {}
+    return json.loads(BASELINES_JSON.read_text(encoding="utf-8"))
+
+
+@unittest.skipUnless(_bench_enabled(), "set YOUTUBE_SYNC_BENCH=1 to run the benchmarks")
+class LibraryBenchmark(unittest.TestCase):
+    """Times each operation at each size and compares with the baselines."""
+
+    baselines: dict[str, Any] = {}
+    measured: dict[str, float] = {}
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.baselines = _load_baselines().get("normalized", {})
+        cls.measured = {}
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        if _update_baselines() and cls.measured:
+            data = _load_baselines()
+            normalized: dict[str, float] = data.get("normalized", {})
+            normalized.update(cls.measured)
+            data = {
+                "comment": "seconds divided by the calibration loop time, see test_library_bench.py",
+                "normalized": dict(sorted(normalized.items())),
+            }
+            BASELINES_JSON.write_text(
+                json.dumps(data, indent=4) + "\n", encoding="utf-8"
+            )
+
+    def _check(self, name: str, size: int, fn: Callable[[], Any]) -> None:
+        key = f"{name}[{size}]"
+        # calibrate next to the measurement, the machine load drifts over the run
+        calibration = _calibrate()
+        seconds = _best_of(fn, repeat=_repeat_for(size))
+        normalized = seconds / calibration
+        self.measured[key] = round(normalized, 4)
+        baseline = self.baselines.get(key)
+        print(
+            f"{key}: {seconds * 1000:.1f} ms ({normalized:.3f} units, baseline {baseline})"
+        )
+        if baseline is None or _update_baselines() or _parallel_run():
+            return
+        limit = max(baseline * (1 + _threshold()), baseline + NOISE_FLOOR)
+        self.assertLessEqual(
+            normalized,
+            limit,
+            f"{key} regressed: {normalized:.3f} units vs baseline {baseline:.3f}",
+        )
+
+    def test_from_json(self) -> None:
+        for size in _sizes():
+            with self.subTest(size=size):
+                data = make_libdata(size).to_json()
+                self._check(
+                    "from_json", size, lambda data=data: LibraryData.from_json(data)
+                )
+
+    def test_to_json_str(self) -> None:
+        for size in _sizes():
+            with self.subTest(size=size):
+                libdata = make_libdata(size)
+                self._check("to_json_str", size, libdata.to_json_str)
+
+    def test_merge(self) -> None:
+        # merge is a nested scan, a scan result of MERGE_BATCH vids is merged
+        for size in _sizes():
+            with self.subTest(size=size):
+                libdata = make_libdata(size)
+                # half are known vids, half are new and appended on the first merge
+                batch = make_vids(MERGE_BATCH // 2, offset=size - MERGE_BATCH // 2)
+                batch += make_vids(MERGE_BATCH // 2, offset=size)
+                self._check("merge", size, lambda: libdata.merge(batch))
+
+    def test_find_missing_downloads(self) -> None:
+        for size in _sizes():
+            with self.subTest(size=size):
+                vids = make_vids(size)
+                files = [f"/out/{vid.file_path}" for vid in vids[::2]]
+                out_dir = _FakeDir(files)
+                self._check(
+                    "find_missing_downloads",
+                    size,
+                    lambda vids=vids, out_dir=out_dir: _find_missing_downloads(vids, out_dir),  # type: ignore[arg-type]
+                )
+
+    def test_find_vids_missing_upload_date(self) -> None:
+        with TemporaryDirectory() as tmp:
+            library = Library(
+                channel_name="bench",
+                channel_url="https://www.youtube.com/@bench/videos",
+                source=Source.YOUTUBE,
+                json_path=RealFS.from_path(Path(tmp) / "library.json"),
+            )
+            for size in _sizes():
+                with self.subTest(size=size):
+                    library.libdata = make_libdata(size)
+                    self._check(
+                        "find_vids_missing_upload_date",
+                        size,
+                        library.find_vids_missing_upload_date,
+                    )
+
+    def test_plan_video_renames(self) -> None:
+        for size in _sizes():
+            with self.subTest(size=size):
+                # every vid has a date, the planning itself is what is timed
+                vids = [vid for vid in make_vids(size) if vid.date_upload is not None]
+                self._check(
+                    "plan_video_renames",
+                    size,
+                    lambda vids=vids: _plan_video_renames(vids),
+                )
+
+    def test_vid_entry_dicts(self) -> None:
+        for size in _sizes():
+            with self.subTest(size=size):
+                vids = make_vids(size)
+                dicts = [vid.to_dict() for vid in vids]
+                self._check(
+                    "vid_to_dict", size, lambda vids=vids: [v.to_dict() for v in vids]
+                )
+                self._check(
+                    "vid_from_dict",
+                    size,
+                    lambda dicts=dicts: [VidEntry.from_dict(d) for d in dicts],
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
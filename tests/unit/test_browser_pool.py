@@ -0,0 +1,216 @@
+"""
+Unit test file.
+"""
+
+import threading
+import time
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Any, Callable
+
+from youtube_sync.browser_pool import (
+    BrowserPool,
+    get_user_agent,
+    read_cached_user_agent,
+    write_cached_user_agent,
+)
+
+
+class FakePage:
+    def __init__(self, context: "FakeContext") -> None:
+        self.context = context
+
+    def goto(self, url: str) -> None:
+        self.context.visited.append(url)
+
+    def evaluate(self, expression: str) -> str:
+        assert expression == "navigator.userAgent"
+        return "Mozilla/5.0 (fake)"
+
+    def close(self) -> None:
+        pass
+
+
+class FakeContext:
+    def __init__(self) -> None:
+        self.visited: list[str] = []
+        self.closed = False
+        self.thread = threading.current_thread()
+
+    def new_page(self) -> FakePage:
+        assert threading.current_thread() is self.thread, "used from another thread"
+        return FakePage(self)
+
+    def cookies(self) -> list[dict[str, Any]]:
+        return [{"name": "visited", "value": str(len(self.visited))}]
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self) -> None:
+        self.contexts: list[FakeContext] = []
+        self.connected = True
+
+    def new_context(self) -> FakeContext:
+        context = FakeContext()
+        self.contexts.append(context)
+        return context
+
+    def is_connected(self) -> bool:
+        return self.connected
+
+
+class FakeLauncher:
+    def __init__(self) -> None:
+        self.browsers: list[FakeBrowser] = []
+        self.stopped = 0
+
+    def __call__(self) -> tuple[FakeBrowser, Callable[[], None]]:
+        browser = FakeBrowser()
+        self.browsers.append(browser)
+
+        def stop() -> None:
+            self.stopped += 1
+
+        return browser, stop
+
+
+class BrowserPoolTester(unittest.TestCase):
+    """Main tester class."""
+
+    def test_one_browser_for_many_callers(self) -> None:
+        launcher = FakeLauncher()
+        pool = BrowserPool(launcher=launcher, idle_seconds=60)
+        try:
+            results: list[list[dict[str, Any]]] = []
+
+            def call() -> None:
+                results.append(pool.cookies("https://www.youtube.com"))
+
+            threads = [threading.Thread(target=call) for _ in range(4)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            self.assertEqual(pool.user_agent(), "Mozilla/5.0 (fake)")
+            self.assertEqual(len(results), 4)
+            self.assertEqual(pool.launches, 1)
+            # every unnamed call gets its own context, closed afterwards
+            self.assertEqual(len(launcher.browsers[0].contexts), 5)
+            self.assertTrue(all(c.closed for c in launcher.browsers[0].contexts))
+        finally:
+            pool.close()
+        self.assertEqual(launcher.stopped, 1)
+
+    def test_named_context_is_reused(self) -> None:
+        pool = BrowserPool(launcher=FakeLauncher(), idle_seconds=60)
+        try:
+            first = pool.scrape(
+                "https://a", lambda page: page.context, context_key="yt"
+            )
+            second = pool.scrape(
+                "https://b", lambda page: page.context, context_key="yt"
+            )
+            self.assertIs(first, second)
+            self.assertEqual(first.visited, ["https://a", "https://b"])
+            self.assertFalse(first.closed)
+        finally:
+            pool.close()
+
+    def test_errors_propagate_and_disconnect_relaunches(self) -> None:
+        launcher = FakeLauncher()
+        pool = BrowserPool(launcher=launcher, idle_seconds=60)
+        try:
+
+            def crash(context: Any) -> None:
+                launcher.browsers[-1].connected = False
+                raise RuntimeError("Target closed")
+
+            with self.assertRaises(RuntimeError):
+                pool.run(crash)
+            self.assertEqual(pool.user_agent(), "Mozilla/5.0 (fake)")
+            self.assertEqual(pool.launches, 2)
+            self.assertEqual(launcher.stopped, 1)
+        finally:
+            pool.close()
+
+    def test_hung_call_recycles_the_browser(self) -> None:
+        launcher = FakeLauncher()
+        pool = BrowserPool(launcher=launcher, idle_seconds=60, task_timeout=0.2)
+        release = threading.Event()
+        try:
+
+            def hang(context: Any) -> None:
+                release.wait(10)
+
+            with self.assertRaises(TimeoutError):
+                pool.run(hang)
+            # the next call gets a new browser instead of queueing behind the hang
+            self.assertEqual(pool.user_agent(), "Mozilla/5.0 (fake)")
+            self.assertEqual((pool.launches, pool.recycles), (2, 1))
+            self.assertEqual(launcher.stopped, 0)
+            # the old browser is closed once the hung call returns
+            release.set()
+            deadline = time.time() + 5
+            while launcher.stopped == 0 and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(launcher.stopped, 1)
+        finally:
+            release.set()
+            pool.close()
+        self.assertEqual(launcher.stopped, 2)
+
+    def test_idle_browser_is_closed(self) -> None:
+        launcher = FakeLauncher()
+        pool = BrowserPool(launcher=launcher, idle_seconds=0.05)
+        try:
+            pool.user_agent()
+            deadline = time.time() + 5
+            while launcher.stopped == 0 and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(launcher.stopped, 1)
+            pool.user_agent()
+            self.assertEqual(pool.launches, 2)
+        finally:
+            pool.close()
+
+    def test_nested_call_is_refused(self) -> None:
+        pool = BrowserPool(launcher=FakeLauncher(), idle_seconds=60)
+        try:
+            with self.assertRaises(RuntimeError):
+                pool.run(lambda context: pool.user_agent())
+        finally:
+            pool.close()
+
+    def test_user_agent_cache(self) -> None:
+        with TemporaryDirectory() as tmp:
+            path = Path(tmp) / "user_agent.json"
+            self.assertIsNone(read_cached_user_agent(path))
+            write_cached_user_agent("UA/1", path, now=1000.0)
+            self.assertEqual(
+                read_cached_user_agent(path, ttl_seconds=60, now=1030.0), "UA/1"
+            )
+            self.assertIsNone(read_cached_user_agent(path, ttl_seconds=60, now=1100.0))
+
+            def no_browser() -> tuple[Any, Callable[[], None]]:
+                raise AssertionError("the cached user agent should be used")
+
+            write_cached_user_agent("UA/2", path)
+            self.assertEqual(
+                get_user_agent(BrowserPool(launcher=no_browser), path), "UA/2"
+            )
+
+            path.write_text("not json")
+            pool = BrowserPool(launcher=FakeLauncher(), idle_seconds=60)
+            try:
+                self.assertEqual(get_user_agent(pool, path), "Mozilla/5.0 (fake)")
+            finally:
+                pool.close()
+            self.assertEqual(read_cached_user_agent(path), "Mozilla/5.0 (fake)")
+
+
+if __name__ == "__main__":
+    unittest.main()
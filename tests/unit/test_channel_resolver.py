@@ -0,0 +1,116 @@
+"""
+Unit test file.
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from youtube_sync.channel_resolver import (
+    ChannelResolution,
+    ChannelResolver,
+    set_channel_resolver_path,
+    youtube_channel_id,
+)
+from youtube_sync.ytdlp.error import ChannelIdNotFound
+
+URL = "https://rumble.com/user/fixture"
+
+
+class ChannelResolverTester(unittest.TestCase):
+    """Main tester class."""
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "channels.json"
+        self.lookups = 0
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def _resolver(self) -> ChannelResolver:
+        return ChannelResolver(cache_path=self.path, ttl=1000, negative_ttl=100)
+
+    def _found(self) -> ChannelResolution:
+        self.lookups += 1
+        return ChannelResolution(url=URL, is_user=True)
+
+    def _missing(self) -> ChannelResolution:
+        self.lookups += 1
+        return ChannelResolution(error="Could not find channel or user fixture")
+
+    def _down(self) -> ChannelResolution:
+        self.lookups += 1
+        raise ValueError("HTTP 503")
+
+    def test_cached_and_persisted(self) -> None:
+        resolver = self._resolver()
+        self.assertEqual(
+            resolver.resolve("rumble:fixture", self._found, now=0).url, URL
+        )
+        self.assertEqual(
+            resolver.resolve("rumble:fixture", self._found, now=999).url, URL
+        )
+        self.assertEqual(self.lookups, 1)
+        # a new process reads the file
+        self.assertTrue(
+            self._resolver().resolve("rumble:fixture", self._found, now=10).is_user
+        )
+        self.assertEqual(self.lookups, 1)
+        # expired, looked up again
+        self._resolver().resolve("rumble:fixture", self._found, now=1000)
+        self.assertEqual(self.lookups, 2)
+
+    def test_negative_and_errors(self) -> None:
+        resolver = self._resolver()
+        self.assertIsNone(resolver.resolve("rumble:gone", self._missing, now=0).url)
+        self.assertIsNone(resolver.resolve("rumble:gone", self._missing, now=99).url)
+        self.assertEqual(self.lookups, 1)
+        resolver.resolve("rumble:gone", self._missing, now=100)
+        self.assertEqual(self.lookups, 2)
+
+        # errors aren't cached, an expired answer stands in
+        with self.assertRaises(ValueError):
+            resolver.resolve("rumble:fixture", self._down, now=0)
+        resolver.resolve("rumble:fixture", self._found, now=0)
+        self.assertEqual(
+            resolver.resolve("rumble:fixture", self._down, now=5000).url, URL
+        )
+        self.assertEqual(self.lookups, 5)
+
+    def test_youtube_channel_id(self) -> None:
+        set_channel_resolver_path(self.path)
+        fetched: list[str] = []
+
+        def fetch(url: str) -> str:
+            fetched.append(url)
+            if "gone" in url:
+                raise ChannelIdNotFound(
+                    f"Could not find channel id in: {url} using yt-dlp."
+                )
+            if "down" in url:
+                raise RuntimeError("Failed to run yt-dlp: HTTP Error 429")
+            return "UCfixture"
+
+        url = "https://www.youtube.com/channel/UC0123456789abcdefghijkl/videos"
+        self.assertEqual(youtube_channel_id(url, fetch), "UC0123456789abcdefghijkl")
+        self.assertEqual(fetched, [])
+        url = "https://www.youtube.com/@fixture/videos"
+        self.assertEqual(youtube_channel_id(url, fetch), "UCfixture")
+        self.assertEqual(youtube_channel_id(url, fetch), "UCfixture")
+        gone = "https://www.youtube.com/@gone/videos"
+        self.assertIsNone(youtube_channel_id(gone, fetch))
+        self.assertIsNone(youtube_channel_id(gone, fetch))
+        self.assertEqual(fetched, [url, gone])
+
+        # a failed yt-dlp run isn't remembered as a missing channel
+        down = "https://www.youtube.com/@down/videos"
+        with self.assertRaises(RuntimeError):
+            youtube_channel_id(down, fetch)
+        with self.assertRaises(RuntimeError):
+            youtube_channel_id(down, fetch)
+        self.assertEqual(fetched, [url, gone, down, down])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,200 @@
+"""
+Unit test file.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Any
+
+from youtube_sync import RealFS
+from youtube_sync.config import Channel, CmdOptions, Config
+from youtube_sync.control import (
+    Action,
+    ChannelState,
+    ControlApi,
+    ControlError,
+    TriggerThread,
+    status_board,
+)
+from youtube_sync.daemon import URGENT_PRIORITY, SyncDaemon
+from youtube_sync.job_queue import JobKind, JobQueue
+from youtube_sync.source_health import SourceHealthController
+from youtube_sync.types import Source
+from youtube_sync.web_server import ENV_WORKER_TOKEN, start_web_server
+
+CHANNEL = Channel(name="fixture", source=Source.RUMBLE, channel_id="fixture")
+HELD = Channel(name="held", source=Source.RUMBLE, channel_id="held")
+
+
+class ControlTester(unittest.TestCase):
+    """Main tester class."""
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.health = SourceHealthController(
+            state_path=Path(self.tmp.name) / "health.json"
+        )
+        self.triggered: list[tuple[str, Action]] = []
+        self.old_token = os.environ.get(ENV_WORKER_TOKEN)
+        os.environ[ENV_WORKER_TOKEN] = "secret"
+        self.server = start_web_server(0, host="127.0.0.1")
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        ControlApi([CHANNEL, HELD], self._trigger, health=self.health).register_routes()
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+        if self.old_token is None:
+            os.environ.pop(ENV_WORKER_TOKEN, None)
+        else:
+            os.environ[ENV_WORKER_TOKEN] = self.old_token
+
+    def _trigger(self, channel: Channel, action: Action) -> None:
+        if channel.name == "held":
+            raise ControlError("held is held by another node")
+        self.triggered.append((channel.name, action))
+
+    def _call(
+        self, method: str, path: str, body: Any = None, token: str | None = "secret"
+    ) -> tuple[int, Any]:
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        req = urllib.request.Request(
+            f"{self.url}{path}", data=data, headers=headers, method=method
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=10) as resp:
+                return resp.status, json.loads(resp.read() or b"null")
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read() or b"null")
+
+    def test_triggers(self) -> None:
+        self.assertEqual(
+            self._call("POST", "/api/scan", {"channel": "fixture"})[0], 202
+        )
+        self.assertEqual(
+            self._call("POST", "/api/download", {"channel": "fixture"})[0], 202
+        )
+        self.assertEqual(
+            self.triggered, [("fixture", Action.SCAN), ("fixture", Action.DOWNLOAD)]
+        )
+        self.assertEqual(self._call("POST", "/api/scan", {"channel": "nope"})[0], 404)
+        self.assertEqual(self._call("POST", "/api/scan", {"channel": "held"})[0], 409)
+        self.assertEqual(self._call("POST", "/api/scan", ["fixture"])[0], 400)
+        # commands want the token, the status doesn't
+        self.assertEqual(
+            self._call("POST", "/api/scan", {"channel": "fixture"}, token=None)[0], 401
+        )
+        self.assertEqual(
+            self._call("POST", "/api/pause", {"source": "rumble"}, token="wrong")[0],
+            401,
+        )
+        self.assertEqual(self._call("GET", "/api/status", token=None)[0], 200)
+        self.assertEqual(len(self.triggered), 2)
+        self.assertFalse(self.health.is_paused(Source.RUMBLE))
+
+    def test_pause_resume_and_status(self) -> None:
+        status, body = self._call(
+            "POST", "/api/pause", {"source": "rumble", "minutes": 5}
+        )
+        self.assertEqual(status, 200)
+        self.assertAlmostEqual(body["paused_until"], time.time() + 300, delta=5)
+        self.assertTrue(self.health.is_paused(Source.RUMBLE))
+        self.assertEqual(
+            self._call("POST", "/api/pause", {"source": "myspace"})[0], 400
+        )
+        for minutes in ([], "soon", True, -5):
+            self.assertEqual(
+                self._call(
+                    "POST", "/api/pause", {"source": "youtube", "minutes": minutes}
+                )[0],
+                400,
+            )
+        self.assertFalse(self.health.is_paused(Source.YOUTUBE))
+
+        board = status_board()
+        with board.activity(CHANNEL, ChannelState.DOWNLOADING, in_flight=3):
+            _, body = self._call("GET", "/api/status")
+            fixture = next(c for c in body["channels"] if c["channel"] == "fixture")
+            self.assertEqual(
+                (fixture["state"], fixture["in_flight"]), ("downloading", 3)
+            )
+        self.assertEqual(body["sources"][0]["state"], "open")
+
+        self.assertEqual(
+            self._call("POST", "/api/resume", {"source": "rumble"})[0], 200
+        )
+        self.assertFalse(self.health.is_paused(Source.RUMBLE))
+        with self.assertRaises(RuntimeError):
+            with board.activity(CHANNEL, ChannelState.SCANNING):
+                raise RuntimeError("ERROR: HTTP Error 429")
+        _, body = self._call("GET", "/api/status")
+        fixture = next(c for c in body["channels"] if c["channel"] == "fixture")
+        self.assertEqual(fixture["state"], "idle")
+        self.assertIn("429", fixture["last_error"])
+
+    def test_trigger_thread(self) -> None:
+        release = threading.Event()
+        ran: list[tuple[str, Action]] = []
+
+        def run(channel: Channel, action: Action) -> None:
+            release.wait(10)
+            ran.append((channel.name, action))
+
+        runner = TriggerThread(run)
+        runner(HELD, Action.SCAN)  # blocks the thread
+        runner(CHANNEL, Action.SCAN)
+        runner(CHANNEL, Action.SCAN)  # already waiting
+        release.set()
+        runner.join()
+        self.assertEqual(ran, [("held", Action.SCAN), ("fixture", Action.SCAN)])
+
+    def test_daemon_trigger(self) -> None:
+        queue = JobQueue(Path(self.tmp.name) / "jobs.sqlite3")
+        try:
+            config = Config(
+                output=self.tmp.name,
+                rclone={},
+                channels=[CHANNEL],
+                cmd_options=CmdOptions(download=True, scan=True),
+            )
+            daemon = SyncDaemon(config, RealFS.from_path(Path(self.tmp.name)), queue)
+            later = time.time() + 3600
+            url = "https://rumble.com/v1-new.html"
+            queue.enqueue(
+                JobKind.DOWNLOAD,
+                f"download:rumble:fixture:{url}",
+                {"channel": "fixture", "url": url},
+                due_at=later,
+                priority=2,
+            )
+            queue.enqueue(
+                JobKind.SCAN,
+                "scan:rumble:fixture",
+                {"channel": "fixture"},
+                due_at=later,
+            )
+
+            daemon.trigger(CHANNEL, Action.DOWNLOAD)
+            job = queue.lease("w", [JobKind.DOWNLOAD])
+            assert job is not None
+            self.assertEqual(job.priority, URGENT_PRIORITY)
+            # queued downloads were enough, the scan keeps its schedule
+            self.assertIsNone(queue.lease("w", [JobKind.SCAN]))
+
+            daemon.trigger(CHANNEL, Action.SCAN)
+            self.assertEqual(queue.lease("w", [JobKind.SCAN]).key, "scan:rumble:fixture")  # type: ignore[union-attr]
+        finally:
+            queue.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+Unit test file.
+"""
+
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from youtube_sync import cookies as cookies_module
+from youtube_sync.cookie_refresher import CookieRefresher
+from youtube_sync.cookies import (
+    Cookies,
+    get_or_refresh_cookies,
+    parse_cookie_expiries,
+    set_cookie_root_path,
+)
+from youtube_sync.source_health import SourceHealthController
+from youtube_sync.types import Source
+
+
+def _cookies_txt(*expiries: float) -> str:
+    lines = [
+        "# Netscape HTTP Cookie File",
+        "# http://curl.haxx.se/rfc/cookie_spec.html",
+    ]
+    for i, expiry in enumerate(expiries):
+        prefix = "#HttpOnly_" if i % 2 else ""
+        lines.append(f"{prefix}.youtube.com\tTRUE\t/\tTRUE\t{int(expiry)}\tc{i}\tv{i}")
+    return "\n".join(lines)
+
+
+def _make_cookies(created: datetime, *expiries: float) -> Cookies:
+    out = Cookies.from_txt(Source.YOUTUBE, _cookies_txt(*expiries))
+    out.creation_time = created
+    return out
+
+
+class CookieRefresherTester(unittest.TestCase):
+    """Main tester class."""
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        set_cookie_root_path(Path(self.tmp.name))
+        self.health = SourceHealthController(
+            state_path=Path(self.tmp.name) / "health.json"
+        )
+
+    def tearDown(self) -> None:
+        set_cookie_root_path(Path("cookies"))
+        self.tmp.cleanup()
+
+    def test_parse_expiries(self) -> None:
+        text = _cookies_txt(0, 2000000000, 1900000000) + "\nbroken line\n"
+        self.assertEqual(parse_cookie_expiries(text), [2000000000.0, 1900000000.0])
+
+    def test_refresh_due_at(self) -> None:
+        now = datetime.now()
+        soon = (now + timedelta(hours=5)).timestamp()
+        short_lived = (now + timedelta(minutes=10)).timestamp()
+        cookies = _make_cookies(now, short_lived, soon, 0)
+        # the short lived cookie is rotated by the site, it doesn't count
+        self.assertEqual(int(cookies.refresh_due_at().timestamp()), int(soon))
+        self.assertFalse(cookies.needs_refresh(now))
+        self.assertTrue(cookies.needs_refresh(now + timedelta(hours=6)))
+        # ages beyond a day count in full
+        old = _make_cookies(now - timedelta(days=3), 0)
+        self.assertTrue(old.needs_refresh(now))
+        self.assertGreater(old.age_seconds(now), 2 * 24 * 60 * 60)
+
+    def test_stale_cached_cookies_are_replaced(self) -> None:
+        now = datetime.now()
+        stale = _make_cookies(now - timedelta(days=3), 0)
+        fresh = _make_cookies(now, 0)
+        fresh.save(fresh.path_pkl)
+        fresh.save(fresh.path_txt)
+        self.assertEqual(list(Path(fresh.path_txt).parent.glob("*.tmp")), [])
+        with cookies_module.COOKIES_LOCK:
+            cookies_module.COOKIES[Source.YOUTUBE] = stale
+        out = get_or_refresh_cookies(Source.YOUTUBE, None)
+        self.assertEqual(out.creation_time, fresh.creation_time)
+        self.assertIs(get_or_refresh_cookies(Source.YOUTUBE, None), out)
+
+    def test_background_refresh(self) -> None:
+        now = datetime.now()
+        fetched: list[Source] = []
+
+        def fetch(source: Source) -> Cookies:
+            fetched.append(source)
+            return _make_cookies(
+                datetime.now(), (datetime.now() + timedelta(days=30)).timestamp()
+            )
+
+        refresher = CookieRefresher(
+            check_seconds=60,
+            lead_seconds=3600,
+            min_refresh_seconds=600,
+            fetch=fetch,
+            health=self.health,
+        )
+        expiring = _make_cookies(now, (now + timedelta(minutes=30)).timestamp())
+        expiring.creation_time = now - timedelta(hours=1)  # a 90 minute cookie
+        with cookies_module.COOKIES_LOCK:
+            cookies_module.COOKIES[Source.YOUTUBE] = expiring
+        self.assertEqual(refresher.check_once(), [Source.YOUTUBE])
+        self.assertIsNot(cookies_module.COOKIES[Source.YOUTUBE], expiring)
+
+        # fresh cookies are left alone, even past the minimum interval
+        self.assertEqual(refresher.check_once(time.time() + 700), [])
+
+        # a bot check after the cookies were made forces a refresh
+        self.health.record_failure(
+            Source.YOUTUBE, "Sign in to confirm you're not a bot"
+        )
+        self.assertEqual(refresher.check_once(), [])  # too soon after the last one
+        self.assertEqual(refresher.check_once(time.time() + 700), [Source.YOUTUBE])
+        self.assertEqual(fetched, [Source.YOUTUBE, Source.YOUTUBE])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,182 @@
+"""
+Unit test file.
+"""
+
+import os
+import tempfile
+import unittest
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from youtube_sync import RealFS
+from youtube_sync.coordinator import Coordinator, RemoteDownloadError
+from youtube_sync.download_worker import DownloadWorker, RemoteTask
+from youtube_sync.final_result import FinalResult
+from youtube_sync.types import Source
+from youtube_sync.web_server import ENV_WORKER_TOKEN, start_web_server
+from youtube_sync.ytdlp.download_request import DownloadRequest
+from youtube_sync.ytdlp.error import SourcePausedException
+
+UPLOAD_DATE = datetime(2025, 1, 2)
+
+
+def _fake_run(
+    task: RemoteTask, _: ThreadPoolExecutor
+) -> tuple[FinalResult, bytes | None]:
+    """Stands in for yt-dlp and ffmpeg on the worker."""
+    di = DownloadRequest(
+        url=task.url,
+        outmp3=RealFS.from_path(Path("unused.mp3")),
+        download_vid=True,
+        download_date=True,
+    )
+    if "paused" in task.url:
+        return (
+            FinalResult(
+                request=di,
+                date=None,
+                exception=SourcePausedException("rumble is paused"),
+            ),
+            None,
+        )
+    if "broken" in task.url:
+        return (
+            FinalResult(
+                request=di,
+                date=UPLOAD_DATE,
+                exception=RuntimeError("ERROR: HTTP Error 429"),
+            ),
+            None,
+        )
+    return FinalResult(
+        request=di, date=UPLOAD_DATE, exception=None
+    ), b"ID3" + task.url.encode("utf-8")
+
+
+class CoordinatorTester(unittest.TestCase):
+    """Main tester class."""
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.out = Path(self.tmp.name)
+        self.old_token = os.environ.get(ENV_WORKER_TOKEN)
+        os.environ[ENV_WORKER_TOKEN] = "secret"
+        self.server = start_web_server(0, host="127.0.0.1")
+        self.coordinator = Coordinator(
+            lease_seconds=60, max_attempts=2, max_result_bytes=1024
+        )
+        self.coordinator.register_routes()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.worker = DownloadWorker(self.url, name="test", runner=_fake_run)
+        self.pool = ThreadPoolExecutor(max_workers=1)
+
+    def tearDown(self) -> None:
+        self.pool.shutdown()
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+        if self.old_token is None:
+            os.environ.pop(ENV_WORKER_TOKEN, None)
+        else:
+            os.environ[ENV_WORKER_TOKEN] = self.old_token
+
+    def _post(self, path: str, body: bytes, token: str | None) -> int:
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        req = urllib.request.Request(
+            f"{self.url}{path}", data=body, headers=headers, method="POST"
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=10) as resp:
+                return int(resp.status)
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    def _request(self, name: str) -> DownloadRequest:
+        return DownloadRequest(
+            url=f"https://rumble.com/{name}.html",
+            outmp3=RealFS.from_path(self.out / "channel" / f"{name}.mp3"),
+            download_vid=True,
+            download_date=True,
+        )
+
+    def test_worker_round_trip(self) -> None:
+        futures = self.coordinator.download_mp3s(
+            [self._request("ok"), self._request("broken"), self._request("paused")],
+            Source.RUMBLE,
+        )
+        for _ in futures:
+            self.assertTrue(self.worker.run_once(0, self.pool))
+        ok, broken, paused = (f.result(timeout=10) for f in futures)
+
+        # the coordinator wrote the audio, the worker only had a temp dir
+        self.assertIsNone(ok.exception)
+        self.assertEqual(ok.date, UPLOAD_DATE)
+        self.assertEqual(
+            (self.out / "channel" / "ok.mp3").read_bytes(),
+            b"ID3https://rumble.com/ok.html",
+        )
+
+        self.assertIsInstance(broken.exception, RemoteDownloadError)
+        self.assertIn("429", str(broken.exception))
+        self.assertEqual(broken.date, UPLOAD_DATE)
+        self.assertFalse((self.out / "channel" / "broken.mp3").exists())
+        self.assertIsInstance(paused.exception, SourcePausedException)
+        self.assertEqual(self.coordinator.pending(), 0)
+
+    def test_lost_worker(self) -> None:
+        future = self.coordinator.submit(self._request("ok"), Source.RUMBLE)
+        now = 1000.0
+        first = self.coordinator.lease("gone", now=now)
+        assert first is not None
+        self.assertIsNone(self.coordinator.lease("other", now=now + 1))
+        # the lease runs out and another worker gets the task
+        second = self.coordinator.lease("other", now=now + 61)
+        assert second is not None
+        self.assertEqual(second.id, first.id)
+        # a late result of the lost worker is refused
+        self.assertTrue(self.coordinator.complete(second.id, None, None, b"ID3"))
+        self.assertFalse(self.coordinator.complete(first.id, None, None, b"ID3"))
+        self.assertIsNone(future.result(timeout=1).exception)
+
+        # out of tries, the download fails
+        future = self.coordinator.submit(self._request("slow"), Source.RUMBLE)
+        self.coordinator.lease("a", now=now)
+        self.coordinator.lease("b", now=now + 61)
+        self.assertIsNone(self.coordinator.lease("c", now=now + 122))
+        self.assertIsInstance(future.result(timeout=1).exception, RemoteDownloadError)
+
+    def test_expiry_without_workers(self) -> None:
+        coordinator = Coordinator(
+            lease_seconds=0.2, max_attempts=1, pending_seconds=0.3, reap_seconds=0.05
+        )
+        # nobody ever asks for work
+        never_taken = coordinator.submit(self._request("queued"), Source.RUMBLE)
+        result = never_taken.result(timeout=10)
+        self.assertIsInstance(result.exception, RemoteDownloadError)
+        self.assertIn("No worker took", str(result.exception))
+        # the only worker dies with the task
+        abandoned = coordinator.submit(self._request("leased"), Source.RUMBLE)
+        self.assertIsNotNone(coordinator.lease("gone"))
+        result = abandoned.result(timeout=10)
+        self.assertIn("No worker finished", str(result.exception))
+        self.assertEqual((coordinator.pending(), coordinator.leased()), (0, {}))
+
+    def test_worker_auth(self) -> None:
+        lease = b'{"worker": "x", "wait": 0}'
+        self.assertEqual(self._post("/worker/lease", lease, None), 401)
+        self.assertEqual(self._post("/worker/lease", lease, "wrong"), 401)
+        self.assertEqual(self._post("/worker/lease", lease, "secret"), 204)
+        # results over the limit are refused before they're read
+        self.assertEqual(
+            self._post("/worker/result", b"{}\n" + b"x" * 2048, "secret"), 413
+        )
+        # without a configured token nobody gets in
+        del os.environ[ENV_WORKER_TOKEN]
+        self.assertEqual(self._post("/worker/lease", lease, "secret"), 403)
+
+
+if __name__ == "__main__":
+    unittest.main()
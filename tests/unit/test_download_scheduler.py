@@ -0,0 +1,83 @@
+"""
+Unit test file.
+"""
+
+import unittest
+from datetime import date, timedelta
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from youtube_sync import RealFS
+from youtube_sync.download_scheduler import DownloadScheduler, Lane, order_for_download
+from youtube_sync.library import Library
+from youtube_sync.vid_entry import VidEntry
+
+
+def _make_vid(channel: str, index: int, days_ago: int | None) -> VidEntry:
+    upload_date = None
+    if days_ago is not None:
+        upload_date = date.today() - timedelta(days=days_ago)
+    return VidEntry(
+        url=f"https://www.youtube.com/watch?v={channel}{index}",
+        title=f"{channel} {index}",
+        file_path=f"{channel}_{index}.mp3",
+        upload_date=upload_date,
+    )
+
+
+def _make_library(temp_dir: str, name: str) -> Library:
+    json_path = RealFS.from_path(Path(temp_dir) / name / "library.json")
+    return Library(
+        channel_name=name,
+        channel_url=f"https://www.youtube.com/@{name}/videos",
+        source="youtube",
+        json_path=json_path,
+    )
+
+
+class DownloadSchedulerTester(unittest.TestCase):
+    """Main tester class."""
+
+    def test_fresh_first(self) -> None:
+        vids = [
+            _make_vid("a", 0, 400),
+            _make_vid("a", 1, 300),
+            _make_vid("a", 2, 2),
+            _make_vid("a", 3, 1),
+        ]
+        ordered = order_for_download(vids, fresh_days=7)
+        self.assertEqual([vid.title for vid in ordered], ["a 3", "a 2", "a 0", "a 1"])
+
+    def test_round_robin_with_weights(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            big = _make_library(temp_dir, "big")
+            small = _make_library(temp_dir, "small")
+            scheduler = DownloadScheduler(fresh_days=7)
+            scheduler.add(
+                big, [_make_vid("big", i, 100 + i) for i in range(20)], weight=2
+            )
+            scheduler.add(small, [_make_vid("small", i, 100 + i) for i in range(3)])
+            plan = scheduler.plan(limit=6)
+            channels = [item.channel_name for item in plan]
+            self.assertEqual(channels, ["big", "big", "small", "big", "big", "small"])
+
+    def test_fresh_lane_across_channels(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            lib_a = _make_library(temp_dir, "a")
+            lib_b = _make_library(temp_dir, "b")
+            scheduler = DownloadScheduler(fresh_days=7)
+            scheduler.add(lib_a, [_make_vid("a", i, 500 + i) for i in range(10)])
+            scheduler.add(lib_b, [_make_vid("b", 0, 900), _make_vid("b", 1, 1)])
+            plan = scheduler.plan(limit=3)
+            self.assertEqual(plan[0].lane, Lane.FRESH)
+            self.assertEqual(plan[0].vid.title, "b 1")
+            self.assertTrue(all(item.lane == Lane.BACKFILL for item in plan[1:]))
+            queue = scheduler.queue()
+            self.assertEqual(len(queue), 12)
+            self.assertEqual(queue[0]["lane"], "fresh")
+            grouped = scheduler.plan_by_library(limit=3)
+            self.assertEqual([lib.channel_name for lib, _ in grouped], ["b", "a"])
+
+
+if __name__ == "__main__":
+    unittest.main()
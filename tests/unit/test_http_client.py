@@ -0,0 +1,118 @@
+"""
+Unit test file.
+"""
+
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+from youtube_sync.http_client import FetchResult, HttpClient
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.lock = threading.Lock()
+        self.peers: set[Any] = set()
+        self.hits: dict[str, int] = {}
+        self.active = 0
+        self.max_active = 0
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    server: _Server
+
+    def do_GET(self) -> None:  # noqa: N802
+        srv = self.server
+        with srv.lock:
+            srv.peers.add(self.client_address)
+            srv.hits[self.path] = srv.hits.get(self.path, 0) + 1
+            hits = srv.hits[self.path]
+            srv.active += 1
+            srv.max_active = max(srv.max_active, srv.active)
+        try:
+            status = 200
+            if self.path.startswith("/slow"):
+                time.sleep(0.2)
+            elif self.path == "/flaky" and hits == 1:
+                status = 503
+            elif self.path == "/limited":
+                status = 429
+            body = self.path.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with srv.lock:
+                srv.active -= 1
+
+    def log_message(
+        self, format: str, *args: Any
+    ) -> None:  # pylint: disable=redefined-builtin
+        pass
+
+
+class HttpClientTester(unittest.TestCase):
+    """Main tester class."""
+
+    def setUp(self) -> None:
+        self.server = _Server()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.client = HttpClient(per_host=2, retries=2, http2=False)
+
+    def tearDown(self) -> None:
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_keep_alive(self) -> None:
+        for i in range(5):
+            result = self.client.fetch(f"{self.base}/page{i}")
+            self.assertEqual((result.status_code, result.html), (200, f"/page{i}"))
+        # one connection, reused
+        self.assertEqual(len(self.server.peers), 1)
+
+    def test_retries(self) -> None:
+        self.assertTrue(self.client.fetch(f"{self.base}/flaky").ok)
+        self.assertEqual(self.server.hits["/flaky"], 2)
+        # rate limits go back to the caller
+        self.assertEqual(self.client.fetch(f"{self.base}/limited").status_code, 429)
+        self.assertEqual(self.server.hits["/limited"], 1)
+
+    def test_fetch_many(self) -> None:
+        urls = [f"{self.base}/slow{i}" for i in range(6)] + [
+            "http://127.0.0.1:1/refused"
+        ]
+        results = self.client.fetch_many(urls, concurrency=8, timeout=5)
+        self.assertEqual(
+            [r.html for r in results[:6] if isinstance(r, FetchResult)],
+            [f"/slow{i}" for i in range(6)],
+        )
+        self.assertIsInstance(results[6], Exception)
+        # never more than per_host requests at the same host
+        self.assertEqual(self.server.max_active, 2)
+        self.assertLessEqual(len(self.server.peers), 2)
+
+    def test_session_is_capped(self) -> None:
+        # the scanners use the session directly, not fetch()
+        def get(i: int) -> None:
+            self.client.session.get(f"{self.base}/slow{i}", timeout=5)
+
+        threads = [threading.Thread(target=get, args=(i,)) for i in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(sum(self.server.hits.values()), 6)
+        self.assertEqual(self.server.max_active, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+"""
+Unit test file.
+"""
+
+import json
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+from youtube_sync.vid_entry import VidEntry
+from youtube_sync.youtube.innertube_scanner import (
+    InnerTubeError,
+    InnerTubeScanner,
+    InnerTubeVideo,
+    parse_channel_page,
+)
+
+HERE = Path(__file__).parent
+FIXTURES = HERE / "test_data" / "innertube"
+
+CHANNEL_URL = "https://www.youtube.com/@fixture"
+NOW = datetime(2025, 6, 1, 12, 0, 0)
+
+
+class FakeResponse:
+    def __init__(self, text: str, status_code: int = 200) -> None:
+        self.text = text
+        self.status_code = status_code
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP Error {self.status_code}")
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+
+class FakeSession:
+    """Serves the recorded channel page and continuations."""
+
+    def __init__(self, page_status: int = 200) -> None:
+        self.page_status = page_status
+        self.gets: list[str] = []
+        self.posts: list[dict[str, Any]] = []
+
+    def get(self, url: str, **kwargs: Any) -> FakeResponse:
+        self.gets.append(url)
+        html = (FIXTURES / "channel_videos.html").read_text(encoding="utf-8")
+        return FakeResponse(html, self.page_status)
+
+    def post(
+        self, url: str, json: dict[str, Any], **kwargs: Any
+    ) -> FakeResponse:  # pylint: disable=redefined-outer-name
+        assert "key=AIzaFixtureKey" in url
+        self.posts.append(json)
+        name = {
+            "4qmFsgKlARIYVUNfcGFnZV8y": "continuation_1.json",
+            "4qmFsgKlARIYVUNfcGFnZV8z": "continuation_2.json",
+        }[json["continuation"]]
+        return FakeResponse((FIXTURES / name).read_text(encoding="utf-8"))
+
+
+class InnerTubeScannerTester(unittest.TestCase):
+    """Main tester class."""
+
+    def test_parse_channel_page(self) -> None:
+        html = (FIXTURES / "channel_videos.html").read_text(encoding="utf-8")
+        data, api_key, context = parse_channel_page(html)
+        self.assertIn("contents", data)
+        self.assertEqual(api_key, "AIzaFixtureKey")
+        self.assertEqual(context["client"]["clientName"], "WEB")
+        with self.assertRaises(InnerTubeError):
+            parse_channel_page("<html>consent page</html>")
+
+    def test_full_scan_follows_continuations(self) -> None:
+        session = FakeSession()
+        vids = InnerTubeScanner(session=session).scan(
+            CHANNEL_URL, stored_vids=[], limit=None, now=NOW
+        )
+        self.assertEqual(session.gets, [CHANNEL_URL + "/videos"])
+        # the grid's tokens are followed, not the sort chips'
+        self.assertEqual(
+            [p["continuation"] for p in session.posts],
+            ["4qmFsgKlARIYVUNfcGFnZV8y", "4qmFsgKlARIYVUNfcGFnZV8z"],
+        )
+        self.assertEqual(
+            session.posts[0]["context"]["client"]["clientVersion"], "2.20250101.01.00"
+        )
+        self.assertEqual(len(vids), 9)
+        self.assertEqual(vids[0].url, "https://www.youtube.com/watch?v=vid00000000")
+        self.assertEqual(vids[0].title, "Episode 0: the news of the week")
+        self.assertEqual(vids[6].url, "https://www.youtube.com/watch?v=lockup00006")
+        self.assertEqual(vids[6].title, "Episode 6: from the new layout")
+        # publish hints become the vid dates
+        self.assertEqual(vids[0].date, NOW - timedelta(hours=3))
+        self.assertEqual(vids[2].date, NOW - timedelta(days=4))
+        self.assertEqual(vids[8].date, NOW - timedelta(days=2 * 365))
+
+    def test_incremental_scan_stops_at_known_vid(self) -> None:
+        session = FakeSession()
+        known = [VidEntry(url="https://www.youtube.com/watch?v=vid00000002", title="x")]
+        vids = InnerTubeScanner(session=session).scan(
+            CHANNEL_URL, stored_vids=known, limit=None, now=NOW
+        )
+        self.assertEqual(len(vids), 2)
+        self.assertEqual(session.posts, [])
+
+        vids = InnerTubeScanner(session=FakeSession()).scan(
+            CHANNEL_URL, stored_vids=[], limit=5, now=NOW
+        )
+        self.assertEqual(len(vids), 5)
+
+    def test_errors_raise_innertube_error(self) -> None:
+        with self.assertRaises(InnerTubeError):
+            InnerTubeScanner(session=FakeSession(page_status=429)).scan(
+                CHANNEL_URL, [], None
+            )
+
+    def test_published_estimate(self) -> None:
+        video = InnerTubeVideo(
+            video_id="abc", title="t", published_text="Streamed 3 weeks ago"
+        )
+        self.assertEqual(video.published_estimate(NOW), NOW - timedelta(weeks=3))
+        self.assertIsNone(
+            InnerTubeVideo(video_id="abc", title="t").published_estimate(NOW)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,234 @@
+"""
+Unit test file.
+"""
+
+import os
+import socket
+import tempfile
+import time
+import unittest
+from datetime import date
+from pathlib import Path
+
+from youtube_sync import RealFS
+from youtube_sync.config import Channel, CmdOptions, Config
+from youtube_sync.daemon import BACKFILL_PRIORITY, FRESH_PRIORITY, SyncDaemon
+from youtube_sync.job_queue import (
+    Job,
+    JobKind,
+    JobQueue,
+    JobState,
+    JobWorker,
+    Retry,
+    worker_id,
+)
+from youtube_sync.types import Source
+from youtube_sync.vid_entry import VidEntry
+
+
+class JobQueueTester(unittest.TestCase):
+    """Main tester class."""
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "jobs.sqlite3"
+        self.queue = JobQueue(self.path)
+
+    def tearDown(self) -> None:
+        self.queue.close()
+        self.tmp.cleanup()
+
+    def test_lease_order_and_dedupe(self) -> None:
+        now = time.time()
+        self.assertTrue(
+            self.queue.enqueue(
+                JobKind.DOWNLOAD, "d1", {"n": 1}, due_at=now - 10, priority=2
+            )
+        )
+        self.assertTrue(
+            self.queue.enqueue(
+                JobKind.DOWNLOAD, "d2", {"n": 2}, due_at=now - 5, priority=1
+            )
+        )
+        self.assertTrue(self.queue.enqueue(JobKind.SCAN, "s1", {}, due_at=now + 3600))
+        # same key: no second job
+        self.assertFalse(
+            self.queue.enqueue(JobKind.DOWNLOAD, "d1", {"n": 1}, due_at=now + 100)
+        )
+
+        job = self.queue.lease("w", now=now)
+        assert job is not None
+        self.assertEqual(job.key, "d2")  # higher priority first
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(self.queue.lease("w", now=now).key, "d1")  # type: ignore[union-attr]
+        # the scan isn't due yet, and leased jobs aren't handed out twice
+        self.assertIsNone(self.queue.lease("w", now=now))
+        self.assertEqual(self.queue.lease("w", [JobKind.SCAN], now=now + 3601).key, "s1")  # type: ignore[union-attr]
+
+    def test_complete_fail_and_requeue(self) -> None:
+        self.queue.enqueue(JobKind.DOWNLOAD, "d1", {}, max_attempts=2)
+        job = self.queue.lease("w")
+        assert job is not None
+        self.assertEqual(self.queue.fail(job, "boom", retry_in=0), JobState.QUEUED)
+        job = self.queue.lease("w")
+        assert job is not None
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(self.queue.fail(job, "boom again"), JobState.FAILED)
+        self.assertIsNone(self.queue.lease("w"))
+        failed = self.queue.jobs(JobState.FAILED)
+        self.assertEqual([j.last_error for j in failed], ["boom again"])
+        # failed jobs stay failed unless asked
+        self.assertFalse(self.queue.enqueue(JobKind.DOWNLOAD, "d1", {}))
+        self.assertTrue(
+            self.queue.enqueue(JobKind.DOWNLOAD, "d1", {}, retry_failed=True)
+        )
+
+        job = self.queue.lease("w")
+        assert job is not None
+        self.queue.complete(job, requeue_at=time.time() + 60)
+        self.assertIsNone(self.queue.lease("w"))
+        self.assertEqual(self.queue.counts(), {"download": {"queued": 1}})
+        self.assertAlmostEqual(self.queue.next_due() or 0, time.time() + 60, delta=5)
+
+    def test_restart_resumes_running_jobs(self) -> None:
+        host = socket.gethostname()
+        self.queue.enqueue(JobKind.DOWNLOAD, "d1", {"url": "u"})
+        old_owner = f"{host}:999999:download"
+        job = self.queue.lease(old_owner)
+        assert job is not None
+        self.queue.close()
+
+        # a new process on the same host opens the same file
+        queue = JobQueue(self.path)
+        self.assertIsNone(queue.lease(worker_id("download")))
+        self.assertEqual(queue.release_stale(worker_id("daemon")), 1)
+        job = queue.lease(worker_id("download"))
+        assert job is not None
+        self.assertEqual(job.payload, {"url": "u"})
+        # the lease of a process elsewhere runs out instead
+        queue.complete(job)
+        queue.enqueue(JobKind.DOWNLOAD, "d2", {})
+        queue.lease("otherhost:1:download", lease_seconds=10)
+        self.assertEqual(queue.release_stale(worker_id("daemon")), 0)
+        self.assertIsNone(queue.lease("w"))
+        self.assertEqual(queue.lease("w", now=time.time() + 11).key, "d2")  # type: ignore[union-attr]
+        # so does the lease of another live process on this host
+        queue.enqueue(JobKind.DOWNLOAD, "d3", {})
+        queue.lease(f"{host}:{os.getppid()}:download")
+        self.assertEqual(queue.release_stale(worker_id("daemon")), 0)
+        queue.close()
+
+    def test_restart_with_the_same_pid(self) -> None:
+        # a restarted container gives the new daemon the old one's pid
+        host = socket.gethostname()
+        self.queue.enqueue(JobKind.DOWNLOAD, "d1", {})
+        self.queue.enqueue(JobKind.DOWNLOAD, "d2", {})
+        self.queue.lease(f"{host}:{os.getpid()}:0ldinstance:download")
+        mine = self.queue.lease(worker_id("download"))
+        assert mine is not None
+        self.assertEqual(self.queue.release_stale(worker_id("daemon")), 1)
+        # the lease of this process is kept
+        job = self.queue.lease(worker_id("download"))
+        assert job is not None
+        self.assertNotEqual(job.key, mine.key)
+
+    def test_worker_renews_lease(self) -> None:
+        self.queue.enqueue(JobKind.DOWNLOAD, "slow", {})
+        stolen: list[Job | None] = []
+
+        def handle(_: Job) -> float | None:
+            time.sleep(0.8)
+            # a lease of 0.3s would have run out by now
+            stolen.append(self.queue.lease("thief"))
+            return None
+
+        worker = JobWorker(
+            self.queue,
+            {JobKind.DOWNLOAD: handle},
+            owner=worker_id("test"),
+            lease_seconds=0.3,
+        )
+        self.assertEqual(worker.run_once().key, "slow")  # type: ignore[union-attr]
+        self.assertEqual(stolen, [None])
+        self.assertEqual(self.queue.counts(), {"download": {"done": 1}})
+
+    def test_worker(self) -> None:
+        ran: list[str] = []
+
+        def handle(job: Job) -> float | None:
+            ran.append(job.key)
+            if job.key == "retry":
+                raise Retry(3600)
+            if job.key == "bad":
+                raise RuntimeError("bad job")
+            return None
+
+        for key in ("ok", "retry", "bad"):
+            self.queue.enqueue(JobKind.DOWNLOAD, key, {})
+        worker = JobWorker(
+            self.queue, {JobKind.DOWNLOAD: handle}, owner=worker_id("test")
+        )
+        while worker.run_once() is not None:
+            pass
+        self.assertEqual(sorted(ran), ["bad", "ok", "retry"])
+        jobs = {j.key: j for j in self.queue.jobs()}
+        self.assertEqual(jobs["ok"].state, JobState.DONE)
+        # deferred without using up an attempt
+        self.assertEqual(jobs["retry"].state, JobState.QUEUED)
+        self.assertEqual(jobs["retry"].attempts, 0)
+        self.assertEqual(jobs["bad"].state, JobState.QUEUED)
+        self.assertEqual(jobs["bad"].last_error, "bad job")
+
+    def test_daemon_queues_jobs(self) -> None:
+        channel = Channel(name="fixture", source=Source.YOUTUBE, channel_id="@fixture")
+        config = Config(
+            output=self.tmp.name,
+            rclone={},
+            channels=[channel],
+            cmd_options=CmdOptions(download=True, scan=True, fresh_days=7),
+        )
+        daemon = SyncDaemon(config, RealFS.from_path(Path(self.tmp.name)), self.queue)
+        daemon.seed()
+        daemon.seed()
+        self.assertEqual(self.queue.counts(), {"scan": {"queued": 1}})
+
+        fresh = VidEntry(
+            url="https://www.youtube.com/watch?v=new",
+            title="new",
+            upload_date=date.today(),
+        )
+        old = VidEntry(
+            url="https://www.youtube.com/watch?v=old",
+            title="old",
+            upload_date=date(2020, 1, 1),
+        )
+        daemon._queue_downloads(
+            channel, [old, fresh]
+        )  # pylint: disable=protected-access
+        daemon._queue_downloads(
+            channel, [old, fresh]
+        )  # pylint: disable=protected-access
+        downloads = [j for j in self.queue.jobs() if j.kind == JobKind.DOWNLOAD]
+        self.assertEqual([j.payload["url"] for j in downloads], [fresh.url, old.url])
+        self.assertEqual(
+            [j.priority for j in downloads], [FRESH_PRIORITY, BACKFILL_PRIORITY]
+        )
+
+        # jobs of channels that left the config are dropped
+        worker = JobWorker(
+            self.queue, {JobKind.SCAN: daemon.handle_scan}, owner=worker_id("scan")
+        )
+        job = self.queue.lease(worker.owner, [JobKind.SCAN])
+        assert job is not None
+        self.queue.complete(job, requeue_at=time.time() + 3600)
+        self.queue.enqueue(JobKind.SCAN, "scan:youtube:gone", {"channel": "gone"})
+        self.assertEqual(worker.run_once().key, "scan:youtube:gone")  # type: ignore[union-attr]
+        self.assertEqual(
+            {j.key: j.state for j in self.queue.jobs()}["scan:youtube:gone"],
+            JobState.DONE,
+        )
+        self.assertEqual(os.path.basename(str(self.queue.path)), "jobs.sqlite3")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,12 +3,34 @@ Unit test file.
 """
 
 import unittest
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, timedelta
 from pathlib import Path
 from tempfile import TemporaryDirectory
 
 from youtube_sync import RealFS
+from youtube_sync.final_result import FinalResult
 from youtube_sync.library import Library
 from youtube_sync.vid_entry import VidEntry
+from youtube_sync.ytdlp.download_request import DownloadRequest
+
+
+class FakeYtDlp:
+    """Records the requests instead of downloading."""
+
+    def __init__(self) -> None:
+        self.requests: list[DownloadRequest] = []
+
+    def download_mp3s(
+        self, downloads: list[DownloadRequest], download_pool: ThreadPoolExecutor
+    ) -> list[Future[FinalResult]]:
+        futures: list[Future[FinalResult]] = []
+        for di in downloads:
+            self.requests.append(di)
+            future: Future[FinalResult] = Future()
+            future.set_result(FinalResult(request=di, date=None, exception=None))
+            futures.append(future)
+        return futures
 
 
 class LibraryTester(unittest.TestCase):
@@ -60,6 +82,62 @@ class LibraryTester(unittest.TestCase):
             self.assertEqual(lib, lib2)
             print("done")
 
+    def test_scheduled_vids_use_the_library_entries(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            lib = Library(
+                channel_name="Some channel",
+                channel_url="https://www.youtube.com/channel/123",
+                source="youtube",
+                json_path=RealFS.from_path(Path(temp_dir) / "library.json"),
+            )
+            url = "https://www.youtube.com/watch?v=123"
+            stored = VidEntry(
+                url,
+                "Some title",
+                "2025-01-02 Some_title.mp3",
+                upload_date=date(2025, 1, 2),
+            )
+            lib.merge([stored], save=True)
+            fake = FakeYtDlp()
+            lib.ytdlp = fake  # type: ignore[assignment]
+
+            # the scheduler's copy is from before the upload date was known
+            lib.download_missing(limit=None, vids=[VidEntry(url, "Some title")])
+            self.assertEqual(
+                [di.outmp3.name for di in fake.requests], ["2025-01-02 Some_title.mp3"]
+            )
+            self.assertEqual(lib.load()[0].date_upload, date(2025, 1, 2))
+
+    def test_fresh_days_orders_the_downloads(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            lib = Library(
+                channel_name="Some channel",
+                channel_url="https://www.youtube.com/channel/123",
+                source="youtube",
+                json_path=RealFS.from_path(Path(temp_dir) / "library.json"),
+            )
+            today = date.today()
+            old = VidEntry(
+                "https://www.youtube.com/watch?v=old",
+                "Old",
+                "old.mp3",
+                upload_date=today - timedelta(days=30),
+            )
+            recent = VidEntry(
+                "https://www.youtube.com/watch?v=recent",
+                "Recent",
+                "recent.mp3",
+                upload_date=today - timedelta(days=10),
+            )
+            lib.merge([old, recent], save=True)
+            fake = FakeYtDlp()
+            lib.ytdlp = fake  # type: ignore[assignment]
+
+            # ten days old is backfill by default, fresh with a 14 day window
+            lib.download_missing(limit=1)
+            lib.download_missing(limit=1, fresh_days=14)
+            self.assertEqual([di.url for di in fake.requests], [old.url, recent.url])
+
 
 if __name__ == "__main__":
     unittest.main()
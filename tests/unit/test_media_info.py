@@ -0,0 +1,33 @@
+"""
+Unit test file.
+"""
+
+import unittest
+from datetime import datetime
+
+from youtube_sync.ytdlp.download_video_upload_date import MediaInfo, parse_media_info
+
+
+class MediaInfoTester(unittest.TestCase):
+    """Main tester class."""
+
+    def test_parse_media_info(self) -> None:
+        stdout = (
+            "[youtube] Extracting URL: https://www.youtube.com/watch?v=x\n"
+            "WARNING: [youtube] some warning\n"
+            "[media_info] 20250102 4718592.5\n"
+        )
+        self.assertEqual(
+            parse_media_info(stdout),
+            MediaInfo(upload_date=datetime(2025, 1, 2), filesize=4718592),
+        )
+        # yt-dlp prints NA for what it doesn't know
+        self.assertEqual(
+            parse_media_info("[media_info] NA NA\n"),
+            MediaInfo(upload_date=None, filesize=None),
+        )
+        self.assertIsNone(parse_media_info("ERROR: Private video\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
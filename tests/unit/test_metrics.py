@@ -0,0 +1,98 @@
+"""
+Unit test file.
+"""
+
+import os
+import unittest
+import urllib.error
+import urllib.request
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from youtube_sync.metrics import REGISTRY, VIDEOS_SCANNED, MetricsRegistry
+from youtube_sync.web_server import start_web_server
+
+
+class MetricsTester(unittest.TestCase):
+    """Main tester class."""
+
+    def test_render(self) -> None:
+        registry = MetricsRegistry()
+        counter = registry.counter("test_total", "A counter.", ("source",))
+        gauge = registry.gauge("test_depth", "A gauge.")
+        histogram = registry.histogram(
+            "test_seconds", "A histogram.", buckets=(1.0, 5.0)
+        )
+        counter.inc(source="youtube")
+        counter.inc(2, source="youtube")
+        counter.inc(source='we"ird')
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+        histogram.observe(0.5)
+        histogram.observe(3)
+        histogram.observe(10)
+        text = registry.render()
+        self.assertIn("# TYPE test_total counter", text)
+        self.assertIn('test_total{source="youtube"} 3', text)
+        self.assertIn('test_total{source="we\\"ird"} 1', text)
+        self.assertIn("test_depth 1", text)
+        self.assertIn('test_seconds_bucket{le="1"} 1', text)
+        self.assertIn('test_seconds_bucket{le="5"} 2', text)
+        self.assertIn('test_seconds_bucket{le="+Inf"} 3', text)
+        self.assertIn("test_seconds_sum 13.5", text)
+        self.assertIn("test_seconds_count 3", text)
+
+    def test_label_mismatch(self) -> None:
+        registry = MetricsRegistry()
+        counter = registry.counter("test_total", "A counter.", ("source",))
+        with self.assertRaises(ValueError):
+            counter.inc(channel="x")
+        with self.assertRaises(ValueError):
+            registry.counter("test_total", "Duplicate.")
+
+    def test_web_server(self) -> None:
+        VIDEOS_SCANNED.inc(3, source="youtube", channel="test-channel")
+        with TemporaryDirectory() as tmp:
+            (Path(tmp) / "hello.txt").write_text("hello", encoding="utf-8")
+            server = start_web_server(0, directory=Path(tmp), host="127.0.0.1")
+            try:
+                port = server.server_address[1]
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as resp:
+                    body = resp.read().decode("utf-8")
+                    self.assertIn("text/plain", resp.headers["Content-Type"])
+                self.assertEqual(body, REGISTRY.render())
+                self.assertIn(
+                    'youtube_sync_videos_scanned_total{source="youtube",channel="test-channel"}',
+                    body,
+                )
+                with urllib.request.urlopen(
+                    f"http://127.0.0.1:{port}/hello.txt"
+                ) as resp:
+                    self.assertEqual(resp.read(), b"hello")
+            finally:
+                server.shutdown()
+                server.server_close()
+
+    def test_no_static_without_directory(self) -> None:
+        with TemporaryDirectory() as tmp:
+            (Path(tmp) / "config.json").write_text("{}", encoding="utf-8")
+            cwd = os.getcwd()
+            os.chdir(tmp)
+            server = start_web_server(0)
+            try:
+                self.assertEqual(server.server_address[0], "127.0.0.1")
+                port = server.server_address[1]
+                with self.assertRaises(urllib.error.HTTPError) as ctx:
+                    urllib.request.urlopen(f"http://127.0.0.1:{port}/config.json")
+                self.assertEqual(ctx.exception.code, 404)
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as resp:
+                    self.assertEqual(resp.status, 200)
+            finally:
+                os.chdir(cwd)
+                server.shutdown()
+                server.server_close()
+
+
+if __name__ == "__main__":
+    unittest.main()
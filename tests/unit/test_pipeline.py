@@ -0,0 +1,165 @@
+"""
+Unit test file.
+"""
+
+import asyncio
+import sys
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from youtube_sync import RealFS
+from youtube_sync.pipeline import DownloadPipeline
+from youtube_sync.source_health import set_source_health_path
+from youtube_sync.staging import StagingBudget
+from youtube_sync.types import Source
+from youtube_sync.ytdlp.download_request import DownloadRequest
+
+UPLOAD_DATE = datetime(2025, 1, 2)
+GATE = threading.Event()
+STAGED: dict[str, Path] = {}
+
+
+class _FakeDownloader:
+    """Stands in for YtDlpDownloader, the transcode is a real subprocess."""
+
+    def __init__(
+        self,
+        di: DownloadRequest,
+        source: Source,
+        cookies_txt: Path | None,
+    ) -> None:
+        self.di = di
+        self.tmp: tempfile.TemporaryDirectory[str] | None = None
+        self.date: datetime | None = None
+        self.downloaded = Path("unset")
+        self.converted = Path("unset")
+
+    def probe(self) -> int | None:
+        # "big" needs more than the tmpfs takes
+        return 100 if "big" in self.di.url else 10
+
+    def download(self, staging_dir: Path) -> object:
+        GATE.wait(10)
+        if "broken" in self.di.url:
+            return RuntimeError("ERROR: HTTP Error 429")
+        self.date = UPLOAD_DATE
+        if not self.di.download_vid:
+            return None
+        self.tmp = tempfile.TemporaryDirectory(dir=staging_dir)
+        self.downloaded = Path(self.tmp.name) / "audio.webm"
+        self.converted = Path(self.tmp.name) / "converted.mp3"
+        STAGED[self.di.url] = staging_dir
+        self.downloaded.write_text(self.di.url, encoding="utf-8")
+        return self.downloaded
+
+    async def convert_to_mp3_async(self) -> Path | Exception:
+        code = "import shutil, sys; shutil.copy(sys.argv[1], sys.argv[2])"
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, "-c", code, str(self.downloaded), str(self.converted)
+        )
+        await proc.wait()
+        return self.converted
+
+    def copy_to_destination(self) -> None:
+        self.di.outmp3.write_bytes(self.converted.read_bytes())
+
+    def dispose(self) -> None:
+        if self.tmp is not None:
+            self.tmp.cleanup()
+
+
+class PipelineTester(unittest.TestCase):
+    """Main tester class."""
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.out = Path(self.tmp.name)
+        set_source_health_path(self.out / "health.json")
+        staging = StagingBudget(
+            root=self.out / "staging",
+            budget=1 << 30,
+            fast_root=self.out / "shm",
+            fast_budget=1 << 20,
+            fast_max=100,
+        )
+        self.pipeline = DownloadPipeline(
+            downloads=4,
+            uploads=2,
+            transcodes=2,
+            downloader_factory=_FakeDownloader,
+            staging=staging,
+        )
+        self.pool = ThreadPoolExecutor(max_workers=2)
+
+    def tearDown(self) -> None:
+        GATE.set()
+        self.pool.shutdown()
+        self.pipeline.close()
+        self.tmp.cleanup()
+
+    def _request(self, name: str, download_vid: bool = True) -> DownloadRequest:
+        return DownloadRequest(
+            url=f"https://rumble.com/{name}.html",
+            outmp3=RealFS.from_path(self.out / f"{name}.mp3"),
+            download_vid=download_vid,
+            download_date=True,
+        )
+
+    def test_stages(self) -> None:
+        GATE.set()
+        futures = [
+            self.pipeline.submit(self._request("ok"), Source.RUMBLE, self.pool),
+            self.pipeline.submit(self._request("big"), Source.RUMBLE, self.pool),
+            self.pipeline.submit(self._request("broken"), Source.RUMBLE, self.pool),
+            self.pipeline.submit(
+                self._request("date", download_vid=False), Source.RUMBLE, self.pool
+            ),
+        ]
+        ok, big, broken, date = (f.result(timeout=30) for f in futures)
+        self.assertIsNone(ok.exception)
+        self.assertIsNone(big.exception)
+        # staged by the size from the probe, small ones on the tmpfs
+        self.assertEqual(STAGED["https://rumble.com/ok.html"], self.out / "shm")
+        self.assertEqual(STAGED["https://rumble.com/big.html"], self.out / "staging")
+        self.assertEqual(ok.date, UPLOAD_DATE)
+        self.assertEqual(
+            (self.out / "ok.mp3").read_text(encoding="utf-8"),
+            "https://rumble.com/ok.html",
+        )
+        self.assertIn("429", str(broken.exception))
+        self.assertFalse((self.out / "broken.mp3").exists())
+        # date only, no transcode or upload
+        self.assertEqual((date.exception, date.date), (None, UPLOAD_DATE))
+        self.assertFalse((self.out / "date.mp3").exists())
+        self.assertEqual(self.pipeline.pending(), 0)
+        self.assertEqual(self.pipeline.staging.area.reserved, 0)
+        self.assertEqual(list((self.out / "staging").iterdir()), [])
+        self.assertEqual(list((self.out / "shm").iterdir()), [])
+
+    def test_queued_downloads_cost_no_threads(self) -> None:
+        GATE.clear()
+        threads = threading.active_count()
+        futures = [
+            self.pipeline.submit(
+                self._request(f"v{i}", i >= 490), Source.RUMBLE, self.pool
+            )
+            for i in range(500)
+        ]
+        # the two download pool threads, nothing per queued download
+        self.assertLessEqual(threading.active_count(), threads + 2)
+        self.assertEqual(self.pipeline.pending(), 500)
+        GATE.set()
+        results = [f.result(timeout=60) for f in futures]
+        self.assertTrue(all(r.exception is None for r in results))
+        self.assertEqual(
+            [r.request.url for r in results],
+            [f"https://rumble.com/v{i}.html" for i in range(500)],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
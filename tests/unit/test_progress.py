@@ -0,0 +1,120 @@
+"""
+Unit test file.
+"""
+
+import io
+import queue
+import stat
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from youtube_sync.ytdlp.download_best_audio import (
+    OUTPUT_TAIL_LINES,
+    RealYtdlp,
+    _read_lines,
+)
+from youtube_sync.ytdlp.exe import YtDlpCmdRunner
+from youtube_sync.ytdlp.progress import (
+    PROGRESS_TEMPLATE,
+    ProgressEvent,
+    ProgressThrottle,
+    format_progress,
+    parse_progress_line,
+    parse_template_line,
+)
+
+_CHATTY_YTDLP = """#!{python}
+import sys
+for i in range(5000):
+    print(f"[progress] downloading {{i * 1000}} 5000000 NA 250000.5 {{5000 - i}}")
+for i in range(500):
+    print(f"[info] line {{i}}")
+print("[progress] finished 5000000 5000000 NA NA NA")
+"""
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class ProgressTester(unittest.TestCase):
+    """Main tester class."""
+
+    def test_template_fields_match_parser(self) -> None:
+        self.assertTrue(PROGRESS_TEMPLATE.startswith("download:[progress] "))
+        fields = PROGRESS_TEMPLATE.split(" ", 1)[1].split()
+        self.assertEqual(len(fields), 6)
+
+    def test_parse_template_line(self) -> None:
+        event = parse_template_line("[progress] downloading 1024 4096 NA 512.0 6")
+        assert event is not None
+        self.assertEqual(event.downloaded_bytes, 1024)
+        self.assertEqual(event.total_bytes, 4096)
+        self.assertEqual(event.speed, 512.0)
+        self.assertEqual(event.eta_seconds, 6)
+        self.assertEqual(event.status, "downloading")
+        self.assertEqual(event.fraction, 0.25)
+        # falls back to the estimate for fragmented downloads
+        event = parse_progress_line("[progress] downloading 10 NA 100.0 NA NA")
+        assert event is not None
+        self.assertEqual(event.total_bytes, 100)
+        self.assertIsNone(event.speed)
+        self.assertIsNone(parse_template_line("[progress] downloading NA NA NA NA NA"))
+        self.assertIsNone(parse_template_line("[download] Destination: x.webm"))
+
+    def test_throttle(self) -> None:
+        clock = _Clock()
+        throttle = ProgressThrottle(interval_seconds=10, clock=clock)
+        running = ProgressEvent(1, 100, None, None, status="downloading")
+        emitted = 0
+        for second in range(0, 30):
+            clock.now = float(second)
+            emitted += throttle.should_emit(running)
+        self.assertEqual(emitted, 3)
+        finished = ProgressEvent(100, 100, None, None, status="finished")
+        self.assertTrue(throttle.should_emit(finished))
+        self.assertIn("100.0%", format_progress(finished))
+
+    def test_read_lines_split_utf8_and_cr(self) -> None:
+        data = "café 1\r\nsecond\rthird\nlast".encode("utf-8")
+        lines: "queue.Queue[str | None]" = queue.Queue()
+
+        class _Chunked(io.RawIOBase):
+            def __init__(self) -> None:
+                self.pos = 0
+
+            def read(self, size: int = -1) -> bytes:  # type: ignore[override]
+                chunk = data[self.pos : self.pos + 4]  # splits the multi-byte char
+                self.pos += len(chunk)
+                return chunk
+
+        _read_lines(_Chunked(), lines)  # type: ignore[arg-type]
+        out: list[str | None] = []
+        while not lines.empty():
+            out.append(lines.get())
+        self.assertEqual(out, ["café 1", "second", "third", "last", None])
+
+    @unittest.skipIf(sys.platform == "win32", "posix shebang script")
+    def test_output_is_bounded(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            exe = Path(temp_dir) / "yt-dlp"
+            exe.write_text(
+                _CHATTY_YTDLP.format(python=sys.executable), encoding="utf-8"
+            )
+            exe.chmod(exe.stat().st_mode | stat.S_IEXEC)
+            rslt = RealYtdlp(YtDlpCmdRunner(exe)).execute([])
+            self.assertTrue(rslt.ok)
+            lines = (rslt.stdout or "").strip().split("\n")
+            self.assertEqual(len(lines), OUTPUT_TAIL_LINES)
+            self.assertEqual(lines[-1], "[info] line 499")
+            self.assertFalse(any(line.startswith("[progress]") for line in lines))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+"""
+Unit test file.
+"""
+
+import unittest
+from pathlib import Path
+from typing import Any
+
+from youtube_sync.types import Source
+from youtube_sync.ytdlp.download_best_audio import ExeResult, RealOrProxyExecutor
+from youtube_sync.ytdlp.exe import YtDlpCmdRunner
+from youtube_sync.ytdlp.proxy_pool import ProxyPool
+
+
+class _FakeReal:
+    """Stands in for RealYtdlp, fails without a proxy and succeeds with one."""
+
+    def __init__(self) -> None:
+        self.calls: list[list[str]] = []
+
+    def execute(self, cmd_list: list[str], **_: Any) -> ExeResult:
+        self.calls.append(cmd_list)
+        if "--proxy" in cmd_list:
+            return ExeResult(ok=True, stdout="20240101\n", stderr=None)
+        return ExeResult(
+            ok=False, stdout="ERROR: HTTP Error 429: Too Many Requests", stderr=None
+        )
+
+
+class ProxyPoolTester(unittest.TestCase):
+    """Main tester class."""
+
+    def test_best_proxy_is_kept(self) -> None:
+        pool = ProxyPool(["http://slow:1", "http://fast:1", "http://broken:1"])
+        for _ in range(5):
+            pool.record("http://slow:1", ok=True, elapsed_seconds=20)
+            pool.record("http://fast:1", ok=True, elapsed_seconds=2)
+            pool.record("http://broken:1", ok=False, elapsed_seconds=1)
+        ranked = [item["url"] for item in pool.snapshot()]
+        self.assertEqual(ranked, ["http://fast:1", "http://slow:1", "http://broken:1"])
+        picks = [pool.pick() for _ in range(50)]
+        self.assertGreater(picks.count("http://fast:1"), 30)
+
+    def test_empty_pool(self) -> None:
+        self.assertIsNone(ProxyPool([]).pick())
+
+    def test_executor_switches_to_proxy(self) -> None:
+        runner = YtDlpCmdRunner(Path("yt-dlp"))
+        executor = RealOrProxyExecutor(
+            runner, source=Source.RUMBLE, proxy_pool=ProxyPool(["http://proxy:1"])
+        )
+        executor._refresh_cookies = lambda source: None  # type: ignore[method-assign]
+        fake = _FakeReal()
+        executor.real = fake  # type: ignore[assignment]
+        for _ in range(3):
+            self.assertFalse(executor.execute(["url"]).ok)
+        self.assertFalse(executor.is_proxy())
+        # the fourth failure switches over and retries through the proxy
+        rslt = executor.execute(["url"])
+        self.assertTrue(executor.is_proxy())
+        self.assertTrue(rslt.ok)
+        self.assertEqual(rslt.stdout, "20240101\n")
+        # and the next call goes straight to the proxy
+        self.assertTrue(executor.execute(["url"]).ok)
+        self.assertIn("--proxy", fake.calls[-1])
+        self.assertEqual(executor.snapshot()["proxies"][0]["successes"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
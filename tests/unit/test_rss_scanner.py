@@ -0,0 +1,124 @@
+"""
+Unit test file.
+"""
+
+import tempfile
+import unittest
+from datetime import date, datetime
+from pathlib import Path
+
+from youtube_sync import RealFS
+from youtube_sync.library import Library
+from youtube_sync.library_data import ScanState
+from youtube_sync.vid_entry import VidEntry
+from youtube_sync.youtube.rss_scanner import (
+    FeedError,
+    channel_id_from_url,
+    diff_feed,
+    feed_url,
+    parse_feed,
+)
+
+HERE = Path(__file__).parent
+FEED = HERE / "test_data" / "rss" / "channel_feed.xml"
+SHORTS_FEED = HERE / "test_data" / "rss" / "channel_feed_shorts.xml"
+
+
+def _feed() -> list[VidEntry]:
+    return parse_feed(FEED.read_text(encoding="utf-8"))
+
+
+class RssScannerTester(unittest.TestCase):
+    """Main tester class."""
+
+    def test_parse_feed(self) -> None:
+        vids = _feed()
+        self.assertEqual(len(vids), 15)
+        self.assertEqual(vids[0].url, "https://www.youtube.com/watch?v=feedvid0000")
+        self.assertEqual(vids[0].title, "Weekly update #100: markets & more")
+        self.assertEqual(vids[0].date_upload, date(2025, 5, 31))
+        self.assertEqual(
+            vids[0].file_path, "2025-05-31 Weekly_update_100_markets_more.mp3"
+        )
+        self.assertEqual(vids[3].title, 'Q&A: "What now?" / part 2')
+        self.assertEqual(vids[-1].date_upload, date(2025, 5, 3))
+        with self.assertRaises(FeedError):
+            parse_feed("<html>not a feed")
+
+    def test_shorts_are_skipped(self) -> None:
+        self.assertEqual(
+            feed_url("UCfixturechannel000001ab"),
+            "https://www.youtube.com/feeds/videos.xml"
+            "?playlist_id=UULFfixturechannel000001ab",
+        )
+        vids = parse_feed(SHORTS_FEED.read_text(encoding="utf-8"))
+        self.assertEqual(
+            [vid.url for vid in vids],
+            [
+                "https://www.youtube.com/watch?v=feedvid0000",
+                "https://www.youtube.com/watch?v=feedvid0001",
+            ],
+        )
+        # a new Short is nothing to download
+        scan = diff_feed(vids, _feed())
+        self.assertFalse(scan.needs_full_scan)
+        self.assertEqual(scan.new_vids, [])
+
+    def test_diff_feed(self) -> None:
+        feed = _feed()
+        # the library already has the older half of the feed
+        known = feed[5:]
+        scan = diff_feed(feed, known)
+        self.assertFalse(scan.needs_full_scan)
+        self.assertEqual(scan.new_vids, feed[:5])
+
+        scan = diff_feed(feed, known=feed)
+        self.assertFalse(scan.needs_full_scan)
+        self.assertEqual(scan.new_vids, [])
+
+        # a full feed of new vids may hide more behind it
+        other = [VidEntry(url="https://www.youtube.com/watch?v=older", title="older")]
+        self.assertTrue(diff_feed(feed, other).needs_full_scan)
+        # a short feed is the whole channel
+        self.assertFalse(diff_feed(feed[:4], other).needs_full_scan)
+        self.assertTrue(diff_feed(feed, []).needs_full_scan)
+
+    def test_channel_id_from_url(self) -> None:
+        url = "https://www.youtube.com/channel/UCfixturechannel000001ab/videos"
+        self.assertEqual(channel_id_from_url(url), "UCfixturechannel000001ab")
+        self.assertIsNone(
+            channel_id_from_url("https://www.youtube.com/@fixture/videos")
+        )
+
+    def test_scan_state_is_persisted(self) -> None:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            json_path = RealFS.from_path(Path(temp_dir) / "library.json")
+            lib = Library(
+                channel_name="fixture",
+                channel_url="https://www.youtube.com/@fixture/videos",
+                source="youtube",
+                json_path=json_path,
+            )
+            self.assertEqual(lib.scan_state(), ScanState())
+            lib.merge(_feed(), save=True)
+            scanned = datetime(2025, 6, 1, 12, 0, 0)
+            lib.save_scan_state(
+                ScanState(channel_id="UCfixturechannel000001ab", last_full_scan=scanned)
+            )
+
+            reloaded = Library(
+                channel_name="fixture",
+                channel_url="https://www.youtube.com/@fixture/videos",
+                source="youtube",
+                json_path=json_path,
+            )
+            vids = reloaded.load()
+            state = reloaded.scan_state()
+            self.assertEqual(state.channel_id, "UCfixturechannel000001ab")
+            self.assertEqual(state.last_full_scan, scanned)
+            self.assertIsNone(state.last_feed_scan)
+            self.assertEqual(len(vids), 15)
+
+
+if __name__ == "__main__":
+    unittest.main()
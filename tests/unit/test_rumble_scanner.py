@@ -0,0 +1,128 @@
+"""
+Unit test file.
+"""
+
+import threading
+import unittest
+from datetime import date
+from pathlib import Path
+from typing import Any
+
+from youtube_sync.rumble.scanner import (
+    RumbleScanError,
+    RumbleScanner,
+    fetch_status,
+    page_url,
+    parse_listing,
+)
+from youtube_sync.vid_entry import VidEntry
+
+HERE = Path(__file__).parent
+FIXTURES = HERE / "test_data" / "rumble"
+
+CHANNEL_URL = "https://rumble.com/c/FixtureNews"
+
+
+class FakeResponse:
+    def __init__(self, text: str, status_code: int = 200) -> None:
+        self.text = text
+        self.status_code = status_code
+
+
+class FakeSession:
+    """Serves the two recorded listing pages, 404 past them."""
+
+    def __init__(self, status_code: int = 200, text: str | None = None) -> None:
+        self.status_code = status_code
+        self.text = text
+        self.urls: list[str] = []
+        self.lock = threading.Lock()
+
+    def get(self, url: str, **kwargs: Any) -> FakeResponse:
+        with self.lock:
+            self.urls.append(url)
+        if self.text is not None:
+            return FakeResponse(self.text, self.status_code)
+        page = int(url.split("page=")[1]) if "page=" in url else 1
+        path = FIXTURES / f"channel_page_{page}.html"
+        if not path.exists():
+            return FakeResponse("<html>404</html>", 404)
+        return FakeResponse(path.read_text(encoding="utf-8"), self.status_code)
+
+
+def _page(num: int) -> list[VidEntry]:
+    return parse_listing(
+        (FIXTURES / f"channel_page_{num}.html").read_text(encoding="utf-8")
+    )
+
+
+class RumbleScannerTester(unittest.TestCase):
+    """Main tester class."""
+
+    def test_parse_listing(self) -> None:
+        vids = _page(1)
+        self.assertEqual(len(vids), 5)
+        self.assertEqual(vids[0].url, "https://rumble.com/v6f000x-daily-show-200.html")
+        self.assertEqual(vids[0].title, "Daily Show 200: the headlines & more")
+        self.assertEqual(vids[0].date_upload, date(2025, 5, 30))
+        self.assertEqual(
+            vids[0].file_path, "2025-05-30 Daily_Show_200_the_headlines_more.mp3"
+        )
+        # the older article.video-item layout
+        vids = _page(2)
+        self.assertEqual(len(vids), 5)
+        self.assertEqual(vids[4].url, "https://rumble.com/v5e009y-daily-show-191.html")
+        self.assertEqual(vids[4].title, "Daily Show 191: archive")
+        self.assertEqual(vids[4].date_upload, date(2025, 5, 21))
+
+    def test_fetch_status(self) -> None:
+        session = FakeSession()
+        self.assertEqual(fetch_status(CHANNEL_URL, session), 200)
+        self.assertEqual(fetch_status(CHANNEL_URL + "?page=9", session), 404)
+        self.assertEqual(fetch_status(CHANNEL_URL, FakeSession(403, "")), 403)
+        self.assertEqual(session.urls, [CHANNEL_URL, CHANNEL_URL + "?page=9"])
+
+    def test_page_url(self) -> None:
+        self.assertEqual(page_url(CHANNEL_URL, 1), CHANNEL_URL)
+        self.assertEqual(page_url(CHANNEL_URL, 3), CHANNEL_URL + "?page=3")
+        self.assertEqual(page_url(CHANNEL_URL + "?page=2", 1), CHANNEL_URL)
+
+    def test_full_scan_until_end_of_listing(self) -> None:
+        session = FakeSession()
+        vids = RumbleScanner(session=session, concurrency=4).scan(
+            CHANNEL_URL, stored_vids=[], limit=None
+        )
+        self.assertEqual(len(vids), 10)
+        self.assertEqual(vids, _page(1) + _page(2))
+        self.assertEqual(len(session.urls), 4)
+
+    def test_stops_at_known_page(self) -> None:
+        session = FakeSession()
+        # the second page is already in the library
+        scanner = RumbleScanner(session=session, concurrency=1)
+        vids = scanner.scan(CHANNEL_URL, stored_vids=_page(2), limit=None)
+        self.assertEqual(vids, _page(1))
+        self.assertEqual(session.urls, [CHANNEL_URL, CHANNEL_URL + "?page=2"])
+
+        vids = RumbleScanner(session=FakeSession(), concurrency=2).scan(
+            CHANNEL_URL, stored_vids=[], limit=7
+        )
+        self.assertEqual(len(vids), 7)
+
+    def test_errors_raise_scan_error(self) -> None:
+        with self.assertRaises(RumbleScanError) as ctx:
+            RumbleScanner(session=FakeSession(status_code=429), concurrency=2).scan(
+                CHANNEL_URL, [], None
+            )
+        self.assertIn("HTTP Error 429", str(ctx.exception))
+        # a first page without videos is a bot check or a new layout, not an empty channel
+        with self.assertRaises(RumbleScanError) as ctx:
+            RumbleScanner(
+                session=FakeSession(text="<html>Checking your browser</html>"),
+                concurrency=2,
+            ).scan(CHANNEL_URL, [], None)
+        self.assertIn("No videos", str(ctx.exception))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+"""
+Unit test file.
+"""
+
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from youtube_sync import RealFS
+from youtube_sync.library import Library
+from youtube_sync.library_data import ScanState
+from youtube_sync.scan_cursor import ENV_DEEP_SCAN_HOURS, ScanCursor, deep_scan_due
+from youtube_sync.sync_impl import YtDlpSync
+from youtube_sync.types import Source
+from youtube_sync.vid_entry import VidEntry
+
+
+def _vid(name: str) -> VidEntry:
+    return VidEntry(url=f"https://www.brighteon.com/{name}", title=name)
+
+
+def _vids(names: str) -> list[VidEntry]:
+    return [_vid(name) for name in names]
+
+
+class FakeListingSync(YtDlpSync):
+    """Walks a fixed listing instead of running yt-dlp."""
+
+    def __init__(self, library: Library, listing: list[VidEntry]) -> None:
+        super().__init__(library)
+        self.listing = listing
+
+    def channel_source(self) -> Source:
+        return Source.BRIGHTEON
+
+    def _scan(
+        self, limit: int | None, state: ScanState, cursor: ScanCursor
+    ) -> list[VidEntry]:
+        out: list[VidEntry] = []
+        for vid in self.listing[:limit]:
+            stop = cursor.observe(vid)
+            if not cursor.is_known(vid):
+                out.append(vid)
+            if stop:
+                break
+        return out
+
+
+class ScanCursorTester(unittest.TestCase):
+    """Main tester class."""
+
+    def test_known_streak(self) -> None:
+        cursor = ScanCursor(_vids("cef"), streak=2)
+        stops = [cursor.observe(vid) for vid in _vids("abcdef")]
+        self.assertEqual(stops, [False, False, False, False, False, True])
+        self.assertEqual(cursor.enumerated, 6)
+        self.assertEqual(cursor.new, 3)
+        self.assertEqual(cursor.newest, _vid("a").url)
+        self.assertEqual(cursor.stop_reason, "2 known videos in a row")
+
+    def test_high_water_mark(self) -> None:
+        cursor = ScanCursor(_vids("cd"), newest_known=_vid("c").url, streak=5)
+        self.assertEqual(
+            [cursor.observe(vid) for vid in _vids("abc")], [False, False, True]
+        )
+        # a deep cursor walks past it and counts what's new
+        cursor = ScanCursor(
+            _vids("cd"), newest_known=_vid("c").url, streak=1, deep=True
+        )
+        self.assertFalse(any(cursor.observe(vid) for vid in _vids("abcdef")))
+        self.assertEqual(cursor.new, 4)
+
+    def test_deep_scan_due(self) -> None:
+        now = datetime(2025, 6, 1, 12, 0, 0)
+        self.assertTrue(deep_scan_due(None, now))
+        self.assertFalse(deep_scan_due(now - timedelta(hours=23), now))
+        self.assertTrue(deep_scan_due(now - timedelta(hours=24), now))
+        os.environ[ENV_DEEP_SCAN_HOURS] = "1"
+        try:
+            self.assertTrue(deep_scan_due(now - timedelta(hours=2), now))
+        finally:
+            del os.environ[ENV_DEEP_SCAN_HOURS]
+
+    def test_sync_keeps_the_cursor(self) -> None:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            lib = Library(
+                channel_name="fixture",
+                channel_url="https://www.brighteon.com/channels/fixture",
+                source="brighteon",
+                json_path=RealFS.from_path(Path(temp_dir) / "library.json"),
+            )
+            sync = FakeListingSync(lib, _vids("ghijklmnop"))
+            # the first scan is deep, it enumerates the whole listing
+            out = sync.scan_for_vids(limit=1000, stop_on_duplicate_vids=False)
+            self.assertEqual(len(out), 10)
+            lib.merge(out, save=True)
+            state = lib.scan_state()
+            self.assertIsNotNone(state.last_full_scan)
+            self.assertEqual(state.newest_known, _vid("g").url)
+
+            # two uploads later the scan stops at the old newest video
+            sync.listing = _vids("ef") + sync.listing
+            out = sync.scan_for_vids(limit=1000, stop_on_duplicate_vids=False)
+            self.assertEqual(out, _vids("ef"))
+            self.assertEqual(lib.scan_state().newest_known, _vid("e").url)
+            self.assertEqual(lib.scan_state().last_full_scan, state.last_full_scan)
+            lib.merge(out, save=True)
+
+            # a scan cut off by the limit keeps the old mark, the videos
+            # between the limit and the mark weren't seen
+            sync.listing = _vids("abcd") + sync.listing
+            out = sync.scan_for_vids(limit=2, stop_on_duplicate_vids=False)
+            self.assertEqual(out, _vids("ab"))
+            self.assertEqual(lib.scan_state().newest_known, _vid("e").url)
+            lib.merge(out, save=True)
+            out = sync.scan_for_vids(limit=1000, stop_on_duplicate_vids=False)
+            self.assertEqual(out, _vids("cd"))
+            self.assertEqual(lib.scan_state().newest_known, _vid("a").url)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+"""
+Unit test file.
+"""
+
+import os
+import unittest
+from datetime import date, datetime, timedelta
+
+from youtube_sync.library_data import ScanState
+from youtube_sync.scan_scheduler import (
+    ENV_SCAN_MAX_HOURS,
+    next_scan_delay,
+    plan_next_scan,
+    scan_due,
+    upload_interval,
+)
+from youtube_sync.vid_entry import VidEntry
+
+TODAY = date(2025, 6, 1)
+NOW = datetime(2025, 6, 1, 12, 0, 0)
+
+
+def _uploads(every_days: int, count: int, last_days_ago: int = 0) -> list[VidEntry]:
+    out: list[VidEntry] = []
+    for i in range(count):
+        upload = TODAY - timedelta(days=last_days_ago + i * every_days)
+        out.append(
+            VidEntry(
+                url=f"https://www.youtube.com/watch?v=v{i}",
+                title=f"video {i}",
+                upload_date=upload,
+            )
+        )
+    return out
+
+
+class ScanSchedulerTester(unittest.TestCase):
+    """Main tester class."""
+
+    def test_upload_interval(self) -> None:
+        self.assertEqual(upload_interval(_uploads(7, 10), TODAY), timedelta(days=7))
+        # only the recent uploads count
+        vids = _uploads(1, 20) + _uploads(30, 10, last_days_ago=400)
+        self.assertEqual(upload_interval(vids, TODAY), timedelta(days=1))
+        # a channel that went quiet stretches to the time since its last upload
+        self.assertEqual(
+            upload_interval(_uploads(1, 10, last_days_ago=60), TODAY),
+            timedelta(days=60),
+        )
+        self.assertIsNone(upload_interval(_uploads(1, 1), TODAY))
+        self.assertIsNone(
+            upload_interval([VidEntry(url="https://x", title="x")], TODAY)
+        )
+
+    def test_next_scan_delay(self) -> None:
+        # several uploads a day: the minimum
+        self.assertEqual(
+            next_scan_delay(_uploads(0, 10), False, TODAY), timedelta(hours=1)
+        )
+        # weekly uploads: capped by the maximum
+        self.assertEqual(
+            next_scan_delay(_uploads(7, 10), False, TODAY), timedelta(hours=24)
+        )
+        os.environ[ENV_SCAN_MAX_HOURS] = str(24 * 7)
+        try:
+            self.assertEqual(
+                next_scan_delay(_uploads(7, 10), False, TODAY), timedelta(days=3.5)
+            )
+            dead = _uploads(1, 10, last_days_ago=2 * 365)
+            self.assertEqual(next_scan_delay(dead, False, TODAY), timedelta(days=7))
+            # new uploads bring the next scan to the minimum
+            self.assertEqual(next_scan_delay(dead, True, TODAY), timedelta(hours=1))
+        finally:
+            del os.environ[ENV_SCAN_MAX_HOURS]
+        # no history yet
+        self.assertEqual(next_scan_delay([], False, TODAY), timedelta(hours=1))
+
+    def test_scan_due(self) -> None:
+        state = ScanState()
+        self.assertTrue(scan_due(state, NOW))
+        next_scan = plan_next_scan(state, _uploads(7, 10), found_new=False, now=NOW)
+        self.assertEqual(next_scan, NOW + timedelta(hours=24))
+        self.assertFalse(scan_due(state, NOW + timedelta(hours=23)))
+        self.assertTrue(scan_due(state, NOW + timedelta(hours=24)))
+        self.assertEqual(ScanState.from_dict(state.to_dict()).next_scan, next_scan)
+
+
+if __name__ == "__main__":
+    unittest.main()
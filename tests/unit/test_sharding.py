@@ -0,0 +1,126 @@
+"""
+Unit test file.
+"""
+
+import multiprocessing
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from typing import Any
+
+from youtube_sync import RealFS
+from youtube_sync.sharding import FSLeaseStore, ShardManager
+
+CHANNELS = [f"channel{i}/youtube" for i in range(6)]
+
+
+def _manager(
+    root: str, node: str, ttl: float = 30.0, settle: float = 0.0
+) -> ShardManager:
+    return ShardManager(
+        FSLeaseStore(RealFS.from_path(Path(root))), node=node, ttl=ttl, settle=settle
+    )
+
+
+def _claim_in_process(root: str, node: str, barrier: Any, results: Any) -> None:
+    shards = _manager(root, node, settle=0.3)
+    shards.claim([])  # announce the node before anyone claims
+    barrier.wait()
+    results.put((node, shards.claim(CHANNELS)))
+
+
+class ShardingTester(unittest.TestCase):
+    """Main tester class."""
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_nodes_split_channels(self) -> None:
+        ctx = multiprocessing.get_context("spawn")
+        barrier = ctx.Barrier(3)
+        results = ctx.Queue()
+        procs = [
+            ctx.Process(
+                target=_claim_in_process, args=(self.root, f"node{i}", barrier, results)
+            )
+            for i in range(3)
+        ]
+        for proc in procs:
+            proc.start()
+        held = dict(results.get(timeout=60) for _ in procs)
+        for proc in procs:
+            proc.join(timeout=60)
+        claimed = [c for channels in held.values() for c in channels]
+        # every channel has exactly one holder and the work is split evenly
+        self.assertEqual(sorted(claimed), sorted(CHANNELS))
+        self.assertEqual([len(channels) for channels in held.values()], [2, 2, 2])
+
+    def test_holder_keeps_channel(self) -> None:
+        a = _manager(self.root, "a")
+        b = _manager(self.root, "b")
+        self.assertEqual(a.claim(CHANNELS[:1]), CHANNELS[:1])
+        self.assertEqual(b.claim(CHANNELS[:1]), [])
+        self.assertFalse(b.acquire(CHANNELS[0]))
+        # renewing keeps the claim time, so a holder never loses to a newcomer
+        a.renew_all()
+        self.assertTrue(a.holds(CHANNELS[0]))
+        self.assertEqual(b.claim(CHANNELS[:1]), [])
+
+    def test_expired_lease_is_taken_over(self) -> None:
+        a = _manager(self.root, "a", ttl=0.2)
+        b = _manager(self.root, "b")
+        self.assertEqual(a.claim(CHANNELS[:1]), CHANNELS[:1])
+        time.sleep(0.3)  # a stopped renewing
+        self.assertFalse(a.holds(CHANNELS[0]))
+        self.assertEqual(b.claim(CHANNELS[:1]), CHANNELS[:1])
+        a.renew_all()
+        self.assertEqual(a.held(), [])
+
+    def test_joining_node_gets_a_share(self) -> None:
+        a = _manager(self.root, "a")
+        b = _manager(self.root, "b")
+        self.assertEqual(a.claim(CHANNELS[:4]), CHANNELS[:4])
+        self.assertEqual(b.claim(CHANNELS[:4]), [])
+        # a sees two live nodes and hands over what's above its share
+        self.assertEqual(a.claim(CHANNELS[:4]), CHANNELS[:2])
+        self.assertEqual(b.claim(CHANNELS[:4]), CHANNELS[2:4])
+        b.release_all()
+        self.assertEqual(a.claim(CHANNELS[:4]), CHANNELS[:4])
+
+    def test_heartbeat_hands_over(self) -> None:
+        a = _manager(self.root, "a")
+        b = _manager(self.root, "b")
+        self.assertEqual(a.claim(CHANNELS[:4]), CHANNELS[:4])
+        self.assertEqual(b.claim(CHANNELS[:4]), [])
+        # a daemon never claims again, the renewal releases what's above the share
+        a.renew_all()
+        self.assertEqual(a.held(), CHANNELS[:2])
+        self.assertTrue(all(b.acquire(c) for c in CHANNELS[2:4]))
+        self.assertFalse(b.acquire(CHANNELS[0]))
+
+    def test_busy_channel_is_kept(self) -> None:
+        a = _manager(self.root, "a")
+        b = _manager(self.root, "b")
+        self.assertEqual(a.claim(CHANNELS[:2]), CHANNELS[:2])
+        self.assertEqual(b.claim(CHANNELS[:2]), [])
+        with a.busy(CHANNELS[0]), a.busy(CHANNELS[1]) as held:
+            self.assertTrue(held)
+            # both are being worked on, neither is handed over
+            a.renew_all()
+            self.assertEqual(a.held(), CHANNELS[:2])
+            self.assertFalse(b.acquire(CHANNELS[1]))
+        # handed over at the next heartbeat once it's idle
+        a.renew_all()
+        self.assertEqual(a.held(), CHANNELS[:1])
+        self.assertTrue(b.acquire(CHANNELS[1]))
+        with a.busy(CHANNELS[1]) as held:
+            self.assertFalse(held)
+
+
+if __name__ == "__main__":
+    unittest.main()
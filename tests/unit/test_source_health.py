@@ -0,0 +1,160 @@
+"""
+Unit test file.
+"""
+
+import time
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from youtube_sync.source_health import (
+    BASE_BACKOFF_SECONDS,
+    PROBE_SECONDS,
+    CircuitState,
+    FailureKind,
+    SourceHealthController,
+    backoff_seconds,
+    classify_failure,
+)
+from youtube_sync.types import Source
+
+
+class SourceHealthTester(unittest.TestCase):
+    """Main tester class."""
+
+    def test_classify(self) -> None:
+        self.assertEqual(
+            classify_failure(
+                "ERROR: unable to download: HTTP Error 429: Too Many Requests"
+            ),
+            FailureKind.RATE_LIMIT,
+        )
+        self.assertEqual(
+            classify_failure("ERROR: Sign in to confirm you're not a bot"),
+            FailureKind.BOT_CHECK,
+        )
+        self.assertEqual(
+            classify_failure(
+                "The uploader has not made this video available in your country"
+            ),
+            FailureKind.GEO,
+        )
+        self.assertEqual(
+            classify_failure("ERROR: Private video"), FailureKind.UNAVAILABLE
+        )
+        self.assertEqual(
+            classify_failure(
+                "urlopen error [Errno -3] Temporary failure in name resolution"
+            ),
+            FailureKind.NETWORK,
+        )
+        self.assertEqual(
+            classify_failure(
+                "ERROR: unable to download video data: HTTP Error 403: Forbidden"
+            ),
+            FailureKind.FORBIDDEN,
+        )
+        self.assertEqual(classify_failure("something odd"), FailureKind.UNKNOWN)
+
+    def test_backoff_grows_and_is_capped(self) -> None:
+        self.assertEqual(backoff_seconds(0), 0.0)
+        for failures in range(1, 20):
+            delay = backoff_seconds(failures, base=10, cap=100)
+            expected = min(100, 10 * 2 ** (failures - 1))
+            self.assertGreaterEqual(delay, expected / 2)
+            self.assertLessEqual(delay, expected)
+
+    def test_circuit_opens_and_persists(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "health.json"
+            controller = SourceHealthController(state_path=path)
+            # per video failures never pause the source
+            for _ in range(20):
+                controller.record_failure(Source.YOUTUBE, "ERROR: Private video")
+            self.assertFalse(controller.is_paused(Source.YOUTUBE))
+            kind = controller.record_failure(Source.YOUTUBE, "HTTP Error 429")
+            self.assertEqual(kind, FailureKind.RATE_LIMIT)
+            self.assertTrue(controller.is_paused(Source.YOUTUBE))
+            self.assertFalse(controller.is_paused(Source.RUMBLE))
+
+            reloaded = SourceHealthController(state_path=path)
+            self.assertTrue(reloaded.is_paused(Source.YOUTUBE))
+
+            # once the pause has passed a single probe is allowed
+            health = reloaded.get(Source.YOUTUBE)
+            health.paused_until = 0
+            self.assertEqual(health.state(), CircuitState.HALF_OPEN)
+            reloaded.record_failure(Source.YOUTUBE, "Connection reset by peer")
+            self.assertTrue(reloaded.is_paused(Source.YOUTUBE))
+            health.paused_until = 0
+            reloaded.record_success(Source.YOUTUBE)
+            self.assertEqual(health.state(), CircuitState.CLOSED)
+
+            # a 403 alone is one video's problem, a run of them pauses the source
+            for _ in range(4):
+                reloaded.record_failure(Source.RUMBLE, "HTTP Error 403: Forbidden")
+            self.assertFalse(reloaded.is_paused(Source.RUMBLE))
+            reloaded.record_failure(Source.RUMBLE, "HTTP Error 403: Forbidden")
+            self.assertTrue(reloaded.is_paused(Source.RUMBLE))
+
+    def test_kinds_count_apart_and_backoff_follows_opens(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            controller = SourceHealthController(
+                state_path=Path(temp_dir) / "health.json"
+            )
+            # two odd errors and one 503 are no run of three network errors
+            controller.record_failure(Source.YOUTUBE, "ffmpeg exited with 1")
+            controller.record_failure(Source.YOUTUBE, "ffmpeg exited with 1")
+            controller.record_failure(Source.YOUTUBE, "HTTP Error 503")
+            self.assertFalse(controller.is_paused(Source.YOUTUBE))
+            for _ in range(9):
+                controller.record_failure(Source.YOUTUBE, "ffmpeg exited with 1")
+            self.assertFalse(controller.is_paused(Source.YOUTUBE))
+            controller.record_failure(Source.YOUTUBE, "ffmpeg exited with 1")
+            health = controller.get(Source.YOUTUBE)
+            # the first open waits around the base delay, not 2**9 of it
+            self.assertEqual(health.opens, 1)
+            self.assertLessEqual(
+                health.seconds_until_resume(), BASE_BACKOFF_SECONDS + 1
+            )
+            # the failed probe doubles it
+            health.paused_until = 0
+            controller.record_failure(Source.YOUTUBE, "HTTP Error 503")
+            self.assertEqual(health.opens, 2)
+            self.assertGreaterEqual(
+                health.seconds_until_resume(), BASE_BACKOFF_SECONDS - 1
+            )
+            reloaded = SourceHealthController(state_path=Path(temp_dir) / "health.json")
+            self.assertEqual(reloaded.get(Source.YOUTUBE).opens, 2)
+            self.assertEqual(
+                reloaded.get(Source.YOUTUBE).streak_kind, FailureKind.NETWORK
+            )
+
+    def test_half_open_admits_one_probe(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            controller = SourceHealthController(
+                state_path=Path(temp_dir) / "health.json"
+            )
+            self.assertEqual(controller.admit(Source.YOUTUBE), CircuitState.CLOSED)
+            self.assertEqual(controller.admit(Source.YOUTUBE), CircuitState.CLOSED)
+            controller.record_failure(Source.YOUTUBE, "HTTP Error 429")
+            self.assertEqual(controller.admit(Source.YOUTUBE), CircuitState.OPEN)
+
+            health = controller.get(Source.YOUTUBE)
+            health.paused_until = 0
+            self.assertFalse(controller.is_paused(Source.YOUTUBE))
+            self.assertEqual(controller.admit(Source.YOUTUBE), CircuitState.HALF_OPEN)
+            # everyone else waits for the probe
+            self.assertEqual(controller.admit(Source.YOUTUBE), CircuitState.OPEN)
+            self.assertTrue(controller.is_paused(Source.YOUTUBE))
+            # a probe that never reports frees the slot after a while
+            self.assertEqual(
+                health.admit(now=time.time() + PROBE_SECONDS + 1),
+                CircuitState.HALF_OPEN,
+            )
+            controller.record_success(Source.YOUTUBE)
+            self.assertEqual(controller.admit(Source.YOUTUBE), CircuitState.CLOSED)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+"""
+Unit test file.
+"""
+
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+
+from youtube_sync import RealFS
+from youtube_sync.staging import ESTIMATE_FACTOR, StagingBudget
+from youtube_sync.ytdlp.download_request import DownloadRequest
+
+
+def _request(download_vid: bool = True) -> DownloadRequest:
+    return DownloadRequest(
+        url="https://rumble.com/v1.html",
+        outmp3=RealFS.from_path(Path("unused.mp3")),
+        download_vid=download_vid,
+        download_date=True,
+    )
+
+
+class StagingTester(unittest.TestCase):
+    """Main tester class."""
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_estimate_and_areas(self) -> None:
+        budget = StagingBudget(
+            root=self.root / "disk",
+            budget=1000,
+            fast_root=self.root / "shm",
+            fast_budget=100,
+            fast_max=50,
+            estimate=300,
+        )
+        self.assertTrue((self.root / "disk").is_dir())
+        self.assertEqual(budget.estimate(_request(download_vid=False), 10), 0)
+        self.assertEqual(budget.estimate(_request(), 10), int(10 * ESTIMATE_FACTOR))
+        # yt-dlp didn't know the size
+        self.assertEqual(budget.estimate(_request()), 300)
+
+        async def run() -> list[Path]:
+            small = await budget.reserve(_request(), 10)
+            big = await budget.reserve(_request(), 100)
+            unknown = await budget.reserve(_request())
+            return [small.area.root, big.area.root, unknown.area.root]
+
+        self.assertEqual(
+            asyncio.run(run()),
+            [self.root / "shm", self.root / "disk", self.root / "disk"],
+        )
+
+    def test_backpressure(self) -> None:
+        budget = StagingBudget(root=self.root, budget=500, estimate=300)
+        order: list[str] = []
+
+        async def download(name: str, request: DownloadRequest, seconds: float) -> None:
+            reservation = await budget.reserve(request)
+            order.append(f"start {name}")
+            await asyncio.sleep(seconds)
+            order.append(f"end {name}")
+            await budget.release(reservation)
+
+        async def run() -> None:
+            first = asyncio.ensure_future(download("a", _request(), 0.2))
+            await asyncio.sleep(0.05)
+            # b doesn't fit next to a, the date lookup needs no space
+            await asyncio.gather(
+                first,
+                download("b", _request(), 0),
+                download("date", _request(download_vid=False), 0),
+            )
+
+        asyncio.run(run())
+        self.assertEqual(
+            order, ["start a", "start date", "end date", "end a", "start b", "end b"]
+        )
+        self.assertEqual(budget.area.reserved, 0)
+
+    def test_bigger_than_budget_runs_alone(self) -> None:
+        budget = StagingBudget(root=self.root, budget=200, estimate=300)
+
+        async def run() -> list[int]:
+            first = await budget.reserve(_request())
+            waiting = asyncio.ensure_future(budget.reserve(_request()))
+            await asyncio.sleep(0.05)
+            self.assertFalse(waiting.done())
+            await budget.release(first)
+            second = await waiting
+            await budget.release(second)
+            return [first.nbytes, second.nbytes]
+
+        self.assertEqual(asyncio.run(run()), [300, 300])
+        self.assertEqual(budget.area.reserved, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+"""
+Unit test file.
+"""
+
+import os
+import stat
+import sys
+import time
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from youtube_sync.ytdlp.download_best_audio import RealYtdlp
+from youtube_sync.ytdlp.exe import YtDlpCmdRunner
+from youtube_sync.ytdlp.progress import ProgressEvent, parse_progress_line
+from youtube_sync.ytdlp.watchdog import StallPolicy, StallWatchdog
+
+_HANGING_YTDLP = """#!{python}
+import sys, time
+print("[youtube] abc: Downloading webpage", flush=True)
+sys.stdout.write("[download]   1.0% of   10.00MiB at  100.00KiB/s ETA 01:40\\r")
+sys.stdout.flush()
+time.sleep(60)
+"""
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _event(downloaded: int) -> ProgressEvent:
+    return ProgressEvent(
+        downloaded_bytes=downloaded, total_bytes=10**9, speed=None, eta_seconds=None
+    )
+
+
+class StallWatchdogTester(unittest.TestCase):
+    """Main tester class."""
+
+    def test_parse_progress(self) -> None:
+        event = parse_progress_line(
+            "[download]  50.0% of ~  10.00MiB at    1.00MiB/s ETA 00:05 (frag 3/10)"
+        )
+        assert event is not None
+        self.assertEqual(event.total_bytes, 10 * 1024 * 1024)
+        self.assertEqual(event.downloaded_bytes, 5 * 1024 * 1024)
+        self.assertEqual(event.speed, 1024 * 1024)
+        self.assertEqual(event.eta_seconds, 5)
+        self.assertIsNone(parse_progress_line("[youtube] abc: Downloading webpage"))
+
+    def test_slow_download(self) -> None:
+        clock = _Clock()
+        policy = StallPolicy(
+            min_bytes_per_second=10_000, window_seconds=60, no_progress_seconds=100
+        )
+        watchdog = StallWatchdog(policy, clock=clock)
+        for second in range(0, 61):
+            clock.now = float(second)
+            watchdog.on_progress(_event(second * 1000))  # 1 KB/s
+            if second < 60:
+                self.assertIsNone(watchdog.check())
+        reason = watchdog.check()
+        self.assertIsNotNone(reason)
+        self.assertIn("throughput", reason or "")
+
+    def test_fast_download_is_fine(self) -> None:
+        clock = _Clock()
+        watchdog = StallWatchdog(StallPolicy(window_seconds=60), clock=clock)
+        for second in range(0, 300):
+            clock.now = float(second)
+            watchdog.on_progress(_event(second * 1_000_000))
+            self.assertIsNone(watchdog.check())
+
+    def test_no_bytes(self) -> None:
+        clock = _Clock()
+        watchdog = StallWatchdog(StallPolicy(no_progress_seconds=30), clock=clock)
+        watchdog.on_progress(_event(1000))
+        for second in range(1, 40):
+            clock.now = float(second)
+            watchdog.on_progress(_event(1000))  # same byte count, nothing new
+        self.assertIn("no bytes", watchdog.check() or "")
+
+    def test_finished_download_is_not_stalled(self) -> None:
+        clock = _Clock()
+        policy = StallPolicy(
+            min_bytes_per_second=10_000,
+            window_seconds=60,
+            no_progress_seconds=30,
+            silent_seconds=1000,
+        )
+        watchdog = StallWatchdog(policy, clock=clock)
+        watchdog.on_progress(_event(10**8))
+        watchdog.on_progress(_event(10**9))  # 100%, the post processing starts
+        for second in range(1, 200):
+            clock.now = float(second)
+            watchdog.on_output()
+            self.assertIsNone(watchdog.check())
+        # the next format starts over and is watched again
+        watchdog.on_progress(_event(1000))
+        clock.now = 300.0
+        self.assertIn("no bytes", watchdog.check() or "")
+
+    @unittest.skipIf(sys.platform == "win32", "posix shebang script")
+    def test_kills_hanging_ytdlp(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            exe = Path(temp_dir) / "yt-dlp"
+            exe.write_text(
+                _HANGING_YTDLP.format(python=sys.executable), encoding="utf-8"
+            )
+            exe.chmod(exe.stat().st_mode | stat.S_IEXEC)
+            policy = StallPolicy(no_progress_seconds=1, silent_seconds=2)
+            real = RealYtdlp(YtDlpCmdRunner(exe), stall_policy=policy)
+            start = time.time()
+            rslt = real.execute(["https://example.com/video"])
+            self.assertLess(time.time() - start, 30)
+            self.assertFalse(rslt.ok)
+            self.assertIsNotNone(rslt.stall_reason)
+            self.assertIn("Downloading webpage", rslt.stdout or "")
+            self.assertTrue(os.path.exists(exe))
+
+
+if __name__ == "__main__":
+    unittest.main()
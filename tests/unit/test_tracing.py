@@ -0,0 +1,72 @@
+"""
+Unit test file.
+"""
+
+import contextvars
+import json
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from youtube_sync.cli.trace_report import load_spans, select_run, summarize
+from youtube_sync.tracing import set_trace_path, span, start_run, trace_context
+
+
+class TracingTester(unittest.TestCase):
+    """Main tester class."""
+
+    def test_spans_carry_context_into_pools(self) -> None:
+        with TemporaryDirectory() as tmp:
+            path = Path(tmp) / "traces.jsonl"
+            set_trace_path(path)
+            run_id = start_run()
+
+            def stage() -> None:
+                with span("download") as rec:
+                    rec["ok"] = False  # e.g. the function returned an Exception
+
+            with trace_context(channel="chan", url="https://x/1"):
+                ctx = contextvars.copy_context()
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                pool.submit(ctx.run, stage).result()
+            with self.assertRaises(ValueError):
+                with span("convert", url="https://x/2"):
+                    raise ValueError("boom")
+
+            records = [json.loads(line) for line in path.read_text().splitlines()]
+            self.assertEqual(len(records), 2)
+            self.assertEqual(records[0]["stage"], "download")
+            self.assertEqual(records[0]["channel"], "chan")
+            self.assertEqual(records[0]["url"], "https://x/1")
+            self.assertFalse(records[0]["ok"])
+            self.assertEqual(records[0]["run_id"], run_id)
+            self.assertEqual(records[1]["error"], "ValueError")
+            self.assertNotIn("channel", records[1])
+
+    def test_report(self) -> None:
+        with TemporaryDirectory() as tmp:
+            path = Path(tmp) / "traces.jsonl"
+            lines = [{"run_id": "old", "stage": "download", "duration_seconds": 100.0}]
+            for i in range(1, 21):
+                lines.append(
+                    {"run_id": "new", "stage": "download", "duration_seconds": float(i)}
+                )
+            lines.append(
+                {"run_id": "new", "stage": "copy", "duration_seconds": 0.5, "ok": False}
+            )
+            text = "\n".join(json.dumps(line) for line in lines) + "\nnot json\n"
+            path.write_text(text, encoding="utf-8")
+            spans = select_run(load_spans(path), None)
+            summaries = summarize(spans)
+            self.assertEqual([s.stage for s in summaries], ["download", "copy"])
+            download = summaries[0]
+            self.assertEqual(download.count, 20)
+            self.assertEqual(download.p50, 10.0)
+            self.assertEqual(download.p95, 19.0)
+            self.assertEqual(download.max, 20.0)
+            self.assertEqual(summaries[1].failures, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
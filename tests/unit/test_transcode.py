@@ -0,0 +1,91 @@
+"""
+Unit test file.
+"""
+
+import os
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from youtube_sync.ffmpeg import _FfmpegProgress
+from youtube_sync.transcode import (
+    ENV_TRANSCODE_JOBS,
+    EncodeStats,
+    TranscodeScheduler,
+    cgroup_cpu_quota,
+    lower_ffmpeg_priority,
+    transcode_concurrency,
+    transcode_nice,
+)
+
+
+class TranscodeTester(unittest.TestCase):
+    """Main tester class."""
+
+    def test_cgroup_v2_quota(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            (root / "cpu.max").write_text("150000 100000\n", encoding="utf-8")
+            self.assertAlmostEqual(cgroup_cpu_quota(root) or 0, 1.5)
+            (root / "cpu.max").write_text("max 100000\n", encoding="utf-8")
+            self.assertIsNone(cgroup_cpu_quota(root))
+
+    def test_cgroup_v1_quota(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            (root / "cpu").mkdir()
+            (root / "cpu" / "cpu.cfs_quota_us").write_text("400000", encoding="utf-8")
+            (root / "cpu" / "cpu.cfs_period_us").write_text("100000", encoding="utf-8")
+            self.assertAlmostEqual(cgroup_cpu_quota(root) or 0, 4.0)
+
+    def test_concurrency(self) -> None:
+        os.environ.pop(ENV_TRANSCODE_JOBS, None)
+        self.assertEqual(transcode_concurrency(1.0), 1)
+        self.assertEqual(transcode_concurrency(2.0), 1)
+        self.assertEqual(transcode_concurrency(8.0), 6)
+        os.environ[ENV_TRANSCODE_JOBS] = "3"
+        try:
+            self.assertEqual(transcode_concurrency(8.0), 3)
+        finally:
+            os.environ.pop(ENV_TRANSCODE_JOBS, None)
+
+    def test_progress_parsing(self) -> None:
+        progress = _FfmpegProgress()
+        for line in ["out_time_us=61500000", "speed=42.5x", "progress=end"]:
+            progress.feed(line)
+        self.assertAlmostEqual(progress.media_seconds or 0, 61.5)
+        self.assertAlmostEqual(progress.speed or 0, 42.5)
+
+    def test_scheduler_stats(self) -> None:
+        scheduler = TranscodeScheduler(max_workers=2)
+        try:
+            futures = [scheduler.submit(lambda x: x * 2, i) for i in range(5)]
+            self.assertEqual([f.result() for f in futures], [0, 2, 4, 6, 8])
+            scheduler.record(
+                EncodeStats(
+                    input_file="a.webm", media_seconds=600, wall_seconds=3, ok=True
+                )
+            )
+            stats = scheduler.stats()
+            self.assertEqual(stats["completed"], 5)
+            self.assertEqual(stats["queued"], 0)
+            self.assertAlmostEqual(stats["avg_realtime_factor"], 200)
+        finally:
+            scheduler.shutdown()
+
+    @unittest.skipUnless(hasattr(os, "setpriority"), "posix only")
+    def test_lower_priority_after_spawn(self) -> None:
+        proc = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(5)"])
+        try:
+            lower_ffmpeg_priority(proc.pid)
+            expected = min(19, os.getpriority(os.PRIO_PROCESS, 0) + transcode_nice())
+            self.assertEqual(os.getpriority(os.PRIO_PROCESS, proc.pid), expected)
+        finally:
+            proc.kill()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    unittest.main()